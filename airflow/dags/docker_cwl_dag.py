@@ -23,6 +23,8 @@ CWL_EXAMPLES_DIR = Path("/opt/airflow/cwl/cwl")
 WORKFLOW_FILE = CWL_EXAMPLES_DIR / "docker_workflow.cwl"
 JOB_FILE = CWL_EXAMPLES_DIR / "docker_job.yml"
 OUTPUT_DIR = Path("/opt/airflow/cwl-output/docker_cwl")
+# Step results are reused across runs when tool and inputs are unchanged
+CACHE_DIR = Path("/opt/airflow/cwl-output/cache")
 
 
 def validate_cwl_files(**context):
@@ -73,6 +75,8 @@ with DAG(
             cd {OUTPUT_DIR} && \
             cwltool \
                 --outdir {OUTPUT_DIR} \
+                --cachedir {CACHE_DIR} \
+                --parallel \
                 --timestamps \
                 --verbose \
                 {WORKFLOW_FILE} \
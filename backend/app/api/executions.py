@@ -6,12 +6,13 @@ Per PLAN.md Stage 5 and SPEC.md Sections 5.4, 5.5, and 7
 Updated for Stage 5: Integrated with execution engine for real CWL→Airflow execution
 """
 
+import os
 import uuid
 import asyncio
 import logging
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks, Response
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks, Response, Header
 from pydantic import BaseModel, Field
 import docker
 
@@ -24,6 +25,7 @@ from app.models.execution import (
     ExecutionRequest,
     ExecutionResponse,
     ExecutionStatusResponse,
+    TaskStateEvent,
     ResultFile,
     ExecutionResultsResponse,
     NodeStatusMessage,
@@ -33,6 +35,9 @@ from app.models.execution import (
 from app.services.database import db_service
 from app.services.minio_client import minio_service
 from app.services.export import sds_exporter
+from app.services.execution_store import execution_store, is_terminal
+from app.services.execution_log_writer import execution_log_writer
+from app.services.shared_state import shared_state
 
 # Stage 5: Import execution engine
 try:
@@ -48,23 +53,36 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# In-memory execution storage
-_executions: Dict[str, Dict[str, Any]] = {}
+# Execution records, shared with the execution engine
+_executions = execution_store
 
-# In-memory workflow/CWL cache (from workflow assembly)
-_workflow_cwl_cache: Dict[str, str] = {}
+# Workflow CWL (from workflow assembly), shared by the API workers
+_workflow_cwl_cache = shared_state.dict("workflow_cwl")
+
+# Shared state channel of execution WebSocket messages
+EXECUTION_CHANNEL = "executions"
 
 
 # WebSocket connection manager
 class ConnectionManager:
-    def __init__(self):
+    """
+    WebSocket clients of this worker, by execution.
+    
+    Messages are published on the shared state channel, so the clients of
+    every API worker receive them whichever worker runs the execution.
+    """
+    
+    def __init__(self, state=None):
         self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.state = state or shared_state
+        self.state.subscribe(EXECUTION_CHANNEL, self._deliver)
     
     async def connect(self, websocket: WebSocket, execution_id: str):
         await websocket.accept()
         if execution_id not in self.active_connections:
             self.active_connections[execution_id] = []
         self.active_connections[execution_id].append(websocket)
+        self.state.start()
     
     def disconnect(self, websocket: WebSocket, execution_id: str):
         if execution_id in self.active_connections:
@@ -72,6 +90,10 @@ class ConnectionManager:
                 self.active_connections[execution_id].remove(websocket)
     
     async def broadcast(self, message: dict, execution_id: str):
+        await self.state.publish(EXECUTION_CHANNEL, {"execution_id": execution_id, "message": message})
+    
+    async def _deliver(self, event: dict):
+        execution_id, message = event["execution_id"], event["message"]
         if execution_id in self.active_connections:
             disconnected = []
             for connection in self.active_connections[execution_id]:
@@ -87,14 +109,14 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
-def set_workflow_cwl(workflow_id: str, cwl_content: str):
+async def set_workflow_cwl(workflow_id: str, cwl_content: str):
     """Store CWL content for a workflow (called from workflows API)."""
-    _workflow_cwl_cache[workflow_id] = cwl_content
+    await _workflow_cwl_cache.aset(workflow_id, cwl_content)
 
 
-def get_workflow_cwl(workflow_id: str) -> Optional[str]:
+async def get_workflow_cwl(workflow_id: str) -> Optional[str]:
     """Get stored CWL content for a workflow."""
-    return _workflow_cwl_cache.get(workflow_id)
+    return await _workflow_cwl_cache.aget(workflow_id)
 
 
 async def _broadcast_status_update(exec_data: Dict[str, Any]):
@@ -123,14 +145,39 @@ async def _broadcast_status_update(exec_data: Dict[str, Any]):
     # Broadcast overall progress
     overall_progress = exec_data.get("overall_progress", 0)
     exec_status = exec_data.get("status")
+    await manager.broadcast(
+        {
+            "type": "progress",
+            "timestamp": datetime.utcnow().isoformat(),
+            "execution_id": execution_id,
+            "progress": overall_progress,
+            "eta_seconds": exec_data.get("eta_seconds"),
+            "estimated_completion": exec_data.get("estimated_completion"),
+        },
+        execution_id,
+    )
     
-    if exec_status in [ExecutionStatus.COMPLETED, ExecutionStatus.FAILED]:
+    # Broadcast the position of queued executions
+    if exec_status == ExecutionStatus.QUEUED and exec_data.get("queue_position"):
         await manager.broadcast(
             {
-                "type": "execution_complete",
+                "type": "queue",
                 "timestamp": datetime.utcnow().isoformat(),
                 "execution_id": execution_id,
-                "status": exec_status.value if hasattr(exec_status, 'value') else exec_status,
+                "position": exec_data["queue_position"],
+            },
+            execution_id,
+        )
+    
+    # Broadcast task output tailed since the last update
+    for entry in exec_data.get("task_log_lines", []):
+        await manager.broadcast(
+            {
+                "type": "log",
+                "timestamp": entry["timestamp"],
+                "level": entry["level"],
+                "message": entry["message"],
+                "node_id": entry["node_id"],
             },
             execution_id,
         )
@@ -149,6 +196,18 @@ async def _broadcast_status_update(exec_data: Dict[str, Any]):
             },
             execution_id,
         )
+    
+    # Completion last, after the output it produced
+    if is_terminal(exec_data):
+        await manager.broadcast(
+            {
+                "type": "execution_complete",
+                "timestamp": datetime.utcnow().isoformat(),
+                "execution_id": execution_id,
+                "status": exec_status.value if hasattr(exec_status, 'value') else exec_status,
+            },
+            execution_id,
+        )
 
 
 @router.post("/executions", response_model=ExecutionResponse, status_code=202)
@@ -170,7 +229,7 @@ async def run_workflow(request: ExecutionRequest, background_tasks: BackgroundTa
         # Stage 5: Use real execution engine
         
         # Get CWL content for workflow
-        cwl_content = get_workflow_cwl(request.workflow_id)
+        cwl_content = await get_workflow_cwl(request.workflow_id)
         
         if not cwl_content:
             # Generate a sample CWL workflow for demo
@@ -192,29 +251,21 @@ async def run_workflow(request: ExecutionRequest, background_tasks: BackgroundTa
         execution_id = prep_result["execution_id"]
         dag_id = prep_result["dag_id"]
         
-        # Store in local cache for status queries
-        _executions[execution_id] = {
-            "execution_id": execution_id,
-            "workflow_id": request.workflow_id,
-            "dag_id": dag_id,
-            "status": ExecutionStatus.QUEUED,
-            "overall_progress": 0,
-            "config": config_dict,
-            "node_statuses": {},
-            "logs": [],
-            "created_at": datetime.utcnow().isoformat(),
-        }
-        
-        # Start execution in background
-        background_tasks.add_task(
-            _start_execution_task,
+        # Queue for a run slot (starts right away when one is free)
+        submitted = await execution_engine.submit_execution(
             execution_id,
+            status_callback=_sync_execution_status,
+            user_id=request.user_id,
+            priority=request.priority,
         )
+        if not submitted.get("success"):
+            raise HTTPException(status_code=429, detail=submitted.get("error", "Execution queue is full"))
         
         return ExecutionResponse(
             execution_id=execution_id,
             status=ExecutionStatus.QUEUED,
             dag_id=dag_id,
+            queue_position=submitted.get("queue_position") or None,
         )
     
     else:
@@ -253,43 +304,10 @@ async def run_workflow(request: ExecutionRequest, background_tasks: BackgroundTa
         )
 
 
-async def _start_execution_task(execution_id: str):
-    """Background task to start execution via engine."""
-    try:
-        result = await execution_engine.start_execution(
-            execution_id=execution_id,
-            status_callback=_sync_execution_status,
-        )
-        
-        if not result.get("success"):
-            logger.error(f"Execution start failed: {result.get('error')}")
-            if execution_id in _executions:
-                _executions[execution_id]["status"] = ExecutionStatus.FAILED
-                _executions[execution_id]["error"] = result.get("error")
-    except Exception as e:
-        logger.error(f"Execution task error: {e}")
-        if execution_id in _executions:
-            _executions[execution_id]["status"] = ExecutionStatus.FAILED
-            _executions[execution_id]["error"] = str(e)
-
-
 async def _sync_execution_status(exec_data: Dict[str, Any]):
-    """Sync execution status from engine to local cache and broadcast."""
-    execution_id = exec_data.get("execution_id")
-    if execution_id and execution_id in _executions:
-        # Update local cache
-        _executions[execution_id].update({
-            "status": exec_data.get("status", ExecutionStatus.RUNNING),
-            "overall_progress": exec_data.get("overall_progress", 0),
-            "node_statuses": exec_data.get("node_statuses", {}),
-            "logs": exec_data.get("logs", []),
-            "results": exec_data.get("results"),
-            "provenance": exec_data.get("provenance"),
-            "updated_at": datetime.utcnow().isoformat(),
-        })
-        
-        # Broadcast updates
-        await _broadcast_status_update(_executions[execution_id])
+    """Broadcast a status update of the engine (the record is shared)."""
+    exec_data["updated_at"] = datetime.utcnow().isoformat()
+    await _broadcast_status_update(exec_data)
 
 
 async def _run_mock_execution(execution_id: str):
@@ -348,7 +366,7 @@ async def _run_mock_execution(execution_id: str):
         await _broadcast_status_update(exec_data)
     
     # Mark execution complete
-    exec_data["status"] = ExecutionStatus.COMPLETED
+    exec_data["status"] = ExecutionStatus.SUCCESS
     exec_data["completed_at"] = datetime.utcnow().isoformat()
     exec_data["logs"].append({
         "timestamp": datetime.utcnow().isoformat(),
@@ -358,6 +376,65 @@ async def _run_mock_execution(execution_id: str):
     await _broadcast_status_update(exec_data)
 
 
+@router.post("/executions/events", status_code=202)
+async def receive_task_event(
+    event: TaskStateEvent,
+    x_veriflow_token: Optional[str] = Header(None),
+):
+    """
+    Webhook for task state changes pushed by generated DAGs.
+    
+    The event only triggers an immediate status poll of its DAG run (by
+    the API worker monitoring it), so the UI is updated within about a
+    second; the run state itself is always read from the Airflow API.
+    """
+    token = os.getenv("VERIFLOW_WEBHOOK_TOKEN")
+    if token and x_veriflow_token != token:
+        raise HTTPException(status_code=401, detail="Invalid webhook token")
+    
+    accepted = bool(
+        EXECUTION_ENGINE_AVAILABLE and execution_engine
+        and await execution_engine.handle_task_event(event.dag_run_id)
+    )
+    return {"accepted": accepted}
+
+
+@router.delete("/executions/cache")
+async def invalidate_call_cache(workflow_id: Optional[str] = None, step_id: Optional[str] = None):
+    """
+    Drop cached step results so the steps run again on the next execution.
+
+    Without filters, the whole call cache is cleared.
+    """
+    cache = execution_engine.call_cache if EXECUTION_ENGINE_AVAILABLE and execution_engine else None
+    if cache is None:
+        return {"removed": 0}
+    removed = await asyncio.to_thread(cache.invalidate, workflow_id, step_id)
+    return {"removed": removed}
+
+
+@router.post("/executions/{execution_id}/cancel")
+async def cancel_execution(execution_id: str):
+    """
+    Cancel a queued or running execution.
+    
+    Stops the Airflow DAG run (or local run) and removes the step
+    containers still running. Executions started by another API worker
+    are cancelled by that worker.
+    """
+    cancelled = bool(
+        EXECUTION_ENGINE_AVAILABLE and execution_engine
+        and await execution_engine.request_cancel(execution_id)
+    )
+    if not cancelled:
+        raise HTTPException(status_code=404, detail=f"No active execution {execution_id}")
+    
+    exec_data = execution_engine.get_execution_status(execution_id)
+    if exec_data:
+        await _broadcast_status_update(exec_data)
+    return {"execution_id": execution_id, "cancelled": True}
+
+
 @router.get("/executions/{execution_id}", response_model=ExecutionStatusResponse)
 async def get_execution_status(execution_id: str):
     """
@@ -367,37 +444,17 @@ async def get_execution_status(execution_id: str):
     - Returns overall progress and per-node status
     - Includes recent log entries
     """
-    # Check execution engine first
-    if EXECUTION_ENGINE_AVAILABLE and execution_engine:
-        engine_status = execution_engine.get_execution_status(execution_id)
-        if engine_status:
-            return ExecutionStatusResponse(
-                execution_id=execution_id,
-                status=engine_status.get("status", ExecutionStatus.RUNNING),
-                overall_progress=engine_status.get("overall_progress", 0),
-                nodes={
-                    node_id: NodeExecutionStatus(
-                        status=status.get("status", "pending"),
-                        progress=status.get("progress", 0),
-                    )
-                    for node_id, status in engine_status.get("node_statuses", {}).items()
-                },
-                logs=[
-                    LogEntry(**log) if isinstance(log, dict) else log
-                    for log in engine_status.get("logs", [])[-20:]
-                ],
-            )
-    
-    # Fallback to local cache
-    if execution_id not in _executions:
+    exec_data = await _executions.load(execution_id)
+    if not exec_data:
         raise HTTPException(status_code=404, detail=f"Execution {execution_id} not found")
     
-    exec_data = _executions[execution_id]
-    
     return ExecutionStatusResponse(
         execution_id=execution_id,
-        status=exec_data["status"],
+        status=exec_data.get("status", ExecutionStatus.RUNNING),
         overall_progress=exec_data.get("overall_progress", 0),
+        queue_position=exec_data.get("queue_position"),
+        eta_seconds=exec_data.get("eta_seconds"),
+        estimated_completion=exec_data.get("estimated_completion"),
         nodes={
             node_id: NodeExecutionStatus(
                 status=status.get("status", "pending"),
@@ -412,6 +469,38 @@ async def get_execution_status(execution_id: str):
     )
 
 
+@router.get("/executions/{execution_id}/logs")
+async def get_execution_logs(execution_id: str, after_seq: int = 0, limit: int = 100):
+    """
+    Page through the full log of an execution.
+    
+    Lines are ordered by sequence number; pass the returned next_seq as
+    after_seq to get the following page.
+    """
+    exec_data = await _executions.load(execution_id)
+    if not exec_data:
+        raise HTTPException(status_code=404, detail=f"Execution {execution_id} not found")
+    
+    limit = max(1, min(limit, 1000))
+    logs = await execution_log_writer.read(execution_id, after_seq=after_seq, limit=limit)
+    return {
+        "execution_id": execution_id,
+        "logs": logs,
+        "next_seq": logs[-1]["seq"] if logs else after_seq,
+    }
+
+
+async def _load_results(execution_id: str, exec_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Results index of an execution, from its record or the stored index."""
+    results = exec_data.get("results")
+    collector = execution_engine.result_collector if EXECUTION_ENGINE_AVAILABLE and execution_engine else None
+    if results is None and collector is not None:
+        results = await collector.load_index(execution_id)
+        if results is not None:
+            exec_data["results"] = results
+    return results or []
+
+
 @router.get("/executions/{execution_id}/results", response_model=ExecutionResultsResponse)
 async def get_execution_results(execution_id: str, node_id: Optional[str] = None):
     """
@@ -421,21 +510,12 @@ async def get_execution_results(execution_id: str, node_id: Optional[str] = None
     - Lists output files with presigned download URLs
     - Optionally filtered by node_id
     """
-    exec_data = None
-    
-    # Check execution engine first
-    if EXECUTION_ENGINE_AVAILABLE and execution_engine:
-        exec_data = execution_engine.get_execution_status(execution_id)
-    
-    # Fallback to local cache
-    if not exec_data and execution_id in _executions:
-        exec_data = _executions[execution_id]
+    exec_data = await _executions.load(execution_id)
     
     if not exec_data:
         raise HTTPException(status_code=404, detail=f"Execution {execution_id} not found")
     
-    # Get results from execution data or use mock
-    results = exec_data.get("results", [])
+    results = await _load_results(execution_id, exec_data)
     
     if not results:
         return ExecutionResultsResponse(
@@ -454,6 +534,7 @@ async def get_execution_results(execution_id: str, node_id: Optional[str] = None
             node_id=result.get("node_id"),
             size=result.get("size", 0),
             mime_type=result.get("mime_type", "application/octet-stream"),
+            sha256=result.get("sha256"),
         )
         
         # Add presigned URL
@@ -482,15 +563,7 @@ async def get_execution_provenance(execution_id: str):
     - Returns wasDerivedFrom relationships
     - Links inputs to outputs
     """
-    exec_data = None
-    
-    # Check execution engine first
-    if EXECUTION_ENGINE_AVAILABLE and execution_engine:
-        exec_data = execution_engine.get_execution_status(execution_id)
-    
-    # Fallback to local cache
-    if not exec_data and execution_id in _executions:
-        exec_data = _executions[execution_id]
+    exec_data = await _executions.load(execution_id)
     
     if not exec_data:
         raise HTTPException(status_code=404, detail=f"Execution {execution_id} not found")
@@ -510,7 +583,7 @@ async def get_execution_provenance(execution_id: str):
                 },
                 "output": {
                     "type": "process",
-                    "path": f"process/{execution_id}/derivative/",
+                    "path": f"process/{execution_id}/",
                     "wasDerivedFrom": "input",
                 },
             },
@@ -529,15 +602,7 @@ async def export_execution(execution_id: str):
     - Includes provenance.json with wasDerivedFrom
     - Returns downloadable ZIP file
     """
-    exec_data = None
-    
-    # Check execution engine first
-    if EXECUTION_ENGINE_AVAILABLE and execution_engine:
-        exec_data = execution_engine.get_execution_status(execution_id)
-    
-    # Fallback to local cache
-    if not exec_data and execution_id in _executions:
-        exec_data = _executions[execution_id]
+    exec_data = await _executions.load(execution_id)
     
     if not exec_data:
         raise HTTPException(status_code=404, detail=f"Execution {execution_id} not found")
@@ -564,8 +629,8 @@ async def export_execution(execution_id: str):
         }
     ]
     
-    # Get outputs from execution data or use mock
-    results = exec_data.get("results", [])
+    # Get outputs from the results index or use mock
+    results = await _load_results(execution_id, exec_data)
     if not results:
         results = [
             {
@@ -587,6 +652,8 @@ async def export_execution(execution_id: str):
             "format": result.get("mime_type", result.get("format", "application/octet-stream")),
             "type": result.get("type", "output"),
             "description": result.get("description", "Output file"),
+            "size": result.get("size"),
+            "sha256": result.get("sha256"),
         })
     
     # Get node statuses
@@ -657,8 +724,8 @@ async def websocket_logs(websocket: WebSocket, execution_id: Optional[str] = Non
         )
         
         # Send current status if execution exists
-        if exec_id in _executions:
-            exec_data = _executions[exec_id]
+        exec_data = await _executions.load(exec_id)
+        if exec_data:
             await websocket.send_json({
                 "type": "status",
                 "execution_id": exec_id,
@@ -666,6 +733,7 @@ async def websocket_logs(websocket: WebSocket, execution_id: Optional[str] = Non
                     if hasattr(exec_data.get("status"), 'value') 
                     else exec_data.get("status", "queued"),
                 "progress": exec_data.get("overall_progress", 0),
+                "eta_seconds": exec_data.get("eta_seconds"),
             })
         
         # Keep connection alive and handle messages
@@ -24,6 +24,7 @@ from app.models.sds import ConfidenceScores, ConfidenceScoreItem
 from app.models.session import AgentSession, Message, AgentType, MessageRole
 from app.services.minio_client import minio_service
 from app.services.database import db_service
+from app.services.shared_state import shared_state
 
 # Stage 4: Import Scholar Agent (Gemini 3 SDK)
 try:
@@ -137,12 +138,12 @@ async def upload_publication(
             with open(temp_pdf_path, "wb") as f:
                 f.write(file_content)
 
-            _upload_cache[upload_id] = {
+            await _upload_cache.aset(upload_id, {
                 "pdf_path": str(temp_pdf_path),
                 "context_content": context_content,
                 "status": "processing",
                 "result": None,
-            }
+            })
             # Queue background analysis
             background_tasks.add_task(
                 _process_publication_async,
@@ -152,13 +153,13 @@ async def upload_publication(
                 session_id,
             )
         except Exception as e:
-            _upload_cache[upload_id] = {
+            await _upload_cache.aset(upload_id, {
                 "pdf_path": None,
                 "context_content": context_content,
                 "status": "error",
                 "error": str(e),
                 "result": None,
-            }
+            })
     
     return UploadResponse(
         upload_id=upload_id,
@@ -169,8 +170,8 @@ async def upload_publication(
     )
 
 
-# Cache for upload processing results
-_upload_cache: dict[str, dict] = {}
+# Cache for upload processing results (shared by the API workers)
+_upload_cache = shared_state.dict("uploads")
 
 
 async def _process_publication_async(
@@ -187,8 +188,7 @@ async def _process_publication_async(
             upload_id=upload_id,
         )
         
-        _upload_cache[upload_id]["status"] = "completed"
-        _upload_cache[upload_id]["result"] = result
+        await _upload_cache.apatch(upload_id, {"status": "completed", "result": result})
         
         # Store conversation message in database
         try:
@@ -202,8 +202,7 @@ async def _process_publication_async(
             pass  # Continue even if DB is unavailable
             
     except Exception as e:
-        _upload_cache[upload_id]["status"] = "error"
-        _upload_cache[upload_id]["error"] = str(e)
+        await _upload_cache.apatch(upload_id, {"status": "error", "error": str(e)})
 
 
 
@@ -246,11 +245,11 @@ async def add_additional_info(upload_id: str, request: AdditionalInfoRequest):
     Add user-provided additional guidance for the publication.
     This info helps downstream agents (Engineer/Reviewer).
     """
-    if upload_id not in _upload_cache:
+    if not await _upload_cache.acontains(upload_id):
         raise HTTPException(status_code=404, detail="Upload not found")
     
     # Store the info in the cache entry
-    _upload_cache[upload_id]["additional_info"] = request.info
+    await _upload_cache.apatch(upload_id, {"additional_info": request.info})
     
     # If using DB (Stage 4), we would persist this here
     
@@ -275,8 +274,8 @@ async def get_study_design(upload_id: str):
         pass
     
     # Check if this is a pre-loaded example (prioritize preloaded data)
-    if upload_id in _upload_cache:
-        cache_entry = _upload_cache[upload_id]
+    cache_entry = await _upload_cache.aget(upload_id)
+    if cache_entry is not None:
         status = cache_entry.get("status", "processing")
         
         # Handle pre-loaded examples directly
@@ -401,7 +400,7 @@ async def load_example(request: LoadExampleRequest):
             pass
     
     # Store in cache with immediate completion status
-    _upload_cache[upload_id] = {
+    await _upload_cache.aset(upload_id, {
         "pdf_text": context_content or "[Pre-loaded example - no PDF text]",
         "context_content": context_content,
         "status": "completed",
@@ -413,7 +412,7 @@ async def load_example(request: LoadExampleRequest):
             "identified_measurements": ground_truth.get("identified_measurements", []),
         },
         "is_preloaded": True,
-    }
+    })
     
     # Create agent session (optional)
     try:
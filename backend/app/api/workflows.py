@@ -31,6 +31,8 @@ from app.models.workflow import (
 from app.services.veriflow_service import veriflow_service
 from app.services.database_sqlite import database_service
 from app.services.websocket_manager import manager
+from app.services.compile_cache import compile_cache
+from app.services.shared_state import shared_state
 
 # Stage 4: Import Engineer and Reviewer agents (Gemini 3 SDK)
 try:
@@ -51,8 +53,8 @@ except ImportError:
 
 router = APIRouter()
 
-# In-memory workflow storage (Design Mode)
-_workflows: dict[str, dict] = {}
+# Workflow storage (Design Mode), shared by the API workers
+_workflows = shared_state.dict("workflows")
 
 # --- New Models for Restart Logic ---
 class RestartRequest(BaseModel):
@@ -83,7 +85,7 @@ async def assemble_mama_mia_workflow(request: AssembleRequest):
     # Stage 4: Use Engineer Agent if available
     if AGENTS_AVAILABLE and CACHE_AVAILABLE:
         # Try to get ISA data from cache
-        cache_entry = _upload_cache.get(request.upload_id, {})
+        cache_entry = await _upload_cache.aget(request.upload_id, {})
         result = cache_entry.get("result", {})
         
         if result:
@@ -137,7 +139,7 @@ async def assemble_mama_mia_workflow(request: AssembleRequest):
                 )
                 
                 # Store workflow
-                _workflows[workflow_id] = {
+                await _workflows.aset(workflow_id, {
                     "workflow_id": workflow_id,
                     "upload_id": request.upload_id,
                     "assay_id": request.assay_id,
@@ -149,7 +151,7 @@ async def assemble_mama_mia_workflow(request: AssembleRequest):
                     "status": "draft",
                     "created_at": datetime.utcnow().isoformat(),
                     "updated_at": datetime.utcnow().isoformat(),
-                }
+                })
                 
                 return AssembleResponse(
                     workflow_id=workflow_id,
@@ -266,7 +268,7 @@ async def assemble_mama_mia_workflow(request: AssembleRequest):
     graph = WorkflowGraph(nodes=nodes, edges=edges)
     
     # Store workflow in memory
-    _workflows[workflow_id] = {
+    await _workflows.aset(workflow_id, {
         "workflow_id": workflow_id,
         "upload_id": request.upload_id,
         "assay_id": request.assay_id,
@@ -274,7 +276,7 @@ async def assemble_mama_mia_workflow(request: AssembleRequest):
         "status": "draft",
         "created_at": datetime.utcnow().isoformat(),
         "updated_at": datetime.utcnow().isoformat(),
-    }
+    })
     
     return AssembleResponse(
         workflow_id=workflow_id,
@@ -475,7 +477,7 @@ async def assemble_workflow_from_scholar(request: DynamicAssembleRequest):
     graph = WorkflowGraph(nodes=nodes, edges=edges)
 
     # Store workflow in memory
-    _workflows[workflow_id] = {
+    await _workflows.aset(workflow_id, {
         "workflow_id": workflow_id,
         "run_id": request.run_id,
         "assay_id": request.assay_id,
@@ -483,7 +485,7 @@ async def assemble_workflow_from_scholar(request: DynamicAssembleRequest):
         "status": "draft",
         "created_at": datetime.utcnow().isoformat(),
         "updated_at": datetime.utcnow().isoformat(),
-    }
+    })
 
     return AssembleResponse(
         workflow_id=workflow_id,
@@ -498,34 +500,45 @@ async def get_workflow(workflow_id: str):
     """
     Get the current state of a workflow (Design Mode).
     """
-    if workflow_id not in _workflows:
+    workflow = await _workflows.aget(workflow_id)
+    if workflow is None:
         raise HTTPException(status_code=404, detail=f"Workflow {workflow_id} not found")
     
-    return _workflows[workflow_id]
+    return workflow
 
 
 @router.put("/workflows/{workflow_id}")
 async def save_workflow(workflow_id: str, request: SaveWorkflowRequest):
     """
     Save workflow graph state (Design Mode).
+    
+    The new graph is diffed against the saved one so only the compile cache
+    entries of changed steps are invalidated; layout-only edits keep the
+    cached parse, plan and image artifacts.
     """
-    if workflow_id not in _workflows:
+    graph = request.graph.model_dump()
+    
+    workflow = await _workflows.aget(workflow_id)
+    if workflow is None:
         # Create new workflow if it doesn't exist
-        _workflows[workflow_id] = {
+        workflow = {
             "workflow_id": workflow_id,
-            "graph": request.graph.model_dump(),
             "status": "draft",
             "created_at": datetime.utcnow().isoformat(),
         }
+        diff = compile_cache.apply_graph_update(workflow_id, None, graph)
     else:
-        _workflows[workflow_id]["graph"] = request.graph.model_dump()
+        diff = compile_cache.apply_graph_update(workflow_id, workflow.get("graph"), graph)
     
-    _workflows[workflow_id]["updated_at"] = datetime.utcnow().isoformat()
+    workflow["graph"] = graph
+    workflow["updated_at"] = datetime.utcnow().isoformat()
+    await _workflows.aset(workflow_id, workflow)
     
     return {
         "workflow_id": workflow_id,
-        "updated_at": _workflows[workflow_id]["updated_at"],
+        "updated_at": workflow["updated_at"],
         "message": "Workflow saved successfully",
+        "changes": diff.to_dict(),
     }
 
 
@@ -12,6 +12,10 @@ from app.graph.workflow import app_graph
 from app.state import AgentState
 from app.services.veriflow_service import veriflow_service
 from app.services.websocket_manager import manager
+from app.services.airflow_client import airflow_client
+from app.services.execution_store import execution_store
+from app.services.execution_log_writer import execution_log_writer
+from app.services.shared_state import shared_state
 
 # Setup Logger
 logging.basicConfig(level=logging.INFO)
@@ -37,6 +41,30 @@ app.include_router(mamamia_cache.router, prefix="/api/v1")
 app.include_router(chat.router, prefix="/api/v1")
 app.include_router(websockets.router)
 
+@app.on_event("startup")
+async def start_shared_state():
+    """Receive WebSocket messages and commands published by the other workers."""
+    shared_state.start()
+
+
+@app.on_event("shutdown")
+async def close_shared_state():
+    await shared_state.close()
+
+
+@app.on_event("shutdown")
+async def close_airflow_client():
+    """Close the pooled Airflow HTTP connections."""
+    await airflow_client.close()
+
+
+@app.on_event("shutdown")
+async def flush_execution_store():
+    """Persist outstanding execution status changes and log lines."""
+    await execution_log_writer.close()
+    await execution_store.close()
+
+
 class OrchestrationRequest(BaseModel):
     pdf_path: str
     repo_path: str
@@ -37,6 +37,7 @@ class CWLInput(BaseModel):
     default: Optional[Any] = None
     format: Optional[str] = None
     secondary_files: Optional[List[str]] = Field(None, alias="secondaryFiles")
+    input_binding: Optional[Dict[str, Any]] = Field(None, alias="inputBinding")
     
     class Config:
         populate_by_name = True
@@ -74,7 +75,7 @@ class CWLStepOutput(BaseModel):
 class CWLStep(BaseModel):
     """A step in a CWL workflow."""
     id: Optional[str] = None
-    run: str  # Path to tool CWL or inline tool definition
+    run: Union[str, Dict[str, Any]]  # Path to tool CWL or inline tool definition
     in_: Dict[str, Union[str, CWLStepInput]] = Field(default_factory=dict, alias="in")
     out: List[Union[str, CWLStepOutput]] = Field(default_factory=list)
     scatter: Optional[Union[str, List[str]]] = None
@@ -172,6 +173,7 @@ class ParsedWorkflow(BaseModel):
     """Parsed workflow with resolved dependencies."""
     workflow: CWLWorkflow
     tools: Dict[str, CWLCommandLineTool] = Field(default_factory=dict)
+    subworkflows: Dict[str, "ParsedWorkflow"] = Field(default_factory=dict)  # step_id -> nested workflow
     step_order: List[str] = Field(default_factory=list)  # Topologically sorted steps
     step_dependencies: Dict[str, List[str]] = Field(default_factory=dict)  # step_id -> [dependency_ids]
 
@@ -190,3 +192,5 @@ class CWLParseResult(BaseModel):
     workflow: Optional[ParsedWorkflow] = None
     error: Optional[str] = None
     validation: Optional[CWLValidationResult] = None
+    # Resolver ETag of each fetched tool document, to revalidate a cached parse
+    tool_versions: Dict[Any, Optional[str]] = Field(default_factory=dict, exclude=True)
@@ -12,6 +12,7 @@ import uuid
 
 class ExecutionStatus(str, Enum):
     QUEUED = "queued"
+    WAITING_FOR_SCHEDULER = "waiting_for_scheduler"  # DAG not registered by Airflow yet
     RUNNING = "running"
     SUCCESS = "success"
     PARTIAL_FAILURE = "partial_failure"
@@ -44,12 +45,18 @@ class LogEntry(BaseModel):
 class ExecutionConfig(BaseModel):
     """Configuration for workflow execution."""
     subjects: List[int] = Field(default=[1])  # Subject IDs to process
+    scatter_batch_size: int = Field(1, ge=1)  # Scatter jobs per mapped task
+    scatter_glob: str = "*"  # Pattern selecting scatter items from data folders
+    force_rerun: bool = False  # Run every step, ignoring cached results of earlier runs
+    simulate: bool = False  # Simulate the run (demo) when Airflow cannot run it
 
 
 class ExecutionRequest(BaseModel):
     """Request to start workflow execution."""
     workflow_id: str
     config: Optional[ExecutionConfig] = None
+    user_id: Optional[str] = None  # Fair-share accounting of running executions
+    priority: int = 0  # Higher starts first when executions are queued
 
 
 class ExecutionResponse(BaseModel):
@@ -57,6 +64,7 @@ class ExecutionResponse(BaseModel):
     execution_id: str = Field(default_factory=lambda: f"exec_{uuid.uuid4().hex[:8]}")
     status: ExecutionStatus = ExecutionStatus.QUEUED
     dag_id: Optional[str] = None
+    queue_position: Optional[int] = None  # 1-based; None once started
 
 
 class ExecutionStatusResponse(BaseModel):
@@ -64,17 +72,31 @@ class ExecutionStatusResponse(BaseModel):
     execution_id: str
     status: ExecutionStatus
     overall_progress: int = Field(0, ge=0, le=100)
+    queue_position: Optional[int] = None
+    eta_seconds: Optional[int] = None  # Expected time to completion, from step duration history
+    estimated_completion: Optional[str] = None  # ISO timestamp
     nodes: Dict[str, NodeExecutionStatus] = Field(default_factory=dict)
     logs: List[LogEntry] = Field(default_factory=list)
 
 
+class TaskStateEvent(BaseModel):
+    """Task or DAG run state change pushed by generated Airflow DAGs."""
+    dag_id: Optional[str] = None
+    dag_run_id: str
+    task_id: Optional[str] = None  # None for DAG run events
+    map_index: Optional[int] = None
+    try_number: Optional[int] = None
+    state: str
+
+
 class ResultFile(BaseModel):
     """A result file from execution."""
     path: str
-    node_id: str
+    node_id: Optional[str] = None
     size: int
     download_url: Optional[str] = None
     mime_type: Optional[str] = None
+    sha256: Optional[str] = None
 
 
 class ExecutionResultsResponse(BaseModel):
@@ -0,0 +1,135 @@
+"""
+VeriFlow - Execution Plan Models
+Immutable, fully resolved view of a workflow ready to execute.
+Per SPEC.md Section 7
+"""
+
+import json
+import hashlib
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Tuple, Any
+
+from app.models.cwl import ParsedWorkflow, ResourceRequirement
+
+
+class PlannedMount(BaseModel):
+    """A bind mount for a step container."""
+    source: str
+    target: str
+    type: str = "bind"
+
+    class Config:
+        frozen = True
+
+
+class PlannedStep(BaseModel):
+    """A workflow step with its image, environment and resources resolved."""
+    step_id: str
+    task_id: str  # Airflow-safe identifier
+    run: str  # Tool reference (or "inline tool")
+    label: Optional[str] = None
+    image: Optional[str] = None  # Declared dockerPull / dockerImageId
+    dockerfile: Optional[str] = None  # Declared dockerFile content
+    base_command: Optional[List[str]] = None
+    env: Dict[str, str] = Field(default_factory=dict)
+    mounts: Tuple[PlannedMount, ...] = ()
+    resources: Optional[ResourceRequirement] = None
+    dependencies: Tuple[str, ...] = ()
+    level: int = 0  # Dependency level (steps of one level can run in parallel)
+    scatter: Tuple[str, ...] = ()
+    scatter_method: Optional[str] = None
+    scatter_sources: Dict[str, Any] = Field(default_factory=dict)
+    outputs: Tuple[str, ...] = ()
+    estimated_duration: float = 0.0  # Seconds
+    priority_weight: int = 1  # Higher runs first; highest along the critical path
+    tool_document: Optional[Dict[str, Any]] = None  # Resolved CWL tool or sub-workflow
+    step_inputs: Dict[str, Any] = Field(default_factory=dict)  # Tool input -> {"source"} or {"value"}
+
+    class Config:
+        frozen = True
+
+
+class ExecutionPlan(BaseModel):
+    """
+    Compiled execution plan for one workflow execution.
+
+    Built once per execution by the PlanCompiler and read by DAG generation,
+    Docker builds, simulation and provenance instead of re-walking the CWL.
+    """
+    workflow_id: str
+    execution_id: str
+    label: Optional[str] = None
+    config: Dict[str, Any] = Field(default_factory=dict)
+    steps: Dict[str, PlannedStep] = Field(default_factory=dict)  # In topological order
+    step_order: Tuple[str, ...] = ()
+    levels: Tuple[Tuple[str, ...], ...] = ()
+    critical_path: Tuple[str, ...] = ()
+    estimated_duration: float = 0.0  # Critical path length in seconds
+    workflow: Optional[ParsedWorkflow] = Field(None, exclude=True)
+
+    class Config:
+        frozen = True
+
+    @property
+    def has_docker(self) -> bool:
+        """Whether any step runs in a container image."""
+        return any(step.image for step in self.steps.values())
+
+    @property
+    def scatter_steps(self) -> List[str]:
+        """Step IDs that scatter over their inputs."""
+        return [step_id for step_id, step in self.steps.items() if step.scatter]
+
+    @property
+    def images(self) -> Dict[str, str]:
+        """Declared container image per step."""
+        return {step_id: step.image for step_id, step in self.steps.items() if step.image}
+
+    @property
+    def dependencies(self) -> Dict[str, List[str]]:
+        """Dependencies per step, including steps without any."""
+        return {step_id: list(step.dependencies) for step_id, step in self.steps.items()}
+
+    @property
+    def shape_key(self) -> str:
+        """
+        Hash of the plan's structure, independent of the execution.
+
+        Plans with the same steps, images, wiring and scatter layout share a
+        key and can run on the same parameterized DAG. Priority weights are
+        left out: they follow the step duration history, and Airflow task
+        priorities cannot be set per run, so a shape DAG keeps the weights
+        of the plan that generated it instead of being regenerated whenever
+        the ranking shifts.
+        """
+        shape = [
+            {
+                "task_id": step.task_id,
+                "run": step.run,
+                "image": step.image,
+                "mounts": [mount.model_dump() for mount in step.mounts],
+                "dependencies": sorted(step.dependencies),
+                "scatter": list(step.scatter),
+                "scatter_method": step.scatter_method,
+                "scatter_sources": step.scatter_sources,
+                "outputs": list(step.outputs),
+                "resources": step.resources.model_dump() if step.resources else None,
+                "tool": step.tool_document,
+                "step_inputs": step.step_inputs,
+            }
+            for step in self.steps.values()
+        ]
+        return hashlib.sha256(json.dumps(shape, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def to_conf(self) -> Dict[str, Any]:
+        """Per-execution values passed to a parameterized DAG as its run conf."""
+        return {
+            "execution_id": self.execution_id,
+            "workflow_id": self.workflow_id,
+            "config": self.config,
+            "inputs": self.config.get("inputs", {}),
+            "steps": {
+                step.task_id: {"step_id": step.step_id, "env": step.env}
+                for step in self.steps.values()
+            },
+        }
@@ -19,6 +19,7 @@ try:
     from app.services.dag_generator import dag_generator, DAGGenerator
     from app.services.airflow_client import airflow_client, AirflowClient
     from app.services.docker_builder import docker_builder, DockerBuilder
+    from app.services.plan_compiler import plan_compiler, PlanCompiler
     from app.services.execution_engine import execution_engine, ExecutionEngine
     EXECUTION_ENGINE_AVAILABLE = True
 except ImportError as e:
@@ -31,6 +32,8 @@ except ImportError as e:
     AirflowClient = None
     docker_builder = None
     DockerBuilder = None
+    plan_compiler = None
+    PlanCompiler = None
     execution_engine = None
     ExecutionEngine = None
 
@@ -52,6 +55,8 @@ __all__ = [
     "AirflowClient",
     "docker_builder",
     "DockerBuilder",
+    "plan_compiler",
+    "PlanCompiler",
     "execution_engine",
     "ExecutionEngine",
     "EXECUTION_ENGINE_AVAILABLE",
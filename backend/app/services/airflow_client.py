@@ -5,9 +5,12 @@ Per SPEC.md Section 7.3 and 7.4
 """
 
 import os
+import json
+import time
+import base64
 import asyncio
 import logging
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
 from datetime import datetime
 from enum import Enum
 
@@ -39,6 +42,32 @@ class TaskInstanceState(str, Enum):
     REMOVED = "removed"
 
 
+class AirflowTokenAuth(httpx.Auth):
+    """
+    Bearer authentication with the Airflow JWT of an AirflowClient.
+    
+    The token is refreshed shortly before it expires, and once more when a
+    request is rejected with 401 (e.g. after an Airflow restart rotated the
+    signing key); the request is then retried with the new token.
+    """
+    
+    def __init__(self, client: "AirflowClient"):
+        self._client = client
+    
+    async def async_auth_flow(self, request: httpx.Request):
+        token = await self._client._ensure_token()
+        if token:
+            request.headers["Authorization"] = f"Bearer {token}"
+        
+        response = yield request
+        
+        if response.status_code == 401:
+            fresh = await self._client._ensure_token(stale=token)
+            if fresh and fresh != token:
+                request.headers["Authorization"] = f"Bearer {fresh}"
+                yield request
+
+
 class AirflowClient:
     """
     Client for Apache Airflow REST API.
@@ -48,7 +77,9 @@ class AirflowClient:
     - Poll execution status
     - Retrieve task logs
     
-    Uses session-based authentication per docker-compose configuration.
+    Uses JWT authentication per docker-compose configuration. All requests
+    share one pooled HTTP client (keep-alive connections) for the lifetime
+    of the backend process; call close() on shutdown.
     """
     
     DEFAULT_BASE_URL = os.getenv("AIRFLOW_API_URL", "http://localhost:8080")
@@ -56,6 +87,28 @@ class AirflowClient:
     DEFAULT_PASSWORD = os.getenv("AIRFLOW_PASSWORD", "airflow")
     POLL_INTERVAL = 5  # seconds
     
+    # Connection pool of the shared HTTP client
+    MAX_CONNECTIONS = int(os.getenv("AIRFLOW_MAX_CONNECTIONS", "20"))
+    MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AIRFLOW_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    KEEPALIVE_EXPIRY = float(os.getenv("AIRFLOW_KEEPALIVE_EXPIRY", "60"))
+    
+    # Tokens are refreshed this many seconds before they expire; tokens
+    # without an `exp` claim are assumed to live TOKEN_TTL seconds
+    TOKEN_REFRESH_MARGIN = 60
+    TOKEN_TTL = int(os.getenv("AIRFLOW_TOKEN_TTL", "3600"))
+    
+    # Seconds to wait before asking for a token again after a failed request
+    TOKEN_RETRY_INTERVAL = 10
+    
+    # Page size of batch list requests (Airflow's maximum_page_limit)
+    PAGE_LIMIT = int(os.getenv("AIRFLOW_PAGE_LIMIT", "100"))
+    
+    # Waiting for the DAG processor to register a new DAG file: polls start
+    # at DAG_POLL_INITIAL seconds and double up to DAG_POLL_MAX
+    DAG_REGISTRATION_TIMEOUT = float(os.getenv("AIRFLOW_DAG_REGISTRATION_TIMEOUT", "120"))
+    DAG_POLL_INITIAL = 0.25
+    DAG_POLL_MAX = 5.0
+    
     def __init__(
         self,
         base_url: Optional[str] = None,
@@ -77,52 +130,95 @@ class AirflowClient:
         self.api_base = self.base_url
         self._client: Optional[httpx.AsyncClient] = None
         self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_retry_at = 0.0
+        self._token_lock = asyncio.Lock()
     
     async def _get_access_token(self) -> Optional[str]:
         """Get JWT access token from Airflow."""
         try:
-            async with httpx.AsyncClient(base_url=self.api_base, timeout=10.0) as client:
-                response = await client.post(
-                    "/auth/token",
-                    json={"username": self.username, "password": self.password}
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("access_token")
+            client = await self._get_client()
+            response = await client.post(
+                "/auth/token",
+                json={"username": self.username, "password": self.password},
+                auth=None,
+                timeout=10.0,
+            )
+            response.raise_for_status()
+            data = response.json()
+            token = data.get("access_token")
+            if token:
+                self._token_expires_at = self._token_expiry(token, data.get("expires_in"))
+            return token
         except Exception as e:
             logger.error(f"Failed to get access token: {e}")
             return None
+    
+    def _token_expiry(self, token: str, expires_in: Optional[int] = None) -> float:
+        """Expiry time of a JWT from its `exp` claim (the signature is not verified)."""
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+            if exp:
+                return float(exp)
+        except (IndexError, ValueError):
+            pass
+        return time.time() + float(expires_in or self.TOKEN_TTL)
+    
+    async def _ensure_token(self, stale: Optional[str] = None) -> Optional[str]:
+        """
+        Return a valid access token, fetching a new one when needed.
+        
+        Args:
+            stale: Token the server rejected; replaced unless another
+                request already refreshed it
+        """
+        async with self._token_lock:
+            now = time.time()
+            expiring = now >= self._token_expires_at - self.TOKEN_REFRESH_MARGIN
+            needs_token = not self._token or expiring or self._token == stale
+            if needs_token and now >= self._token_retry_at:
+                token = await self._get_access_token()
+                if token:
+                    self._token = token
+                else:
+                    self._token_retry_at = now + self.TOKEN_RETRY_INTERVAL
+                    if self._token == stale:
+                        self._token = None
+            return self._token
 
     async def _get_client(self) -> httpx.AsyncClient:
-        """Get or create HTTP client with JWT authentication."""
+        """Get or create the shared, pooled HTTP client with JWT authentication."""
         if self._client is None or self._client.is_closed:
-            # Refresh token if needed (simplistic approach: fetch new one on client creation)
-            if not self._token:
-                self._token = await self._get_access_token()
-            
-            headers = {}
-            if self._token:
-                headers["Authorization"] = f"Bearer {self._token}"
-            
             self._client = httpx.AsyncClient(
                 base_url=self.api_base,
-                headers=headers,
-                timeout=30.0,
+                auth=AirflowTokenAuth(self),
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.MAX_CONNECTIONS,
+                    max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=self.KEEPALIVE_EXPIRY,
+                ),
             )
         return self._client
     
     async def close(self):
-        """Close the HTTP client."""
+        """Close the HTTP client and its pooled connections."""
         if self._client and not self._client.is_closed:
             await self._client.aclose()
+        self._client = None
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_retry_at = 0.0
     
     async def health_check(self) -> bool:
         """Check if Airflow is healthy and accessible."""
         try:
-            # Airflow 3: Use /monitor/health instead of /health
-            async with httpx.AsyncClient(base_url=self.api_base, timeout=5.0) as client:
-                response = await client.get("/monitor/health")
-                return response.status_code == 200
+            client = await self._get_client()
+            # Airflow 3: Use /monitor/health instead of /health (no authentication)
+            response = await client.get("/monitor/health", auth=None, timeout=5.0)
+            return response.status_code == 200
         except Exception as e:
             logger.error(f"Airflow health check failed: {e}")
             return False
@@ -153,6 +249,36 @@ class AirflowClient:
             logger.error(f"Failed to get DAG {dag_id}: {e}")
             return None
     
+    async def wait_for_dag(
+        self,
+        dag_id: str,
+        timeout: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Wait until Airflow has registered a DAG.
+        
+        Polls with exponential backoff, so DAGs that are parsed quickly are
+        found within a fraction of a second.
+        
+        Args:
+            dag_id: DAG identifier
+            timeout: Maximum wait time in seconds (default: DAG_REGISTRATION_TIMEOUT)
+            
+        Returns:
+            DAG details, or None if the DAG was not registered in time
+        """
+        deadline = time.monotonic() + (self.DAG_REGISTRATION_TIMEOUT if timeout is None else timeout)
+        interval = self.DAG_POLL_INITIAL
+        while True:
+            dag = await self.get_dag(dag_id)
+            if dag:
+                return dag
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * 2, self.DAG_POLL_MAX)
+    
     async def trigger_dag(
         self,
         dag_id: str,
@@ -224,6 +350,35 @@ class AirflowClient:
             logger.error(f"Failed to get DAG run {dag_id}/{dag_run_id}: {e}")
             return None
     
+    async def set_dag_run_state(self, dag_id: str, dag_run_id: str, state: str) -> bool:
+        """
+        Set the state of a DAG run (e.g. "failed" to stop it).
+        
+        Marking a run failed makes Airflow fail its unfinished task
+        instances and terminate the running ones.
+        
+        Args:
+            dag_id: DAG identifier
+            dag_run_id: DAG run identifier
+            state: New run state ("success", "failed" or "queued")
+            
+        Returns:
+            True if the state was set
+        """
+        try:
+            client = await self._get_client()
+            response = await client.patch(
+                f"/dags/{dag_id}/dagRuns/{dag_run_id}",
+                json={"state": state},
+            )
+            response.raise_for_status()
+            logger.info(f"Set DAG run {dag_id}/{dag_run_id} to {state}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to set state of DAG run {dag_id}/{dag_run_id}: {e}")
+            return False
+    
     async def get_task_instances(
         self,
         dag_id: str,
@@ -256,6 +411,72 @@ class AirflowClient:
             logger.error(f"Failed to get task instances: {e}")
             return []
     
+    async def _list_batch(self, path: str, body: Dict[str, Any], key: str) -> List[Dict[str, Any]]:
+        """POST a batch list query, following pages until all entries are read."""
+        client = await self._get_client()
+        entries: List[Dict[str, Any]] = []
+        while True:
+            response = await client.post(
+                path,
+                json={**body, "page_offset": len(entries), "page_limit": self.PAGE_LIMIT},
+            )
+            response.raise_for_status()
+            data = response.json()
+            page = data.get(key, [])
+            entries.extend(page)
+            if len(page) < self.PAGE_LIMIT or len(entries) >= data.get("total_entries", 0):
+                return entries
+    
+    async def list_dag_runs(
+        self,
+        dag_ids: List[str],
+        states: Optional[List[str]] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        List DAG runs of several DAGs in one batch query.
+        
+        Args:
+            dag_ids: DAG identifiers
+            states: Only return runs in these states
+            
+        Returns:
+            DAG run details, or None if the request failed
+        """
+        try:
+            body: Dict[str, Any] = {"dag_ids": dag_ids}
+            if states:
+                body["states"] = states
+            return await self._list_batch("/dags/~/dagRuns/list", body, "dag_runs")
+        except Exception as e:
+            logger.error(f"Failed to list DAG runs: {e}")
+            return None
+    
+    async def list_task_instances(
+        self,
+        dag_ids: List[str],
+        dag_run_ids: List[str],
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        List the task instances of several DAG runs in one batch query.
+        
+        Args:
+            dag_ids: DAG identifiers
+            dag_run_ids: DAG run identifiers
+            
+        Returns:
+            Task instance details (with dag_id and dag_run_id), or None if
+            the request failed
+        """
+        try:
+            return await self._list_batch(
+                "/dags/~/dagRuns/~/taskInstances/list",
+                {"dag_ids": dag_ids, "dag_run_ids": dag_run_ids},
+                "task_instances",
+            )
+        except Exception as e:
+            logger.error(f"Failed to list task instances: {e}")
+            return None
+    
     async def get_task_logs(
         self,
         dag_id: str,
@@ -293,6 +514,111 @@ class AirflowClient:
             logger.error(f"Failed to get task logs: {e}")
             return None
     
+    async def get_task_log_chunk(
+        self,
+        dag_id: str,
+        dag_run_id: str,
+        task_id: str,
+        task_try_number: int = 1,
+        continuation_token: Optional[str] = None,
+        map_index: Optional[int] = None,
+    ) -> Optional[Tuple[List[str], Optional[str]]]:
+        """
+        Get the task log lines written since a continuation token.
+        
+        Args:
+            dag_id: DAG identifier
+            dag_run_id: DAG run identifier
+            task_id: Task identifier
+            task_try_number: Attempt number (default 1)
+            continuation_token: Token returned by the previous call (None
+                reads from the start of the log)
+            map_index: Map index of a mapped task instance
+            
+        Returns:
+            (new lines, token for the next call), or None if unavailable
+        """
+        try:
+            client = await self._get_client()
+            params: Dict[str, Any] = {"full_content": "false"}
+            if continuation_token:
+                params["token"] = continuation_token
+            if map_index is not None and map_index >= 0:
+                params["map_index"] = map_index
+            response = await client.get(
+                f"/dags/{dag_id}/dagRuns/{dag_run_id}/taskInstances/{task_id}/logs/{task_try_number}",
+                params=params,
+                headers={"Accept": "application/json"},
+            )
+            
+            if response.status_code == 404:
+                return None
+            
+            response.raise_for_status()
+            data = response.json()
+            return self._log_lines(data.get("content")), data.get("continuation_token")
+            
+        except Exception as e:
+            logger.error(f"Failed to get task log chunk: {e}")
+            return None
+    
+    def _log_lines(self, content: Any) -> List[str]:
+        """Flatten log content (text, or Airflow 3 structured messages) into lines."""
+        if not content:
+            return []
+        if isinstance(content, str):
+            return content.splitlines()
+        lines: List[str] = []
+        for item in content:
+            if isinstance(item, dict):
+                lines.extend(str(item.get("event", "")).splitlines())
+            elif isinstance(item, (list, tuple)) and item:
+                # Airflow 2: (host, text) pairs
+                lines.extend(str(item[-1]).splitlines())
+            else:
+                lines.extend(str(item).splitlines())
+        return lines
+    
+    async def ensure_pool(self, name: str, slots: int, description: str = "") -> bool:
+        """
+        Create an Airflow pool, or resize it if it exists with other slots.
+        
+        Args:
+            name: Pool name
+            slots: Number of slots
+            description: Pool description
+            
+        Returns:
+            True if the pool exists with the requested size
+        """
+        try:
+            client = await self._get_client()
+            response = await client.get(f"/pools/{name}")
+            
+            if response.status_code == 404:
+                response = await client.post(
+                    "/pools",
+                    json={"name": name, "slots": slots, "description": description},
+                )
+                response.raise_for_status()
+                logger.info(f"Created Airflow pool {name} with {slots} slots")
+                return True
+            
+            response.raise_for_status()
+            if response.json().get("slots") != slots:
+                response = await client.patch(
+                    f"/pools/{name}",
+                    json={"name": name, "slots": slots},
+                    params={"update_mask": "slots"},
+                )
+                response.raise_for_status()
+                logger.info(f"Resized Airflow pool {name} to {slots} slots")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to ensure pool {name}: {e}")
+            return False
+    
     async def wait_for_dag_run(
         self,
         dag_id: str,
@@ -0,0 +1,281 @@
+"""
+VeriFlow - Call Cache
+Reuses the outputs of step runs across executions.
+
+Each step of a plan gets a content-addressed key: a digest of its tool,
+container image, arguments, the content of the workflow inputs and the keys
+of its upstream steps (so a changed input invalidates everything
+downstream of it). Successful runs are indexed by key; a later execution
+computing the same key links the earlier output directory instead of
+running the step again (see dag_runtime.link_cached_outputs).
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, List, Any, Callable
+
+from app.models.plan import ExecutionPlan, PlannedStep
+from app.services.dag_runtime import DATA_ROOT, CONTAINER_DATA_ROOT
+
+logger = logging.getLogger(__name__)
+
+CALL_CACHE_ENABLED = os.getenv("VERIFLOW_CALL_CACHE", "true").lower() in ("1", "true", "yes")
+
+# Files are hashed in full, streamed in chunks of this size
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# File digests kept in memory, keyed by (path, mtime, size), so unchanged
+# inputs are not read again on every execution
+DIGEST_CACHE_SIZE = int(os.getenv("VERIFLOW_CALL_CACHE_DIGESTS", "65536"))
+
+# Config keys that do not change what a step computes
+IGNORED_CONFIG_KEYS = ("force_rerun", "scatter_batch_size", "simulate")
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+_digests: "OrderedDict[tuple, str]" = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+def _file_digest(path: str) -> str:
+    # Whole content: any edit, even one keeping the size, changes the key;
+    # it is only read again when its modification time or size changed
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _digests_lock:
+        digest = _digests.get(key)
+        if digest is not None:
+            _digests.move_to_end(key)
+            return digest
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _digests_lock:
+        _digests[key] = digest
+        while len(_digests) > DIGEST_CACHE_SIZE:
+            _digests.popitem(last=False)
+    return digest
+
+
+def path_fingerprint(path: str) -> Optional[str]:
+    """
+    Content fingerprint of a file or directory tree.
+
+    Directory entries are identified by their relative path, so the same
+    data uploaded for two executions gets the same fingerprint.
+
+    Returns:
+        Hex digest, or None when the path does not exist
+    """
+    if os.path.isfile(path):
+        return _file_digest(path)
+    if not os.path.isdir(path):
+        return None
+    entries = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            entries.append((os.path.relpath(full, path), _file_digest(full)))
+    return _digest(entries)
+
+
+def _host_path(path: str) -> Optional[str]:
+    """Host path of a /data path (None for paths outside the data root)."""
+    if path == CONTAINER_DATA_ROOT or path.startswith(CONTAINER_DATA_ROOT + "/"):
+        return DATA_ROOT + path[len(CONTAINER_DATA_ROOT):]
+    return None
+
+
+def _input_fingerprint(value: Any) -> Any:
+    """Replace data paths in a workflow input value by their content fingerprint."""
+    if isinstance(value, dict):
+        location = value.get("path") or value.get("location")
+        if value.get("class") in ("File", "Directory") and isinstance(location, str):
+            return {"class": value["class"], "content": _input_fingerprint(location)}
+        return {key: _input_fingerprint(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_input_fingerprint(item) for item in value]
+    if isinstance(value, str):
+        host = _host_path(value.replace("file://", "", 1))
+        if host is not None:
+            return {"content": path_fingerprint(host)}
+    return value
+
+
+class CallCache:
+    """
+    Index of successful step runs by content-addressed key.
+
+    Entries live in the call_cache table (SQLite) and point at the output
+    directory of the run that produced them; entries whose outputs are gone
+    are dropped on lookup.
+    """
+
+    def __init__(self, db=None, docker_url: Optional[str] = None):
+        """
+        Initialize call cache.
+
+        Args:
+            db: Database with the call_cache table (default: SQLite service)
+            docker_url: Docker daemon used to resolve image digests
+        """
+        if db is None:
+            from app.services.database_sqlite import database_service
+            db = database_service
+        self.db = db
+        self.docker_url = docker_url
+
+    def image_digest(self, image: Optional[str]) -> Optional[str]:
+        """
+        Image ID of a container image, so a re-tagged image changes step keys.
+
+        Falls back to the image reference when Docker is unavailable.
+        """
+        if not image:
+            return None
+        try:
+            import docker
+
+            client = docker.DockerClient(base_url=self.docker_url) if self.docker_url else docker.from_env()
+            try:
+                return client.images.get(image).id
+            finally:
+                client.close()
+        except Exception:
+            return image
+
+    def step_keys(
+        self,
+        plan: ExecutionPlan,
+        cacheable: Callable[[PlannedStep], bool],
+    ) -> Dict[str, str]:
+        """
+        Compute the cache key of every cacheable step of a plan.
+
+        A step is only keyed when all its upstream steps are, since the
+        outputs of other steps are not content-addressed. Input files are
+        read in full unless their digest is cached (same path, modification
+        time and size), so call this off the event loop (asyncio.to_thread).
+
+        Args:
+            plan: Compiled execution plan
+            cacheable: Whether a step's outputs can be reused
+
+        Returns:
+            step_id -> cache key
+        """
+        config = {
+            key: value for key, value in plan.config.items()
+            if key not in IGNORED_CONFIG_KEYS
+        }
+        inputs = _digest({
+            "config": _input_fingerprint(config),
+            "input_folder": path_fingerprint(os.path.join(DATA_ROOT, "input", plan.execution_id)),
+        })
+
+        images: Dict[str, Optional[str]] = {}
+        keys: Dict[str, str] = {}
+        for step_id, step in plan.steps.items():
+            if not cacheable(step) or any(dep not in keys for dep in step.dependencies):
+                continue
+            if step.image not in images:
+                images[step.image] = self.image_digest(step.image)
+            keys[step_id] = _digest({
+                "tool": step.tool_document,
+                "run": step.run,
+                "image": images[step.image],
+                "base_command": step.base_command,
+                "step_inputs": step.step_inputs,
+                "outputs": list(step.outputs),
+                "upstream": {dep: keys[dep] for dep in step.dependencies},
+                "inputs": inputs,
+            })
+        return keys
+
+    def lookup(self, keys: Dict[str, str]) -> Dict[str, str]:
+        """
+        Find earlier runs for step keys.
+
+        Args:
+            keys: step_id -> cache key
+
+        Returns:
+            step_id -> "<execution_id>/<task_id>" of the run to reuse
+        """
+        try:
+            entries = self.db.get_call_cache_entries(list(set(keys.values())))
+        except Exception as e:
+            logger.warning(f"Call cache lookup failed: {e}")
+            return {}
+
+        hits: Dict[str, str] = {}
+        stale: List[str] = []
+        for step_id, key in keys.items():
+            entry = entries.get(key)
+            if not entry:
+                continue
+            if not os.path.isdir(os.path.join(DATA_ROOT, "output", entry["execution_id"], entry["task_id"])):
+                stale.append(key)
+                continue
+            hits[step_id] = f"{entry['execution_id']}/{entry['task_id']}"
+        if stale:
+            self.invalidate(cache_keys=stale)
+        return hits
+
+    def record(self, plan: ExecutionPlan, keys: Dict[str, str], step_ids: List[str]) -> int:
+        """
+        Index the successful runs of steps of an execution.
+
+        Args:
+            plan: Execution plan the steps ran from
+            keys: step_id -> cache key
+            step_ids: Steps that ran successfully
+
+        Returns:
+            Number of entries written
+        """
+        rows = [
+            (keys[step_id], plan.workflow_id, step_id, plan.execution_id, plan.steps[step_id].task_id)
+            for step_id in step_ids
+            if step_id in keys
+        ]
+        if not rows:
+            return 0
+        try:
+            self.db.put_call_cache_entries(rows)
+        except Exception as e:
+            logger.warning(f"Could not record call cache entries: {e}")
+            return 0
+        return len(rows)
+
+    def invalidate(
+        self,
+        workflow_id: Optional[str] = None,
+        step_id: Optional[str] = None,
+        cache_keys: Optional[List[str]] = None,
+    ) -> int:
+        """
+        Drop cache entries (all of them without filters).
+
+        Returns:
+            Number of entries removed
+        """
+        return self.db.delete_call_cache_entries(workflow_id, step_id, cache_keys)
+
+
+# Singleton instance (None when call caching is disabled)
+call_cache = CallCache() if CALL_CACHE_ENABLED else None
@@ -0,0 +1,295 @@
+"""
+VeriFlow - Workflow Compile Cache
+Keeps parse results and per-step compile artifacts between executions,
+invalidated by diffing Design Mode graph edits.
+Per SPEC.md Section 7
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, List, Any, NamedTuple
+
+from app.models.cwl import CWLParseResult, ParsedWorkflow
+
+logger = logging.getLogger(__name__)
+
+# Node fields that only affect how the graph is drawn or its run state
+LAYOUT_FIELDS = ("position",)
+VOLATILE_DATA_FIELDS = ("status", "confidence")
+
+
+class GraphDiff(NamedTuple):
+    """Semantic difference between two saved workflow graphs."""
+    added: List[str]
+    removed: List[str]
+    changed: List[str]
+    edges_changed: bool
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed or self.changed or self.edges_changed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "added": self.added,
+            "removed": self.removed,
+            "changed": self.changed,
+            "edges_changed": self.edges_changed,
+        }
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def node_fingerprints(graph: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Fingerprint each node by its semantic content and incoming connections.
+
+    Layout (position) and run state (status, confidence) are ignored, so
+    moving a node on the canvas does not count as a change.
+    """
+    graph = graph or {}
+    incoming: Dict[str, List[Any]] = {}
+    for edge in graph.get("edges", []):
+        incoming.setdefault(edge.get("target"), []).append((
+            edge.get("source"),
+            edge.get("source_handle") or edge.get("sourceHandle"),
+            edge.get("target_handle") or edge.get("targetHandle"),
+        ))
+
+    fingerprints = {}
+    for node in graph.get("nodes", []):
+        content = {k: v for k, v in node.items() if k not in LAYOUT_FIELDS}
+        data = content.get("data") or {}
+        content["data"] = {k: v for k, v in data.items() if k not in VOLATILE_DATA_FIELDS}
+        content["incoming"] = sorted(incoming.get(node.get("id"), []), key=str)
+        fingerprints[node.get("id")] = _digest(content)
+    return fingerprints
+
+
+def diff_graphs(
+    old_graph: Optional[Dict[str, Any]],
+    new_graph: Optional[Dict[str, Any]],
+) -> GraphDiff:
+    """Compute which nodes were added, removed or changed between two graphs."""
+    old = node_fingerprints(old_graph)
+    new = node_fingerprints(new_graph)
+
+    def edge_set(graph):
+        return {
+            (e.get("source"), e.get("target"),
+             e.get("source_handle") or e.get("sourceHandle"),
+             e.get("target_handle") or e.get("targetHandle"))
+            for e in (graph or {}).get("edges", [])
+        }
+
+    return GraphDiff(
+        added=sorted(set(new) - set(old)),
+        removed=sorted(set(old) - set(new)),
+        changed=sorted(n for n in set(old) & set(new) if old[n] != new[n]),
+        edges_changed=edge_set(old_graph) != edge_set(new_graph),
+    )
+
+
+def step_fingerprint(workflow: ParsedWorkflow, step_id: str) -> str:
+    """Fingerprint a step by its CWL definition and resolved tool document."""
+    step = workflow.workflow.steps.get(step_id)
+    tool = workflow.tools.get(step_id)
+    return _digest({
+        "step": step.model_dump() if step else None,
+        "tool": tool.model_dump() if tool else None,
+    })
+
+
+class WorkflowCompileEntry:
+    """Cached compile state of one workflow."""
+
+    def __init__(self):
+        self.cwl_hash: Optional[str] = None
+        self.parse_result: Optional[CWLParseResult] = None
+        self.step_fingerprints: Dict[str, str] = {}
+        self.steps: Dict[str, Dict[str, Any]] = {}  # step_id -> artifacts (with fingerprint)
+
+
+class CompileCache:
+    """
+    Per-workflow cache of parse results and step compile artifacts.
+
+    - The parse result is keyed by a hash of the CWL text, so re-running an
+      unchanged workflow skips parsing and validation entirely. It carries the
+      ETags of its tool documents, which callers revalidate before reusing it.
+    - Step artifacts (resolved requirements, Dockerfiles) are keyed by a
+      fingerprint of the step and its tool, so after an edit only the steps
+      that actually changed are recompiled.
+    - Saving a graph diffs it against the previous one and evicts the
+      entries of changed nodes; layout-only saves invalidate nothing.
+    """
+
+    MAX_WORKFLOWS = int(os.getenv("VERIFLOW_COMPILE_CACHE_SIZE", "64"))
+
+    def __init__(self, max_workflows: Optional[int] = None):
+        """
+        Initialize compile cache.
+
+        Args:
+            max_workflows: Number of workflows kept (least recently used evicted)
+        """
+        self.max_workflows = max_workflows or self.MAX_WORKFLOWS
+        self._entries: "OrderedDict[str, WorkflowCompileEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, workflow_id: str) -> WorkflowCompileEntry:
+        entry = self._entries.get(workflow_id)
+        if entry is None:
+            entry = self._entries[workflow_id] = WorkflowCompileEntry()
+            while len(self._entries) > self.max_workflows:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(workflow_id)
+        return entry
+
+    def get_parse(self, workflow_id: str, cwl_content: str) -> Optional[CWLParseResult]:
+        """Return the cached parse result if the CWL text is unchanged."""
+        with self._lock:
+            entry = self._entries.get(workflow_id)
+            if entry and entry.parse_result and entry.cwl_hash == _digest(cwl_content):
+                self._entries.move_to_end(workflow_id)
+                return entry.parse_result
+        return None
+
+    def store_parse(
+        self,
+        workflow_id: str,
+        cwl_content: str,
+        parse_result: CWLParseResult,
+    ) -> Dict[str, str]:
+        """
+        Cache a successful parse result and fingerprint its steps.
+
+        Returns:
+            Dict of step_id -> fingerprint
+        """
+        workflow = parse_result.workflow
+        fingerprints = {
+            step_id: step_fingerprint(workflow, step_id)
+            for step_id in workflow.workflow.steps
+        } if workflow else {}
+
+        with self._lock:
+            entry = self._entry(workflow_id)
+            entry.cwl_hash = _digest(cwl_content)
+            entry.parse_result = parse_result
+            entry.step_fingerprints = fingerprints
+            # Artifacts of steps that changed or disappeared are stale
+            entry.steps = {
+                step_id: artifacts for step_id, artifacts in entry.steps.items()
+                if fingerprints.get(step_id) == artifacts.get("fingerprint")
+            }
+        return fingerprints
+
+    def get_fingerprints(self, workflow_id: str) -> Dict[str, str]:
+        """Step fingerprints of the cached parse result."""
+        with self._lock:
+            entry = self._entries.get(workflow_id)
+            return dict(entry.step_fingerprints) if entry else {}
+
+    def get_steps(self, workflow_id: str, fingerprints: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """Return cached artifacts for the steps whose fingerprint still matches."""
+        with self._lock:
+            entry = self._entries.get(workflow_id)
+            if not entry:
+                return {}
+            return {
+                step_id: artifacts for step_id, artifacts in entry.steps.items()
+                if fingerprints.get(step_id) == artifacts.get("fingerprint")
+            }
+
+    def store_step(self, workflow_id: str, step_id: str, fingerprint: str, **artifacts):
+        """Cache compile artifacts of one step."""
+        with self._lock:
+            entry = self._entry(workflow_id)
+            current = entry.steps.get(step_id)
+            if not current or current.get("fingerprint") != fingerprint:
+                current = entry.steps[step_id] = {"fingerprint": fingerprint}
+            current.update(artifacts)
+
+    def invalidate(self, workflow_id: str, step_ids: Optional[List[str]] = None):
+        """
+        Invalidate cached state of a workflow.
+
+        Args:
+            workflow_id: Workflow identifier
+            step_ids: Steps to invalidate (None drops the whole workflow)
+        """
+        with self._lock:
+            if step_ids is None:
+                self._entries.pop(workflow_id, None)
+                return
+            entry = self._entries.get(workflow_id)
+            if not entry:
+                return
+            for step_id in step_ids:
+                entry.steps.pop(step_id, None)
+
+    def apply_graph_update(
+        self,
+        workflow_id: str,
+        old_graph: Optional[Dict[str, Any]],
+        new_graph: Dict[str, Any],
+    ) -> GraphDiff:
+        """
+        Diff a saved graph against the previous one and invalidate changed steps.
+
+        Nodes are matched to CWL steps by node id or by their cleaned
+        name/label. A change in connections also drops the cached parse,
+        since step dependencies and levels may differ.
+        """
+        diff = diff_graphs(old_graph, new_graph)
+        if not diff.has_changes:
+            return diff
+
+        touched = set(diff.added) | set(diff.removed) | set(diff.changed)
+        nodes = {
+            n.get("id"): n
+            for graph in (old_graph or {}, new_graph or {})
+            for n in graph.get("nodes", [])
+        }
+        with self._lock:
+            entry = self._entries.get(workflow_id)
+            if not entry:
+                return diff
+
+            known_steps = set(entry.steps) | set(entry.step_fingerprints)
+            step_ids = set()
+            for node_id in touched:
+                data = (nodes.get(node_id) or {}).get("data") or {}
+                for candidate in (node_id, data.get("name"), data.get("label")):
+                    if not candidate:
+                        continue
+                    clean = "".join(c if c.isalnum() else "_" for c in candidate).lower()
+                    step_ids.update(
+                        s for s in known_steps
+                        if s == candidate or s.lower() == clean
+                    )
+
+            for step_id in step_ids:
+                entry.steps.pop(step_id, None)
+            if diff.edges_changed or diff.added or diff.removed:
+                entry.parse_result = None
+                entry.cwl_hash = None
+
+        logger.info(
+            f"Workflow {workflow_id} graph update: {len(touched)} node(s) changed, "
+            f"{len(step_ids)} step(s) invalidated"
+        )
+        return diff
+
+
+# Singleton instance
+compile_cache = CompileCache()
@@ -6,7 +6,7 @@ Per SPEC.md Section 7.2
 
 import yaml
 import os
-from typing import Optional, Dict, List, Any, Union
+from typing import Optional, Dict, List, Any, Union, Tuple
 from pathlib import Path
 from collections import defaultdict
 
@@ -20,7 +20,15 @@ from app.models.cwl import (
     CWLValidationResult,
     CWLParseResult,
     DockerRequirement,
+    ResourceRequirement,
 )
+from app.services.tool_resolver import ToolResolver
+
+# Prefer the libyaml-backed safe loader; fall back to the pure-Python one
+try:
+    from yaml import CSafeLoader as YAMLSafeLoader
+except ImportError:
+    from yaml import SafeLoader as YAMLSafeLoader
 
 
 class CWLParser:
@@ -32,32 +40,47 @@ class CWLParser:
     - CommandLineTool documents
     - Dependency resolution between steps
     - Topological sorting of execution order
+    - Tool resolution from inline, local and MinIO references
     """
     
     SUPPORTED_VERSIONS = ["v1.0", "v1.1", "v1.2", "v1.3"]
     
-    def __init__(self, base_path: Optional[Path] = None):
+    def __init__(
+        self,
+        base_path: Optional[Path] = None,
+        yaml_loader: Optional[type] = None,
+        tool_resolver: Optional[ToolResolver] = None,
+    ):
         """
         Initialize parser with optional base path for resolving relative references.
         
         Args:
             base_path: Base directory for resolving tool references
+            yaml_loader: YAML loader class (defaults to CSafeLoader when available)
+            tool_resolver: Resolver for step `run:` references
         """
         self.base_path = base_path or Path(".")
+        self.yaml_loader = yaml_loader or YAMLSafeLoader
+        self.tool_resolver = tool_resolver or ToolResolver(self)
     
     def parse_yaml(self, yaml_content: str) -> Dict[str, Any]:
         """Parse YAML string to dictionary."""
         try:
-            return yaml.safe_load(yaml_content)
+            return yaml.load(yaml_content, Loader=self.yaml_loader)
         except yaml.YAMLError as e:
             raise ValueError(f"Invalid YAML: {e}")
     
-    def parse_workflow(self, yaml_content: str) -> CWLParseResult:
+    def parse_workflow(
+        self,
+        yaml_content: str,
+        base_path: Optional[Path] = None,
+    ) -> CWLParseResult:
         """
         Parse a CWL workflow from YAML content.
         
         Args:
             yaml_content: CWL YAML string
+            base_path: Directory for resolving relative tool references
             
         Returns:
             CWLParseResult with parsed workflow or error
@@ -65,6 +88,11 @@ class CWLParser:
         try:
             data = self.parse_yaml(yaml_content)
             
+            # Packed documents keep the workflow and its tools in $graph
+            inline_documents = {}
+            if isinstance(data, dict) and "$graph" in data:
+                data, inline_documents = self._unpack_graph(data)
+            
             # Validate CWL version
             cwl_version = data.get("cwlVersion", "")
             if not any(v in cwl_version for v in self.SUPPORTED_VERSIONS):
@@ -81,52 +109,31 @@ class CWLParser:
                     error=f"Expected Workflow class, got: {doc_class}"
                 )
             
-            # Parse inputs
-            inputs = self._parse_inputs(data.get("inputs", {}))
-            
-            # Parse outputs
-            outputs = self._parse_outputs(data.get("outputs", {}))
-            
-            # Parse steps
-            steps = self._parse_steps(data.get("steps", {}))
-            
             # Create workflow object
-            workflow = CWLWorkflow(
-                cwlVersion=cwl_version,
-                **{"class": doc_class},
-                id=data.get("id"),
-                label=data.get("label"),
-                doc=data.get("doc"),
-                inputs=inputs,
-                outputs=outputs,
-                steps=steps,
-                requirements=data.get("requirements"),
-                hints=data.get("hints"),
-            )
-            
-            # Resolve step dependencies
-            step_dependencies = self._resolve_dependencies(workflow)
-            
-            # Topologically sort steps
-            step_order = self._topological_sort(step_dependencies)
+            workflow = self.build_workflow(data)
             
-            # Load tool definitions (if available)
-            tools = self._load_tools(workflow)
+            # Load tool definitions referenced by steps
+            resolution = self.tool_resolver.resolve(
+                workflow,
+                base_path=base_path,
+                inline_documents=inline_documents,
+            )
             
-            parsed = ParsedWorkflow(
-                workflow=workflow,
-                tools=tools,
-                step_order=step_order,
-                step_dependencies=step_dependencies,
+            parsed = self.build_parsed_workflow(
+                workflow,
+                tools=resolution.tools,
+                subworkflows=resolution.subworkflows,
             )
             
             # Validate
             validation = self._validate_workflow(parsed)
+            validation.warnings.extend(resolution.errors)
             
             return CWLParseResult(
                 success=True,
                 workflow=parsed,
                 validation=validation,
+                tool_versions=resolution.versions,
             )
             
         except Exception as e:
@@ -135,6 +142,44 @@ class CWLParser:
                 error=str(e),
             )
     
+    def build_workflow(self, data: Dict[str, Any]) -> CWLWorkflow:
+        """Build a CWLWorkflow model from a loaded Workflow document."""
+        return CWLWorkflow(
+            cwlVersion=data.get("cwlVersion", "v1.3"),
+            **{"class": "Workflow"},
+            id=data.get("id"),
+            label=data.get("label"),
+            doc=data.get("doc"),
+            inputs=self._parse_inputs(data.get("inputs", {})),
+            outputs=self._parse_outputs(data.get("outputs", {})),
+            steps=self._parse_steps(data.get("steps", {})),
+            requirements=self._normalize_requirements(data.get("requirements")),
+            hints=self._normalize_requirements(data.get("hints")),
+        )
+    
+    def build_parsed_workflow(
+        self,
+        workflow: CWLWorkflow,
+        tools: Optional[Dict[str, CWLCommandLineTool]] = None,
+        subworkflows: Optional[Dict[str, ParsedWorkflow]] = None,
+    ) -> ParsedWorkflow:
+        """Resolve step dependencies and execution order for a workflow."""
+        step_dependencies = self._resolve_dependencies(workflow)
+        step_order = self._topological_sort(step_dependencies)
+        
+        # Steps without dependencies on or from other steps still need to run
+        for step_id in workflow.steps:
+            if step_id not in step_order:
+                step_order.append(step_id)
+        
+        return ParsedWorkflow(
+            workflow=workflow,
+            tools=tools or {},
+            subworkflows=subworkflows or {},
+            step_order=step_order,
+            step_dependencies=step_dependencies,
+        )
+    
     def parse_tool(self, yaml_content: str) -> Optional[CWLCommandLineTool]:
         """
         Parse a CWL CommandLineTool from YAML content.
@@ -146,9 +191,14 @@ class CWLParser:
             Parsed CommandLineTool or None on error
         """
         try:
-            data = self.parse_yaml(yaml_content)
-            
-            if data.get("class") != "CommandLineTool":
+            return self.build_tool(self.parse_yaml(yaml_content))
+        except Exception:
+            return None
+    
+    def build_tool(self, data: Dict[str, Any]) -> Optional[CWLCommandLineTool]:
+        """Build a CWLCommandLineTool model from a loaded document, or None on error."""
+        try:
+            if not isinstance(data, dict) or data.get("class") != "CommandLineTool":
                 return None
             
             inputs = self._parse_inputs(data.get("inputs", {}))
@@ -164,8 +214,8 @@ class CWLParser:
                 arguments=data.get("arguments"),
                 inputs=inputs,
                 outputs=outputs,
-                requirements=data.get("requirements"),
-                hints=data.get("hints"),
+                requirements=self._normalize_requirements(data.get("requirements")),
+                hints=self._normalize_requirements(data.get("hints")),
                 stdin=data.get("stdin"),
                 stdout=data.get("stdout"),
                 stderr=data.get("stderr"),
@@ -173,6 +223,40 @@ class CWLParser:
         except Exception:
             return None
     
+    def _unpack_graph(self, data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """Split a packed document into its main workflow and inline documents by id."""
+        entries = {}
+        for entry in data.get("$graph", []):
+            if isinstance(entry, dict) and entry.get("id"):
+                entries[entry["id"].split("#")[-1]] = entry
+        
+        main = entries.get("main")
+        if main is None:
+            main = next(
+                (e for e in entries.values() if e.get("class") == "Workflow"),
+                {},
+            )
+        
+        main = dict(main)
+        main.setdefault("cwlVersion", data.get("cwlVersion", ""))
+        return main, entries
+    
+    def _normalize_requirements(
+        self,
+        requirements: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]],
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Convert map-form requirements/hints ({Class: {...}}) to list form."""
+        if requirements is None or isinstance(requirements, list):
+            return requirements
+        
+        result = []
+        for req_class, value in requirements.items():
+            entry = {"class": req_class}
+            if isinstance(value, dict):
+                entry.update(value)
+            result.append(entry)
+        return result
+    
     def _parse_inputs(self, inputs_data: Union[Dict, List]) -> Dict[str, CWLInput]:
         """Parse inputs from CWL format (dict or list)."""
         result = {}
@@ -332,36 +416,6 @@ class CWLParser:
         
         return result
     
-    def _load_tools(self, workflow: CWLWorkflow) -> Dict[str, CWLCommandLineTool]:
-        """
-        Load tool definitions referenced by workflow steps.
-        
-        For MVP, returns empty dict - tools would be loaded from MinIO.
-        """
-        tools = {}
-        
-        for step_id, step in workflow.steps.items():
-            if step.run and not step.run.startswith("#"):
-                # External tool reference - would load from MinIO
-                # For MVP, create placeholder tool
-                tools[step_id] = CWLCommandLineTool(
-                    cwlVersion=workflow.cwl_version,
-                    **{"class": "CommandLineTool"},
-                    id=step_id,
-                    label=step_id.replace("-", " ").title(),
-                    baseCommand=["python", "-c", f"print('Running {step_id}')"],
-                    inputs={
-                        name: CWLInput(type="File")
-                        for name in step.in_.keys()
-                    },
-                    outputs={
-                        name: CWLOutput(type="File")
-                        for name in step.out
-                    },
-                )
-        
-        return tools
-    
     def _validate_workflow(self, parsed: ParsedWorkflow) -> CWLValidationResult:
         """Validate the parsed workflow structure."""
         errors = []
@@ -413,6 +467,25 @@ class CWLParser:
                 if isinstance(req, dict) and req.get("class") == "DockerRequirement":
                     return DockerRequirement(**req)
         return None
+    
+    def get_resource_requirement(
+        self,
+        tool: CWLCommandLineTool,
+        workflow: Optional[CWLWorkflow] = None,
+    ) -> Optional[ResourceRequirement]:
+        """Extract ResourceRequirement from tool (or enclosing workflow) hints/requirements."""
+        req_lists = [tool.requirements or [], tool.hints or []]
+        if workflow is not None:
+            req_lists.extend([workflow.requirements or [], workflow.hints or []])
+        for req_list in req_lists:
+            for req in req_list:
+                if isinstance(req, dict) and req.get("class") == "ResourceRequirement":
+                    try:
+                        return ResourceRequirement(**req)
+                    except Exception:
+                        # Expressions ($(...)) cannot be evaluated before runtime
+                        return None
+        return None
 
 
 # Singleton instance
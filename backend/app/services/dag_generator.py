@@ -5,8 +5,10 @@ Per SPEC.md Section 7.2
 """
 
 import os
+import json
+import shlex
 import logging
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
 from pathlib import Path
 from datetime import datetime
 import textwrap
@@ -14,11 +16,11 @@ import textwrap
 from app.models.cwl import (
     ParsedWorkflow,
     CWLWorkflow,
-    CWLStep,
-    CWLCommandLineTool,
-    DockerRequirement,
 )
-from app.services.cwl_parser import cwl_parser
+from app.models.plan import ExecutionPlan, PlannedStep
+from app.services.plan_compiler import plan_compiler
+from app.services.dag_store import DAGStore
+from app.services.dag_runtime import step_marker
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +31,7 @@ class DAGGenerator:
     
     Converts:
     - CWL Workflow → Airflow DAG
-    - CWL CommandLineTool → DockerOperator or BashOperator
+    - CWL CommandLineTool → container task (PythonOperator) or BashOperator
     - CWL step dependencies → Airflow task dependencies
     """
     
@@ -38,25 +40,86 @@ class DAGGenerator:
     # Local dags path for development
     LOCAL_DAGS_PATH = Path(__file__).parent.parent.parent.parent / "airflow" / "dags"
     
-    # MinIO configuration for volume mounts
-    MINIO_DATA_PATH = os.getenv("MINIO_DATA_PATH", "/data/minio")
+    # Runtime helpers imported by generated DAGs (copied into the DAGs folder)
+    RUNTIME_MODULE = "veriflow_runtime"
+    RUNTIME_SOURCE = Path(__file__).parent / "dag_runtime.py"
     
-    def __init__(self, dags_path: Optional[Path] = None):
+    # Scatter jobs per mapped task (1 = one task per subject)
+    DEFAULT_SCATTER_BATCH_SIZE = int(os.getenv("VERIFLOW_SCATTER_BATCH_SIZE", "1"))
+    
+    # "shape": one parameterized DAG per workflow shape, reused across executions
+    # "execution": one DAG file per execution
+    DAG_MODE = os.getenv("VERIFLOW_DAG_MODE", "shape")
+    
+    # Concurrent runs allowed on a shared (per-shape) DAG
+    SHAPE_DAG_MAX_ACTIVE_RUNS = int(os.getenv("VERIFLOW_SHAPE_DAG_MAX_ACTIVE_RUNS", "16"))
+    
+    # Airflow pool shared by all step tasks; one slot per worker CPU core,
+    # tasks take as many slots as the cores they request
+    WORKER_POOL = os.getenv("VERIFLOW_WORKER_POOL", "veriflow_workers")
+    WORKER_POOL_SLOTS = int(os.getenv("VERIFLOW_WORKER_CPUS", str(os.cpu_count() or 4)))
+    
+    # Task retries (Airflow default_args)
+    TASK_RETRIES = int(os.getenv("VERIFLOW_TASK_RETRIES", "1"))
+    
+    # Share of a step's memory limit given to /dev/shm (DataLoader workers etc.)
+    SHM_FRACTION = float(os.getenv("VERIFLOW_SHM_FRACTION", "0.5"))
+    
+    # Run linear chains of same-image steps in a single container
+    FUSE_STEPS = os.getenv("VERIFLOW_FUSE_STEPS", "false").lower() in ("1", "true", "yes")
+    
+    # "cwltool": steps with a resolved tool run through the cwl/ runner image
+    # "placeholder": steps only echo (no tool execution)
+    TASK_RUNNER = os.getenv("VERIFLOW_TASK_RUNNER", "cwltool")
+    CWL_RUNNER_IMAGE = os.getenv("VERIFLOW_CWL_RUNNER_IMAGE", "veriflow-cwl:latest")
+    CWL_STEP_SCRIPT = "/opt/veriflow/veriflow_step.py"
+    
+    # Push task state changes to the backend (veriflow_runtime.notify_backend;
+    # a no-op on workers without VERIFLOW_WEBHOOK_URL)
+    PUSH_STATUS = os.getenv("VERIFLOW_PUSH_STATUS", "true").lower() in ("1", "true", "yes")
+    
+    # Shared cwltool --cachedir; a host path mounted at the same location
+    # since cwltool starts step containers on the host Docker daemon
+    CWL_CACHE_PATH = os.getenv("VERIFLOW_CWL_CACHE_PATH", "/data/veriflow-cwl-cache")
+    
+    def __init__(
+        self,
+        dags_path: Optional[Path] = None,
+        fuse_steps: Optional[bool] = None,
+        task_runner: Optional[str] = None,
+    ):
         """
         Initialize DAG generator.
         
         Args:
             dags_path: Directory to write generated DAG files
+            fuse_steps: Enable step fusion (defaults to VERIFLOW_FUSE_STEPS)
+            task_runner: "cwltool" or "placeholder" (defaults to VERIFLOW_TASK_RUNNER)
         """
+        self.fuse_steps = self.FUSE_STEPS if fuse_steps is None else fuse_steps
+        self.task_runner = task_runner or self.TASK_RUNNER
         self.dags_path = dags_path or self.LOCAL_DAGS_PATH
         self.dags_path = Path(self.dags_path)
         self.dags_path.mkdir(parents=True, exist_ok=True)
+        self.store = DAGStore(self.dags_path)
+        self._install_runtime()
+    
+    def _install_runtime(self):
+        """Copy the DAG runtime helpers next to the generated DAGs if outdated."""
+        target = self.dags_path / f"{self.RUNTIME_MODULE}.py"
+        source = self.RUNTIME_SOURCE.read_text()
+        try:
+            if not target.exists() or target.read_text() != source:
+                target.write_text(source)
+        except OSError as e:
+            logger.warning(f"Could not install DAG runtime helpers: {e}")
     
     def generate_dag(
         self,
         workflow: ParsedWorkflow,
         execution_id: str,
         config: Optional[Dict[str, Any]] = None,
+        plan: Optional[ExecutionPlan] = None,
     ) -> str:
         """
         Generate an Airflow DAG file from a parsed CWL workflow.
@@ -65,6 +128,7 @@ class DAGGenerator:
             workflow: Parsed CWL workflow
             execution_id: Unique execution identifier
             config: Optional execution configuration
+            plan: Compiled execution plan (compiled here if not given)
             
         Returns:
             Path to the generated DAG file
@@ -78,15 +142,61 @@ class DAGGenerator:
             dag_id=dag_id,
             execution_id=execution_id,
             config=config,
+            plan=plan,
         )
         
-        # Write to file
-        dag_file = self.dags_path / f"{dag_id}.py"
-        dag_file.write_text(dag_code)
+        # Write atomically; identical code leaves the existing file untouched
+        dag_file = self.store.write(dag_id, dag_code, execution_id=execution_id)
         
         logger.info(f"Generated DAG file: {dag_file}")
         return str(dag_file)
     
+    def generate_shape_dag(
+        self,
+        workflow: ParsedWorkflow,
+        plan: ExecutionPlan,
+    ) -> Tuple[str, str]:
+        """
+        Get or create the parameterized DAG for a workflow shape.
+        
+        The DAG only encodes the structure of the plan; everything that is
+        specific to an execution (execution ID, environment, inputs) is read
+        from the run conf (see ExecutionPlan.to_conf). An existing file is
+        never rewritten, so the scheduler does not re-parse it and later
+        executions of the same shape can be triggered immediately.
+        
+        Args:
+            workflow: Parsed CWL workflow
+            plan: Compiled execution plan
+            
+        Returns:
+            Tuple of (dag_id, path to the DAG file)
+        """
+        dag_id = self._generate_shape_dag_id(workflow, plan)
+        dag_file = self.dags_path / f"{dag_id}.py"
+        
+        # Written again when missing, also when another worker just collected it
+        if not self.store.add_reference(dag_id, plan.execution_id):
+            dag_code = self._generate_dag_code(
+                workflow=workflow,
+                dag_id=dag_id,
+                execution_id=plan.execution_id,
+                config=plan.config,
+                plan=plan,
+                parameterized=True,
+            )
+            self.store.write(dag_id, dag_code, execution_id=plan.execution_id)
+            logger.info(f"Generated shape DAG file: {dag_file}")
+        
+        return dag_id, str(dag_file)
+    
+    def _generate_shape_dag_id(self, workflow: ParsedWorkflow, plan: ExecutionPlan) -> str:
+        """Generate the DAG ID shared by all executions of a workflow shape."""
+        workflow_id = workflow.workflow.id or "workflow"
+        clean_id = "".join(c if c.isalnum() else "_" for c in workflow_id)
+        suffix = "_fused" if self.fusion_groups(plan) else ""
+        return f"veriflow_{clean_id}_shape_{plan.shape_key[:12]}{suffix}"
+    
     def _generate_dag_id(self, workflow: ParsedWorkflow, execution_id: str) -> str:
         """Generate unique DAG ID."""
         workflow_id = workflow.workflow.id or "workflow"
@@ -100,32 +210,54 @@ class DAGGenerator:
         dag_id: str,
         execution_id: str,
         config: Dict[str, Any],
+        plan: Optional[ExecutionPlan] = None,
+        parameterized: bool = False,
     ) -> str:
         """Generate the Python code for an Airflow DAG."""
         
+        if plan is None:
+            plan = plan_compiler.compile(workflow, execution_id, config)
+        
         # Extract workflow info
         cwl_workflow = workflow.workflow
-        steps = cwl_workflow.steps
-        step_order = workflow.step_order
-        dependencies = workflow.step_dependencies
-        
-        # Build imports
-        imports = self._generate_imports(workflow)
         
         # Build DAG context
-        dag_context = self._generate_dag_context(dag_id, cwl_workflow, execution_id, config)
+        dag_context = self._generate_dag_context(
+            dag_id, cwl_workflow, execution_id, config, parameterized=parameterized
+        )
         
         # Build tasks
-        tasks = self._generate_tasks(workflow, execution_id, config)
+        groups = self.fusion_groups(plan)
+        tasks = self._generate_tasks(plan, parameterized=parameterized, groups=groups)
+        
+        # Build imports (only what the DAG uses, to keep DAG parsing cheap)
+        imports = self._generate_imports(dag_context + tasks)
         
         # Build dependencies
-        task_deps = self._generate_dependencies(dependencies)
+        task_deps = self._generate_dependencies(
+            self._fused_dependencies(plan, groups),
+            scatter_steps=plan.scatter_steps,
+        )
         
+        if parameterized:
+            # Per-execution values come from the run conf (ExecutionPlan.to_conf)
+            header = f"Shape: {plan.shape_key}"
+            settings = "\n".join([
+                "# Execution configuration (templated from dag_run.conf)",
+                "EXECUTION_ID = \"{{ dag_run.conf['execution_id'] }}\"",
+            ])
+        else:
+            header = f"Execution ID: {execution_id}"
+            settings = "\n".join([
+                "# Execution configuration",
+                f'EXECUTION_ID = "{execution_id}"',
+            ])
+
         # Combine all parts
         code = f'''"""
 VeriFlow Generated DAG
 Workflow: {cwl_workflow.label or cwl_workflow.id or 'Unknown'}
-Execution ID: {execution_id}
+{header}
 Generated: {datetime.utcnow().isoformat()}
 
 DO NOT EDIT - This file is auto-generated from CWL workflow.
@@ -133,9 +265,7 @@ DO NOT EDIT - This file is auto-generated from CWL workflow.
 
 {imports}
 
-# Execution configuration
-EXECUTION_ID = "{execution_id}"
-CONFIG = {repr(config)}
+{settings}
 
 {dag_context}
 {tasks}
@@ -143,27 +273,38 @@ CONFIG = {repr(config)}
 '''
         return code
     
-    def _generate_imports(self, workflow: ParsedWorkflow) -> str:
-        """Generate import statements."""
+    def _generate_imports(self, tasks: str) -> str:
+        """
+        Generate import statements for the operators and helpers the DAG uses.
+        
+        The scheduler re-parses every DAG file periodically, so generated
+        files import nothing they do not need at module level. Containers are
+        started by veriflow_runtime.run_container, which imports the Docker
+        SDK only when the task runs.
+        """
         imports = [
             "from datetime import datetime, timedelta",
-            "import os",
             "",
             "from airflow import DAG",
-            "from airflow.operators.bash import BashOperator",
-            "from airflow.operators.python import PythonOperator",
             "from airflow.operators.empty import EmptyOperator",
         ]
-        
-        # Check if we need DockerOperator
-        has_docker = any(
-            self._get_docker_image(workflow, step_id)
-            for step_id in workflow.workflow.steps
-        )
-        
-        if has_docker:
-            imports.append("from airflow.providers.docker.operators.docker import DockerOperator")
-            imports.append("from docker.types import Mount")
+        if "BashOperator" in tasks:
+            imports.append("from airflow.operators.bash import BashOperator")
+        if "PythonOperator" in tasks:
+            imports.append("from airflow.operators.python import PythonOperator")
+        
+        helpers = [
+            name
+            for name in (
+                "run_container", "container_args", "scatter_split", "scatter_gather",
+                "notify_task_running", "notify_task_success", "notify_task_failed",
+                "notify_task_retry", "notify_run_success", "notify_run_failed",
+            )
+            if name in tasks
+        ]
+        if helpers:
+            imports.append("")
+            imports.append(f"from {self.RUNTIME_MODULE} import {', '.join(helpers)}")
         
         return "\n".join(imports)
     
@@ -173,10 +314,32 @@ CONFIG = {repr(config)}
         cwl_workflow: CWLWorkflow,
         execution_id: str,
         config: Dict[str, Any],
+        parameterized: bool = False,
     ) -> str:
         """Generate DAG definition context."""
         
-        description = cwl_workflow.doc or cwl_workflow.label or f"VeriFlow workflow {execution_id}"
+        if parameterized:
+            description = cwl_workflow.doc or cwl_workflow.label or "VeriFlow parameterized workflow"
+            max_active_runs = self.SHAPE_DAG_MAX_ACTIVE_RUNS
+            tags = '["veriflow", "generated", "parameterized"]'
+        else:
+            description = cwl_workflow.doc or cwl_workflow.label or f"VeriFlow workflow {execution_id}"
+            max_active_runs = 1
+            tags = '["veriflow", "generated"]'
+        
+        task_callbacks, dag_callbacks = "", ""
+        if self.PUSH_STATUS:
+            # Task state changes are pushed to the backend webhook
+            task_callbacks = "".join([
+                "\n    'on_execute_callback': notify_task_running,",
+                "\n    'on_success_callback': notify_task_success,",
+                "\n    'on_failure_callback': notify_task_failed,",
+                "\n    'on_retry_callback': notify_task_retry,",
+            ])
+            dag_callbacks = "".join([
+                "\n    on_success_callback=notify_run_success,",
+                "\n    on_failure_callback=notify_run_failed,",
+            ])
         
         return f'''
 # Default arguments for tasks
@@ -185,8 +348,8 @@ default_args = {{
     'depends_on_past': False,
     'email_on_failure': False,
     'email_on_retry': False,
-    'retries': 1,
-    'retry_delay': timedelta(minutes=1),
+    'retries': {self.TASK_RETRIES},
+    'retry_delay': timedelta(minutes=1),{task_callbacks}
 }}
 
 # DAG definition
@@ -195,18 +358,88 @@ with DAG(
     default_args=default_args,
     description="""{description}""",
     start_date=datetime(2026, 1, 1),
-    schedule_interval=None,  # Manual trigger only
+    schedule=None,  # Manual trigger only
     catchup=False,
-    tags=["veriflow", "generated"],
-    max_active_runs=1,
+    is_paused_upon_creation=False,
+    render_template_as_native_obj=True,
+    tags={tags},
+    max_active_runs={max_active_runs},{dag_callbacks}
 ) as dag:
 '''
     
+    def fusion_groups(self, plan: ExecutionPlan) -> List[Tuple[str, ...]]:
+        """
+        Find maximal linear chains of steps that can share one container.
+        
+        A step joins the chain of its only dependency when that dependency
+        has no other dependents, both run the same image with the same
+        resources, either both or neither run a resolved tool (runs_cwl),
+        and neither scatters. Only chains of two or more steps are returned,
+        and only when fusion is enabled.
+        """
+        if not self.fuse_steps:
+            return []
+        
+        dependents: Dict[str, List[str]] = {step_id: [] for step_id in plan.steps}
+        for step_id, step in plan.steps.items():
+            for dep in step.dependencies:
+                dependents[dep].append(step_id)
+        
+        chains: List[List[str]] = []
+        chain_of: Dict[str, List[str]] = {}
+        for step_id, step in plan.steps.items():
+            parent = plan.steps[step.dependencies[0]] if len(step.dependencies) == 1 else None
+            if (
+                parent is not None
+                and step.image
+                and parent.image == step.image
+                and parent.resources == step.resources
+                and self.runs_cwl(parent) == self.runs_cwl(step)
+                and not step.scatter
+                and not parent.scatter
+                and len(dependents[parent.step_id]) == 1
+            ):
+                chain = chain_of[parent.step_id]
+                chain.append(step_id)
+            else:
+                chain = [step_id]
+                chains.append(chain)
+            chain_of[step_id] = chain
+        
+        return [tuple(chain) for chain in chains if len(chain) > 1]
+    
+    @staticmethod
+    def fused_task_id(plan: ExecutionPlan, group: Tuple[str, ...]) -> str:
+        """Airflow task ID of a fused chain (first and last step)."""
+        return f"{plan.steps[group[0]].task_id}__{plan.steps[group[-1]].task_id}"
+    
+    def _fused_dependencies(
+        self,
+        plan: ExecutionPlan,
+        groups: List[Tuple[str, ...]],
+    ) -> Dict[str, List[str]]:
+        """Step dependencies with each fused chain collapsed into its task."""
+        if not groups:
+            return plan.dependencies
+        
+        node = {step_id: step_id for step_id in plan.steps}
+        for group in groups:
+            for step_id in group:
+                node[step_id] = self.fused_task_id(plan, group)
+        
+        dependencies: Dict[str, List[str]] = {}
+        for step_id, deps in plan.dependencies.items():
+            targets = dependencies.setdefault(node[step_id], [])
+            for dep in deps:
+                if node[dep] != node[step_id] and node[dep] not in targets:
+                    targets.append(node[dep])
+        return dependencies
+    
     def _generate_tasks(
         self,
-        workflow: ParsedWorkflow,
-        execution_id: str,
-        config: Dict[str, Any],
+        plan: ExecutionPlan,
+        parameterized: bool = False,
+        groups: Optional[List[Tuple[str, ...]]] = None,
     ) -> str:
         """Generate task definitions for all workflow steps."""
         tasks = []
@@ -217,14 +450,14 @@ with DAG(
     start = EmptyOperator(task_id="start")
 ''')
         
-        # Generate task for each step
-        for step_id in workflow.step_order:
-            step = workflow.workflow.steps.get(step_id)
-            if not step:
-                continue
-            
-            task_code = self._generate_task(workflow, step_id, step, execution_id, config)
-            tasks.append(task_code)
+        # Generate task for each step (or fused chain of steps)
+        fused = {group[0]: group for group in groups or []}
+        skipped = {step_id for group in groups or [] for step_id in group[1:]}
+        for step_id, step in plan.steps.items():
+            if step_id in fused:
+                tasks.append(self._generate_fused_task(plan, fused[step_id], parameterized))
+            elif step_id not in skipped:
+                tasks.append(self._generate_task(step, plan.config, parameterized))
         
         # End task
         tasks.append('''
@@ -236,83 +469,320 @@ with DAG(
     
     def _generate_task(
         self,
-        workflow: ParsedWorkflow,
-        step_id: str,
-        step: CWLStep,
-        execution_id: str,
+        step: PlannedStep,
         config: Dict[str, Any],
+        parameterized: bool = False,
     ) -> str:
         """Generate a single task definition."""
+        if step.scatter:
+            return self._generate_scatter_task(step, config, parameterized)
         
-        # Clean task ID for Airflow (alphanumeric and underscore only)
-        task_id = "".join(c if c.isalnum() else "_" for c in step_id)
-        
-        # Check for Docker image
-        docker_image = self._get_docker_image(workflow, step_id)
-        
-        if docker_image:
-            return self._generate_docker_task(
-                task_id, step, docker_image, execution_id, config
-            )
+        if self.runs_cwl(step):
+            return self._generate_cwl_task(step, parameterized)
+        if step.image:
+            return self._generate_docker_task(step, parameterized)
         else:
-            return self._generate_bash_task(
-                task_id, step, execution_id, config
-            )
+            return self._generate_bash_task(step, parameterized)
+    
+    def _env_expression(self, step: PlannedStep, parameterized: bool) -> str:
+        """Step environment as a literal, or as a template on the run conf."""
+        if parameterized:
+            return '"' + "{{ dag_run.conf['steps']['" + step.task_id + "']['env'] }}" + '"'
+        return repr(step.env)
+    
+    def _generate_mounts(self, step: PlannedStep) -> List[Dict[str, str]]:
+        """Bind mounts of a step container."""
+        return [mount.model_dump() for mount in step.mounts]
     
-    def _generate_docker_task(
+    def _generate_scheduling_args(self, step: PlannedStep) -> str:
+        """
+        Generate pool and priority arguments for a task.
+        
+        The task takes one pool slot per core requested in the step's CWL
+        ResourceRequirement, so the workers are not oversubscribed.
+        """
+        resources = step.resources
+        cores = (resources.cores_min or resources.cores_max or 1) if resources else 1
+        slots = max(1, min(int(cores), self.WORKER_POOL_SLOTS))
+        
+        args = [
+            f'pool="{self.WORKER_POOL}"',
+            f"pool_slots={slots}",
+            f"priority_weight={step.priority_weight}",
+            'weight_rule="absolute"',
+        ]
+        return "".join(f"\n        {arg}," for arg in args)
+    
+    def _container_limits(self, step: PlannedStep) -> Dict[str, Any]:
+        """Container CPU, memory and /dev/shm limits from coresMax/ramMax (or the minimums)."""
+        resources = step.resources
+        if not resources:
+            return {}
+        
+        limits: Dict[str, Any] = {}
+        cpus = resources.cores_max or resources.cores_min
+        ram_mb = resources.ram_max or resources.ram_min
+        if cpus:
+            limits["cpus"] = float(cpus)
+        if ram_mb:
+            limits["mem_limit"] = f"{int(ram_mb)}m"
+            limits["shm_size"] = int(ram_mb * self.SHM_FRACTION) * 1024 * 1024
+        return limits
+    
+    def _generate_container_operator(
         self,
         task_id: str,
-        step: CWLStep,
-        docker_image: str,
-        execution_id: str,
-        config: Dict[str, Any],
+        container: Dict[str, Any],
+        environment: Optional[str],
+        scheduling: PlannedStep,
+        mapped_over: Optional[str] = None,
     ) -> str:
-        """Generate a DockerOperator task."""
-        
-        # Build environment variables
-        env_vars = {
-            "EXECUTION_ID": execution_id,
-            "STEP_ID": task_id,
-            "INPUT_PATH": f"/data/input/{execution_id}",
-            "OUTPUT_PATH": f"/data/output/{execution_id}/{task_id}",
-        }
+        """
+        Generate a PythonOperator running a container through veriflow_runtime.
+        
+        The Docker SDK is only imported inside run_container when the task
+        executes, so parsing the DAG file stays cheap for the scheduler.
+        Mapped tasks receive their environment per map index instead.
+        """
+        kwargs = "".join(f'\n            "{key}": {value!r},' for key, value in container.items())
+        if mapped_over is None:
+            kwargs += f'\n            "environment": {environment},'
+            operator, expand = "PythonOperator(", ""
+        else:
+            operator = "PythonOperator.partial("
+            expand = f".expand(op_args={mapped_over}.output.map(container_args))"
+        
+        return f'''{operator}
+        task_id="{task_id}",
+        python_callable=run_container,
+        op_kwargs={{{kwargs}
+        }},{self._generate_scheduling_args(scheduling)}
+    ){expand}'''
+    
+    def runs_cwl(self, step: PlannedStep) -> bool:
+        """Whether a step runs its real tool through the CWL runner image."""
+        return self.task_runner == "cwltool" and step.tool_document is not None
+    
+    def scatter_runnable(self, step: PlannedStep) -> bool:
+        """
+        Whether the batches of a scatter step run a real tool.
+        
+        With the cwltool runner a scatter step without a resolved tool would
+        only echo per batch and be reported as succeeded, so it cannot run;
+        the placeholder runner echoes for every step.
+        """
+        return self.task_runner != "cwltool" or self.runs_cwl(step)
+    
+    def _cwl_step_spec(self, step: PlannedStep) -> str:
+        """Step spec passed to the runner script (tool document and input bindings)."""
+        return json.dumps(
+            {"step": step.task_id, "tool": step.tool_document, "inputs": step.step_inputs},
+            sort_keys=True,
+            default=str,
+        )
+    
+    def _generate_cwl_mounts(self, step: PlannedStep) -> List[Dict[str, str]]:
+        """Mounts of a runner container: data, Docker socket and the shared cache."""
+        return self._generate_mounts(step) + [
+            {"source": "/var/run/docker.sock", "target": "/var/run/docker.sock", "type": "bind"},
+            {"source": self.CWL_CACHE_PATH, "target": self.CWL_CACHE_PATH, "type": "bind"},
+        ]
+    
+    def step_container(self, step: PlannedStep) -> Optional[Dict[str, Any]]:
+        """
+        Container a (non-fused) step runs in: run_container arguments without
+        the environment, or None for steps without an image.
         
-        # Add config as env vars
-        for key, value in config.items():
-            env_vars[f"CONFIG_{key.upper()}"] = str(value)
+        Steps with a resolved tool run through the CWL runner image, other
+        steps with an image run a placeholder command in it.
+        """
+        if self.runs_cwl(step):
+            return {
+                "image": self.CWL_RUNNER_IMAGE,
+                "entrypoint": ["python"],
+                "command": [self.CWL_STEP_SCRIPT, self._cwl_step_spec(step)],
+                "mounts": self._generate_cwl_mounts(step),
+            }
+        if step.image:
+            return {
+                "image": step.image,
+                "command": f"python -c \"print('Executing {step.task_id}')\"",
+                "mounts": self._generate_mounts(step),
+                **self._container_limits(step),
+            }
+        return None
+    
+    def _generate_cwl_task(self, step: PlannedStep, parameterized: bool = False) -> str:
+        """
+        Generate a task running the step's CWL tool with cwltool.
         
+        The runner image executes cwl/veriflow_step.py, which builds the job
+        from workflow inputs and upstream outputs and calls cwltool with the
+        shared --cachedir (and --parallel for sub-workflows). Resource limits
+        are enforced by cwltool on the tool container, so the runner itself
+        only takes pool slots.
+        """
+        task_id = step.task_id
+        operator = self._generate_container_operator(
+            task_id, self.step_container(step), self._env_expression(step, parameterized), step,
+        )
+        return f'''
+    # Task: {task_id} (cwltool: {step.run})
+    {task_id} = {operator}
+'''
+    
+    def _generate_docker_task(self, step: PlannedStep, parameterized: bool = False) -> str:
+        """Generate a container task for a step with a Docker image."""
+        task_id = step.task_id
+        operator = self._generate_container_operator(
+            task_id, self.step_container(step), self._env_expression(step, parameterized), step,
+        )
         return f'''
     # Task: {task_id}
-    {task_id} = DockerOperator(
-        task_id="{task_id}",
-        image="{docker_image}",
-        command="python -c \\"print('Executing {task_id}')\\"",
-        environment={repr(env_vars)},
-        mounts=[
-            Mount(
-                source="{self.MINIO_DATA_PATH}",
-                target="/data",
-                type="bind",
-            ),
-        ],
-        auto_remove=True,
-        docker_url="unix://var/run/docker.sock",
-        network_mode="bridge",
-    )
+    {task_id} = {operator}
 '''
     
-    def _generate_bash_task(
+    def _generate_fused_task(
         self,
-        task_id: str,
-        step: CWLStep,
-        execution_id: str,
+        plan: ExecutionPlan,
+        group: Tuple[str, ...],
+        parameterized: bool = False,
+    ) -> str:
+        """
+        Generate one container task running a chain of steps in sequence.
+        
+        Each step sets its own STEP_ID/OUTPUT_PATH and is wrapped in
+        VERIFLOW_STEP start/end log markers, from which per-step status is
+        recovered (see dag_runtime.parse_step_markers).
+        """
+        steps = [plan.steps[step_id] for step_id in group]
+        first = steps[0]
+        task_id = self.fused_task_id(plan, group)
+        
+        runs_cwl = all(self.runs_cwl(step) for step in steps)
+        
+        script = ["set -e"]
+        for step in steps:
+            output_path = f"{plan_compiler.CONTAINER_DATA_PATH}/output/$EXECUTION_ID/{step.task_id}"
+            if runs_cwl:
+                run = f"python {self.CWL_STEP_SCRIPT} {shlex.quote(self._cwl_step_spec(step))}"
+            else:
+                run = f"python -c \"print('Executing {step.task_id}')\""
+            script.extend([
+                f"echo '{step_marker(step.task_id, 'start')}'",
+                f"export STEP_ID={step.task_id} OUTPUT_PATH={output_path}",
+                f"mkdir -p $OUTPUT_PATH",
+                run,
+                f"echo '{step_marker(step.task_id, 'end')}'",
+            ])
+        
+        if runs_cwl:
+            # The runner image's entrypoint is cwltool
+            container = {
+                "image": self.CWL_RUNNER_IMAGE,
+                "entrypoint": ["sh", "-c"],
+                "command": ["\n".join(script)],
+                "mounts": self._generate_cwl_mounts(first),
+            }
+        else:
+            container = {
+                "image": first.image,
+                "command": ["sh", "-c", "\n".join(script)],
+                "mounts": self._generate_mounts(first),
+                **self._container_limits(first),
+            }
+        
+        # The chain inherits the highest priority of its steps
+        scheduling = first.model_copy(
+            update={"priority_weight": max(step.priority_weight for step in steps)}
+        )
+        operator = self._generate_container_operator(
+            task_id, container, self._env_expression(first, parameterized), scheduling,
+        )
+        return f'''
+    # Task: {task_id} (fused: {" -> ".join(step.task_id for step in steps)})
+    {task_id} = {operator}
+'''
+    
+    def _generate_scatter_task(
+        self,
+        step: PlannedStep,
         config: Dict[str, Any],
+        parameterized: bool = False,
     ) -> str:
+        """
+        Generate a scatter step as split -> mapped task -> gather.
+        
+        The split task expands the scatter inputs (dotproduct or
+        flat_crossproduct) into batches of `scatter_batch_size` jobs, the step
+        task is dynamically mapped over those batches, and the gather task
+        collects per-job outputs back into array outputs. Steps with a
+        resolved tool run each batch through the CWL runner, which reads the
+        batch's jobs from SCATTER_ITEMS. Raises ValueError for scatter steps
+        that would not run a real tool (see scatter_runnable).
+        """
+        task_id = step.task_id
+        if not self.scatter_runnable(step):
+            raise ValueError(f"Scatter step '{step.step_id}' has no resolved CWL tool to run per batch")
+        if parameterized:
+            batch_size = (
+                '"' + "{{ dag_run.conf['config'].get('scatter_batch_size') or "
+                + str(self.DEFAULT_SCATTER_BATCH_SIZE) + " }}" + '"'
+            )
+            pattern = '"' + "{{ dag_run.conf['config'].get('scatter_glob') or '*' }}" + '"'
+        else:
+            batch_size = max(1, int(config.get("scatter_batch_size") or self.DEFAULT_SCATTER_BATCH_SIZE))
+            pattern = repr(config.get("scatter_glob") or "*")
+        
+        if self.runs_cwl(step) or step.image:
+            mapped_task = self._generate_container_operator(
+                task_id, self.step_container(step), None, step, mapped_over=f"{task_id}_split",
+            )
+        else:
+            mapped_task = f'''BashOperator.partial(
+        task_id="{task_id}",
+        bash_command="echo \\"Executing step: {task_id} batch $SCATTER_INDEX\\"",{self._generate_scheduling_args(step)}
+    ).expand(env={task_id}_split.output)'''
+        
+        return f'''
+    # Task: {task_id} (scatter over {list(step.scatter)!r}, {step.scatter_method})
+    {task_id}_split = PythonOperator(
+        task_id="{task_id}_split",
+        python_callable=scatter_split,
+        op_kwargs={{
+            "step_id": "{task_id}",
+            "sources": {repr(step.scatter_sources)},
+            "method": {step.scatter_method!r},
+            "batch_size": {batch_size},
+            "base_env": {self._env_expression(step, parameterized)},
+            "execution_id": EXECUTION_ID,
+            "pattern": {pattern},
+        }},
+    )
+    {task_id} = {mapped_task}
+    {task_id}_gather = PythonOperator(
+        task_id="{task_id}_gather",
+        python_callable=scatter_gather,
+        op_kwargs={{
+            "step_id": "{task_id}",
+            "outputs": {repr(list(step.outputs))},
+        }},
+    )
+    {task_id}_split >> {task_id} >> {task_id}_gather
+'''
+    
+    def _generate_bash_task(self, step: PlannedStep, parameterized: bool = False) -> str:
         """Generate a BashOperator task (fallback when no Docker image)."""
+        task_id = step.task_id
+        if parameterized:
+            execution_id = "$EXECUTION_ID"
+            env = self._env_expression(step, parameterized)
+        else:
+            execution_id = step.env["EXECUTION_ID"]
+            env = repr({"EXECUTION_ID": execution_id, "STEP_ID": task_id})
         
         # For MVP, create a simple echo command
         # In production, this would run the actual tool
-        
         return f'''
     # Task: {task_id} (BashOperator fallback)
     {task_id} = BashOperator(
@@ -325,37 +795,47 @@ with DAG(
             mkdir -p /tmp/veriflow/{execution_id}/{task_id}
             echo "Step completed at $(date)" > /tmp/veriflow/{execution_id}/{task_id}/status.txt
         """,
-        env={{
-            "EXECUTION_ID": "{execution_id}",
-            "STEP_ID": "{task_id}",
-        }},
+        env={env},{self._generate_scheduling_args(step)}
     )
 '''
     
-    def _generate_dependencies(self, dependencies: Dict[str, List[str]]) -> str:
+    def _generate_dependencies(
+        self,
+        dependencies: Dict[str, List[str]],
+        scatter_steps: Optional[List[str]] = None,
+    ) -> str:
         """Generate task dependency statements."""
         lines = ["\n    # Task dependencies"]
+        scatter_steps = set(scatter_steps or [])
         
         # All steps depend on start
         all_steps = set(dependencies.keys())
         for deps in dependencies.values():
             all_steps.update(deps)
+        all_steps.update(scatter_steps)
         
         # Clean step IDs
         clean_steps = {s: "".join(c if c.isalnum() else "_" for c in s) for s in all_steps}
         
+        # Scatter steps are entered through their split task and left through gather
+        entry = {
+            s: f"{clean_steps[s]}_split" if s in scatter_steps else clean_steps[s]
+            for s in all_steps
+        }
+        exit_ = {
+            s: f"{clean_steps[s]}_gather" if s in scatter_steps else clean_steps[s]
+            for s in all_steps
+        }
+        
         # Steps with no dependencies depend on start
         root_steps = [s for s in all_steps if s not in dependencies or not dependencies[s]]
         for step in root_steps:
-            clean_id = clean_steps[step]
-            lines.append(f"    start >> {clean_id}")
+            lines.append(f"    start >> {entry[step]}")
         
         # Add explicit dependencies
         for step_id, deps in dependencies.items():
-            clean_step = clean_steps[step_id]
             for dep in deps:
-                clean_dep = clean_steps[dep]
-                lines.append(f"    {clean_dep} >> {clean_step}")
+                lines.append(f"    {exit_[dep]} >> {entry[step_id]}")
         
         # End task depends on all leaf nodes (steps that nothing depends on)
         dependent_steps = set()
@@ -365,43 +845,37 @@ with DAG(
         
         if leaf_steps:
             for step in leaf_steps:
-                clean_id = clean_steps[step]
-                lines.append(f"    {clean_id} >> end")
+                lines.append(f"    {exit_[step]} >> end")
         else:
             # If no leaves found, just connect end to all steps
             for step in all_steps:
-                clean_id = clean_steps[step]
-                lines.append(f"    {clean_id} >> end")
+                lines.append(f"    {exit_[step]} >> end")
         
         return "\n".join(lines)
     
-    def _get_docker_image(self, workflow: ParsedWorkflow, step_id: str) -> Optional[str]:
-        """Get Docker image for a step from tool definition."""
-        tool = workflow.tools.get(step_id)
-        if not tool:
-            return None
-        
-        docker_req = cwl_parser.get_docker_requirement(tool)
-        if docker_req:
-            return docker_req.docker_pull or docker_req.docker_image_id
-        
-        return None
-    
     def delete_dag(self, dag_id: str) -> bool:
         """Delete a generated DAG file."""
-        dag_file = self.dags_path / f"{dag_id}.py"
-        if dag_file.exists():
-            dag_file.unlink()
-            logger.info(f"Deleted DAG file: {dag_file}")
-            return True
-        return False
-    
-    def list_generated_dags(self) -> List[str]:
-        """List all generated VeriFlow DAG files."""
-        dags = []
-        for file in self.dags_path.glob("veriflow_*.py"):
-            dags.append(file.stem)
-        return dags
+        return self.store.delete(dag_id)
+    
+    def release_dag(self, execution_id: str):
+        """
+        Mark an execution as finished so its DAG can be garbage collected.
+        
+        DAGs are removed once every execution using them has finished and
+        the retention window (VERIFLOW_DAG_RETENTION_HOURS) has passed.
+        """
+        self.store.mark_finished(execution_id)
+        self.store.maybe_collect_garbage()
+    
+    def list_generated_dags(self) -> List[Dict[str, Any]]:
+        """
+        List generated VeriFlow DAG files.
+        
+        Returns:
+            List of dicts with dag_id, path, size_bytes, age_seconds,
+            content_hash and execution reference counts
+        """
+        return self.store.list_dags()
 
 
 # Singleton instance
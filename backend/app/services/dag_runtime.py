@@ -0,0 +1,391 @@
+"""
+VeriFlow - Generated DAG Runtime Helpers
+Callables used by generated workflow DAGs at task run time.
+
+This module is copied next to the generated DAG files (see DAGGenerator) and
+imported from there by the scheduler and workers, so it must only depend on
+the standard library (the Docker SDK is imported lazily by run_container,
+on workers only) and must not import anything from `app`.
+"""
+
+import os
+import glob
+import json
+import shutil
+import itertools
+import urllib.request
+from typing import Dict, List, Any, Optional, Union
+
+# Host directory bind-mounted into task containers as /data
+DATA_ROOT = os.getenv("MINIO_DATA_PATH", "/data/minio")
+CONTAINER_DATA_ROOT = "/data"
+
+# Outputs of a step run through cwltool (written by cwl/veriflow_step.py)
+CWL_OUTPUT_FILE = "cwl_output.json"
+
+
+def _to_container_path(path: str) -> str:
+    """Translate a host path under DATA_ROOT to the path seen inside containers."""
+    relative = os.path.relpath(path, DATA_ROOT)
+    return f"{CONTAINER_DATA_ROOT}/{relative}"
+
+
+def _list_folder(folder: str, pattern: str) -> List[str]:
+    """List entries of a data folder (relative to /data) matching a glob pattern."""
+    matches = sorted(glob.glob(os.path.join(DATA_ROOT, folder, pattern)))
+    return [_to_container_path(m) for m in matches]
+
+
+def scatter_values(
+    source: Union[str, List[str]],
+    execution_id: str,
+    pattern: str = "*",
+    **context,
+) -> List[Any]:
+    """
+    Resolve the array a scatter parameter iterates over.
+
+    Sources are looked up in this order:
+    1. The gathered array output of an upstream scatter step (`step/output`)
+    2. An explicit value in the run conf (`conf["inputs"][name]`)
+    3. The entries of the matching data folder, filtered by `pattern`
+       (e.g. `sub-*/sam-*` for per-subject cohorts)
+    """
+    if isinstance(source, list):
+        # Multiple sources are merged (CWL MultipleInputFeatureRequirement)
+        return [v for s in source for v in scatter_values(s, execution_id, pattern, **context)]
+
+    if "/" in source:
+        step, output = source.split("/", 1)
+        ti = context.get("ti")
+        gathered = ti.xcom_pull(task_ids=f"{step}_gather") if ti else None
+        if gathered and output in gathered:
+            return list(gathered[output])
+        return _list_folder(f"output/{execution_id}/{step}", pattern)
+
+    dag_run = context.get("dag_run")
+    conf = (dag_run.conf if dag_run else None) or {}
+    value = conf.get("inputs", {}).get(source)
+    if value is not None:
+        return value if isinstance(value, list) else [value]
+    return _list_folder(f"input/{execution_id}", pattern)
+
+
+def scatter_split(
+    step_id: str,
+    sources: Dict[str, Union[str, List[str]]],
+    method: str,
+    batch_size: int,
+    base_env: Dict[str, str],
+    execution_id: str,
+    pattern: str = "*",
+    **context,
+) -> List[Dict[str, str]]:
+    """
+    Expand a scatter step into batches of jobs, one mapped task per batch.
+
+    Returns one environment dict per batch. Each job in SCATTER_ITEMS carries
+    its global index, its scatter inputs and its own output directory, so the
+    gathered outputs keep the CWL input order regardless of batching.
+    """
+    names = list(sources)
+    values = [scatter_values(sources[name], execution_id, pattern, **context) for name in names]
+
+    if method == "dotproduct" or len(names) == 1:
+        lengths = {len(v) for v in values}
+        if len(lengths) > 1:
+            raise ValueError(
+                f"dotproduct scatter on step '{step_id}' requires equal-length inputs, got {sorted(lengths)}"
+            )
+        combinations = list(zip(*values))
+    else:
+        # flat_crossproduct (nested_crossproduct is flattened the same way)
+        combinations = list(itertools.product(*values))
+
+    output_root = base_env.get("OUTPUT_PATH", f"{CONTAINER_DATA_ROOT}/output/{execution_id}/{step_id}")
+    jobs = [
+        {
+            "index": index,
+            "inputs": dict(zip(names, combination)),
+            "output_path": f"{output_root}/{index}",
+        }
+        for index, combination in enumerate(combinations)
+    ]
+
+    batch_size = max(1, int(batch_size))
+    batches = []
+    for batch_index, start in enumerate(range(0, len(jobs), batch_size)):
+        env = dict(base_env)
+        env["SCATTER_INDEX"] = str(batch_index)
+        env["SCATTER_ITEMS"] = json.dumps(jobs[start:start + batch_size])
+        batches.append(env)
+
+    return batches
+
+
+def scatter_gather(
+    step_id: str,
+    outputs: List[str],
+    **context,
+) -> Dict[str, List[str]]:
+    """
+    Collect the per-job outputs of a scatter step into arrays.
+
+    Jobs run through cwltool contribute the values of their
+    cwl_output.json, other jobs the path of the output in their directory.
+    """
+    ti = context["ti"]
+    batches = ti.xcom_pull(task_ids=f"{step_id}_split") or []
+
+    jobs = []
+    for env in batches:
+        jobs.extend(json.loads(env.get("SCATTER_ITEMS", "[]")))
+    jobs.sort(key=lambda job: job["index"])
+
+    gathered: Dict[str, List[Any]] = {output: [] for output in outputs}
+    for job in jobs:
+        host_path = DATA_ROOT + job["output_path"][len(CONTAINER_DATA_ROOT):]
+        cwl_output = os.path.join(host_path, CWL_OUTPUT_FILE)
+        values = {}
+        if os.path.exists(cwl_output):
+            with open(cwl_output) as f:
+                values = json.load(f)
+        for output in outputs:
+            gathered[output].append(values.get(output, f"{job['output_path']}/{output}"))
+    return gathered
+
+
+# Structured log line written around each step of a fused task
+STEP_MARKER = "VERIFLOW_STEP"
+
+
+def step_marker(step_id: str, event: str) -> str:
+    """Format a step marker line (event is "start" or "end")."""
+    return f"{STEP_MARKER} step={step_id} event={event}"
+
+
+def parse_step_markers(log_text: str) -> Dict[str, str]:
+    """
+    Read per-step states from the log of a fused task.
+
+    Returns step_id -> "running" for steps that started but have not ended
+    (yet), and "completed" for steps that logged their end marker.
+    """
+    states: Dict[str, str] = {}
+    for line in (log_text or "").splitlines():
+        position = line.find(STEP_MARKER + " ")
+        if position < 0:
+            continue
+        fields = dict(
+            part.split("=", 1)
+            for part in line[position:].split()[1:]
+            if "=" in part
+        )
+        step_id, event = fields.get("step"), fields.get("event")
+        if not step_id:
+            continue
+        if event == "start":
+            states[step_id] = "running"
+        elif event == "end":
+            states[step_id] = "completed"
+    return states
+
+
+# Set in a step's environment when its outputs are reused from an earlier
+# run with identical tool and inputs (call cache hit): "<execution_id>/<task_id>"
+CACHE_HIT_ENV = "VERIFLOW_CACHE_HIT"
+
+
+def link_cached_outputs(environment: Dict[str, str]) -> Optional[str]:
+    """
+    Link a step's output directory to the outputs of an earlier run.
+
+    The link is relative (output/<execution>/<task> -> ../<source execution>/<task>),
+    so it resolves both on the host and inside containers mounting /data.
+
+    Returns:
+        The source ("<execution_id>/<task_id>"), or None without a cache hit
+    """
+    source = (environment or {}).get(CACHE_HIT_ENV)
+    if not source:
+        return None
+    source_execution, source_task = source.split("/", 1)
+    target = os.path.join(
+        DATA_ROOT, "output", environment["EXECUTION_ID"], environment.get("STEP_ID", source_task)
+    )
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if os.path.islink(target) or os.path.isfile(target):
+        os.unlink(target)
+    elif os.path.isdir(target):
+        shutil.rmtree(target)
+    os.symlink(os.path.join("..", source_execution, source_task), target)
+    return source
+
+
+# Labels of step containers, used to find the containers of an execution
+EXECUTION_LABEL = "veriflow.execution_id"
+TASK_LABEL = "veriflow.task_id"
+
+
+def container_args(env: Dict[str, str]) -> List[Dict[str, str]]:
+    """Positional args of one mapped run_container task (its environment)."""
+    return [env]
+
+
+def run_container(
+    environment: Dict[str, str] = None,
+    image: str = "",
+    command: Union[str, List[str]] = None,
+    entrypoint: List[str] = None,
+    mounts: List[Dict[str, str]] = (),
+    cpus: float = None,
+    mem_limit: str = None,
+    shm_size: int = None,
+    docker_url: str = "unix://var/run/docker.sock",
+    network_mode: str = "bridge",
+    **context,
+) -> int:
+    """
+    Run a step container and stream its output into the task log.
+
+    The Docker SDK is imported here rather than at module level, so parsing
+    generated DAG files never loads it. Containers are labelled with the
+    execution and task IDs, and always removed once the task finishes.
+    Steps with a call cache hit only link their earlier outputs.
+    Raises RuntimeError when the container exits non-zero.
+    """
+    source = link_cached_outputs(environment)
+    if source:
+        print(f"Reusing outputs of {source} (call cache hit)", flush=True)
+        return 0
+
+    import docker
+    from docker.types import Mount
+
+    environment = dict(environment or {})
+    if isinstance(command, list):
+        # Native template rendering turns JSON arguments back into objects
+        command = [json.dumps(part) if isinstance(part, (dict, list)) else part for part in command]
+    ti = context.get("ti")
+    labels = {
+        EXECUTION_LABEL: environment.get("EXECUTION_ID", ""),
+        TASK_LABEL: ti.task_id if ti else environment.get("STEP_ID", ""),
+    }
+
+    client = docker.DockerClient(base_url=docker_url)
+    container = client.containers.run(
+        image,
+        command=command,
+        entrypoint=entrypoint,
+        environment=environment,
+        mounts=[Mount(**mount) for mount in mounts],
+        nano_cpus=int(cpus * 1e9) if cpus else None,
+        mem_limit=mem_limit,
+        shm_size=shm_size,
+        network_mode=network_mode,
+        labels=labels,
+        detach=True,
+    )
+    try:
+        for chunk in container.logs(stream=True, follow=True):
+            print(chunk.decode("utf-8", errors="replace"), end="", flush=True)
+        status = container.wait().get("StatusCode", 1)
+        if status != 0:
+            raise RuntimeError(f"Container {image} exited with status {status}")
+        return status
+    finally:
+        try:
+            container.remove(force=True)
+        except Exception:
+            pass
+        client.close()
+
+
+def stop_containers(execution_id: str, docker_url: Optional[str] = None) -> int:
+    """
+    Kill and remove the step containers of an execution.
+
+    Args:
+        execution_id: Execution whose containers are stopped
+        docker_url: Docker daemon URL (default: environment)
+
+    Returns:
+        Number of containers removed
+    """
+    import docker
+
+    client = docker.DockerClient(base_url=docker_url) if docker_url else docker.from_env()
+    try:
+        containers = client.containers.list(all=True, filters={"label": f"{EXECUTION_LABEL}={execution_id}"})
+        for container in containers:
+            try:
+                container.remove(force=True)
+            except docker.errors.NotFound:
+                pass
+        return len(containers)
+    finally:
+        client.close()
+
+
+# Backend endpoint receiving task state changes (unset: nothing is pushed)
+WEBHOOK_URL_ENV = "VERIFLOW_WEBHOOK_URL"
+WEBHOOK_TOKEN_ENV = "VERIFLOW_WEBHOOK_TOKEN"
+WEBHOOK_TIMEOUT = 2  # seconds
+
+
+def notify_backend(context: Dict[str, Any], state: str, task: bool = True) -> bool:
+    """
+    POST a task (or DAG run) state change to the VeriFlow backend.
+
+    Used as Airflow callback so the UI sees state changes without waiting
+    for the next status poll. Failures are ignored: polling still picks
+    the change up.
+    """
+    url = os.getenv(WEBHOOK_URL_ENV)
+    if not url:
+        return False
+
+    dag_run = context.get("dag_run")
+    ti = context.get("ti") if task else None
+    event: Dict[str, Optional[Any]] = {
+        "dag_id": getattr(dag_run, "dag_id", None) or getattr(context.get("dag"), "dag_id", None),
+        "dag_run_id": getattr(dag_run, "run_id", None),
+        "task_id": getattr(ti, "task_id", None),
+        "map_index": getattr(ti, "map_index", None),
+        "try_number": getattr(ti, "try_number", None),
+        "state": state,
+    }
+    headers = {"Content-Type": "application/json"}
+    if os.getenv(WEBHOOK_TOKEN_ENV):
+        headers["X-VeriFlow-Token"] = os.environ[WEBHOOK_TOKEN_ENV]
+
+    request = urllib.request.Request(url, data=json.dumps(event).encode("utf-8"), headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=WEBHOOK_TIMEOUT):
+            return True
+    except Exception:
+        return False
+
+
+def notify_task_running(context):
+    notify_backend(context, "running")
+
+
+def notify_task_success(context):
+    notify_backend(context, "success")
+
+
+def notify_task_failed(context):
+    notify_backend(context, "failed")
+
+
+def notify_task_retry(context):
+    notify_backend(context, "up_for_retry")
+
+
+def notify_run_success(context):
+    notify_backend(context, "success", task=False)
+
+
+def notify_run_failed(context):
+    notify_backend(context, "failed", task=False)
@@ -0,0 +1,264 @@
+"""
+VeriFlow - Generated DAG Store
+Lifecycle management for generated Airflow DAG files.
+Per SPEC.md Section 7.2
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Any, Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class DAGStore:
+    """
+    Stores generated DAG files in the Airflow DAGs folder.
+
+    - Writes are atomic (temp file + rename), so the scheduler never parses
+      a half-written DAG.
+    - Files are de-duplicated by content hash: re-generating identical code
+      does not touch the file (no mtime change, no scheduler re-parse), and
+      executions sharing a DAG are tracked as references to one file.
+    - DAGs whose executions have all reached a terminal state are deleted
+      once the retention window has passed.
+
+    The index is kept next to the DAGs as a JSON file (ignored by Airflow)
+    so garbage collection survives backend restarts. Backend workers share
+    it: every change re-reads the index under an exclusive lock on
+    LOCK_FILE, so one worker never overwrites the references of another,
+    nor collects a DAG the other still runs on.
+    """
+
+    INDEX_FILE = ".veriflow_dags.json"
+    LOCK_FILE = ".veriflow_dags.lock"
+
+    # Hours a DAG is kept after its last execution finished
+    RETENTION_HOURS = float(os.getenv("VERIFLOW_DAG_RETENTION_HOURS", "24"))
+
+    # Minimum seconds between opportunistic garbage collections
+    GC_INTERVAL = float(os.getenv("VERIFLOW_DAG_GC_INTERVAL", "300"))
+
+    def __init__(
+        self,
+        dags_path: Path,
+        retention_hours: Optional[float] = None,
+    ):
+        """
+        Initialize DAG store.
+
+        Args:
+            dags_path: Airflow DAGs folder
+            retention_hours: Hours to keep DAGs after their executions finished
+        """
+        self.dags_path = Path(dags_path)
+        self.retention_seconds = (
+            retention_hours if retention_hours is not None else self.RETENTION_HOURS
+        ) * 3600
+        self._lock = threading.Lock()
+        self._last_gc = 0.0
+        self._index: Dict[str, Dict[str, Any]] = self._load_index()
+
+    @staticmethod
+    def content_hash(code: str) -> str:
+        """Hash DAG code, ignoring the generation timestamp in its header."""
+        lines = [line for line in code.splitlines() if not line.startswith("Generated: ")]
+        return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+    def write(
+        self,
+        dag_id: str,
+        code: str,
+        execution_id: Optional[str] = None,
+    ) -> Path:
+        """
+        Store DAG code, skipping the write when identical content exists.
+
+        Args:
+            dag_id: DAG identifier (file name without .py)
+            code: Generated Python code
+            execution_id: Execution referencing the DAG
+
+        Returns:
+            Path to the DAG file
+        """
+        dag_file = self.dags_path / f"{dag_id}.py"
+        digest = self.content_hash(code)
+
+        with self._locked():
+            entry = self._index.get(dag_id)
+            if not (entry and entry.get("hash") == digest and dag_file.exists()):
+                self._atomic_write(dag_file, code)
+                entry = self._index[dag_id] = {
+                    "hash": digest,
+                    "created_at": time.time(),
+                    "executions": (entry or {}).get("executions", {}),
+                }
+                logger.info(f"Stored DAG file: {dag_file}")
+
+            if execution_id:
+                entry["executions"][execution_id] = {"finished_at": None}
+            self._save_index()
+
+        return dag_file
+
+    def contains(self, dag_id: str) -> bool:
+        """Whether a DAG is stored and its file still exists."""
+        with self._locked():
+            return dag_id in self._index and (self.dags_path / f"{dag_id}.py").exists()
+
+    def add_reference(self, dag_id: str, execution_id: str) -> bool:
+        """
+        Record that an execution runs on an already stored DAG.
+
+        Returns:
+            False when the DAG is no longer stored (e.g. collected by another
+            worker), in which case it has to be written again
+        """
+        with self._locked():
+            entry = self._index.get(dag_id)
+            if entry is None or not (self.dags_path / f"{dag_id}.py").exists():
+                return False
+            entry["executions"][execution_id] = {"finished_at": None}
+            self._save_index()
+            return True
+
+    def mark_finished(self, execution_id: str, finished_at: Optional[float] = None):
+        """Mark an execution terminal so its DAG becomes eligible for GC."""
+        finished_at = finished_at or time.time()
+        with self._locked():
+            changed = False
+            for entry in self._index.values():
+                ref = entry["executions"].get(execution_id)
+                if ref is not None and ref.get("finished_at") is None:
+                    ref["finished_at"] = finished_at
+                    changed = True
+            if changed:
+                self._save_index()
+
+    def delete(self, dag_id: str) -> bool:
+        """Delete a DAG file and its index entry."""
+        dag_file = self.dags_path / f"{dag_id}.py"
+        with self._locked():
+            existed = self._index.pop(dag_id, None) is not None
+            if dag_file.exists():
+                dag_file.unlink()
+                existed = True
+                logger.info(f"Deleted DAG file: {dag_file}")
+            self._save_index()
+        return existed
+
+    def collect_garbage(self, now: Optional[float] = None) -> List[str]:
+        """
+        Delete DAGs whose executions all finished before the retention window.
+
+        DAGs without any recorded execution are kept, so pre-registered or
+        hand-written DAGs are never collected.
+
+        Returns:
+            List of deleted DAG IDs
+        """
+        now = now or time.time()
+        expired = []
+        with self._locked():
+            self._last_gc = now
+            for dag_id, entry in list(self._index.items()):
+                refs = entry["executions"].values()
+                if not refs or any(ref.get("finished_at") is None for ref in refs):
+                    continue
+                if now - max(ref["finished_at"] for ref in refs) >= self.retention_seconds:
+                    expired.append(dag_id)
+            for dag_id in expired:
+                self._index.pop(dag_id, None)
+                dag_file = self.dags_path / f"{dag_id}.py"
+                if dag_file.exists():
+                    dag_file.unlink()
+            if expired:
+                self._save_index()
+
+        if expired:
+            logger.info(f"Garbage collected {len(expired)} DAG file(s)")
+        return expired
+
+    def maybe_collect_garbage(self) -> List[str]:
+        """Run garbage collection if the GC interval has elapsed."""
+        if time.time() - self._last_gc < self.GC_INTERVAL:
+            return []
+        return self.collect_garbage()
+
+    def list_dags(self) -> List[Dict[str, Any]]:
+        """List stored DAGs with file size, age and execution references."""
+        now = time.time()
+        dags = []
+        with self._locked():
+            for dag_id, entry in sorted(self._index.items()):
+                dag_file = self.dags_path / f"{dag_id}.py"
+                if not dag_file.exists():
+                    continue
+                refs = entry["executions"]
+                dags.append({
+                    "dag_id": dag_id,
+                    "path": str(dag_file),
+                    "size_bytes": dag_file.stat().st_size,
+                    "age_seconds": now - entry["created_at"],
+                    "content_hash": entry["hash"],
+                    "executions": len(refs),
+                    "active_executions": sum(
+                        1 for ref in refs.values() if ref.get("finished_at") is None
+                    ),
+                })
+        return dags
+
+    def _atomic_write(self, path: Path, content: str):
+        """Write to a hidden temp file in the same folder, then rename over the target."""
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the store lock across threads and workers, with a fresh index."""
+        with self._lock:
+            lock_file = None
+            if fcntl is not None:
+                try:
+                    lock_file = open(self.dags_path / self.LOCK_FILE, "a")
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                except OSError as e:
+                    logger.warning(f"Could not lock DAG index: {e}")
+            try:
+                self._index = self._load_index()
+                yield
+            finally:
+                if lock_file is not None:
+                    lock_file.close()
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        index_file = self.dags_path / self.INDEX_FILE
+        if not index_file.exists():
+            return {}
+        try:
+            return json.loads(index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read DAG index, starting empty: {e}")
+            return {}
+
+    def _save_index(self):
+        try:
+            self._atomic_write(self.dags_path / self.INDEX_FILE, json.dumps(self._index))
+        except OSError as e:
+            logger.warning(f"Could not write DAG index: {e}")
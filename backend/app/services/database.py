@@ -11,7 +11,40 @@ import asyncpg
 from contextlib import asynccontextmanager
 
 from app.models.session import AgentSession, Message, ScholarState, EngineerState, ReviewerState
-from app.models.execution import ExecutionStatus, LogEntry
+from app.models.execution import ExecutionStatus
+
+# Key of the advisory lock serializing schema migrations between workers
+MIGRATION_LOCK_ID = 7_241_001
+
+# Idempotent schema changes for databases created by an older init.sql
+# (the init script only runs on an empty volume), applied on connect
+SCHEMA_MIGRATIONS = [
+    # Execution store records (engine execution IDs are not UUIDs)
+    "ALTER TABLE executions ALTER COLUMN execution_id TYPE VARCHAR(64)",
+    "ALTER TABLE executions ADD COLUMN IF NOT EXISTS record JSONB",
+    # Append-only execution log
+    """
+    CREATE TABLE IF NOT EXISTS execution_logs (
+        execution_id VARCHAR(64) NOT NULL,
+        seq BIGINT NOT NULL,
+        ts TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        level VARCHAR(20) NOT NULL DEFAULT 'INFO',
+        node_id VARCHAR(255),
+        message TEXT NOT NULL,
+        PRIMARY KEY (execution_id, seq)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_execution_logs_node ON execution_logs(execution_id, node_id, seq)",
+    "CREATE INDEX IF NOT EXISTS idx_execution_logs_level ON execution_logs(execution_id, level) "
+    "WHERE level IN ('WARNING', 'ERROR')",
+    # waiting_for_scheduler status
+    "ALTER TABLE executions DROP CONSTRAINT IF EXISTS executions_status_check",
+    """
+    ALTER TABLE executions ADD CONSTRAINT executions_status_check CHECK (status IN (
+        'queued', 'waiting_for_scheduler', 'running', 'success', 'partial_failure', 'failed'
+    ))
+    """,
+]
 
 
 class DatabaseService:
@@ -29,6 +62,15 @@ class DatabaseService:
         """Create database connection pool."""
         if self.pool is None:
             self.pool = await asyncpg.create_pool(self.database_url)
+            await self.migrate()
+    
+    async def migrate(self) -> None:
+        """Bring an existing database up to the current schema (see SCHEMA_MIGRATIONS)."""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", MIGRATION_LOCK_ID)
+                for statement in SCHEMA_MIGRATIONS:
+                    await conn.execute(statement)
     
     async def disconnect(self) -> None:
         """Close database connection pool."""
@@ -244,6 +286,9 @@ class DatabaseService:
         if row is None:
             return None
         
+        # Most recent log page, oldest first
+        logs = await self.get_execution_logs(execution_id, limit=100, latest=True)
+        
         return {
             "execution_id": str(row["execution_id"]),
             "workflow_id": row["workflow_id"],
@@ -252,7 +297,7 @@ class DatabaseService:
             "overall_progress": row["overall_progress"],
             "config": json.loads(row["config"]) if row["config"] else {},
             "node_statuses": json.loads(row["node_statuses"]) if row["node_statuses"] else {},
-            "logs": json.loads(row["logs"]) if row["logs"] else [],
+            "logs": logs,
             "created_at": row["created_at"].isoformat(),
             "updated_at": row["updated_at"].isoformat(),
             "completed_at": row["completed_at"].isoformat() if row["completed_at"] else None,
@@ -284,20 +329,134 @@ class DatabaseService:
                 datetime.utcnow(),
             )
     
-    async def add_execution_log(self, execution_id: str, log_entry: LogEntry) -> None:
-        """Add a log entry to execution."""
+    async def save_execution_records(self, records: List[dict]) -> None:
+        """Upsert compact execution records (execution store write-behind)."""
+        rows = [
+            (
+                record["execution_id"],
+                record.get("workflow_id") or "",
+                record.get("dag_id"),
+                record.get("status") or ExecutionStatus.QUEUED.value,
+                record.get("overall_progress", 0),
+                json.dumps(record.get("config") or {}),
+                json.dumps(record.get("node_statuses") or {}),
+                json.dumps(record),
+                datetime.fromisoformat(record["completed_at"]) if record.get("completed_at") else None,
+            )
+            for record in records
+        ]
         async with self.get_connection() as conn:
-            # Append to logs JSON array
-            await conn.execute(
+            await conn.executemany(
                 """
-                UPDATE executions 
-                SET logs = logs || $2::jsonb
-                WHERE execution_id = $1
+                INSERT INTO executions (
+                    execution_id, workflow_id, dag_id, status, overall_progress,
+                    config, node_statuses, record, completed_at
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                ON CONFLICT (execution_id) DO UPDATE SET
+                    dag_id = EXCLUDED.dag_id,
+                    status = EXCLUDED.status,
+                    overall_progress = EXCLUDED.overall_progress,
+                    node_statuses = EXCLUDED.node_statuses,
+                    record = EXCLUDED.record,
+                    completed_at = EXCLUDED.completed_at
                 """,
+                rows,
+            )
+    
+    async def get_execution_record(self, execution_id: str) -> Optional[dict]:
+        """Get the compact execution record saved by the execution store."""
+        async with self.get_connection() as conn:
+            row = await conn.fetchrow(
+                "SELECT record FROM executions WHERE execution_id = $1",
                 execution_id,
-                json.dumps([log_entry.model_dump()]),
             )
-
+        
+        if row is None or row["record"] is None:
+            return None
+        return json.loads(row["record"])
+    
+    async def add_execution_logs(self, rows: List[tuple]) -> None:
+        """
+        Append log lines with one COPY into a staging table.
+        
+        Lines already stored (same execution_id and seq, e.g. from a retried
+        batch) are skipped, so a duplicate never fails the batch.
+        
+        Args:
+            rows: (execution_id, seq, timestamp, level, node_id, message) tuples
+        """
+        records = [
+            (execution_id, seq, datetime.fromisoformat(ts), level, node_id, message)
+            for execution_id, seq, ts, level, node_id, message in rows
+        ]
+        async with self.get_connection() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "CREATE TEMP TABLE execution_logs_batch (LIKE execution_logs INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                await conn.copy_records_to_table(
+                    "execution_logs_batch",
+                    records=records,
+                    columns=["execution_id", "seq", "ts", "level", "node_id", "message"],
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO execution_logs (execution_id, seq, ts, level, node_id, message)
+                    SELECT execution_id, seq, ts, level, node_id, message FROM execution_logs_batch
+                    ON CONFLICT (execution_id, seq) DO NOTHING
+                    """
+                )
+    
+    async def get_execution_logs(
+        self,
+        execution_id: str,
+        after_seq: int = 0,
+        limit: int = 100,
+        latest: bool = False,
+    ) -> List[dict]:
+        """
+        Get a page of execution log lines ordered by sequence number.
+        
+        Args:
+            execution_id: Execution identifier
+            after_seq: Return lines after this sequence number
+            limit: Maximum number of lines
+            latest: Return the last page (most recent lines) instead
+        """
+        async with self.get_connection() as conn:
+            if latest:
+                rows = await conn.fetch(
+                    """
+                    SELECT * FROM (
+                        SELECT seq, ts, level, node_id, message FROM execution_logs
+                        WHERE execution_id = $1 ORDER BY seq DESC LIMIT $2
+                    ) recent ORDER BY seq
+                    """,
+                    execution_id,
+                    limit,
+                )
+            else:
+                rows = await conn.fetch(
+                    """
+                    SELECT seq, ts, level, node_id, message FROM execution_logs
+                    WHERE execution_id = $1 AND seq > $2
+                    ORDER BY seq LIMIT $3
+                    """,
+                    execution_id,
+                    after_seq,
+                    limit,
+                )
+        
+        return [
+            {
+                "seq": row["seq"],
+                "timestamp": row["ts"].isoformat(),
+                "level": row["level"],
+                "node_id": row["node_id"],
+                "message": row["message"],
+            }
+            for row in rows
+        ]
 
 # Global service instance
 db_service = DatabaseService()
@@ -7,8 +7,9 @@ import os
 import json
 import sqlite3
 import logging
+from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +55,64 @@ class SQLiteDB:
                 cursor.execute("ALTER TABLE agent_sessions ADD COLUMN user_context TEXT")
                 logger.info("Migrated DB: Added user_context column")
 
+            # Durable tier of the execution store (compact status records)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS executions (
+                    execution_id TEXT PRIMARY KEY,
+                    workflow_id TEXT,
+                    dag_id TEXT,
+                    status TEXT,
+                    overall_progress INTEGER DEFAULT 0,
+                    record TEXT,
+                    created_at TEXT,
+                    updated_at TEXT,
+                    completed_at TEXT
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_executions_status ON executions(status)")
+
+            # Append-only execution log lines
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS execution_logs (
+                    execution_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    ts TEXT,
+                    level TEXT,
+                    node_id TEXT,
+                    message TEXT,
+                    PRIMARY KEY (execution_id, seq)
+                )
+            ''')
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_execution_logs_node ON execution_logs(execution_id, node_id, seq)"
+            )
+
+            # Call cache: successful step runs by content-addressed key
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS call_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    workflow_id TEXT,
+                    step_id TEXT,
+                    execution_id TEXT NOT NULL,
+                    task_id TEXT NOT NULL,
+                    created_at TEXT
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_call_cache_step ON call_cache(workflow_id, step_id)")
+
+            # Step duration history: moving average per tool, image and input size class
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS step_durations (
+                    tool_key TEXT NOT NULL,
+                    image TEXT NOT NULL,
+                    size_class INTEGER NOT NULL,
+                    samples INTEGER NOT NULL,
+                    mean_seconds REAL NOT NULL,
+                    updated_at TEXT,
+                    PRIMARY KEY (tool_key, image, size_class)
+                )
+            ''')
+
             conn.commit()
 
     def create_or_update_agent_session(self, run_id: str, **kwargs: Any):
@@ -104,6 +163,188 @@ class SQLiteDB:
                 return data
             return None
             
+    def save_executions(self, records: List[Dict[str, Any]]):
+        """
+        Upsert compact execution records in one transaction.
+        """
+        rows = [
+            (
+                record["execution_id"],
+                record.get("workflow_id"),
+                record.get("dag_id"),
+                record.get("status"),
+                record.get("overall_progress", 0),
+                json.dumps(record),
+                record.get("created_at"),
+                record.get("updated_at") or datetime.utcnow().isoformat(),
+                record.get("completed_at"),
+            )
+            for record in records
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                '''
+                INSERT INTO executions (
+                    execution_id, workflow_id, dag_id, status, overall_progress,
+                    record, created_at, updated_at, completed_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(execution_id) DO UPDATE SET
+                    workflow_id = excluded.workflow_id,
+                    dag_id = excluded.dag_id,
+                    status = excluded.status,
+                    overall_progress = excluded.overall_progress,
+                    record = excluded.record,
+                    updated_at = excluded.updated_at,
+                    completed_at = excluded.completed_at
+                ''',
+                rows,
+            )
+            conn.commit()
+
+    def get_execution(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT record FROM executions WHERE execution_id = ?", (execution_id,))
+            row = cursor.fetchone()
+            if row and row["record"]:
+                try:
+                    return json.loads(row["record"])
+                except json.JSONDecodeError:
+                    return None
+            return None
+
+    def add_execution_logs(self, rows: List[tuple]):
+        """
+        Append log lines (execution_id, seq, timestamp, level, node_id, message) in one transaction.
+        """
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO execution_logs (execution_id, seq, ts, level, node_id, message) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+
+    def get_execution_logs(
+        self, execution_id: str, after_seq: int = 0, limit: int = 100, latest: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Page of log lines ordered by seq; latest returns the most recent page.
+        """
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            if latest:
+                cursor.execute(
+                    "SELECT * FROM (SELECT seq, ts, level, node_id, message FROM execution_logs "
+                    "WHERE execution_id = ? ORDER BY seq DESC LIMIT ?) ORDER BY seq",
+                    (execution_id, limit),
+                )
+            else:
+                cursor.execute(
+                    "SELECT seq, ts, level, node_id, message FROM execution_logs "
+                    "WHERE execution_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (execution_id, after_seq, limit),
+                )
+            return [
+                {
+                    "seq": row["seq"],
+                    "timestamp": row["ts"],
+                    "level": row["level"],
+                    "node_id": row["node_id"],
+                    "message": row["message"],
+                }
+                for row in cursor.fetchall()
+            ]
+
+    def get_call_cache_entries(self, cache_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Call cache entries by key (missing keys are left out).
+        """
+        if not cache_keys:
+            return {}
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            placeholders = ", ".join(["?"] * len(cache_keys))
+            cursor.execute(f"SELECT * FROM call_cache WHERE cache_key IN ({placeholders})", tuple(cache_keys))
+            return {row["cache_key"]: dict(row) for row in cursor.fetchall()}
+
+    def put_call_cache_entries(self, rows: List[tuple]):
+        """
+        Upsert call cache entries (cache_key, workflow_id, step_id, execution_id, task_id) in one transaction.
+        """
+        now = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO call_cache (cache_key, workflow_id, step_id, execution_id, task_id, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [tuple(row) + (now,) for row in rows],
+            )
+            conn.commit()
+
+    def delete_call_cache_entries(
+        self,
+        workflow_id: Optional[str] = None,
+        step_id: Optional[str] = None,
+        cache_keys: Optional[List[str]] = None,
+    ) -> int:
+        """
+        Delete call cache entries matching all given filters (no filter: all entries).
+        """
+        clauses, values = [], []
+        if workflow_id is not None:
+            clauses.append("workflow_id = ?")
+            values.append(workflow_id)
+        if step_id is not None:
+            clauses.append("step_id = ?")
+            values.append(step_id)
+        if cache_keys is not None:
+            clauses.append(f"cache_key IN ({', '.join(['?'] * len(cache_keys)) or 'NULL'})")
+            values.extend(cache_keys)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            cursor = conn.execute(f"DELETE FROM call_cache{where}", tuple(values))
+            conn.commit()
+            return cursor.rowcount
+
+    def get_step_durations(self, tools: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        Duration history rows of (tool_key, image) pairs, for all size classes.
+        """
+        if not tools:
+            return []
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            clauses = " OR ".join(["(tool_key = ? AND image = ?)"] * len(tools))
+            cursor.execute(
+                f"SELECT * FROM step_durations WHERE {clauses}",
+                tuple(value for pair in tools for value in pair),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def add_step_durations(self, rows: List[tuple], alpha: float):
+        """
+        Fold (tool_key, image, size_class, seconds) samples into the duration history.
+
+        The mean is cumulative for the first 1 / alpha samples and an
+        exponential moving average (weight alpha) after that, in one transaction.
+        """
+        now = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            for tool_key, image, size_class, seconds in rows:
+                row = conn.execute(
+                    "SELECT samples, mean_seconds FROM step_durations "
+                    "WHERE tool_key = ? AND image = ? AND size_class = ?",
+                    (tool_key, image, size_class),
+                ).fetchone()
+                samples, mean = (row["samples"], row["mean_seconds"]) if row else (0, 0.0)
+                weight = max(1.0 / (samples + 1), alpha)
+                conn.execute(
+                    "INSERT OR REPLACE INTO step_durations "
+                    "(tool_key, image, size_class, samples, mean_seconds, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (tool_key, image, size_class, samples + 1, mean + weight * (seconds - mean), now),
+                )
+            conn.commit()
+
     def get_full_state_mock(self, run_id: str) -> Optional[Dict[str, Any]]:
         """
         Reconstruct state from DB session + files.
@@ -14,6 +14,7 @@ from app.models.cwl import (
     CWLCommandLineTool,
     DockerRequirement,
 )
+from app.models.plan import ExecutionPlan
 from app.services.minio_client import minio_service
 
 logger = logging.getLogger(__name__)
@@ -111,8 +112,10 @@ class DockerBuilder:
             if docker_req.docker_image_id:
                 return docker_req.docker_image_id
         
-        # Infer from base command
-        base_cmd = tool.base_command
+        return self._infer_base_image(tool.base_command)
+    
+    def _infer_base_image(self, base_cmd: Optional[Any]) -> str:
+        """Infer a base image from a tool's base command."""
         if isinstance(base_cmd, list):
             base_cmd = base_cmd[0] if base_cmd else ""
         base_cmd = str(base_cmd).lower()
@@ -229,6 +232,59 @@ class DockerBuilder:
             logger.error(f"Failed to store Dockerfile: {e}")
             raise
     
+    def prepare_images(
+        self,
+        plan: ExecutionPlan,
+        use_placeholder: bool = True,
+        dockerfiles: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, str]:
+        """
+        Generate Dockerfiles and image names for every tool step of a plan.
+        
+        Reads the images and Dockerfiles already resolved in the plan, and
+        generates each distinct Dockerfile once even when steps share a tool.
+        
+        Args:
+            plan: Compiled execution plan
+            use_placeholder: If True, return placeholder images for MVP
+            dockerfiles: Previously generated Dockerfiles per step_id to reuse
+            
+        Returns:
+            Dict of step_id -> Docker image name
+        """
+        tools = plan.workflow.tools if plan.workflow else {}
+        dockerfiles = dockerfiles or {}
+        images: Dict[str, str] = {}
+        generated: Dict[Any, str] = {}
+        
+        for step_id, step in plan.steps.items():
+            tool = tools.get(step_id)
+            if tool is None:
+                continue
+            
+            key = (id(tool), step.image, step.dockerfile)
+            if step_id in dockerfiles:
+                generated[key] = dockerfiles[step_id]
+            elif key not in generated:
+                if step.dockerfile:
+                    generated[key] = step.dockerfile
+                else:
+                    generated[key] = self._build_dockerfile(
+                        base_image=step.image or self._infer_base_image(step.base_command),
+                        tool=tool,
+                        tool_id=step_id,
+                        requirements_txt=None,
+                    )
+            self.generated_dockerfiles[step_id] = generated[key]
+            
+            if use_placeholder:
+                images[step_id] = self.PLACEHOLDER_IMAGE
+            else:
+                clean_id = "".join(c if c.isalnum() else "_" for c in step_id).lower()
+                images[step_id] = step.image or f"veriflow/{clean_id}:latest"
+        
+        return images
+    
     def get_image_name(
         self,
         tool: CWLCommandLineTool,
@@ -6,10 +6,11 @@ Per SPEC.md Section 7
 """
 
 import os
+import time
 import asyncio
 import logging
-from typing import Optional, Dict, List, Any, Callable
-from datetime import datetime
+from typing import Optional, Dict, List, Any, Callable, Tuple
+from datetime import datetime, timedelta
 from pathlib import Path
 import uuid
 import json
@@ -28,10 +29,47 @@ from app.services.cwl_parser import cwl_parser, CWLParser
 from app.services.dag_generator import dag_generator, DAGGenerator
 from app.services.airflow_client import airflow_client, AirflowClient
 from app.services.docker_builder import docker_builder, DockerBuilder
+from app.services.plan_compiler import plan_compiler, PlanCompiler, StepRequirements
+from app.services.compile_cache import compile_cache, CompileCache
+from app.services.dag_runtime import parse_step_markers, stop_containers, CACHE_HIT_ENV
+from app.services.run_monitor import RunMonitor
+from app.services.log_tailer import TaskLogTailer
+from app.services.execution_store import execution_store, ExecutionStore, MAX_RECORD_LOGS, is_terminal
+from app.services.execution_log_writer import execution_log_writer, ExecutionLogWriter
+from app.services.local_executor import local_executor, LocalExecutor
+from app.services.call_cache import call_cache, CallCache
+from app.services.result_collector import result_collector, ResultCollector
+from app.services.execution_scheduler import execution_scheduler, ExecutionScheduler, QueueFullError
+from app.services.shared_state import shared_state, SharedState
+from app.services.step_history import (
+    step_history,
+    StepHistory,
+    input_size,
+    estimate_progress,
+    task_run_times,
+)
 from app.services.minio_client import minio_service
 
 logger = logging.getLogger(__name__)
 
+# Final task states whose remaining log lines are read once
+LOGGED_STATES = ("success", "failed", "up_for_retry")
+
+# Run workflow steps on this host when Airflow is unavailable (otherwise simulate)
+LOCAL_EXECUTION = os.getenv("VERIFLOW_LOCAL_EXECUTION", "true").lower() in ("1", "true", "yes")
+
+# Docker daemon running step containers (default: environment, e.g. DOCKER_HOST)
+STEP_DOCKER_URL = os.getenv("VERIFLOW_STEP_DOCKER_URL")
+
+# Seconds a cancelled local run gets to stop its steps
+CANCEL_TIMEOUT = float(os.getenv("VERIFLOW_CANCEL_TIMEOUT", "15"))
+
+# Shared state channel of cancel requests, handled by the worker owning the execution
+CANCEL_CHANNEL = "execution_cancel"
+
+# Shared state channel of pushed task events, handled by the worker monitoring the run
+TASK_EVENT_CHANNEL = "task_events"
+
 
 class ExecutionEngine:
     """
@@ -52,15 +90,66 @@ class ExecutionEngine:
         dag_generator: DAGGenerator = None,
         airflow_client: AirflowClient = None,
         docker_builder: DockerBuilder = None,
+        plan_compiler: PlanCompiler = None,
+        compile_cache: CompileCache = None,
+        execution_store: ExecutionStore = None,
+        log_writer: ExecutionLogWriter = None,
+        local_executor: LocalExecutor = None,
+        call_cache: CallCache = None,
+        result_collector: ResultCollector = None,
+        scheduler: ExecutionScheduler = None,
+        shared_state: SharedState = None,
+        step_history: StepHistory = None,
     ):
         """Initialize execution engine with service dependencies."""
         self.cwl_parser = cwl_parser or cwl_parser
         self.dag_generator = dag_generator or dag_generator
         self.airflow_client = airflow_client or airflow_client
         self.docker_builder = docker_builder or docker_builder
+        self.plan_compiler = plan_compiler or plan_compiler
+        self.compile_cache = compile_cache or CompileCache()
+        
+        # Execution records (bounded in memory, persisted write-behind)
+        self.active_executions = execution_store if execution_store is not None else ExecutionStore()
+        
+        # Full execution logs (append-only, batched); records keep recent lines
+        self.log_writer = log_writer if log_writer is not None else ExecutionLogWriter()
+        
+        # Whether the worker pool has been created in Airflow
+        self._pool_ready = False
+        
+        # One polling loop for the DAG runs of all executions
+        self.run_monitor = RunMonitor(self.airflow_client)
+        
+        # Incremental reads of running task logs
+        self.log_tailer = TaskLogTailer(self.airflow_client)
+        
+        # Runs plans on this host when Airflow is unavailable (None: simulate)
+        self.local_executor = local_executor
+        # Local and simulated runs in progress, by execution
+        self._local_runs: Dict[str, asyncio.Task] = {}
         
-        # Active executions for status tracking
-        self.active_executions: Dict[str, Dict[str, Any]] = {}
+        # Reuses outputs of steps run earlier with identical inputs (None: off)
+        self.call_cache = call_cache
+        
+        # Indexes output files of finished executions (None: not collected)
+        self.result_collector = result_collector
+        
+        # Admission control: executions wait here for a run slot
+        self.scheduler = scheduler if scheduler is not None else ExecutionScheduler()
+        self.scheduler.on_queue_change = self._queue_changed
+        self.scheduler.on_preempted = self._preempted
+        self._queued_callbacks: Dict[str, Optional[Callable]] = {}
+        
+        # Expected step durations from earlier runs (None: plan defaults,
+        # progress by completed tasks)
+        self.step_history = step_history
+        
+        # Cross-worker messages (None: single worker)
+        self.shared_state = shared_state
+        if shared_state is not None:
+            shared_state.subscribe(CANCEL_CHANNEL, self._cancel_requested)
+            shared_state.subscribe(TASK_EVENT_CHANNEL, self._task_event_received)
     
     async def prepare_execution(
         self,
@@ -83,9 +172,23 @@ class ExecutionEngine:
         config = config or {}
         
         try:
-            # Parse CWL workflow
-            logger.info(f"Parsing CWL workflow for execution {execution_id}")
-            parse_result = self.cwl_parser.parse_workflow(cwl_content)
+            # Reuse the cached parse when the CWL is unchanged since the last run
+            parse_result = self.compile_cache.get_parse(workflow_id, cwl_content)
+            if parse_result is not None and not await asyncio.to_thread(
+                self.cwl_parser.tool_resolver.is_current, parse_result.tool_versions
+            ):
+                # A referenced tool .cwl changed in MinIO or on disk
+                logger.info(f"Tool documents of workflow {workflow_id} changed, parsing again")
+                parse_result = None
+            if parse_result is not None:
+                logger.info(f"Reusing cached CWL parse for execution {execution_id}")
+                fingerprints = self.compile_cache.get_fingerprints(workflow_id)
+            else:
+                # Parse CWL workflow
+                logger.info(f"Parsing CWL workflow for execution {execution_id}")
+                # Tool references are fetched from MinIO with the blocking SDK
+                parse_result = await asyncio.to_thread(self.cwl_parser.parse_workflow, cwl_content)
+                fingerprints = None
             
             if not parse_result.success:
                 return {
@@ -106,30 +209,85 @@ class ExecutionEngine:
                     "validation": parse_result.validation,
                 }
             
-            # Generate DAG
-            logger.info(f"Generating Airflow DAG for execution {execution_id}")
-            dag_path = self.dag_generator.generate_dag(
-                workflow=workflow,
-                execution_id=execution_id,
-                config=config,
+            if fingerprints is None:
+                fingerprints = self.compile_cache.store_parse(workflow_id, cwl_content, parse_result)
+            
+            # Only steps changed since the last compile are resolved again
+            cached_steps = self.compile_cache.get_steps(workflow_id, fingerprints)
+            
+            # Compile the execution plan once; all later stages read from it
+            plan = self.plan_compiler.compile(
+                workflow,
+                execution_id,
+                config,
+                workflow_id=workflow_id,
+                requirements={
+                    step_id: artifacts["requirements"]
+                    for step_id, artifacts in cached_steps.items()
+                    if "requirements" in artifacts
+                },
             )
             
-            # Generate DAG ID
-            dag_id = self.dag_generator._generate_dag_id(workflow, execution_id)
+            # Steps that already ran with identical tool and inputs link
+            # their earlier outputs instead of running again
+            call_keys, cache_hits = await self._lookup_call_cache(plan, config)
+            if cache_hits:
+                plan = plan.model_copy(update={"steps": {
+                    step_id: step.model_copy(update={"env": {**step.env, CACHE_HIT_ENV: cache_hits[step_id]}})
+                    if step_id in cache_hits else step
+                    for step_id, step in plan.steps.items()
+                }})
+                logger.info(f"Reusing outputs of {len(cache_hits)} steps for execution {execution_id}")
             
-            # Generate Dockerfiles for tools (MVP: placeholder images)
-            tool_images = {}
-            for step_id, tool in workflow.tools.items():
-                dockerfile = self.docker_builder.generate_dockerfile(
-                    tool=tool,
-                    tool_id=step_id,
+            # Re-estimate the plan with the run times of earlier executions
+            plan, input_bytes = await self._apply_step_history(plan, config, cache_hits)
+            
+            # Generate DAG
+            if self.dag_generator.DAG_MODE == "shape":
+                # Shared DAG per workflow shape; the plan travels in the run conf
+                dag_id, dag_path = self.dag_generator.generate_shape_dag(workflow, plan)
+                trigger_conf = plan.to_conf()
+                logger.info(f"Using shape DAG {dag_id} for execution {execution_id}")
+            else:
+                logger.info(f"Generating Airflow DAG for execution {execution_id}")
+                dag_path = self.dag_generator.generate_dag(
+                    workflow=workflow,
+                    execution_id=execution_id,
+                    config=config,
+                    plan=plan,
                 )
-                image_name = self.docker_builder.get_image_name(
-                    tool=tool,
-                    tool_id=step_id,
-                    use_placeholder=True,  # MVP uses placeholders
+                
+                # Generate DAG ID
+                dag_id = self.dag_generator._generate_dag_id(workflow, execution_id)
+                trigger_conf = config
+            
+            # Generate Dockerfiles for tools (MVP: placeholder images)
+            tool_images = self.docker_builder.prepare_images(
+                plan,
+                use_placeholder=True,
+                dockerfiles={
+                    step_id: artifacts["dockerfile"]
+                    for step_id, artifacts in cached_steps.items()
+                    if artifacts.get("dockerfile")
+                },
+            )
+            
+            for step_id, step in plan.steps.items():
+                if step_id in cached_steps or step_id not in fingerprints:
+                    continue
+                self.compile_cache.store_step(
+                    workflow_id,
+                    step_id,
+                    fingerprints[step_id],
+                    requirements=StepRequirements(
+                        image=step.image,
+                        dockerfile=step.dockerfile,
+                        resources=step.resources,
+                        base_command=step.base_command,
+                        label=step.label,
+                    ),
+                    dockerfile=self.docker_builder.generated_dockerfiles.get(step_id),
                 )
-                tool_images[step_id] = image_name
             
             # Store execution metadata
             self.active_executions[execution_id] = {
@@ -140,19 +298,33 @@ class ExecutionEngine:
                 "status": ExecutionStatus.QUEUED,
                 "workflow": workflow,
                 "config": config,
+                "trigger_conf": trigger_conf,
                 "tool_images": tool_images,
-                "step_order": workflow.step_order,
+                "plan": plan,
+                "step_order": list(plan.step_order),
+                "call_cache_keys": call_keys,
+                "cached_steps": cache_hits,
+                "input_bytes": input_bytes,
+                "fused_tasks": {
+                    self.dag_generator.fused_task_id(plan, group): [
+                        plan.steps[step_id].task_id for step_id in group
+                    ]
+                    for group in self.dag_generator.fusion_groups(plan)
+                },
                 "created_at": datetime.utcnow().isoformat(),
                 "logs": [],
                 "node_statuses": {},
             }
+            if self.step_history is not None:
+                self.active_executions[execution_id]["eta_seconds"] = round(plan.estimated_duration)
             
             return {
                 "success": True,
                 "execution_id": execution_id,
                 "dag_id": dag_id,
                 "dag_path": dag_path,
-                "steps": workflow.step_order,
+                "steps": list(plan.step_order),
+                "cached_steps": list(cache_hits),
                 "tool_images": tool_images,
             }
             
@@ -164,6 +336,143 @@ class ExecutionEngine:
                 "error": str(e),
             }
     
+    async def submit_execution(
+        self,
+        execution_id: str,
+        status_callback: Optional[Callable] = None,
+        user_id: Optional[str] = None,
+        priority: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Queue a prepared execution; it starts once a run slot is free.
+        
+        Args:
+            execution_id: Prepared execution ID
+            status_callback: Optional callback for status updates
+            user_id: User the execution counts against (fair share)
+            priority: Higher starts first
+            
+        Returns:
+            Submission result with the queue position (0: started)
+        """
+        exec_data = self.active_executions.get(execution_id)
+        if not exec_data:
+            return {
+                "success": False,
+                "error": f"Execution {execution_id} not found",
+            }
+        
+        exec_data["user_id"] = user_id
+        exec_data["priority"] = priority
+        self._queued_callbacks[execution_id] = self._guard_callback(status_callback)
+        try:
+            position = self.scheduler.submit(
+                execution_id,
+                lambda: self._start_queued(execution_id),
+                user_id=user_id,
+                workflow_id=exec_data.get("workflow_id"),
+                priority=priority,
+            )
+        except QueueFullError as e:
+            self._queued_callbacks.pop(execution_id, None)
+            exec_data["status"] = ExecutionStatus.FAILED
+            exec_data["error"] = str(e)
+            self._release_dag(execution_id)
+            self._finish(execution_id)
+            return {
+                "success": False,
+                "execution_id": execution_id,
+                "error": str(e),
+            }
+        
+        if position:
+            self._add_log(execution_id, LogLevel.INFO, f"Execution queued (position {position})")
+        return {
+            "success": True,
+            "execution_id": execution_id,
+            "status": ExecutionStatus.QUEUED,
+            "queue_position": position,
+        }
+    
+    async def _start_queued(self, execution_id: str) -> bool:
+        """Start an execution admitted by the scheduler; False if it failed to start."""
+        status_callback = self._queued_callbacks.pop(execution_id, None)
+        exec_data = self.active_executions.get(execution_id)
+        if not exec_data:
+            return False
+        exec_data.pop("queue_position", None)
+        
+        try:
+            result = await self.start_execution(execution_id, status_callback)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        if result.get("success"):
+            return True
+        
+        logger.error(f"Execution start failed: {result.get('error')}")
+        exec_data["status"] = ExecutionStatus.FAILED
+        exec_data["error"] = result.get("error")
+        exec_data["completed_at"] = datetime.utcnow().isoformat()
+        if status_callback:
+            await status_callback(exec_data)
+        self._finish(execution_id)
+        return False
+    
+    def _queue_changed(self, positions: Dict[str, int]):
+        """Record new queue positions and report them to status callbacks."""
+        for execution_id, position in positions.items():
+            exec_data = self.active_executions.get(execution_id)
+            if not exec_data or exec_data.get("queue_position") == position:
+                continue
+            exec_data["queue_position"] = position
+            status_callback = self._queued_callbacks.get(execution_id)
+            if status_callback:
+                asyncio.get_running_loop().create_task(status_callback(exec_data))
+    
+    def _preempted(self, execution_id: str):
+        """Fail a queued execution dropped for higher-priority work."""
+        status_callback = self._queued_callbacks.pop(execution_id, None)
+        exec_data = self.active_executions.get(execution_id)
+        if not exec_data:
+            return
+        exec_data.pop("queue_position", None)
+        exec_data["status"] = ExecutionStatus.FAILED
+        exec_data["error"] = "Pre-empted by a higher-priority execution"
+        exec_data["completed_at"] = datetime.utcnow().isoformat()
+        self._add_log(execution_id, LogLevel.WARNING, "Execution pre-empted by a higher-priority execution")
+        self._release_dag(execution_id)
+        if status_callback:
+            asyncio.get_running_loop().create_task(status_callback(exec_data))
+        self.active_executions.finish(execution_id)
+    
+    @staticmethod
+    def _guard_callback(status_callback: Optional[Callable]) -> Optional[Callable]:
+        """
+        Wrap a status callback so its errors are logged, not raised.
+        
+        A failing callback (e.g. a WebSocket broadcast) must not change the
+        state of the execution it reports on.
+        """
+        if status_callback is None:
+            return None
+        
+        async def guarded(exec_data: Dict[str, Any]):
+            try:
+                await status_callback(exec_data)
+            except Exception as e:
+                logger.error(f"Status callback failed for {exec_data.get('execution_id')}: {e}")
+        
+        return guarded
+    
+    def _finish(self, execution_id: str):
+        """Compact the record of a finished execution and free its run slot."""
+        exec_data = self.active_executions.get(execution_id)
+        if exec_data and "eta_seconds" in exec_data:
+            exec_data["eta_seconds"] = 0
+            exec_data["estimated_completion"] = exec_data.get("completed_at")
+        self.active_executions.finish(execution_id)
+        self.scheduler.release(execution_id)
+    
     async def start_execution(
         self,
         execution_id: str,
@@ -187,28 +496,42 @@ class ExecutionEngine:
         
         exec_data = self.active_executions[execution_id]
         dag_id = exec_data["dag_id"]
+        status_callback = self._guard_callback(status_callback)
         
         try:
             # Check Airflow health
             is_healthy = await self.airflow_client.health_check()
             if not is_healthy:
-                logger.warning("Airflow not healthy, proceeding with simulation mode")
-                return await self._simulate_execution(execution_id, status_callback)
-            
-            # Wait for DAG to be picked up by Airflow
-            await asyncio.sleep(2)
+                logger.warning("Airflow not healthy, running without Airflow")
+                return await self._run_without_airflow(execution_id, status_callback)
             
-            # Check if DAG exists
+            # Shape DAGs are usually registered already; only new ones need
+            # to wait for the DAG processor to pick them up
             dag = await self.airflow_client.get_dag(dag_id)
             if not dag:
-                logger.warning(f"DAG {dag_id} not found in Airflow, using simulation mode")
-                return await self._simulate_execution(execution_id, status_callback)
+                exec_data["status"] = ExecutionStatus.WAITING_FOR_SCHEDULER
+                self._add_log(execution_id, LogLevel.INFO, f"Waiting for Airflow to register DAG {dag_id}")
+                if status_callback:
+                    await status_callback(exec_data)
+                dag = await self.airflow_client.wait_for_dag(dag_id)
+            if not dag:
+                timeout = self.airflow_client.DAG_REGISTRATION_TIMEOUT
+                logger.warning(f"DAG {dag_id} not registered by Airflow within {timeout:.0f}s")
+                if exec_data.get("config", {}).get("simulate"):
+                    return await self._simulate_execution(execution_id, status_callback)
+                self._release_dag(execution_id)
+                return {
+                    "success": False,
+                    "error": f"DAG {dag_id} was not registered by the Airflow scheduler within {timeout:.0f}s",
+                }
+            
+            await self._ensure_worker_pool()
             
             # Trigger DAG run
             logger.info(f"Triggering DAG {dag_id}")
             dag_run_id = await self.airflow_client.trigger_dag(
                 dag_id=dag_id,
-                conf=exec_data["config"],
+                conf=exec_data.get("trigger_conf", exec_data["config"]),
             )
             
             if not dag_run_id:
@@ -231,9 +554,7 @@ class ExecutionEngine:
             
             # Start background monitoring if callback provided
             if status_callback:
-                asyncio.create_task(
-                    self._monitor_execution(execution_id, status_callback)
-                )
+                self._monitor_execution(execution_id, status_callback)
             
             return {
                 "success": True,
@@ -247,11 +568,140 @@ class ExecutionEngine:
             logger.error(f"Failed to start execution: {e}")
             exec_data["status"] = ExecutionStatus.FAILED
             self._add_log(execution_id, LogLevel.ERROR, str(e))
+            self._release_dag(execution_id)
             return {
                 "success": False,
                 "error": str(e),
             }
     
+    async def _run_without_airflow(
+        self,
+        execution_id: str,
+        status_callback: Optional[Callable] = None,
+    ) -> Dict[str, Any]:
+        """
+        Execute locally when a local executor is configured, else simulate
+        if the execution asked for it (config "simulate").
+        """
+        exec_data = self.active_executions[execution_id]
+        if self.local_executor is not None and exec_data.get("plan"):
+            return await self._start_local_execution(execution_id, status_callback)
+        if exec_data.get("config", {}).get("simulate"):
+            return await self._simulate_execution(execution_id, status_callback)
+        self._release_dag(execution_id)
+        return {
+            "success": False,
+            "error": "Airflow is not available and simulation was not requested",
+        }
+    
+    async def _start_local_execution(
+        self,
+        execution_id: str,
+        status_callback: Optional[Callable] = None,
+    ) -> Dict[str, Any]:
+        """Run the execution's plan with the local executor in the background."""
+        exec_data = self.active_executions[execution_id]
+        
+        exec_data["status"] = ExecutionStatus.RUNNING
+        exec_data["started_at"] = datetime.utcnow().isoformat()
+        exec_data["local"] = True
+        
+        self._add_log(
+            execution_id,
+            LogLevel.WARNING,
+            "Airflow not available, running workflow steps locally",
+        )
+        
+        self._local_runs[execution_id] = asyncio.create_task(
+            self._run_local_execution(execution_id, status_callback)
+        )
+        
+        return {
+            "success": True,
+            "execution_id": execution_id,
+            "dag_id": exec_data["dag_id"],
+            "status": ExecutionStatus.RUNNING,
+            "local": True,
+        }
+    
+    async def _run_local_execution(
+        self,
+        execution_id: str,
+        status_callback: Optional[Callable] = None,
+    ):
+        """
+        Run a plan locally, applying step updates like those of a DAG run.
+        
+        Node statuses are keyed by task ID with the mapped Airflow state, so
+        status callbacks see the same records as for monitored Airflow runs.
+        """
+        exec_data = self.active_executions.get(execution_id)
+        if not exec_data:
+            return
+        plan = exec_data["plan"]
+        states: Dict[str, str] = {}
+        started: Dict[str, float] = {}
+        durations: Dict[str, float] = {}
+        
+        async def on_update(changed: Dict[str, str], lines: Dict[str, List[str]]):
+            exec_data["task_log_lines"] = [
+                self._task_log_entry(execution_id, exec_data, plan.steps[step_id].task_id, line)
+                for step_id, new in lines.items()
+                for line in new
+            ]
+            now = time.monotonic()
+            for step_id, state in changed.items():
+                states[step_id] = state
+                if state == "running":
+                    started[step_id] = now
+                elif state == "success" and step_id in started:
+                    durations[plan.steps[step_id].task_id] = now - started[step_id]
+                exec_data["node_statuses"][plan.steps[step_id].task_id] = {
+                    "status": self.airflow_client.map_task_state(state),
+                    "airflow_state": state,
+                    "updated_at": datetime.utcnow().isoformat(),
+                }
+            self._update_progress(
+                exec_data,
+                {step_id: self.airflow_client.map_task_state(state) for step_id, state in states.items()},
+                {step_id: now - started[step_id] for step_id, state in states.items() if state == "running"},
+                lambda: self.airflow_client.calculate_progress(
+                    [{"state": states.get(step_id)} for step_id in plan.steps]
+                ),
+            )
+            if status_callback:
+                await status_callback(exec_data)
+        
+        try:
+            final = await self.local_executor.run(plan, on_update)
+            exec_data["task_log_lines"] = []
+            if all(state == "success" for state in final.values()):
+                exec_data["status"] = ExecutionStatus.SUCCESS
+                self._add_log(execution_id, LogLevel.INFO, "Execution completed")
+            else:
+                exec_data["status"] = ExecutionStatus.FAILED
+                failed = [step_id for step_id, state in final.items() if state == "failed"]
+                self._add_log(execution_id, LogLevel.ERROR, f"Execution failed (steps: {', '.join(failed)})")
+        except asyncio.CancelledError:
+            exec_data["status"] = ExecutionStatus.FAILED
+            raise
+        except Exception as e:
+            logger.error(f"Local execution error: {e}")
+            exec_data["status"] = ExecutionStatus.FAILED
+            self._add_log(execution_id, LogLevel.ERROR, f"Local execution error: {e}")
+        finally:
+            self._local_runs.pop(execution_id, None)
+        
+        exec_data["completed_at"] = datetime.utcnow().isoformat()
+        self._release_dag(execution_id)
+        await self._record_call_cache(execution_id)
+        await self._record_step_history(execution_id, durations)
+        if exec_data["status"] == ExecutionStatus.SUCCESS:
+            await self._collect_results(execution_id)
+        if status_callback:
+            await status_callback(exec_data)
+        self._finish(execution_id)
+    
     async def _simulate_execution(
         self,
         execution_id: str,
@@ -274,7 +724,7 @@ class ExecutionEngine:
         )
         
         # Start background simulation
-        asyncio.create_task(
+        self._local_runs[execution_id] = asyncio.create_task(
             self._run_simulation(execution_id, status_callback)
         )
         
@@ -296,56 +746,32 @@ class ExecutionEngine:
         if not exec_data:
             return
         
+        plan = exec_data.get("plan")
         step_order = exec_data.get("step_order", [])
+        levels = plan.levels if plan else [[step_id] for step_id in step_order]
+        completed = 0
+        done: Dict[str, str] = {}
         
-        # Simulate each step
-        for i, step_id in enumerate(step_order):
-            # Update status to running
-            exec_data["node_statuses"][step_id] = {
-                "status": "running",
-                "progress": 0,
-                "started_at": datetime.utcnow().isoformat(),
-            }
-            
-            self._add_log(
-                execution_id,
-                LogLevel.INFO,
-                f"Starting step: {step_id}",
-                node_id=step_id,
-            )
-            
-            if status_callback:
-                await status_callback(exec_data)
-            
-            # Simulate processing time
-            for progress in range(0, 101, 25):
-                await asyncio.sleep(0.5)
-                exec_data["node_statuses"][step_id]["progress"] = progress
-                if status_callback:
-                    await status_callback(exec_data)
-            
-            # Mark step complete
-            exec_data["node_statuses"][step_id] = {
-                "status": "completed",
-                "progress": 100,
-                "completed_at": datetime.utcnow().isoformat(),
-            }
-            
-            self._add_log(
-                execution_id,
-                LogLevel.INFO,
-                f"Completed step: {step_id}",
-                node_id=step_id,
-            )
+        # Steps of one dependency level run side by side, as they would in Airflow
+        for level in levels:
+            await asyncio.gather(*(
+                self._simulate_step(execution_id, step_id, status_callback)
+                for step_id in level
+            ))
             
             # Update overall progress
-            exec_data["overall_progress"] = int(((i + 1) / len(step_order)) * 100)
+            completed += len(level)
+            done.update({step_id: "completed" for step_id in level})
+            self._update_progress(
+                exec_data, done, {}, lambda: int((completed / len(step_order)) * 100)
+            )
             
             if status_callback:
                 await status_callback(exec_data)
         
         # Mark execution complete
-        exec_data["status"] = ExecutionStatus.COMPLETED
+        self._local_runs.pop(execution_id, None)
+        exec_data["status"] = ExecutionStatus.SUCCESS
         exec_data["completed_at"] = datetime.utcnow().isoformat()
         
         self._add_log(
@@ -353,89 +779,518 @@ class ExecutionEngine:
             LogLevel.INFO,
             "Workflow execution completed successfully",
         )
+        self._release_dag(execution_id)
         
         # Generate mock results
         await self._generate_mock_results(execution_id)
         
         if status_callback:
             await status_callback(exec_data)
+        self._finish(execution_id)
+    
+    async def _simulate_step(
+        self,
+        execution_id: str,
+        step_id: str,
+        status_callback: Optional[Callable] = None,
+    ):
+        """Simulate a single step of a simulated execution."""
+        exec_data = self.active_executions[execution_id]
+        
+        # Update status to running
+        exec_data["node_statuses"][step_id] = {
+            "status": "running",
+            "progress": 0,
+            "started_at": datetime.utcnow().isoformat(),
+        }
+        
+        self._add_log(
+            execution_id,
+            LogLevel.INFO,
+            f"Starting step: {step_id}",
+            node_id=step_id,
+        )
+        
+        if status_callback:
+            await status_callback(exec_data)
+        
+        # Simulate processing time
+        for progress in range(0, 101, 25):
+            await asyncio.sleep(0.5)
+            exec_data["node_statuses"][step_id]["progress"] = progress
+            if status_callback:
+                await status_callback(exec_data)
+        
+        # Mark step complete
+        exec_data["node_statuses"][step_id] = {
+            "status": "completed",
+            "progress": 100,
+            "completed_at": datetime.utcnow().isoformat(),
+        }
+        
+        self._add_log(
+            execution_id,
+            LogLevel.INFO,
+            f"Completed step: {step_id}",
+            node_id=step_id,
+        )
     
-    async def _monitor_execution(
+    def _monitor_execution(
         self,
         execution_id: str,
         status_callback: Callable,
     ):
-        """Monitor execution status via Airflow API."""
+        """Monitor execution status via the shared Airflow run monitor."""
         exec_data = self.active_executions.get(execution_id)
-        if not exec_data:
+        if not exec_data or not exec_data.get("dag_run_id"):
             return
         
-        dag_id = exec_data["dag_id"]
-        dag_run_id = exec_data.get("dag_run_id")
+        async def handle(dag_run, task_instances, changed):
+            return await self._handle_run_update(
+                execution_id, status_callback, dag_run, task_instances, changed
+            )
         
-        if not dag_run_id:
-            return
+        self.run_monitor.watch(
+            exec_data["dag_id"],
+            exec_data["dag_run_id"],
+            handle,
+            # Running tasks write logs (and fused steps progress) without
+            # task state changes
+            refresh_running=True,
+            expected_durations=self._expected_task_durations(exec_data),
+        )
+    
+    def _expected_task_durations(self, exec_data: Dict[str, Any]) -> Dict[str, float]:
+        """Expected seconds per Airflow task, from the plan's step estimates."""
+        plan = exec_data.get("plan")
+        if plan is None:
+            return {}
+        durations = {step.task_id: step.estimated_duration for step in plan.steps.values()}
+        for task_id, members in exec_data.get("fused_tasks", {}).items():
+            durations[task_id] = sum(durations.get(member, 0.0) for member in members)
+        return durations
+    
+    def notify_task_event(self, dag_run_id: str) -> bool:
+        """
+        Refresh an execution right away after Airflow pushed a state change.
+        
+        Args:
+            dag_run_id: DAG run the event belongs to
+            
+        Returns:
+            True if the run belongs to a monitored execution
+        """
+        return self.run_monitor.notify(dag_run_id)
+    
+    async def handle_task_event(self, dag_run_id: str) -> bool:
+        """
+        Refresh an execution after a pushed state change, whichever API
+        worker monitors its run.
+        
+        Events for runs not monitored by this worker are forwarded to the
+        other workers on the shared state.
+        
+        Returns:
+            True if the event was handled here or forwarded
+        """
+        if self.notify_task_event(dag_run_id):
+            return True
+        if self.shared_state is None or not self.shared_state.backend.shared:
+            return False
+        await self.shared_state.publish(TASK_EVENT_CHANNEL, {"dag_run_id": dag_run_id})
+        return True
+    
+    async def _task_event_received(self, message: Dict[str, Any]):
+        self.notify_task_event(message["dag_run_id"])
+    
+    async def _handle_run_update(
+        self,
+        execution_id: str,
+        status_callback: Callable,
+        dag_run: Dict[str, Any],
+        task_instances: List[Dict[str, Any]],
+        changed: List[Dict[str, Any]],
+    ) -> bool:
+        """
+        Apply a change of a monitored DAG run to its execution.
+        
+        Args:
+            execution_id: Execution identifier
+            status_callback: Callback receiving the updated execution
+            dag_run: Current DAG run details
+            task_instances: All task instances of the run
+            changed: Task instances whose state changed since the last update
+            
+        Returns:
+            True when the execution reached a terminal state
+        """
+        exec_data = self.active_executions.get(execution_id)
+        if not exec_data:
+            return True
         
         try:
-            while True:
-                # Get DAG run status
-                dag_run = await self.airflow_client.get_dag_run(dag_id, dag_run_id)
-                if not dag_run:
-                    break
-                
-                state = dag_run.get("state", "")
-                
-                # Get task instances
-                task_instances = await self.airflow_client.get_task_instances(
-                    dag_id, dag_run_id
-                )
-                
-                # Update node statuses
-                for task in task_instances:
-                    task_id = task.get("task_id")
-                    task_state = task.get("state", "")
-                    
-                    exec_data["node_statuses"][task_id] = {
-                        "status": self.airflow_client.map_task_state(task_state),
-                        "airflow_state": task_state,
-                        "updated_at": datetime.utcnow().isoformat(),
-                    }
-                
-                # Calculate overall progress
-                exec_data["overall_progress"] = self.airflow_client.calculate_progress(
-                    task_instances
-                )
+            state = dag_run.get("state", "")
+            
+            # Tail the logs of running tasks (and the last lines of tasks
+            # that just finished) into the execution's log stream
+            changed_ids = {task.get("task_id") for task in changed}
+            new_lines: Dict[str, List[str]] = {}
+            exec_data["task_log_lines"] = []
+            for task in task_instances:
+                task_id = task.get("task_id")
+                task_state = task.get("state", "")
+                if task_state == "running" or (task_id in changed_ids and task_state in LOGGED_STATES):
+                    lines = await self.log_tailer.tail(exec_data["dag_id"], exec_data["dag_run_id"], task)
+                    new_lines.setdefault(task_id, []).extend(lines)
+                    exec_data["task_log_lines"].extend(
+                        self._task_log_entry(execution_id, exec_data, task_id, line) for line in lines
+                    )
+            
+            # Update node statuses
+            fused_tasks = exec_data.get("fused_tasks", {})
+            for task in task_instances:
+                task_id = task.get("task_id")
+                task_state = task.get("state", "")
                 
-                # Check terminal states
-                if state == "success":
-                    exec_data["status"] = ExecutionStatus.COMPLETED
-                    self._add_log(execution_id, LogLevel.INFO, "Execution completed")
-                    await self._collect_results(execution_id)
-                    await status_callback(exec_data)
-                    break
-                elif state == "failed":
-                    exec_data["status"] = ExecutionStatus.FAILED
-                    self._add_log(execution_id, LogLevel.ERROR, "Execution failed")
-                    await status_callback(exec_data)
-                    break
+                if task_id in fused_tasks:
+                    if task_id in changed_ids or task_state == "running":
+                        self._update_fused_statuses(
+                            exec_data, task, fused_tasks[task_id], new_lines.get(task_id, [])
+                        )
+                    continue
+                if task_id not in changed_ids:
+                    continue
                 
+                exec_data["node_statuses"][task_id] = {
+                    "status": self.airflow_client.map_task_state(task_state),
+                    "airflow_state": task_state,
+                    "updated_at": datetime.utcnow().isoformat(),
+                }
+            
+            # Calculate overall progress
+            finished_tasks, running_tasks = task_run_times(task_instances, time.time())
+            self._update_progress(
+                exec_data,
+                *self._step_progress(exec_data, running_tasks),
+                lambda: self.airflow_client.calculate_progress(task_instances),
+            )
+            
+            # Check terminal states
+            if state == "success":
+                exec_data["status"] = ExecutionStatus.SUCCESS
+                exec_data["completed_at"] = datetime.utcnow().isoformat()
+                self._add_log(execution_id, LogLevel.INFO, "Execution completed")
+                self._release_dag(execution_id)
+                await self._record_call_cache(execution_id)
+                await self._record_step_history(execution_id, finished_tasks)
+                await self._collect_results(execution_id)
                 await status_callback(exec_data)
-                await asyncio.sleep(5)  # Poll interval
-                
+                self._finish(execution_id)
+                return True
+            elif state == "failed":
+                exec_data["status"] = ExecutionStatus.FAILED
+                exec_data["completed_at"] = datetime.utcnow().isoformat()
+                self._add_log(execution_id, LogLevel.ERROR, "Execution failed")
+                self._release_dag(execution_id)
+                await self._record_call_cache(execution_id)
+                await self._record_step_history(execution_id, finished_tasks)
+                await status_callback(exec_data)
+                self._finish(execution_id)
+                return True
+            
+            await status_callback(exec_data)
+            return False
+            
         except Exception as e:
             logger.error(f"Monitoring error: {e}")
             exec_data["status"] = ExecutionStatus.FAILED
             self._add_log(execution_id, LogLevel.ERROR, f"Monitoring error: {e}")
+            self._release_dag(execution_id)
+            self._finish(execution_id)
+            return True
+    
+    def _update_fused_statuses(
+        self,
+        exec_data: Dict[str, Any],
+        task: Dict[str, Any],
+        members: List[str],
+        new_lines: List[str],
+    ):
+        """
+        Update the node statuses of the steps run by one fused task.
+        
+        Per-step states come from the VERIFLOW_STEP markers in the task's
+        log, accumulated from the lines tailed so far.
+        """
+        task_state = task.get("state", "")
+        status = self.airflow_client.map_task_state(task_state)
+        markers = exec_data.setdefault("fused_markers", {}).setdefault(task.get("task_id"), {})
+        markers.update(parse_step_markers("\n".join(new_lines)))
+        
+        for member in members:
+            if status in ("pending", "completed"):
+                member_status = status
+            elif markers.get(member) == "running":
+                member_status = status  # The step in progress (or the one that failed)
+            else:
+                member_status = markers.get(member, "pending")
+            exec_data["node_statuses"][member] = {
+                "status": member_status,
+                "airflow_state": task_state,
+                "fused_task": task.get("task_id"),
+                "updated_at": datetime.utcnow().isoformat(),
+            }
+    
+    def _task_log_entry(
+        self,
+        execution_id: str,
+        exec_data: Dict[str, Any],
+        task_id: str,
+        line: str,
+    ) -> Dict[str, Any]:
+        """Log entry for a line of task output (appended to the execution log)."""
+        entry = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "level": LogLevel.INFO.value,
+            "message": line,
+            "node_id": task_id,
+        }
+        self._write_log(execution_id, exec_data, entry)
+        return entry
+    
+    def _write_log(self, execution_id: str, exec_data: Dict[str, Any], entry: Dict[str, Any]):
+        """Append a log entry to the persistent execution log."""
+        seq = exec_data["log_seq"] = exec_data.get("log_seq", 0) + 1
+        self.log_writer.append(
+            execution_id,
+            seq,
+            entry["message"],
+            level=entry["level"],
+            node_id=entry.get("node_id"),
+            timestamp=entry["timestamp"],
+        )
+    
+    def get_task_logs(self, execution_id: str, task_id: str, map_index: int = -1) -> List[str]:
+        """Get the recent output lines of a task of a running execution."""
+        exec_data = self.active_executions.get(execution_id)
+        if not exec_data or not exec_data.get("dag_run_id"):
+            return []
+        return self.log_tailer.lines(exec_data["dag_run_id"], task_id, map_index)
+    
+    async def _ensure_worker_pool(self):
+        """Create the Airflow pool generated tasks are assigned to (once)."""
+        if self._pool_ready:
+            return
+        try:
+            self._pool_ready = await self.airflow_client.ensure_pool(
+                self.dag_generator.WORKER_POOL,
+                self.dag_generator.WORKER_POOL_SLOTS,
+                "VeriFlow step tasks (one slot per worker CPU core)",
+            )
+        except Exception as e:
+            logger.warning(f"Could not create worker pool: {e}")
+    
+    def _release_dag(self, execution_id: str):
+        """Let the DAG of a finished execution be garbage collected."""
+        dag_run_id = self.active_executions.get(execution_id, {}).get("dag_run_id")
+        if dag_run_id:
+            self.log_tailer.forget(dag_run_id)
+        try:
+            self.dag_generator.release_dag(execution_id)
+        except Exception as e:
+            logger.warning(f"Could not release DAG of {execution_id}: {e}")
+    
+    async def _lookup_call_cache(
+        self,
+        plan,
+        config: Dict[str, Any],
+    ) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Compute the call cache keys of a plan and find reusable step runs.
+        
+        Only non-scatter, non-fused steps running their real tool are cached
+        (their outputs are one directory per step).
+        
+        Returns:
+            (step_id -> cache key, step_id -> "<execution_id>/<task_id>" to reuse)
+        """
+        if self.call_cache is None:
+            return {}, {}
+        fused = {step_id for group in self.dag_generator.fusion_groups(plan) for step_id in group}
+        
+        def cacheable(step) -> bool:
+            return self.dag_generator.runs_cwl(step) and not step.scatter and step.step_id not in fused
+        
+        try:
+            keys = await asyncio.to_thread(self.call_cache.step_keys, plan, cacheable)
+            if config.get("force_rerun"):
+                return keys, {}
+            return keys, await asyncio.to_thread(self.call_cache.lookup, keys)
+        except Exception as e:
+            logger.warning(f"Call cache unavailable for execution {plan.execution_id}: {e}")
+            return {}, {}
+    
+    async def _record_call_cache(self, execution_id: str):
+        """Index the steps of a finished execution that ran successfully."""
+        exec_data = self.active_executions.get(execution_id)
+        if self.call_cache is None or not exec_data or not exec_data.get("call_cache_keys"):
+            return
+        plan = exec_data["plan"]
+        cached = exec_data.get("cached_steps", {})
+        succeeded = [
+            step_id for step_id, step in plan.steps.items()
+            if step_id not in cached
+            and exec_data["node_statuses"].get(step.task_id, {}).get("airflow_state") == "success"
+        ]
+        await asyncio.to_thread(self.call_cache.record, plan, exec_data["call_cache_keys"], succeeded)
+    
+    async def _apply_step_history(
+        self,
+        plan,
+        config: Dict[str, Any],
+        cache_hits: Dict[str, str],
+    ) -> Tuple[Any, int]:
+        """
+        Re-estimate a plan with the recorded run times of its steps.
+        
+        Steps reusing cached outputs are expected to take no time.
+        
+        Returns:
+            (plan, total bytes of the execution's inputs)
+        """
+        if self.step_history is None:
+            return plan, 0
+        try:
+            input_bytes = await asyncio.to_thread(input_size, plan.execution_id, config)
+            estimates = await asyncio.to_thread(self.step_history.estimates, plan, input_bytes)
+        except Exception as e:
+            logger.warning(f"Step duration history unavailable for execution {plan.execution_id}: {e}")
+            return plan, 0
+        estimates.update({step_id: 0.0 for step_id in cache_hits})
+        if estimates:
+            plan = self.plan_compiler.apply_durations(plan, estimates)
+        return plan, input_bytes
+    
+    def _step_progress(
+        self,
+        exec_data: Dict[str, Any],
+        running_tasks: Dict[str, float],
+    ) -> Tuple[Dict[str, str], Dict[str, float]]:
+        """
+        Per-step states and running times of a DAG run, for estimate_progress.
+        
+        Steps of a fused task have no start time of their own: the running
+        one is credited with the task's running time beyond the estimates
+        of the steps it already completed.
+        """
+        plan = exec_data.get("plan")
+        if plan is None:
+            return {}, {}
+        node_statuses = exec_data.get("node_statuses", {})
+        states = {
+            step_id: node_statuses.get(step.task_id, {}).get("status")
+            for step_id, step in plan.steps.items()
+        }
+        elapsed = {
+            step_id: running_tasks[step.task_id]
+            for step_id, step in plan.steps.items()
+            if step.task_id in running_tasks
+        }
+        by_task = {step.task_id: step_id for step_id, step in plan.steps.items()}
+        for task_id, members in exec_data.get("fused_tasks", {}).items():
+            if task_id not in running_tasks:
+                continue
+            ran = running_tasks[task_id]
+            for member in members:
+                step_id = by_task.get(member)
+                if step_id is None:
+                    continue
+                if states.get(step_id) == "completed":
+                    ran -= plan.steps[step_id].estimated_duration
+                elif states.get(step_id) == "running":
+                    elapsed[step_id] = max(ran, 0.0)
+        return states, elapsed
+    
+    def _update_progress(
+        self,
+        exec_data: Dict[str, Any],
+        states: Dict[str, str],
+        elapsed: Dict[str, float],
+        fallback: Callable[[], int],
+    ):
+        """
+        Set the overall progress and ETA of an execution.
+        
+        With a duration history, progress is weighted by expected step
+        durations and the ETA follows the remaining critical path;
+        otherwise `fallback` computes the progress.
+        """
+        plan = exec_data.get("plan")
+        if self.step_history is None or plan is None:
+            exec_data["overall_progress"] = fallback()
+            return
+        progress, remaining = estimate_progress(plan, states, elapsed)
+        exec_data["overall_progress"] = progress
+        exec_data["eta_seconds"] = round(remaining)
+        exec_data["estimated_completion"] = (datetime.utcnow() + timedelta(seconds=remaining)).isoformat()
+    
+    async def _record_step_history(self, execution_id: str, task_durations: Dict[str, float]):
+        """
+        Add the run times of an execution's steps to the duration history.
+        
+        Steps that reused cached outputs or ran fused with other steps
+        (no run time of their own) are left out, as are simulations.
+        
+        Args:
+            execution_id: Execution identifier
+            task_durations: task_id -> seconds of tasks that succeeded
+        """
+        exec_data = self.active_executions.get(execution_id)
+        if self.step_history is None or not exec_data or exec_data.get("simulation") or not task_durations:
+            return
+        plan = exec_data.get("plan")
+        if plan is None:
+            return
+        cached = exec_data.get("cached_steps", {})
+        fused = {member for members in exec_data.get("fused_tasks", {}).values() for member in members}
+        durations = {
+            step_id: task_durations[step.task_id]
+            for step_id, step in plan.steps.items()
+            if step.task_id in task_durations and step_id not in cached and step.task_id not in fused
+        }
+        try:
+            await asyncio.to_thread(
+                self.step_history.record, plan, exec_data.get("input_bytes", 0), durations
+            )
+        except Exception as e:
+            logger.warning(f"Could not record step durations of {execution_id}: {e}")
     
     async def _collect_results(self, execution_id: str):
-        """Collect results from completed execution."""
+        """
+        Index the output files of a completed execution.
+        
+        Outputs are collected per step (the step's OUTPUT_PATH, published
+        to process/{execution_id}/{task_id}/), so each result is attributed
+        to the step that wrote it.
+        """
         exec_data = self.active_executions.get(execution_id)
-        if not exec_data:
+        if not exec_data or self.result_collector is None:
             return
         
-        # In production, would collect outputs from MinIO
-        # For MVP, generate mock results
-        await self._generate_mock_results(execution_id)
+        plan = exec_data.get("plan")
+        if plan:
+            prefixes = {step_id: f"{execution_id}/{step.task_id}/" for step_id, step in plan.steps.items()}
+        else:
+            prefixes = {None: f"{execution_id}/"}
+        
+        try:
+            exec_data["results"] = await self.result_collector.collect(execution_id, prefixes)
+        except Exception as e:
+            logger.warning(f"Could not collect results of {execution_id}: {e}")
+            self._add_log(execution_id, LogLevel.WARNING, f"Could not collect results: {e}")
+            return
+        
+        exec_data["provenance"] = self._generate_provenance(execution_id)
     
     async def _generate_mock_results(self, execution_id: str):
         """Generate mock results for demo purposes."""
@@ -472,30 +1327,53 @@ class ExecutionEngine:
             return {}
         
         workflow_id = exec_data.get("workflow_id", "unknown")
+        plan = exec_data.get("plan")
         
-        return {
-            "execution_id": execution_id,
-            "workflow_id": workflow_id,
-            "generated_at": datetime.utcnow().isoformat(),
-            "entities": {
-                "input": {
-                    "type": "measurements",
-                    "path": "measurements/mama-mia/primary/",
-                },
-                "output": {
+        # Steps publish their outputs under their own prefix (see _collect_results)
+        entities = {
+            "input": {
+                "type": "measurements",
+                "path": "measurements/mama-mia/primary/",
+            },
+            "output": {
+                "type": "process",
+                "path": f"process/{execution_id}/",
+                "wasDerivedFrom": "input",
+            },
+        }
+        if plan:
+            activities = []
+            for step in plan.steps.values():
+                entities[f"output/{step.step_id}"] = {
                     "type": "process",
-                    "path": f"process/{execution_id}/derivative/",
+                    "path": f"process/{execution_id}/{step.task_id}/",
+                    "wasGeneratedBy": step.step_id,
                     "wasDerivedFrom": "input",
-                },
-            },
-            "activities": [
+                }
+                activities.append({
+                    "step_id": step.step_id,
+                    "image": step.image,
+                    "depends_on": list(step.dependencies),
+                    "level": step.level,
+                    "used": ["input"],
+                    "generated": [f"output/{step.step_id}"],
+                })
+        else:
+            activities = [
                 {
                     "step_id": step_id,
                     "used": ["input"],
                     "generated": ["output"],
                 }
                 for step_id in exec_data.get("step_order", [])
-            ],
+            ]
+        
+        return {
+            "execution_id": execution_id,
+            "workflow_id": workflow_id,
+            "generated_at": datetime.utcnow().isoformat(),
+            "entities": entities,
+            "activities": activities,
         }
     
     def _add_log(
@@ -517,7 +1395,11 @@ class ExecutionEngine:
             "node_id": node_id,
         }
         
-        exec_data["logs"].append(log_entry)
+        self._write_log(execution_id, exec_data, log_entry)
+        logs = exec_data.setdefault("logs", [])
+        logs.append(log_entry)
+        if len(logs) > MAX_RECORD_LOGS:
+            del logs[:-MAX_RECORD_LOGS]
         logger.log(
             getattr(logging, level.value if isinstance(level, LogLevel) else level, "INFO"),
             f"[{execution_id}] {message}"
@@ -539,17 +1421,78 @@ class ExecutionEngine:
         return exec_data.get("logs", [])[-limit:]
     
     async def cancel_execution(self, execution_id: str) -> bool:
-        """Cancel a running execution."""
+        """
+        Cancel a queued or running execution.
+        
+        The Airflow DAG run is marked failed (Airflow then stops its
+        remaining tasks), local and simulated runs are cancelled, step
+        containers still running are removed and the run slot is freed.
+        
+        Returns:
+            False if the execution does not exist or already finished
+        """
         exec_data = self.active_executions.get(execution_id)
-        if not exec_data:
+        if not exec_data or is_terminal(exec_data) or not self.active_executions.owns(execution_id):
             return False
         
-        # Mark as cancelled
+        # Mark as cancelled first, so no status update in flight can finish it
         exec_data["status"] = ExecutionStatus.FAILED
         exec_data["cancelled_at"] = datetime.utcnow().isoformat()
+        exec_data["completed_at"] = exec_data["cancelled_at"]
+        started = bool(exec_data.get("started_at"))
+        self.scheduler.cancel(execution_id)
+        self._queued_callbacks.pop(execution_id, None)
+        exec_data.pop("queue_position", None)
+        
+        dag_run_id = exec_data.get("dag_run_id")
+        if dag_run_id:
+            self.run_monitor.unwatch(dag_run_id)
+            if not await self.airflow_client.set_dag_run_state(exec_data["dag_id"], dag_run_id, "failed"):
+                self._add_log(execution_id, LogLevel.WARNING, f"Could not stop DAG run {dag_run_id} in Airflow")
+        
+        local_run = self._local_runs.pop(execution_id, None)
+        if local_run is not None:
+            # Kills the step containers / processes of local runs
+            local_run.cancel()
+            await asyncio.wait({local_run}, timeout=CANCEL_TIMEOUT)
+        
+        if started and not exec_data.get("simulation"):
+            try:
+                stopped = await asyncio.to_thread(stop_containers, execution_id, STEP_DOCKER_URL)
+                if stopped:
+                    self._add_log(execution_id, LogLevel.INFO, f"Stopped {stopped} step containers")
+            except Exception as e:
+                logger.warning(f"Could not stop containers of {execution_id}: {e}")
+        
         self._add_log(execution_id, LogLevel.WARNING, "Execution cancelled by user")
+        self._release_dag(execution_id)
+        self._finish(execution_id)
+        
+        return True
+    
+    async def request_cancel(self, execution_id: str) -> bool:
+        """
+        Cancel an execution, whichever API worker runs it.
         
+        Executions of other workers are cancelled by their worker, on a
+        message published on the shared state.
+        
+        Returns:
+            False if the execution does not exist or already finished
+        """
+        if self.active_executions.owns(execution_id):
+            return await self.cancel_execution(execution_id)
+        if self.shared_state is None:
+            return False
+        exec_data = await self.active_executions.load(execution_id)
+        if not exec_data or is_terminal(exec_data):
+            return False
+        await self.shared_state.publish(CANCEL_CHANNEL, {"execution_id": execution_id})
         return True
+    
+    async def _cancel_requested(self, message: Dict[str, Any]):
+        if self.active_executions.owns(message["execution_id"]):
+            await self.cancel_execution(message["execution_id"])
 
 
 # Singleton instance
@@ -558,4 +1501,14 @@ execution_engine = ExecutionEngine(
     dag_generator=dag_generator,
     airflow_client=airflow_client,
     docker_builder=docker_builder,
+    plan_compiler=plan_compiler,
+    compile_cache=compile_cache,
+    execution_store=execution_store,
+    log_writer=execution_log_writer,
+    local_executor=local_executor if LOCAL_EXECUTION else None,
+    call_cache=call_cache,
+    result_collector=result_collector,
+    scheduler=execution_scheduler,
+    shared_state=shared_state,
+    step_history=step_history,
 )
@@ -0,0 +1,196 @@
+"""
+VeriFlow - Execution Log Writer
+Buffers execution log lines and appends them to the execution_logs table
+in batches.
+
+Appending a line only adds a row to an in-memory buffer; rows are written
+with one batch insert (COPY on Postgres) once LOG_BATCH_SIZE lines are
+buffered or LOG_FLUSH_INTERVAL_MS elapsed, so ingestion cost per line does
+not depend on how many lines an execution already logged.
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Tuple
+
+from app.services.execution_store import execution_store
+
+logger = logging.getLogger(__name__)
+
+LOG_BATCH_SIZE = int(os.getenv("VERIFLOW_LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_INTERVAL_MS = int(os.getenv("VERIFLOW_LOG_FLUSH_INTERVAL_MS", "500"))
+
+# Lines kept buffered while the database is unavailable; older ones are dropped
+MAX_BUFFERED_LINES = int(os.getenv("VERIFLOW_LOG_MAX_BUFFERED", "50000"))
+
+# (execution_id, seq, timestamp, level, node_id, message)
+LogRow = Tuple[str, int, str, str, Optional[str], str]
+
+
+def _row_to_entry(row: LogRow) -> Dict[str, Any]:
+    return {
+        "seq": row[1],
+        "timestamp": row[2],
+        "level": row[3],
+        "node_id": row[4],
+        "message": row[5],
+    }
+
+
+class ExecutionLogWriter:
+    """
+    Batched, append-only writer for execution log lines.
+
+    Sequence numbers are assigned by the caller (the execution record's
+    `log_seq` counter), so lines of one execution can be paged through in
+    order with `read` whether or not they were flushed yet.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval_ms: int = LOG_FLUSH_INTERVAL_MS,
+        max_buffered: int = MAX_BUFFERED_LINES,
+    ):
+        """
+        Initialize log writer.
+
+        Args:
+            backend: Durable tier with save_logs/load_logs coroutines (see
+                ExecutionStore backends); None discards lines
+            batch_size: Buffered lines that trigger a flush
+            flush_interval_ms: Maximum time a line stays buffered
+            max_buffered: Lines kept while flushes fail
+        """
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_buffered = max_buffered
+        self._buffer: List[LogRow] = []
+        self._task: Optional[asyncio.Task] = None
+        self._full: Optional[asyncio.Event] = None
+
+    def append(
+        self,
+        execution_id: str,
+        seq: int,
+        message: str,
+        level: str = "INFO",
+        node_id: Optional[str] = None,
+        timestamp: Optional[str] = None,
+    ):
+        """
+        Buffer one log line.
+
+        Args:
+            execution_id: Execution identifier
+            seq: Sequence number of the line within the execution
+            message: Log message
+            level: Log level name
+            node_id: Step or task the line belongs to
+            timestamp: ISO timestamp (default: now)
+        """
+        if self.backend is None:
+            return
+        self._buffer.append((
+            execution_id,
+            seq,
+            timestamp or datetime.utcnow().isoformat(),
+            level,
+            node_id,
+            message,
+        ))
+        if len(self._buffer) > self.max_buffered:
+            # Flushes are failing: keep the newest lines
+            del self._buffer[:len(self._buffer) - self.max_buffered]
+        self._start_flusher()
+        if len(self._buffer) >= self.batch_size and self._full is not None:
+            self._full.set()
+
+    @property
+    def buffered(self) -> int:
+        """Number of lines waiting to be written."""
+        return len(self._buffer)
+
+    def _start_flusher(self):
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (sync callers); the next append from async code starts it
+            return
+        self._full = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while self._buffer:
+            if len(self._buffer) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+            if not await self.flush():
+                # Database unavailable: retry on the next interval
+                await asyncio.sleep(self.flush_interval)
+
+    async def flush(self) -> int:
+        """
+        Write all buffered lines in one batch.
+
+        Returns:
+            Number of lines written
+        """
+        if not self._buffer or self.backend is None:
+            return 0
+        rows, self._buffer = self._buffer, []
+        try:
+            await self.backend.save_logs(rows)
+        except Exception as e:
+            logger.error(f"Could not write {len(rows)} execution log lines: {e}")
+            self._buffer = (rows + self._buffer)[-self.max_buffered:]
+            return 0
+        return len(rows)
+
+    async def read(
+        self,
+        execution_id: str,
+        after_seq: int = 0,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Page through the log of an execution by sequence number.
+
+        Args:
+            execution_id: Execution identifier
+            after_seq: Return lines after this sequence number
+            limit: Maximum number of lines
+
+        Returns:
+            Log entries (with their seq) in order, including buffered lines
+        """
+        entries: List[Dict[str, Any]] = []
+        if self.backend is not None:
+            entries = await self.backend.load_logs(execution_id, after_seq, limit)
+        last = entries[-1]["seq"] if entries else after_seq
+        buffered = sorted(
+            (row for row in self._buffer if row[0] == execution_id and row[1] > last),
+            key=lambda row: row[1],
+        )
+        entries.extend(_row_to_entry(row) for row in buffered[:limit - len(entries)])
+        return entries
+
+    async def close(self):
+        """Stop the flush task and write the remaining lines."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+# Singleton instance (same durable tier as the execution store)
+execution_log_writer = ExecutionLogWriter(backend=execution_store.backend)
@@ -0,0 +1,371 @@
+"""
+VeriFlow - Execution Scheduler
+Admission control and fair-share queueing of workflow executions.
+
+Prepared executions are submitted here instead of being started right
+away. An execution starts once the global, per-user and per-workflow caps
+on running executions allow it; queued executions are ordered by
+priority, then by how many executions their user already runs, then by
+submission order. Waiting raises the effective priority (aging), so low
+priority work is delayed but not starved.
+
+With several API workers the caps hold across all of them: run slots are
+claimed in a shared ledger (a SharedDict namespace, updated atomically)
+before an execution starts, and freed slots are announced so queued
+executions of every worker retry. Each worker orders its own queue; the
+fair-share order counts the executions users run on all workers.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import Counter
+from typing import Optional, Dict, List, Any, Callable, Awaitable
+
+from app.services.shared_state import shared_state, SharedDict
+
+logger = logging.getLogger(__name__)
+
+# Concurrently running executions (0: unlimited)
+MAX_RUNNING_EXECUTIONS = int(os.getenv("VERIFLOW_MAX_RUNNING_EXECUTIONS", "8"))
+MAX_RUNNING_PER_USER = int(os.getenv("VERIFLOW_MAX_RUNNING_PER_USER", "4"))
+MAX_RUNNING_PER_WORKFLOW = int(os.getenv("VERIFLOW_MAX_RUNNING_PER_WORKFLOW", "4"))
+
+# Queued executions; a full queue pre-empts lower-priority entries
+MAX_QUEUED_EXECUTIONS = int(os.getenv("VERIFLOW_MAX_QUEUED_EXECUTIONS", "1000"))
+
+# Seconds of waiting that raise an execution's priority by one
+QUEUE_AGING_SECONDS = float(os.getenv("VERIFLOW_QUEUE_AGING_SECONDS", "300"))
+
+# Seconds between refreshes of the shared run slots of this worker; slots
+# not refreshed for SLOT_TTL_SECONDS (their worker is gone) are freed
+SLOT_HEARTBEAT_SECONDS = float(os.getenv("VERIFLOW_SLOT_HEARTBEAT_SECONDS", "15"))
+SLOT_TTL_SECONDS = 4 * SLOT_HEARTBEAT_SECONDS
+
+# Shared state channel announcing freed run slots
+SLOT_CHANNEL = "execution_slots"
+
+ANONYMOUS_USER = "anonymous"
+
+# Starts a queued execution; returns whether it started
+StartFunction = Callable[[], Awaitable[bool]]
+
+
+class QueueFullError(Exception):
+    """Raised when the queue is full of executions of equal or higher priority."""
+    pass
+
+
+class QueuedExecution:
+    """An execution waiting for (or holding) a run slot."""
+
+    def __init__(
+        self,
+        execution_id: str,
+        start: StartFunction,
+        user_id: str,
+        workflow_id: Optional[str],
+        priority: int,
+        seq: int,
+    ):
+        self.execution_id = execution_id
+        self.start = start
+        self.user_id = user_id
+        self.workflow_id = workflow_id
+        self.priority = priority
+        self.seq = seq
+        self.submitted_at = time.monotonic()
+        # Waiting for a slot held by another worker to be freed
+        self.blocked = False
+
+
+class ExecutionScheduler:
+    """
+    Fair-share queue in front of the execution engine.
+
+    Slots are released with `release` when an execution reaches a terminal
+    state (see ExecutionEngine._finish), which starts the next admissible
+    queued executions.
+    """
+
+    def __init__(
+        self,
+        max_running: int = MAX_RUNNING_EXECUTIONS,
+        max_per_user: int = MAX_RUNNING_PER_USER,
+        max_per_workflow: int = MAX_RUNNING_PER_WORKFLOW,
+        max_queued: int = MAX_QUEUED_EXECUTIONS,
+        aging_seconds: float = QUEUE_AGING_SECONDS,
+        slots: Optional[SharedDict] = None,
+    ):
+        """
+        Initialize execution scheduler.
+
+        Args:
+            max_running: Running executions in total (0: unlimited)
+            max_per_user: Running executions per user (0: unlimited)
+            max_per_workflow: Running executions per workflow (0: unlimited)
+            max_queued: Executions waiting in the queue
+            aging_seconds: Waiting time that raises priority by one (0: no aging)
+            slots: Run slots shared by the API workers (None: this worker only)
+        """
+        self.max_running = max_running
+        self.max_per_user = max_per_user
+        self.max_per_workflow = max_per_workflow
+        self.max_queued = max_queued
+        self.aging_seconds = aging_seconds
+        self._queue: Dict[str, QueuedExecution] = {}
+        self._running: Dict[str, QueuedExecution] = {}
+        self._seq = 0
+        self.slots = slots
+        # Slots held by executions of other workers, as last read from the ledger
+        self._others: Dict[str, Dict[str, Any]] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+        if slots is not None:
+            slots.state.subscribe(SLOT_CHANNEL, self._slot_released)
+        # Called with {execution_id: position} after the queue changed
+        self.on_queue_change: Optional[Callable[[Dict[str, int]], None]] = None
+        # Called with the ID of a queued execution dropped for higher-priority work
+        self.on_preempted: Optional[Callable[[str], None]] = None
+
+    def submit(
+        self,
+        execution_id: str,
+        start: StartFunction,
+        user_id: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        priority: int = 0,
+    ) -> int:
+        """
+        Queue an execution and start it as soon as the caps allow.
+
+        Args:
+            execution_id: Execution identifier
+            start: Coroutine function starting the execution
+            user_id: User the execution counts against
+            workflow_id: Workflow the execution counts against
+            priority: Higher runs first
+
+        Returns:
+            Queue position (1-based), or 0 when the execution started
+
+        Raises:
+            QueueFullError: The queue is full of equal or higher priority work
+        """
+        if len(self._queue) >= self.max_queued:
+            victim = self._order()[-1] if self._queue else None
+            if victim is None or victim.priority >= priority:
+                raise QueueFullError(f"Execution queue is full ({self.max_queued} executions)")
+            del self._queue[victim.execution_id]
+            logger.info(f"Execution {victim.execution_id} pre-empted by {execution_id}")
+            if self.on_preempted:
+                self.on_preempted(victim.execution_id)
+
+        self._seq += 1
+        self._queue[execution_id] = QueuedExecution(
+            execution_id, start, user_id or ANONYMOUS_USER, workflow_id, priority, self._seq
+        )
+        self._dispatch()
+        return self.position(execution_id) or 0
+
+    def release(self, execution_id: str):
+        """Free the slot of a finished execution (or drop it from the queue)."""
+        was_running = self._running.pop(execution_id, None) is not None
+        if not was_running and self._queue.pop(execution_id, None) is None:
+            return
+        if was_running and self.slots is not None:
+            asyncio.get_running_loop().create_task(self._free_slot(execution_id))
+        self._dispatch()
+
+    def cancel(self, execution_id: str) -> bool:
+        """Remove a queued execution; returns whether it was queued."""
+        if self._queue.pop(execution_id, None) is None:
+            return False
+        self._dispatch()
+        return True
+
+    def position(self, execution_id: str) -> Optional[int]:
+        """Queue position (1-based) of a queued execution."""
+        for position, entry in enumerate(self._order(), start=1):
+            if entry.execution_id == execution_id:
+                return position
+        return None
+
+    def is_queued(self, execution_id: str) -> bool:
+        return execution_id in self._queue
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def _effective_priority(self, entry: QueuedExecution, now: float) -> float:
+        if self.aging_seconds <= 0:
+            return entry.priority
+        return entry.priority + (now - entry.submitted_at) / self.aging_seconds
+
+    def _holders(self) -> List[Dict[str, Any]]:
+        """Run slots held on this worker and (as last read) on the others."""
+        local = [{"user_id": entry.user_id, "workflow_id": entry.workflow_id} for entry in self._running.values()]
+        return local + list(self._others.values())
+
+    def _order(self) -> List[QueuedExecution]:
+        """Queued executions in the order they are admitted."""
+        now = time.monotonic()
+        running_per_user = Counter(holder["user_id"] for holder in self._holders())
+        return sorted(
+            self._queue.values(),
+            key=lambda entry: (
+                -self._effective_priority(entry, now),
+                running_per_user[entry.user_id],
+                entry.seq,
+            ),
+        )
+
+    def _fits(self, entry: QueuedExecution, holders: List[Dict[str, Any]]) -> bool:
+        """Whether the caps allow one more execution next to the slot `holders`."""
+        if self.max_running and len(holders) >= self.max_running:
+            return False
+        if (
+            self.max_per_user
+            and sum(1 for holder in holders if holder["user_id"] == entry.user_id) >= self.max_per_user
+        ):
+            return False
+        if (
+            self.max_per_workflow and entry.workflow_id is not None
+            and sum(1 for holder in holders if holder["workflow_id"] == entry.workflow_id) >= self.max_per_workflow
+        ):
+            return False
+        return True
+
+    def _admissible(self, entry: QueuedExecution) -> bool:
+        return not entry.blocked and self._fits(entry, self._holders())
+
+    def _dispatch(self):
+        """Start admissible queued executions, then report queue positions."""
+        started = True
+        while started:
+            started = False
+            for entry in self._order():
+                if self.max_running and len(self._running) + len(self._others) >= self.max_running:
+                    break
+                if not self._admissible(entry):
+                    continue
+                del self._queue[entry.execution_id]
+                self._running[entry.execution_id] = entry
+                asyncio.get_running_loop().create_task(self._start(entry))
+                # Fair-share order depends on running counts: re-rank
+                started = True
+                break
+
+        if self.on_queue_change:
+            self.on_queue_change({
+                entry.execution_id: position
+                for position, entry in enumerate(self._order(), start=1)
+            })
+
+    async def _start(self, entry: QueuedExecution):
+        if self.slots is not None:
+            try:
+                claimed = await self._claim(entry)
+            except Exception as e:
+                logger.warning(f"Shared run slots unavailable, starting {entry.execution_id} anyway: {e}")
+                claimed = True
+            if entry.execution_id not in self._running:
+                # Released (cancelled) while claiming
+                if claimed:
+                    await self._free_slot(entry.execution_id)
+                return
+            if not claimed:
+                # Caps reached with executions of other workers: wait for a freed slot
+                del self._running[entry.execution_id]
+                entry.blocked = True
+                self._queue[entry.execution_id] = entry
+                self._dispatch()
+                return
+        try:
+            started = await entry.start()
+        except Exception as e:
+            logger.error(f"Could not start execution {entry.execution_id}: {e}")
+            started = False
+        if not started:
+            self.release(entry.execution_id)
+
+    async def _claim(self, entry: QueuedExecution) -> bool:
+        """Take a slot in the shared ledger if the caps allow it across all workers."""
+        worker_id = self.slots.state.worker_id
+
+        def claim(slots: Dict[str, Dict[str, Any]]):
+            now = time.time()
+            changes = {key: None for key, slot in slots.items() if now - slot["heartbeat"] > SLOT_TTL_SECONDS}
+            live = {key: slot for key, slot in slots.items() if key not in changes and key != entry.execution_id}
+            admitted = self._fits(entry, list(live.values()))
+            if admitted:
+                changes[entry.execution_id] = {
+                    "user_id": entry.user_id,
+                    "workflow_id": entry.workflow_id,
+                    "worker_id": worker_id,
+                    "heartbeat": now,
+                }
+            return changes, (admitted, live)
+
+        admitted, live = await self.slots.transact(claim)
+        self._others = {key: slot for key, slot in live.items() if slot["worker_id"] != worker_id}
+        self._start_heartbeat()
+        return admitted
+
+    async def _free_slot(self, execution_id: str):
+        """Remove a slot from the shared ledger and let every worker retry its queue."""
+        try:
+            await self.slots.transact(lambda slots: ({execution_id: None} if execution_id in slots else {}, None))
+            await self.slots.state.publish(SLOT_CHANNEL, {"execution_id": execution_id})
+        except Exception as e:
+            logger.warning(f"Could not free the run slot of {execution_id}: {e}")
+
+    async def _slot_released(self, message: Dict[str, Any]):
+        self._others.pop(message["execution_id"], None)
+        self._retry_blocked()
+
+    def _retry_blocked(self):
+        for entry in self._queue.values():
+            entry.blocked = False
+        if self._queue:
+            self._dispatch()
+
+    def _start_heartbeat(self):
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.get_running_loop().create_task(self._refresh_slots())
+
+    async def _refresh_slots(self):
+        """Keep the slots of this worker alive and retry blocked executions, while there are any."""
+        worker_id = self.slots.state.worker_id
+        while self._running or self._queue:
+            await asyncio.sleep(SLOT_HEARTBEAT_SECONDS)
+            mine = set(self._running)
+
+            def refresh(slots: Dict[str, Dict[str, Any]]):
+                now = time.time()
+                changes: Dict[str, Optional[Dict[str, Any]]] = {}
+                for key, slot in slots.items():
+                    if key in mine and slot["worker_id"] == worker_id:
+                        changes[key] = dict(slot, heartbeat=now)
+                    elif now - slot["heartbeat"] > SLOT_TTL_SECONDS:
+                        changes[key] = None
+                live = {key: slot for key, slot in slots.items() if changes.get(key, slot) is not None}
+                return changes, live
+
+            try:
+                live = await self.slots.transact(refresh)
+                self._others = {key: slot for key, slot in live.items() if slot["worker_id"] != worker_id}
+            except Exception as e:
+                logger.warning(f"Could not refresh shared run slots: {e}")
+            self._retry_blocked()
+
+
+# Singleton instance (slots shared when the API runs several workers)
+execution_scheduler = ExecutionScheduler(
+    slots=shared_state.dict("execution_slots") if shared_state.backend.shared else None,
+)
@@ -0,0 +1,414 @@
+"""
+VeriFlow - Execution Store
+Canonical execution records shared by the execution engine and the API.
+
+Records live in two tiers:
+- a hot in-memory tier, LRU-bounded, holding the full record of every
+  active execution (workflow, plan, ...) and the compact status of
+  recently finished ones
+- a durable tier (SQLite locally, the Postgres `executions` table in
+  docker compose) holding the compact status of every execution
+
+Status changes are written behind: records are mutated in place and a
+background task periodically persists the ones whose compact form
+changed, in one batch. Finished records are settled once their final
+form is persisted and are not serialized again, so a flush only costs
+the active executions.
+
+With several API workers, each execution is owned by the worker that
+started it. Other workers read its compact record from the durable tier
+and re-read it while it is active, so they see changes one flush late.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Optional, Dict, List, Any, Iterator
+
+from app.models.execution import ExecutionStatus
+
+logger = logging.getLogger(__name__)
+
+# Executions kept in memory; active executions are never evicted
+MAX_HOT_EXECUTIONS = int(os.getenv("VERIFLOW_EXECUTION_CACHE_SIZE", "256"))
+
+# Seconds between write-behind flushes
+FLUSH_INTERVAL = float(os.getenv("VERIFLOW_EXECUTION_FLUSH_INTERVAL", "2"))
+
+# Recent log entries kept per execution record (the full log is in the
+# execution_logs table, see ExecutionLogWriter)
+MAX_RECORD_LOGS = int(os.getenv("VERIFLOW_EXECUTION_LOG_LIMIT", "100"))
+
+TERMINAL_STATUSES = (
+    ExecutionStatus.SUCCESS.value,
+    ExecutionStatus.PARTIAL_FAILURE.value,
+    ExecutionStatus.FAILED.value,
+    "completed",
+)
+
+# Fields of the compact record persisted to the durable tier; everything
+# else (parsed workflow, plan, trigger conf, ...) only lives in memory
+# while the execution is active
+COMPACT_FIELDS = (
+    "execution_id",
+    "workflow_id",
+    "dag_id",
+    "dag_run_id",
+    "status",
+    "overall_progress",
+    "eta_seconds",
+    "estimated_completion",
+    "queue_position",
+    "user_id",
+    "priority",
+    "config",
+    "node_statuses",
+    "logs",
+    "log_seq",
+    "error",
+    "results",
+    "provenance",
+    "step_order",
+    "simulation",
+    "created_at",
+    "started_at",
+    "updated_at",
+    "completed_at",
+    "cancelled_at",
+)
+
+
+def _status_value(status: Any) -> Optional[str]:
+    return status.value if hasattr(status, "value") else status
+
+
+def compact_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact, JSON-serializable form of an execution record."""
+    compact = {field: record[field] for field in COMPACT_FIELDS if field in record}
+    if "status" in compact:
+        compact["status"] = _status_value(compact["status"])
+    if "logs" in compact:
+        compact["logs"] = list(compact["logs"])[-MAX_RECORD_LOGS:]
+    return compact
+
+
+def is_terminal(record: Dict[str, Any]) -> bool:
+    """Whether an execution record reached a final status."""
+    return _status_value(record.get("status")) in TERMINAL_STATUSES
+
+
+class SQLiteExecutionBackend:
+    """Durable tier in the local SQLite database (see SQLiteDB)."""
+
+    def __init__(self, db=None):
+        if db is None:
+            from app.services.database_sqlite import database_service
+            db = database_service
+        self.db = db
+
+    async def save(self, records: List[Dict[str, Any]]):
+        await asyncio.to_thread(self.db.save_executions, records)
+
+    async def load(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.db.get_execution, execution_id)
+
+    async def save_logs(self, rows: List[tuple]):
+        await asyncio.to_thread(self.db.add_execution_logs, rows)
+
+    async def load_logs(
+        self, execution_id: str, after_seq: int = 0, limit: int = 100, latest: bool = False
+    ) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.db.get_execution_logs, execution_id, after_seq, limit, latest)
+
+
+class PostgresExecutionBackend:
+    """Durable tier in the Postgres `executions` table (see DatabaseService)."""
+
+    def __init__(self, db=None):
+        if db is None:
+            from app.services.database import db_service
+            db = db_service
+        self.db = db
+
+    async def save(self, records: List[Dict[str, Any]]):
+        await self.db.save_execution_records(records)
+
+    async def load(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        return await self.db.get_execution_record(execution_id)
+
+    async def save_logs(self, rows: List[tuple]):
+        await self.db.add_execution_logs(rows)
+
+    async def load_logs(
+        self, execution_id: str, after_seq: int = 0, limit: int = 100, latest: bool = False
+    ) -> List[Dict[str, Any]]:
+        return await self.db.get_execution_logs(execution_id, after_seq, limit, latest)
+
+
+class ExecutionStore(MutableMapping):
+    """
+    LRU-bounded execution records with a write-behind durable tier.
+
+    Item access (store[execution_id]) only covers the hot tier, so the
+    engine can keep reading and mutating records of active executions
+    synchronously. Finished executions evicted from memory are read back
+    from the durable tier with `load`, as are executions owned by other
+    API workers.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        max_hot: int = MAX_HOT_EXECUTIONS,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        """
+        Initialize execution store.
+
+        Args:
+            backend: Durable tier (save/load coroutines); None keeps
+                records in memory only
+            max_hot: Executions kept in memory
+            flush_interval: Seconds between write-behind flushes
+        """
+        self.backend = backend
+        self.max_hot = max_hot
+        self.flush_interval = flush_interval
+        self._hot: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Evicted records waiting for their final flush
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # Last persisted compact form per record (serialized)
+        self._flushed: Dict[str, str] = {}
+        # Records of executions owned by other workers -> time read
+        self._remote: Dict[str, float] = {}
+        # Finished records (see finish) not yet / already persisted in final form
+        self._finished: set = set()
+        self._settled: set = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def __getitem__(self, execution_id: str) -> Dict[str, Any]:
+        if execution_id in self._hot:
+            self._hot.move_to_end(execution_id)
+            return self._hot[execution_id]
+        if execution_id in self._pending:
+            return self._pending[execution_id]
+        raise KeyError(execution_id)
+
+    def __setitem__(self, execution_id: str, record: Dict[str, Any]):
+        self._pending.pop(execution_id, None)
+        self._remote.pop(execution_id, None)
+        self._unsettle(execution_id)
+        self._hot[execution_id] = record
+        self._hot.move_to_end(execution_id)
+        self._evict()
+        self._start_flusher()
+
+    def __delitem__(self, execution_id: str):
+        if execution_id in self._hot:
+            del self._hot[execution_id]
+        elif execution_id in self._pending:
+            del self._pending[execution_id]
+        else:
+            raise KeyError(execution_id)
+        self._flushed.pop(execution_id, None)
+        self._remote.pop(execution_id, None)
+        self._unsettle(execution_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._hot))
+
+    def __len__(self) -> int:
+        return len(self._hot)
+
+    def __contains__(self, execution_id: object) -> bool:
+        return execution_id in self._hot or execution_id in self._pending
+
+    async def load(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get an execution record from memory or the durable tier.
+
+        Records read from the durable tier are compact (no workflow or
+        plan) and are cached in the hot tier; active records owned by
+        another worker are re-read once older than the flush interval.
+        """
+        if execution_id in self and not self._is_stale(execution_id):
+            return self[execution_id]
+        if self.backend is None:
+            return None
+        try:
+            record = await self.backend.load(execution_id)
+        except Exception as e:
+            logger.warning(f"Could not load execution {execution_id}: {e}")
+            return self.get(execution_id)
+        if record is None:
+            return None
+        if execution_id in self and execution_id not in self._remote:
+            return self[execution_id]
+        self._flushed[execution_id] = self._serialize(record)
+        self._remote[execution_id] = time.monotonic()
+        self._unsettle(execution_id)
+        cached = self._hot.get(execution_id)
+        if cached is not None:
+            # Same dict, so callers holding the record see the update
+            cached.clear()
+            cached.update(record)
+            return cached
+        self._hot[execution_id] = record
+        self._evict()
+        return record
+
+    def owns(self, execution_id: str) -> bool:
+        """Whether this worker runs the execution (its record was not read from the durable tier)."""
+        return execution_id in self and execution_id not in self._remote
+
+    def _is_stale(self, execution_id: str) -> bool:
+        read_at = self._remote.get(execution_id)
+        if read_at is None or is_terminal(self[execution_id]):
+            return False
+        return time.monotonic() - read_at >= self.flush_interval
+
+    def finish(self, execution_id: str):
+        """
+        Reduce the record of a finished execution to its compact status.
+
+        The compact record is kept in place (same dict) so callers holding
+        it keep working; it is persisted on the next flush and may then be
+        evicted from memory. It must not change afterwards: once persisted,
+        finished records are no longer checked for changes.
+        """
+        record = self.get(execution_id)
+        if record is None:
+            return
+        compact = compact_record(record)
+        record.clear()
+        record.update(compact)
+        self._settled.discard(execution_id)
+        self._finished.add(execution_id)
+        self._start_flusher()
+
+    def _unsettle(self, execution_id: str):
+        self._finished.discard(execution_id)
+        self._settled.discard(execution_id)
+
+    def _evict(self):
+        """Drop least recently used finished records beyond max_hot."""
+        overflow = len(self._hot) - self.max_hot
+        if overflow <= 0:
+            return
+        for execution_id in list(self._hot):
+            if overflow <= 0:
+                break
+            record = self._hot[execution_id]
+            if execution_id in self._remote:
+                # Owned by another worker: the durable tier has it
+                del self._hot[execution_id]
+                del self._remote[execution_id]
+                self._flushed.pop(execution_id, None)
+                overflow -= 1
+                continue
+            if not is_terminal(record):
+                continue
+            del self._hot[execution_id]
+            overflow -= 1
+            if execution_id in self._settled:
+                self._unsettle(execution_id)
+                self._flushed.pop(execution_id, None)
+            elif self._is_dirty(execution_id, record):
+                self._pending[execution_id] = record
+            else:
+                self._flushed.pop(execution_id, None)
+
+    def _is_dirty(self, execution_id: str, record: Dict[str, Any]) -> bool:
+        if self.backend is None or "execution_id" not in record:
+            return False
+        return self._serialize(record) != self._flushed.get(execution_id)
+
+    def _serialize(self, record: Dict[str, Any]) -> str:
+        return json.dumps(compact_record(record), sort_keys=True, default=str)
+
+    def _start_flusher(self):
+        if self.backend is None or (self._task is not None and not self._task.done()):
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        except RuntimeError:
+            # No event loop (sync callers); the next write from async code starts it
+            pass
+
+    def _unsettled(self) -> bool:
+        """Whether a record may still have changes to persist."""
+        return bool(self._pending) or any(
+            execution_id not in self._settled and execution_id not in self._remote
+            for execution_id in self._hot
+        )
+
+    async def _run(self):
+        while self._unsettled():
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Persist records whose compact status changed since the last flush.
+
+        Returns:
+            Number of records written
+        """
+        if self.backend is None:
+            return 0
+
+        batch: Dict[str, str] = {}
+        records: List[Dict[str, Any]] = []
+        finished = []
+        for execution_id, record in list(self._hot.items()) + list(self._pending.items()):
+            if "execution_id" not in record or execution_id in self._remote or execution_id in self._settled:
+                continue
+            serialized = self._serialize(record)
+            if serialized != self._flushed.get(execution_id):
+                batch[execution_id] = serialized
+                records.append(json.loads(serialized))
+            if execution_id in self._finished:
+                finished.append(execution_id)
+        if records:
+            try:
+                await self.backend.save(records)
+            except Exception as e:
+                logger.error(f"Execution store flush failed ({len(records)} records): {e}")
+                return 0
+            self._flushed.update(batch)
+        for execution_id in finished:
+            self._finished.discard(execution_id)
+            self._settled.add(execution_id)
+
+        # Evicted records are dropped once persisted
+        for execution_id, record in list(self._pending.items()):
+            if execution_id in self._settled or not self._is_dirty(execution_id, record):
+                del self._pending[execution_id]
+                self._flushed.pop(execution_id, None)
+                self._unsettle(execution_id)
+        return len(records)
+
+    async def close(self):
+        """Stop the flush task and persist outstanding changes."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+def _default_backend():
+    """Durable tier selected by VERIFLOW_EXECUTION_STORE (sqlite, postgres or memory)."""
+    kind = os.getenv("VERIFLOW_EXECUTION_STORE", "sqlite").lower()
+    if kind == "postgres":
+        return PostgresExecutionBackend()
+    if kind == "sqlite":
+        return SQLiteExecutionBackend()
+    return None
+
+
+# Singleton instance
+execution_store = ExecutionStore(backend=_default_backend())
@@ -0,0 +1,395 @@
+"""
+VeriFlow - Local Executor
+Runs compiled execution plans on this host when Airflow is not available.
+Per SPEC.md Section 7
+
+Steps run as Docker containers (the same containers the generated DAGs
+start, see DAGGenerator.step_container) or, without a Docker daemon, as
+local processes. Independent steps run concurrently within a CPU and
+memory budget; critical-path steps are started first.
+"""
+
+import os
+import shlex
+import signal
+import asyncio
+import logging
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Callable, Awaitable
+
+from app.models.plan import ExecutionPlan, PlannedStep
+from app.services.dag_generator import dag_generator as shared_dag_generator, DAGGenerator
+from app.services.plan_compiler import PlanCompiler
+from app.services.dag_runtime import scatter_split, link_cached_outputs, EXECUTION_LABEL, TASK_LABEL
+
+logger = logging.getLogger(__name__)
+
+# Resources shared by all locally running steps
+LOCAL_CPUS = float(os.getenv("VERIFLOW_LOCAL_CPUS", str(os.cpu_count() or 4)))
+LOCAL_MEMORY_MB = float(os.getenv("VERIFLOW_LOCAL_MEMORY_MB", "8192"))
+
+# Seconds a step may run before it is killed
+STEP_TIMEOUT = float(os.getenv("VERIFLOW_LOCAL_STEP_TIMEOUT", "3600"))
+
+# "docker", "process", or "auto" (docker when the daemon answers)
+LOCAL_RUNTIME = os.getenv("VERIFLOW_LOCAL_RUNTIME", "auto").lower()
+
+# CWL runner script used instead of the runner image's copy in process mode
+LOCAL_CWL_STEP_SCRIPT = os.getenv(
+    "VERIFLOW_LOCAL_CWL_STEP_SCRIPT",
+    str(Path(__file__).resolve().parents[3] / "cwl" / "veriflow_step.py"),
+)
+
+# Seconds between updates that only carry new output lines
+OUTPUT_INTERVAL = 0.5
+
+# Step states reported to the update handler (Airflow task state names)
+RUNNING, SUCCESS, FAILED, UPSTREAM_FAILED = "running", "success", "failed", "upstream_failed"
+
+# (changed step states, new output lines per step) -> None
+UpdateHandler = Callable[[Dict[str, str], Dict[str, List[str]]], Awaitable[None]]
+
+
+class ResourceBudget:
+    """CPU cores and memory (MB) shared by concurrently running steps."""
+
+    def __init__(self, cpus: float, memory_mb: float):
+        self.cpus = cpus
+        self.memory_mb = memory_mb
+        self.used_cpus = 0.0
+        self.used_memory_mb = 0.0
+
+    def clamp(self, cpus: float, memory_mb: float):
+        """Limit a request to the budget, so oversized steps still run (alone)."""
+        return min(cpus, self.cpus), min(memory_mb, self.memory_mb)
+
+    def fits(self, cpus: float, memory_mb: float) -> bool:
+        return (
+            self.used_cpus + cpus <= self.cpus + 1e-9
+            and self.used_memory_mb + memory_mb <= self.memory_mb + 1e-9
+        )
+
+    def take(self, cpus: float, memory_mb: float):
+        self.used_cpus += cpus
+        self.used_memory_mb += memory_mb
+
+    def release(self, cpus: float, memory_mb: float):
+        self.used_cpus = max(0.0, self.used_cpus - cpus)
+        self.used_memory_mb = max(0.0, self.used_memory_mb - memory_mb)
+
+
+def step_resources(step: PlannedStep):
+    """Cores and memory (MB) a step reserves: its CWL minimums, at least one core."""
+    resources = step.resources
+    if not resources:
+        return 1.0, 0.0
+    cpus = float(resources.cores_min or resources.cores_max or 1)
+    memory_mb = float(resources.ram_min or resources.ram_max or 0)
+    return cpus, memory_mb
+
+
+class LocalExecutor:
+    """
+    Executes an ExecutionPlan without Airflow.
+
+    `run` schedules ready steps by priority weight whenever the budget
+    allows, streams their output to the update handler and reports state
+    changes with Airflow's task state names, so callers can treat updates
+    like those of a monitored DAG run. A failed step fails its downstream
+    steps (upstream_failed); independent branches keep running.
+    """
+
+    def __init__(
+        self,
+        dag_generator: DAGGenerator = None,
+        cpus: float = LOCAL_CPUS,
+        memory_mb: float = LOCAL_MEMORY_MB,
+        step_timeout: float = STEP_TIMEOUT,
+        runtime: str = LOCAL_RUNTIME,
+        docker_url: Optional[str] = None,
+    ):
+        """
+        Initialize local executor.
+
+        Args:
+            dag_generator: Generator whose step containers are run
+            cpus: Cores shared by running steps
+            memory_mb: Memory (MB) shared by running steps
+            step_timeout: Seconds before a step is killed
+            runtime: "docker", "process" or "auto"
+            docker_url: Docker daemon URL (default: environment)
+        """
+        self.dag_generator = dag_generator or shared_dag_generator
+        self.cpus = cpus
+        self.memory_mb = memory_mb
+        self.step_timeout = step_timeout
+        self.runtime = runtime
+        self.docker_url = docker_url
+        self._docker_available: Optional[bool] = None
+
+    async def run(self, plan: ExecutionPlan, on_update: UpdateHandler) -> Dict[str, str]:
+        """
+        Run all steps of a plan.
+
+        Args:
+            plan: Compiled execution plan
+            on_update: Called with changed step states and new output lines
+
+        Returns:
+            Final state per step_id
+        """
+        budget = ResourceBudget(self.cpus, self.memory_mb)
+        use_docker = await self._use_docker()
+        states: Dict[str, str] = {}
+        pending = sorted(plan.steps, key=lambda step_id: -plan.steps[step_id].priority_weight)
+        running: Dict[asyncio.Task, tuple] = {}
+        output: Dict[str, List[str]] = {}
+
+        async def report(changed: Dict[str, str]):
+            lines = {step_id: list(new) for step_id, new in output.items() if new}
+            output.clear()
+            if changed or lines:
+                await on_update(changed, lines)
+
+        def emit(step_id: str, line: str):
+            output.setdefault(step_id, []).append(line)
+
+        try:
+            while pending or running:
+                changed: Dict[str, str] = {}
+
+                # Fail steps below failed ones, start ready steps in priority order
+                for step_id in list(pending):
+                    step = plan.steps[step_id]
+                    dep_states = [states.get(dep) for dep in step.dependencies]
+                    if any(state in (FAILED, UPSTREAM_FAILED) for state in dep_states):
+                        pending.remove(step_id)
+                        states[step_id] = changed[step_id] = UPSTREAM_FAILED
+                        continue
+                    if not all(state == SUCCESS for state in dep_states):
+                        continue
+                    request = budget.clamp(*step_resources(step))
+                    if not budget.fits(*request):
+                        continue
+                    budget.take(*request)
+                    pending.remove(step_id)
+                    task = asyncio.create_task(self._run_step(plan, step, use_docker, emit))
+                    running[task] = (step_id, request)
+                    states[step_id] = changed[step_id] = RUNNING
+
+                await report(changed)
+                if not running:
+                    # Nothing can start (unsatisfiable dependencies)
+                    for step_id in pending:
+                        states[step_id] = UPSTREAM_FAILED
+                    await report({step_id: UPSTREAM_FAILED for step_id in pending})
+                    break
+
+                done, _ = await asyncio.wait(
+                    running, timeout=OUTPUT_INTERVAL, return_when=asyncio.FIRST_COMPLETED,
+                )
+                changed = {}
+                for task in done:
+                    step_id, request = running.pop(task)
+                    budget.release(*request)
+                    error = None if task.cancelled() else task.exception()
+                    ok = not task.cancelled() and error is None and task.result()
+                    if error is not None:
+                        emit(step_id, f"Step failed: {error}")
+                    states[step_id] = changed[step_id] = SUCCESS if ok else FAILED
+                if changed:
+                    await report(changed)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return states
+
+    async def _use_docker(self) -> bool:
+        if self.runtime == "docker":
+            return True
+        if self.runtime == "process":
+            return False
+        if self._docker_available is None:
+            self._docker_available = await asyncio.to_thread(self._ping_docker)
+            if not self._docker_available:
+                logger.warning("Docker daemon not available, running steps as local processes")
+        return self._docker_available
+
+    def _ping_docker(self) -> bool:
+        try:
+            import docker
+            client = docker.DockerClient(base_url=self.docker_url) if self.docker_url else docker.from_env()
+            try:
+                return bool(client.ping())
+            finally:
+                client.close()
+        except Exception:
+            return False
+
+    def _jobs(self, plan: ExecutionPlan, step: PlannedStep) -> List[Dict[str, str]]:
+        """Environment of each job of a step: one, or one per scatter batch."""
+        if not step.scatter:
+            return [dict(step.env)]
+        config = plan.config
+        return scatter_split(
+            step.task_id,
+            step.scatter_sources,
+            step.scatter_method or "dotproduct",
+            config.get("scatter_batch_size") or self.dag_generator.DEFAULT_SCATTER_BATCH_SIZE,
+            dict(step.env),
+            plan.execution_id,
+            config.get("scatter_glob") or "*",
+        )
+
+    async def _run_step(
+        self,
+        plan: ExecutionPlan,
+        step: PlannedStep,
+        use_docker: bool,
+        emit: Callable[[str, str], None],
+    ) -> bool:
+        """Run every job of a step; True when all of them succeed."""
+        source = link_cached_outputs(step.env)
+        if source:
+            emit(step.step_id, f"Reusing outputs of {source} (call cache hit)")
+            return True
+        if step.scatter and not self.dag_generator.scatter_runnable(step):
+            emit(step.step_id, f"Scatter step {step.step_id} has no resolved CWL tool to run per batch")
+            return False
+        # Scatter batches run the same container, with their jobs in SCATTER_ITEMS
+        container = self.dag_generator.step_container(step)
+        jobs = self._jobs(plan, step)
+        for env in jobs:
+            if container and use_docker:
+                status = await self._run_container(step, container, env, emit)
+            else:
+                status = await self._run_process(step, container, env, emit)
+            if status != 0:
+                emit(step.step_id, f"Step {step.step_id} exited with status {status}")
+                return False
+        return True
+
+    async def _run_container(
+        self,
+        step: PlannedStep,
+        container: Dict[str, Any],
+        env: Dict[str, str],
+        emit: Callable[[str, str], None],
+    ) -> int:
+        """Run a step container, streaming its output; kills it on timeout."""
+        loop = asyncio.get_running_loop()
+        started: Dict[str, Any] = {}
+
+        def run() -> int:
+            import docker
+            from docker.types import Mount
+
+            client = docker.DockerClient(base_url=self.docker_url) if self.docker_url else docker.from_env()
+            cpus = container.get("cpus")
+            handle = client.containers.run(
+                container["image"],
+                command=container.get("command"),
+                entrypoint=container.get("entrypoint"),
+                environment=env,
+                mounts=[Mount(**mount) for mount in container.get("mounts", [])],
+                nano_cpus=int(cpus * 1e9) if cpus else None,
+                mem_limit=container.get("mem_limit"),
+                shm_size=container.get("shm_size"),
+                labels={
+                    EXECUTION_LABEL: env.get("EXECUTION_ID", ""),
+                    TASK_LABEL: step.task_id,
+                    "veriflow.runner": "local",
+                },
+                detach=True,
+            )
+            started["container"] = handle
+            try:
+                partial = ""
+                for chunk in handle.logs(stream=True, follow=True):
+                    partial += chunk.decode("utf-8", errors="replace")
+                    *lines, partial = partial.split("\n")
+                    for line in lines:
+                        loop.call_soon_threadsafe(emit, step.step_id, line)
+                if partial:
+                    loop.call_soon_threadsafe(emit, step.step_id, partial)
+                return handle.wait().get("StatusCode", 1)
+            finally:
+                try:
+                    handle.remove(force=True)
+                except Exception:
+                    pass
+                client.close()
+
+        worker = asyncio.ensure_future(asyncio.to_thread(run))
+        try:
+            return await asyncio.wait_for(asyncio.shield(worker), timeout=self.step_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Stopping the container ends the log stream, so the thread returns
+            if "container" in started:
+                try:
+                    await asyncio.to_thread(started["container"].kill)
+                except Exception:
+                    pass
+            await asyncio.gather(worker, return_exceptions=True)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            emit(step.step_id, f"Step timed out after {self.step_timeout:.0f}s")
+            return -1
+
+    async def _run_process(
+        self,
+        step: PlannedStep,
+        container: Optional[Dict[str, Any]],
+        env: Dict[str, str],
+        emit: Callable[[str, str], None],
+    ) -> int:
+        """Run a step as a local process (paths under /data point to the host data directory)."""
+        if container:
+            command = container.get("command")
+            command = shlex.split(command) if isinstance(command, str) else list(command or [])
+            command = list(container.get("entrypoint") or []) + command
+            command = [
+                LOCAL_CWL_STEP_SCRIPT if part == self.dag_generator.CWL_STEP_SCRIPT else part
+                for part in command
+            ]
+        else:
+            command = ["sh", "-c", f'echo "Executing step: {step.task_id}"']
+
+        host_env = {
+            key: value.replace(PlanCompiler.CONTAINER_DATA_PATH, PlanCompiler.MINIO_DATA_PATH, 1)
+            if value.startswith(PlanCompiler.CONTAINER_DATA_PATH + "/") else value
+            for key, value in env.items()
+        }
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            env={**os.environ, **host_env},
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            # Own process group, so the whole step tree can be killed
+            start_new_session=True,
+        )
+
+        async def stream():
+            async for line in process.stdout:
+                emit(step.step_id, line.decode("utf-8", errors="replace").rstrip("\n"))
+            return await process.wait()
+
+        try:
+            return await asyncio.wait_for(stream(), timeout=self.step_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            emit(step.step_id, f"Step timed out after {self.step_timeout:.0f}s")
+            return -1
+
+
+# Singleton instance
+local_executor = LocalExecutor(dag_generator=shared_dag_generator)
@@ -6,9 +6,10 @@ Per SPEC.md Section 8.2
 
 import os
 from datetime import timedelta
-from typing import Optional, List, BinaryIO
+from typing import Optional, List, BinaryIO, Iterator
 from minio import Minio
 from minio.error import S3Error
+from urllib3.exceptions import HTTPError
 
 
 class MinIOService:
@@ -83,6 +84,20 @@ class MinIOService:
             response.close()
             response.release_conn()
     
+    def iter_object(
+        self,
+        bucket: str,
+        object_name: str,
+        chunk_size: int = 1024 * 1024,
+    ) -> Iterator[bytes]:
+        """Stream an object from MinIO in chunks, without loading it into memory."""
+        response = self.client.get_object(bucket, object_name)
+        try:
+            yield from response.stream(chunk_size)
+        finally:
+            response.close()
+            response.release_conn()
+    
     def get_presigned_download_url(
         self,
         bucket: str,
@@ -137,6 +152,19 @@ class MinIOService:
         except S3Error:
             return False
     
+    def get_object_etag(self, bucket: str, object_name: str) -> Optional[str]:
+        """
+        Get the ETag of an object, or None if it does not exist.
+        
+        Raises ConnectionError when MinIO cannot be reached.
+        """
+        try:
+            return self.client.stat_object(bucket, object_name).etag
+        except S3Error:
+            return None
+        except (HTTPError, OSError) as e:
+            raise ConnectionError(f"MinIO unreachable at {self.endpoint}: {e}") from e
+    
     def object_exists(self, bucket: str, object_name: str) -> bool:
         """Check if an object exists."""
         try:
@@ -0,0 +1,377 @@
+"""
+VeriFlow - Execution Plan Compiler
+Compiles a parsed CWL workflow into an immutable ExecutionPlan.
+Per SPEC.md Section 7
+"""
+
+import os
+import json
+import logging
+from typing import Optional, Dict, List, Any, NamedTuple
+
+from app.models.cwl import (
+    ParsedWorkflow,
+    CWLStep,
+    CWLCommandLineTool,
+    CWLWorkflow,
+    ResourceRequirement,
+)
+from app.models.plan import ExecutionPlan, PlannedStep, PlannedMount
+from app.services.cwl_parser import cwl_parser, CWLParser
+
+logger = logging.getLogger(__name__)
+
+# CWL scatterMethod values
+SCATTER_METHODS = ("dotproduct", "flat_crossproduct", "nested_crossproduct")
+
+
+class StepRequirements(NamedTuple):
+    """Requirements of a step resolved from its tool document."""
+    image: Optional[str] = None
+    dockerfile: Optional[str] = None
+    resources: Optional[ResourceRequirement] = None
+    base_command: Optional[List[str]] = None
+    label: Optional[str] = None
+
+
+def clean_task_id(step_id: str) -> str:
+    """Clean a step ID for use as an Airflow task ID (alphanumeric and underscore only)."""
+    return "".join(c if c.isalnum() else "_" for c in step_id)
+
+
+def _document_fields(model) -> Dict[str, Any]:
+    """Dump a CWL model to its document form (CWL field names, no empty fields)."""
+    data = model.model_dump(by_alias=True, exclude_none=True)
+    for section in ("inputs", "outputs"):
+        for field in data.get(section, {}).values():
+            # The id is already the map key
+            field.pop("id", None)
+    return data
+
+
+def tool_document(workflow: ParsedWorkflow, step_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Rebuild the CWL document a step runs, with sub-workflow tools inlined.
+
+    The result is self-contained, so a runner can execute it without access
+    to the files or objects the original `run:` references pointed to.
+    """
+    tool = workflow.tools.get(step_id)
+    subworkflow = workflow.subworkflows.get(step_id)
+    if isinstance(tool, CWLCommandLineTool):
+        document = _document_fields(tool)
+    elif subworkflow is not None:
+        document = _document_fields(subworkflow.workflow)
+    else:
+        return None
+
+    # Embedded documents share the version of the workflow that runs them
+    document["cwlVersion"] = workflow.workflow.cwl_version
+    if subworkflow is None:
+        return document
+
+    for sub_step_id, step in document.get("steps", {}).items():
+        step.pop("id", None)
+        inlined = tool_document(subworkflow, sub_step_id)
+        if inlined is not None:
+            step["run"] = inlined
+    return document
+
+
+class PlanCompiler:
+    """
+    Compiles ParsedWorkflow → ExecutionPlan in a single pass over the steps.
+
+    Resolves per step:
+    - Container image and Dockerfile from DockerRequirement
+    - Environment variables and data mounts
+    - ResourceRequirement (tool, then enclosing workflow)
+    - Dependency level, estimated duration and priority weight
+
+    and per workflow the parallel levels and the critical path, so every
+    consumer reads the same precomputed view.
+    """
+
+    # MinIO data directory bind-mounted into step containers
+    MINIO_DATA_PATH = os.getenv("MINIO_DATA_PATH", "/data/minio")
+    CONTAINER_DATA_PATH = "/data"
+
+    # Duration assumed for steps without an estimate (seconds)
+    DEFAULT_STEP_DURATION = float(os.getenv("VERIFLOW_DEFAULT_STEP_DURATION", "60"))
+
+    def __init__(self, parser: Optional[CWLParser] = None):
+        """
+        Initialize plan compiler.
+        
+        Args:
+            parser: CWLParser used to read tool requirements
+        """
+        self.cwl_parser = parser or cwl_parser
+
+    def compile(
+        self,
+        workflow: ParsedWorkflow,
+        execution_id: str,
+        config: Optional[Dict[str, Any]] = None,
+        workflow_id: Optional[str] = None,
+        duration_estimates: Optional[Dict[str, float]] = None,
+        requirements: Optional[Dict[str, StepRequirements]] = None,
+    ) -> ExecutionPlan:
+        """
+        Compile a parsed workflow into an execution plan.
+
+        Args:
+            workflow: Parsed CWL workflow
+            execution_id: Unique execution identifier
+            config: Execution configuration
+            workflow_id: Workflow identifier (defaults to the CWL id)
+            duration_estimates: Optional expected seconds per step_id
+            requirements: Previously resolved requirements per step_id to reuse
+
+        Returns:
+            Immutable ExecutionPlan
+        """
+        config = config or {}
+        duration_estimates = duration_estimates or {}
+        requirements = requirements or {}
+        cwl_workflow = workflow.workflow
+        steps = cwl_workflow.steps
+
+        mounts = (
+            PlannedMount(source=self.MINIO_DATA_PATH, target=self.CONTAINER_DATA_PATH),
+        )
+
+        planned: Dict[str, PlannedStep] = {}
+        levels: List[List[str]] = []
+
+        # step_order is topological, so dependencies are always planned first
+        for step_id in workflow.step_order:
+            step = steps.get(step_id)
+            if step is None:
+                continue
+
+            dependencies = tuple(
+                dep for dep in workflow.step_dependencies.get(step_id, [])
+                if dep in planned
+            )
+            level = max((planned[dep].level + 1 for dep in dependencies), default=0)
+            duration = float(duration_estimates.get(step_id, self.DEFAULT_STEP_DURATION))
+
+            resolved = requirements.get(step_id)
+            if resolved is None:
+                resolved = self.resolve_requirements(workflow, step_id)
+            
+            planned[step_id] = self._plan_step(
+                workflow, step_id, step, resolved, execution_id, config,
+                mounts, dependencies, level, duration,
+            )
+
+            if level == len(levels):
+                levels.append([])
+            levels[level].append(step_id)
+
+        planned, critical_path, estimated_duration = self._rank(planned)
+
+        return ExecutionPlan(
+            workflow_id=workflow_id or cwl_workflow.id or "workflow",
+            execution_id=execution_id,
+            label=cwl_workflow.label or cwl_workflow.id,
+            config=dict(config),
+            steps=planned,
+            step_order=tuple(planned),
+            levels=tuple(tuple(level) for level in levels),
+            critical_path=tuple(critical_path),
+            estimated_duration=estimated_duration,
+            workflow=workflow,
+        )
+
+    def apply_durations(self, plan: ExecutionPlan, duration_estimates: Dict[str, float]) -> ExecutionPlan:
+        """
+        Re-estimate a compiled plan with new expected step durations.
+
+        Updates the step estimates, priority weights, critical path and
+        estimated duration; everything else is kept.
+
+        Args:
+            plan: Compiled execution plan
+            duration_estimates: Expected seconds per step_id (others keep theirs)
+
+        Returns:
+            New ExecutionPlan
+        """
+        steps = {
+            step_id: step.model_copy(update={"estimated_duration": float(duration_estimates[step_id])})
+            if step_id in duration_estimates else step
+            for step_id, step in plan.steps.items()
+        }
+        steps, critical_path, estimated_duration = self._rank(steps)
+        return plan.model_copy(update={
+            "steps": steps,
+            "critical_path": tuple(critical_path),
+            "estimated_duration": estimated_duration,
+        })
+
+    def _rank(self, planned: Dict[str, PlannedStep]):
+        """
+        Critical path and priority weights of steps in topological order.
+
+        Returns:
+            (steps with priority weights, critical path, its length in seconds)
+        """
+        finish: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for step_id, step in planned.items():
+            # Longest path ending at this step
+            slowest = max(step.dependencies, key=lambda dep: finish[dep], default=None)
+            finish[step_id] = step.estimated_duration + (finish[slowest] if slowest else 0.0)
+            previous[step_id] = slowest
+
+        # Longest remaining path from each step to the end of the workflow;
+        # steps are ranked by it so the critical path is scheduled first
+        dependents: Dict[str, List[str]] = {step_id: [] for step_id in planned}
+        for step_id, step in planned.items():
+            for dep in step.dependencies:
+                dependents[dep].append(step_id)
+        remaining: Dict[str, float] = {}
+        for step_id in reversed(list(planned)):
+            downstream = (remaining[other] for other in dependents[step_id])
+            remaining[step_id] = planned[step_id].estimated_duration + max(downstream, default=0.0)
+        ranks = {value: rank for rank, value in enumerate(sorted(set(remaining.values())), start=1)}
+        planned = {
+            step_id: step.model_copy(update={"priority_weight": ranks[remaining[step_id]]})
+            for step_id, step in planned.items()
+        }
+
+        critical_path: List[str] = []
+        if finish:
+            node = max(finish, key=finish.get)
+            while node:
+                critical_path.append(node)
+                node = previous[node]
+            critical_path.reverse()
+
+        return planned, critical_path, max(finish.values(), default=0.0)
+
+    def resolve_requirements(self, workflow: ParsedWorkflow, step_id: str) -> StepRequirements:
+        """Resolve image, Dockerfile, resources and command of a step's tool."""
+        tool = workflow.tools.get(step_id)
+        if tool is None:
+            return StepRequirements()
+        
+        image = dockerfile = base_command = None
+        docker_req = self.cwl_parser.get_docker_requirement(tool)
+        if docker_req:
+            image = docker_req.docker_pull or docker_req.docker_image_id
+            dockerfile = docker_req.docker_file
+        if tool.base_command:
+            base_command = (
+                [tool.base_command] if isinstance(tool.base_command, str)
+                else list(tool.base_command)
+            )
+        
+        return StepRequirements(
+            image=image,
+            dockerfile=dockerfile,
+            resources=self.cwl_parser.get_resource_requirement(tool, workflow.workflow),
+            base_command=base_command,
+            label=tool.label,
+        )
+    
+    def _plan_step(
+        self,
+        workflow: ParsedWorkflow,
+        step_id: str,
+        step: CWLStep,
+        resolved: StepRequirements,
+        execution_id: str,
+        config: Dict[str, Any],
+        mounts: tuple,
+        dependencies: tuple,
+        level: int,
+        duration: float,
+    ) -> PlannedStep:
+        """Resolve everything a single step needs to run."""
+        task_id = clean_task_id(step_id)
+
+        env = {
+            "EXECUTION_ID": execution_id,
+            "STEP_ID": task_id,
+            "INPUT_PATH": f"{self.CONTAINER_DATA_PATH}/input/{execution_id}",
+            "OUTPUT_PATH": f"{self.CONTAINER_DATA_PATH}/output/{execution_id}/{task_id}",
+        }
+        for key, value in config.items():
+            env[f"CONFIG_{key.upper()}"] = str(value)
+        if "inputs" in config:
+            # Workflow inputs for the CWL runner (see cwl/veriflow_step.py)
+            env["CWL_INPUTS"] = json.dumps(config["inputs"], default=str)
+
+        scatter: tuple = ()
+        scatter_sources: Dict[str, Any] = {}
+        if step.scatter and (step.scatter_method or "dotproduct") not in SCATTER_METHODS:
+            raise ValueError(f"Step '{step_id}' has unsupported scatterMethod: {step.scatter_method!r}")
+        if step.scatter:
+            scatter = (step.scatter,) if isinstance(step.scatter, str) else tuple(step.scatter)
+            for name in scatter:
+                source = step.in_.get(name, name)
+                if hasattr(source, "source"):
+                    source = source.source
+                scatter_sources[name] = _clean_source(source)
+
+        return PlannedStep(
+            step_id=step_id,
+            task_id=task_id,
+            run=step.run if isinstance(step.run, str) else "inline tool",
+            label=resolved.label,
+            image=resolved.image,
+            dockerfile=resolved.dockerfile,
+            base_command=resolved.base_command,
+            env=env,
+            mounts=mounts,
+            resources=resolved.resources,
+            dependencies=dependencies,
+            level=level,
+            scatter=scatter,
+            scatter_method=(step.scatter_method or "dotproduct") if scatter else None,
+            scatter_sources=scatter_sources,
+            outputs=tuple(o if isinstance(o, str) else o.id for o in step.out),
+            estimated_duration=duration,
+            tool_document=tool_document(workflow, step_id),
+            step_inputs=_step_inputs(step, workflow.workflow),
+        )
+
+
+def _step_inputs(step: CWLStep, cwl_workflow: CWLWorkflow) -> Dict[str, Any]:
+    """Map each tool input to its source (`input` or `step/output`) or literal value."""
+    def is_source(value):
+        if isinstance(value, list):
+            return bool(value) and all(is_source(v) for v in value)
+        if not isinstance(value, str):
+            return False
+        value = value.lstrip("#")
+        return value in cwl_workflow.inputs or value.split("/")[0] in cwl_workflow.steps
+
+    inputs = {}
+    for name, value in step.in_.items():
+        if hasattr(value, "source"):
+            value = value.source if value.source is not None else value.default
+        if value is None:
+            continue
+        if is_source(value):
+            inputs[name] = {"source": _clean_source(value)}
+        else:
+            inputs[name] = {"value": value}
+    return inputs
+
+
+def _clean_source(source: Any) -> Any:
+    """Clean the step part of `step/output` sources to match task IDs."""
+    if isinstance(source, list):
+        return [_clean_source(s) for s in source]
+    if isinstance(source, str) and "/" in source:
+        step, output = source.split("/", 1)
+        return f"{clean_task_id(step)}/{output}"
+    return source
+
+
+# Singleton instance
+plan_compiler = PlanCompiler()
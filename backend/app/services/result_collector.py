@@ -0,0 +1,279 @@
+"""
+VeriFlow - Result Collector
+Indexes the output files of a finished execution in the process bucket.
+
+Steps write their outputs to the data directory
+(output/{execution_id}/{task_id}/, see PlanCompiler). Those files are
+uploaded to process/{execution_id}/{task_id}/, where downloads and exports
+read them; objects already in the bucket under a step prefix are indexed
+too. Files and objects are processed concurrently and streamed to compute
+their SHA-256 and size and to detect their MIME type from their leading
+bytes; files are hashed while they are uploaded, so they are read once. The resulting index is written next to the outputs
+(results_index.json) and kept in the execution record, so result listings
+and exports read it instead of the bucket.
+"""
+
+import io
+import os
+import codecs
+import json
+import zlib
+import asyncio
+import hashlib
+import logging
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Any, Tuple, Iterator
+
+from app.services.dag_runtime import DATA_ROOT
+
+logger = logging.getLogger(__name__)
+
+# Objects listed and read in parallel
+RESULT_WORKERS = int(os.getenv("VERIFLOW_RESULT_WORKERS", "16"))
+
+CHUNK_SIZE = 1024 * 1024
+INDEX_OBJECT = "results_index.json"
+
+# Leading bytes inspected for MIME detection
+HEAD_BYTES = 64 * 1024
+
+# (offset, magic bytes, MIME type)
+MAGIC_NUMBERS: Tuple[Tuple[int, bytes, str], ...] = (
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\x89HDF\r\n\x1a\n", "application/x-hdf5"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (4, b"n+2\x00", "application/x-nifti"),
+    (128, b"DICM", "application/dicom"),
+    (344, b"n+1\x00", "application/x-nifti"),
+    (344, b"ni1\x00", "application/x-nifti"),
+)
+
+
+def _match_magic(head: bytes) -> Optional[str]:
+    for offset, magic, mime_type in MAGIC_NUMBERS:
+        if head[offset:offset + len(magic)] == magic:
+            return mime_type
+    return None
+
+
+def detect_mime_type(head: bytes, name: str = "") -> str:
+    """
+    MIME type of a file from its leading bytes.
+
+    Gzip streams are inflated far enough to recognize their content, so
+    compressed NIfTI volumes (.nii.gz) are reported as NIfTI. The file name
+    is only used for types without a magic number (text formats).
+    """
+    mime_type = _match_magic(head)
+    if mime_type:
+        return mime_type
+    if head[:2] == b"\x1f\x8b":
+        try:
+            inner = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(head, 512)
+        except zlib.error:
+            inner = b""
+        return _match_magic(inner) or "application/gzip"
+    guessed = mimetypes.guess_type(name)[0]
+    try:
+        # Not final: the head may end inside a multi-byte character
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return "application/octet-stream"
+    if b"\x00" in head:
+        return "application/octet-stream"
+    return guessed if guessed and guessed.startswith(("text/", "application/json")) else "text/plain"
+
+
+class _HashingReader:
+    """File wrapper hashing the bytes read from it (by an upload)."""
+
+    def __init__(self, f):
+        self._f = f
+        self.sha = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(size)
+        self.sha.update(data)
+        self.size += len(data)
+        return data
+
+
+class ResultCollector:
+    """
+    Builds the results index of an execution, once.
+
+    Listing and reading objects is blocking (MinIO SDK), so it runs on a
+    thread pool shared by all collections.
+    """
+
+    def __init__(
+        self,
+        storage=None,
+        bucket: Optional[str] = None,
+        max_workers: int = RESULT_WORKERS,
+        data_root: str = DATA_ROOT,
+    ):
+        """
+        Initialize result collector.
+
+        Args:
+            storage: Object storage service (default: MinIO service)
+            bucket: Bucket holding execution outputs (default: process bucket)
+            max_workers: Objects listed and read in parallel
+            data_root: Host data directory the steps write their outputs to
+        """
+        if storage is None:
+            from app.services.minio_client import minio_service
+            storage = minio_service
+        self.storage = storage
+        self.bucket = bucket or storage.PROCESS_BUCKET
+        self.data_root = data_root
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="veriflow-results")
+
+    async def collect(self, execution_id: str, prefixes: Dict[Optional[str], str]) -> List[Dict[str, Any]]:
+        """
+        Index the outputs of an execution (or return the existing index).
+
+        Args:
+            execution_id: Execution identifier
+            prefixes: node_id -> object prefix listing that node's outputs
+                ({execution_id}/{task_id}/, also its folder under output/ in
+                the data directory)
+
+        Returns:
+            Result entries (path, node_id, size, sha256, mime_type) ordered by path
+        """
+        existing = await self.load_index(execution_id)
+        if existing is not None:
+            return existing
+
+        loop = asyncio.get_running_loop()
+
+        # Output files written by the steps, uploaded to the bucket
+        files = await loop.run_in_executor(self._executor, self._list_output_files, prefixes)
+        published = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self._publish_file, execution_id, path, name, node_id)
+            for name, (path, node_id) in files.items()
+        ))
+
+        # Objects stored in the bucket by other means
+        listings = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self.storage.list_objects, self.bucket, prefix)
+            for prefix in prefixes.values()
+        ))
+        objects: Dict[str, Optional[str]] = {}
+        for node_id, listing in zip(prefixes, listings):
+            for obj in listing:
+                name = obj["name"]
+                if name != f"{execution_id}/{INDEX_OBJECT}" and not name.endswith("/") and name not in files:
+                    objects.setdefault(name, node_id)
+        stored = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self._index_object, execution_id, name, node_id)
+            for name, node_id in objects.items()
+        ))
+        index = sorted(published + stored, key=lambda entry: entry["path"])
+
+        await loop.run_in_executor(self._executor, self._write_index, execution_id, index)
+        logger.info(f"Indexed {len(index)} result files of execution {execution_id}")
+        return index
+
+    def _list_output_files(self, prefixes: Dict[Optional[str], str]) -> Dict[str, Tuple[str, Optional[str]]]:
+        """object name -> (host path, node_id) of the output files of all prefixes."""
+        files: Dict[str, Tuple[str, Optional[str]]] = {}
+        for node_id, prefix in prefixes.items():
+            for path, name in self._output_files(prefix):
+                files.setdefault(name, (path, node_id))
+        return files
+
+    def _output_files(self, prefix: str) -> Iterator[Tuple[str, str]]:
+        """(host path, object name) of the files in the data directory folder of a prefix."""
+        folder = os.path.join(self.data_root, "output", prefix)
+        for root, dirs, names in os.walk(folder):
+            dirs.sort()
+            for file_name in sorted(names):
+                path = os.path.join(root, file_name)
+                yield path, prefix + os.path.relpath(path, folder).replace(os.sep, "/")
+
+    def _publish_file(self, execution_id: str, path: str, name: str, node_id: Optional[str]) -> Dict[str, Any]:
+        """Upload an output file to the bucket, indexing it from the uploaded bytes."""
+        with open(path, "rb") as f:
+            head = f.read(HEAD_BYTES)
+            f.seek(0)
+            mime_type = detect_mime_type(head, name)
+            reader = _HashingReader(f)
+            self.storage.upload_file(
+                self.bucket, name, reader, content_type=mime_type, length=os.fstat(f.fileno()).st_size
+            )
+        return {
+            "path": name[len(execution_id) + 1:],
+            "node_id": node_id,
+            "size": reader.size,
+            "sha256": reader.sha.hexdigest(),
+            "mime_type": mime_type,
+        }
+
+    def _index_object(self, execution_id: str, name: str, node_id: Optional[str]) -> Dict[str, Any]:
+        """Stream one object from the bucket and index it."""
+        return self._index_chunks(
+            execution_id, name, node_id, self.storage.iter_object(self.bucket, name, CHUNK_SIZE)
+        )
+
+    def _index_chunks(
+        self,
+        execution_id: str,
+        name: str,
+        node_id: Optional[str],
+        chunks: Iterator[bytes],
+    ) -> Dict[str, Any]:
+        """Hash streamed content, keeping its head for MIME detection."""
+        sha = hashlib.sha256()
+        size = 0
+        head = b""
+        for chunk in chunks:
+            if len(head) < HEAD_BYTES:
+                head += chunk[:HEAD_BYTES - len(head)]
+            sha.update(chunk)
+            size += len(chunk)
+        return {
+            "path": name[len(execution_id) + 1:],
+            "node_id": node_id,
+            "size": size,
+            "sha256": sha.hexdigest(),
+            "mime_type": detect_mime_type(head, name),
+        }
+
+    def _write_index(self, execution_id: str, index: List[Dict[str, Any]]):
+        data = json.dumps(index, separators=(",", ":")).encode("utf-8")
+        try:
+            self.storage.upload_file(
+                self.bucket,
+                f"{execution_id}/{INDEX_OBJECT}",
+                io.BytesIO(data),
+                content_type="application/json",
+                length=len(data),
+            )
+        except Exception as e:
+            logger.warning(f"Could not write results index of {execution_id}: {e}")
+
+    async def load_index(self, execution_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Read the stored results index of an execution.
+
+        Returns:
+            Result entries, or None when the execution was not indexed yet
+        """
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.storage.download_file, self.bucket, f"{execution_id}/{INDEX_OBJECT}"
+            )
+            return json.loads(data)
+        except Exception:
+            return None
+
+
+# Singleton instance
+result_collector = ResultCollector()
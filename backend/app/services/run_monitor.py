@@ -0,0 +1,300 @@
+"""
+VeriFlow - Airflow Run Monitor
+Polls all active DAG runs with shared batch requests.
+Per SPEC.md Section 7.4
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Callable, Awaitable, Tuple
+
+from app.services.airflow_client import AirflowClient, DAGRunState
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_RUN_STATES = ["queued", "running"]
+TERMINAL_RUN_STATES = (DAGRunState.SUCCESS.value, DAGRunState.FAILED.value)
+
+# Polls a run may be missing (deleted, or lookups failing) before it counts as failed
+MAX_MISSES = 3
+
+# Poll interval bounds (seconds); runs that receive pushed task events are
+# polled at most every PUSH_MAX_INTERVAL as a safety net
+MIN_INTERVAL = float(os.getenv("VERIFLOW_POLL_MIN_INTERVAL", "1"))
+MAX_INTERVAL = float(os.getenv("VERIFLOW_POLL_MAX_INTERVAL", "60"))
+PUSH_MAX_INTERVAL = float(os.getenv("VERIFLOW_POLL_PUSH_MAX_INTERVAL", "300"))
+
+# Growth of the interval while nothing changes, and its random spread
+BACKOFF = 1.5
+JITTER = 0.2
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds of an Airflow ISO timestamp."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+# (dag_run, task_instances, changed_task_instances) -> True when done watching
+RunHandler = Callable[[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]], Awaitable[bool]]
+
+
+class RunWatch:
+    """A DAG run being monitored and the last state seen for it."""
+
+    def __init__(
+        self,
+        dag_id: str,
+        dag_run_id: str,
+        handler: RunHandler,
+        refresh_running: bool = False,
+        expected_durations: Optional[Dict[str, float]] = None,
+    ):
+        self.dag_id = dag_id
+        self.dag_run_id = dag_run_id
+        self.handler = handler
+        # Dispatch every poll while a task runs (e.g. to re-read fused task logs)
+        self.refresh_running = refresh_running
+        # Expected seconds per task_id, to poll again near expected completion
+        self.expected_durations = expected_durations or {}
+        self.run_state: Optional[str] = None
+        self.tasks: Dict[Tuple[str, int], Tuple[Any, ...]] = {}
+        # Consecutive polls on which the run could not be found
+        self.misses = 0
+        self.interval = MIN_INTERVAL
+        self.next_poll_at = 0.0
+        # Whether task events are pushed for this run (see RunMonitor.notify)
+        self.pushed = False
+
+
+class RunMonitor:
+    """
+    Single polling loop for all DAG runs the backend waits on.
+
+    Each poll lists the active runs of all due DAG runs in one batch query,
+    fetches runs that left the active states individually (once, when they
+    finish), and lists the task instances of all running runs in one more
+    batch query. Results are diffed against the previous poll and handlers
+    are only called for runs whose state or task instances changed, so the
+    request rate depends on the poll interval rather than on the number of
+    executions and tasks.
+
+    Every run has its own poll interval: it backs off (with jitter) while
+    nothing changes, and shrinks as running tasks approach their expected
+    duration. Task events pushed by the generated DAGs (notify) trigger an
+    immediate poll of their run.
+    """
+
+    def __init__(self, airflow_client: AirflowClient):
+        """
+        Initialize run monitor.
+
+        Args:
+            airflow_client: Client used for the batch queries
+        """
+        self.airflow_client = airflow_client
+        self._watches: Dict[str, RunWatch] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def watch(
+        self,
+        dag_id: str,
+        dag_run_id: str,
+        handler: RunHandler,
+        refresh_running: bool = False,
+        expected_durations: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Start monitoring a DAG run; starts the polling loop if needed.
+
+        Args:
+            dag_id: DAG identifier
+            dag_run_id: DAG run identifier
+            handler: Called with the run, its task instances and the changed
+                ones; returning True stops monitoring the run
+            refresh_running: Also call the handler on polls without changes
+                while a task is running
+            expected_durations: Expected seconds per task_id
+        """
+        self._watches[dag_run_id] = RunWatch(
+            dag_id, dag_run_id, handler, refresh_running, expected_durations
+        )
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        else:
+            self._wakeup.set()
+    
+    def notify(self, dag_run_id: str) -> bool:
+        """
+        Poll a run as soon as possible (a task event was pushed for it).
+
+        Returns:
+            True if the run is being monitored
+        """
+        w = self._watches.get(dag_run_id)
+        if w is None:
+            return False
+        w.pushed = True
+        w.next_poll_at = 0.0
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def unwatch(self, dag_run_id: str):
+        """Stop monitoring a DAG run."""
+        self._watches.pop(dag_run_id, None)
+
+    @property
+    def watched(self) -> List[str]:
+        """IDs of the DAG runs being monitored."""
+        return list(self._watches)
+
+    async def _run(self):
+        while self._watches:
+            now = time.time()
+            due = [w.dag_run_id for w in self._watches.values() if w.next_poll_at <= now]
+            if due:
+                try:
+                    await self.poll(due)
+                except Exception as e:
+                    logger.error(f"Run monitor poll failed: {e}")
+                    self._back_off(self._watches[run_id] for run_id in due if run_id in self._watches)
+            if not self._watches:
+                break
+            
+            # Sleep until the next run is due or an event is pushed
+            delay = min(w.next_poll_at for w in self._watches.values()) - time.time()
+            self._wakeup.clear()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def poll(self, run_ids: Optional[List[str]] = None):
+        """
+        Query watched runs once and dispatch changes to their handlers.
+
+        Args:
+            run_ids: Runs to query (default: all watched runs)
+        """
+        watches = {
+            run_id: w for run_id, w in self._watches.items()
+            if run_ids is None or run_id in run_ids
+        }
+        if not watches:
+            return
+
+        dag_ids = sorted({w.dag_id for w in watches.values()})
+        active = await self.airflow_client.list_dag_runs(dag_ids, states=ACTIVE_RUN_STATES)
+        if active is None:
+            self._back_off(watches.values())
+            return
+        runs = {run.get("dag_run_id"): run for run in active if run.get("dag_run_id") in watches}
+
+        # Runs no longer active have finished (or were deleted)
+        for run_id, w in watches.items():
+            if run_id in runs:
+                continue
+            run = await self.airflow_client.get_dag_run(w.dag_id, run_id)
+            if run:
+                w.misses = 0
+                runs[run_id] = run
+                continue
+            w.misses += 1
+            if w.misses >= MAX_MISSES:
+                logger.warning(f"DAG run {run_id} not found, giving up monitoring")
+                runs[run_id] = {"dag_run_id": run_id, "state": DAGRunState.FAILED.value}
+
+        # Queued runs have no task instances to report yet
+        listed = [
+            run_id for run_id, run in runs.items()
+            if run.get("state") != DAGRunState.QUEUED.value
+        ]
+        task_instances: Dict[str, List[Dict[str, Any]]] = {run_id: [] for run_id in runs}
+        if listed:
+            tis = await self.airflow_client.list_task_instances(
+                sorted({watches[run_id].dag_id for run_id in listed}), listed,
+            )
+            if tis is None:
+                self._back_off(watches.values())
+                return
+            for ti in tis:
+                if ti.get("dag_run_id") in task_instances:
+                    task_instances[ti["dag_run_id"]].append(ti)
+
+        for run_id, w in watches.items():
+            if run_id in runs:
+                await self._dispatch(w, runs[run_id], task_instances[run_id])
+            else:
+                self._schedule(w, [], changed=False)
+
+    async def _dispatch(self, w: RunWatch, run: Dict[str, Any], tis: List[Dict[str, Any]]):
+        snapshot = {
+            (ti.get("task_id"), ti.get("map_index", -1)): (ti.get("state"), ti.get("try_number"))
+            for ti in tis
+        }
+        changed = [
+            ti for ti in tis
+            if w.tasks.get((ti.get("task_id"), ti.get("map_index", -1)))
+            != snapshot[(ti.get("task_id"), ti.get("map_index", -1))]
+        ]
+        state = run.get("state")
+        running = any(ti.get("state") == "running" for ti in tis)
+        has_changes = state != w.run_state or bool(changed)
+        self._schedule(w, tis, has_changes)
+        if not has_changes and not (w.refresh_running and running):
+            return
+
+        previous = w.run_state, w.tasks
+        w.run_state, w.tasks = state, snapshot
+        try:
+            done = await w.handler(run, tis, changed)
+        except Exception as e:
+            # Keep watching: the same changes are dispatched again on a
+            # later (backed-off) poll instead of the run being dropped
+            logger.error(f"Run handler for {w.dag_run_id} failed, retrying: {e}")
+            w.run_state, w.tasks = previous
+            self._schedule(w, [], changed=False)
+            return
+        if done or state in TERMINAL_RUN_STATES:
+            self.unwatch(w.dag_run_id)
+
+    def _back_off(self, watches):
+        """Poll runs later after a failed query, so outages are not polled in a loop."""
+        for w in watches:
+            self._schedule(w, [], changed=False)
+
+    def _schedule(self, w: RunWatch, tis: List[Dict[str, Any]], changed: bool):
+        """Set when a run is polled next."""
+        max_interval = PUSH_MAX_INTERVAL if w.pushed else MAX_INTERVAL
+        if changed:
+            w.interval = MIN_INTERVAL
+        else:
+            w.interval = min(w.interval * BACKOFF, max_interval)
+        
+        # Poll again halfway to the earliest expected task completion, so
+        # polls get denser near it; overdue tasks only follow the backoff
+        now = time.time()
+        interval = w.interval
+        remaining = []
+        for ti in tis:
+            expected = w.expected_durations.get(ti.get("task_id"))
+            started = _timestamp(ti.get("start_date"))
+            if ti.get("state") == "running" and expected and started:
+                remaining.append(expected - (now - started))
+        upcoming = [r for r in remaining if r > 0]
+        if upcoming:
+            interval = min(interval, min(upcoming) / 2)
+        
+        interval = min(max(interval, MIN_INTERVAL), max_interval)
+        w.next_poll_at = now + interval * random.uniform(1 - JITTER, 1 + JITTER)
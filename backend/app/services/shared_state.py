@@ -0,0 +1,472 @@
+"""
+VeriFlow - Shared State
+Key-value state and pub/sub shared by the API worker processes.
+
+Cross-request state of the API (uploads, design-mode workflows, workflow
+CWL) lives in SharedDict namespaces instead of module-level dicts, and
+WebSocket messages are published on channels, so any worker can serve any
+request and reach clients connected to another worker.
+
+Backends, selected by VERIFLOW_STATE_BACKEND:
+- memory: in-process, for a single worker (default)
+- sqlite: a SQLite file shared by the workers of one host (WAL mode);
+  messages are polled from an events table
+- redis: a Redis-compatible server (requires the `redis` package)
+
+Values are stored as JSON in every backend, so reading a value returns a
+copy: nested changes must be written back (see SharedDict.patch). The
+sqlite and redis backends do blocking I/O: async code uses the SharedDict
+coroutines (aget, aset, ...), which run it in a worker thread.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Iterator, Callable, Awaitable, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATE_BACKEND = os.getenv("VERIFLOW_STATE_BACKEND", "memory").lower()
+STATE_DB_PATH = os.getenv("VERIFLOW_STATE_DB_PATH", "db/veriflow_state.db")
+STATE_REDIS_URL = os.getenv("VERIFLOW_STATE_REDIS_URL", "redis://localhost:6379/0")
+
+# Seconds between polls of the SQLite events table
+EVENT_POLL_INTERVAL = float(os.getenv("VERIFLOW_STATE_POLL_INTERVAL", "0.2"))
+# Seconds SQLite events are kept for workers to read
+EVENT_RETENTION = 60
+
+# Identifies this worker process in published messages
+WORKER_ID = uuid.uuid4().hex
+
+REDIS_PREFIX = "veriflow:state:"
+REDIS_EVENTS_CHANNEL = "veriflow:events"
+
+# Called with each message published on a subscribed channel
+MessageHandler = Callable[[Any], Awaitable[None]]
+
+# Called with the items of a namespace inside a transaction; returns the
+# changes to write (None deletes a key) and the result of the transaction
+Transaction = Callable[[Dict[str, Any]], Tuple[Dict[str, Any], Any]]
+
+
+def _apply(data: Dict[str, Any], changes: Dict[str, Any]):
+    for key, value in changes.items():
+        if value is None:
+            data.pop(key, None)
+        else:
+            data[key] = value
+
+
+class MemoryStateBackend:
+    """Process-local state; messages never leave the worker."""
+
+    shared = False
+    blocking = False
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, str]] = {}
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        return self._data.get(namespace, {}).get(key)
+
+    def set(self, namespace: str, key: str, value: str):
+        self._data.setdefault(namespace, {})[key] = value
+
+    def delete(self, namespace: str, key: str) -> bool:
+        return self._data.get(namespace, {}).pop(key, None) is not None
+
+    def keys(self, namespace: str) -> List[str]:
+        return list(self._data.get(namespace, {}))
+
+    def transact(self, namespace: str, update: Transaction) -> Any:
+        data = self._data.setdefault(namespace, {})
+        changes, result = update(dict(data))
+        _apply(data, changes)
+        return result
+
+    async def publish(self, envelope: str):
+        pass
+
+    async def listen(self, deliver: Callable[[str], Awaitable[None]]):
+        pass
+
+    async def close(self):
+        pass
+
+
+class SQLiteStateBackend:
+    """State in a SQLite file shared by the workers of one host."""
+
+    shared = True
+    blocking = True
+
+    def __init__(self, db_path: str = STATE_DB_PATH, poll_interval: float = EVENT_POLL_INTERVAL):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS shared_state (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS shared_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    envelope TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_state (namespace, key, value) VALUES (?, ?, ?)",
+                (namespace, key, value),
+            )
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+        return cursor.rowcount > 0
+
+    def keys(self, namespace: str) -> List[str]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key FROM shared_state WHERE namespace = ?", (namespace,)).fetchall()
+        return [row[0] for row in rows]
+
+    def transact(self, namespace: str, update: Transaction) -> Any:
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            # Write lock up front: no other worker reads the namespace in between
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT key, value FROM shared_state WHERE namespace = ?", (namespace,)
+            ).fetchall()
+            changes, result = update(dict(rows))
+            for key, value in changes.items():
+                if value is None:
+                    conn.execute("DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO shared_state (namespace, key, value) VALUES (?, ?, ?)",
+                        (namespace, key, value),
+                    )
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _append_event(self, envelope: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO shared_events (envelope, created_at) VALUES (?, ?)", (envelope, time.time())
+            )
+
+    def _read_events(self, after_id: Optional[int]) -> List[tuple]:
+        with self._connect() as conn:
+            if after_id is None:
+                row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM shared_events").fetchone()
+                return [(row[0], None)]
+            conn.execute("DELETE FROM shared_events WHERE created_at < ?", (time.time() - EVENT_RETENTION,))
+            return conn.execute(
+                "SELECT id, envelope FROM shared_events WHERE id > ? ORDER BY id", (after_id,)
+            ).fetchall()
+
+    async def publish(self, envelope: str):
+        await asyncio.to_thread(self._append_event, envelope)
+
+    async def listen(self, deliver: Callable[[str], Awaitable[None]]):
+        # Only messages published after the listener started are delivered
+        last_id = (await asyncio.to_thread(self._read_events, None))[0][0]
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for event_id, envelope in await asyncio.to_thread(self._read_events, last_id):
+                last_id = event_id
+                await deliver(envelope)
+
+    async def close(self):
+        pass
+
+
+class RedisStateBackend:
+    """State in a Redis-compatible server (one hash per namespace)."""
+
+    shared = True
+    blocking = True
+
+    def __init__(self, url: str = STATE_REDIS_URL):
+        import redis
+        import redis.asyncio
+
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._async_client = redis.asyncio.Redis.from_url(url, decode_responses=True)
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        return self._client.hget(REDIS_PREFIX + namespace, key)
+
+    def set(self, namespace: str, key: str, value: str):
+        self._client.hset(REDIS_PREFIX + namespace, key, value)
+
+    def delete(self, namespace: str, key: str) -> bool:
+        return self._client.hdel(REDIS_PREFIX + namespace, key) > 0
+
+    def keys(self, namespace: str) -> List[str]:
+        return list(self._client.hkeys(REDIS_PREFIX + namespace))
+
+    def transact(self, namespace: str, update: Transaction) -> Any:
+        import redis
+
+        name = REDIS_PREFIX + namespace
+        with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    # Optimistic: retried when another worker changed the hash meanwhile
+                    pipe.watch(name)
+                    changes, result = update(pipe.hgetall(name))
+                    pipe.multi()
+                    for key, value in changes.items():
+                        if value is None:
+                            pipe.hdel(name, key)
+                        else:
+                            pipe.hset(name, key, value)
+                    pipe.execute()
+                    return result
+                except redis.WatchError:
+                    continue
+
+    async def publish(self, envelope: str):
+        await self._async_client.publish(REDIS_EVENTS_CHANNEL, envelope)
+
+    async def listen(self, deliver: Callable[[str], Awaitable[None]]):
+        pubsub = self._async_client.pubsub()
+        await pubsub.subscribe(REDIS_EVENTS_CHANNEL)
+        try:
+            async for item in pubsub.listen():
+                if item.get("type") == "message":
+                    await deliver(item["data"])
+        finally:
+            await pubsub.close()
+
+    async def close(self):
+        self._client.close()
+        await self._async_client.close()
+
+
+class SharedDict(MutableMapping):
+    """
+    Dict-like view of one namespace of the shared state.
+
+    Values must be JSON-serializable. Writes replace the whole value; the
+    last writer wins when workers update the same key. The mapping methods
+    block on the backend; coroutines use the `a`-prefixed variants.
+    """
+
+    def __init__(self, state: "SharedState", namespace: str):
+        self.state = state
+        self.namespace = namespace
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.state.backend.get(self.namespace, key)
+        if value is None:
+            raise KeyError(key)
+        return json.loads(value)
+
+    def __setitem__(self, key: str, value: Any):
+        self.state.backend.set(self.namespace, key, json.dumps(value, default=str))
+
+    def __delitem__(self, key: str):
+        if not self.state.backend.delete(self.namespace, key):
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.state.backend.get(self.namespace, key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.state.backend.keys(self.namespace))
+
+    def __len__(self) -> int:
+        return len(self.state.backend.keys(self.namespace))
+
+    def patch(self, key: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Update fields of a stored dict.
+
+        Raises:
+            KeyError: The key does not exist
+        """
+        value = self[key]
+        value.update(fields)
+        self[key] = value
+        return value
+
+    async def transact(self, update: Transaction) -> Any:
+        """
+        Read and change the namespace atomically across workers.
+
+        Args:
+            update: Called with a copy of all items; returns (changes, result)
+                where changes maps keys to new values (None deletes the key)
+
+        Returns:
+            The result returned by `update`
+        """
+        def run(raw: Dict[str, str]) -> Tuple[Dict[str, Optional[str]], Any]:
+            changes, result = update({key: json.loads(value) for key, value in raw.items()})
+            encoded = {
+                key: None if value is None else json.dumps(value, default=str)
+                for key, value in changes.items()
+            }
+            return encoded, result
+
+        return await self._run(self.state.backend.transact, self.namespace, run)
+
+    async def _run(self, function: Callable, *args) -> Any:
+        if self.state.backend.blocking:
+            return await asyncio.to_thread(function, *args)
+        return function(*args)
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        """Value of a key, or `default` (without blocking the event loop)."""
+        return await self._run(self.get, key, default)
+
+    async def aset(self, key: str, value: Any):
+        """Store a value (without blocking the event loop)."""
+        await self._run(self.__setitem__, key, value)
+
+    async def acontains(self, key: str) -> bool:
+        """Whether a key exists (without blocking the event loop)."""
+        return await self._run(self.__contains__, key)
+
+    async def apop(self, key: str, default: Any = None) -> Any:
+        """Remove a key and return its value, or `default` (without blocking the event loop)."""
+        return await self._run(self.pop, key, default)
+
+    async def apatch(self, key: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Update fields of a stored dict (without blocking the event loop)."""
+        return await self._run(self.patch, key, fields)
+
+
+class SharedState:
+    """
+    Shared key-value namespaces plus pub/sub between workers.
+
+    Messages are delivered to the handlers of the publishing worker
+    directly and to the other workers through the backend, so WebSocket
+    clients get them whichever worker they are connected to.
+    """
+
+    def __init__(self, backend=None):
+        """
+        Initialize shared state.
+
+        Args:
+            backend: State backend (default: memory)
+        """
+        self.backend = backend if backend is not None else MemoryStateBackend()
+        self.worker_id = WORKER_ID
+        self._handlers: Dict[str, List[MessageHandler]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def dict(self, namespace: str) -> SharedDict:
+        """Dict-like view of a namespace."""
+        return SharedDict(self, namespace)
+
+    def subscribe(self, channel: str, handler: MessageHandler):
+        """Call `handler` with every message published on `channel` (by any worker)."""
+        self._handlers.setdefault(channel, []).append(handler)
+        self.start()
+
+    async def publish(self, channel: str, message: Any):
+        """Deliver a JSON-serializable message to the subscribers of a channel."""
+        await self._dispatch(channel, message)
+        if not self.backend.shared:
+            return
+        self.start()
+        envelope = json.dumps({"origin": self.worker_id, "channel": channel, "message": message}, default=str)
+        try:
+            await self.backend.publish(envelope)
+        except Exception as e:
+            logger.warning(f"Could not publish on {channel}: {e}")
+
+    async def _dispatch(self, channel: str, message: Any):
+        for handler in self._handlers.get(channel, ()):
+            try:
+                await handler(message)
+            except Exception as e:
+                logger.error(f"Handler for {channel} failed: {e}")
+
+    async def _receive(self, envelope: str):
+        event = json.loads(envelope)
+        if event.get("origin") != self.worker_id:
+            await self._dispatch(event["channel"], event["message"])
+
+    def start(self):
+        """Start receiving messages of other workers (needs a running loop)."""
+        if not self.backend.shared or (self._task is not None and not self._task.done()):
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+        except RuntimeError:
+            # No event loop yet (import time); started on app startup
+            pass
+
+    async def _listen(self):
+        while True:
+            try:
+                await self.backend.listen(self._receive)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Shared state listener failed, reconnecting: {e}")
+            await asyncio.sleep(1)
+
+    async def close(self):
+        """Stop receiving messages and close the backend."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.backend.close()
+
+
+def _default_backend():
+    """State backend selected by VERIFLOW_STATE_BACKEND (memory, sqlite or redis)."""
+    if STATE_BACKEND == "sqlite":
+        return SQLiteStateBackend()
+    if STATE_BACKEND == "redis":
+        try:
+            return RedisStateBackend()
+        except ImportError:
+            logger.warning("redis package not installed, shared state stays in memory")
+    return MemoryStateBackend()
+
+
+# Singleton instance
+shared_state = SharedState(_default_backend())
@@ -0,0 +1,265 @@
+"""
+VeriFlow - Step Duration History
+Expected step run times learned from finished executions.
+
+Run times are recorded per tool (its resolved CWL document), container
+image and input size class, as a moving average. Plans are re-estimated
+with them before they run, so the critical path, the task priority weights
+and the run monitor's poll timing follow real run times, and running
+executions report a duration-weighted progress and a critical-path ETA
+(see estimate_progress).
+"""
+
+import os
+import json
+import math
+import hashlib
+import logging
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Tuple
+
+from app.models.plan import ExecutionPlan, PlannedStep
+from app.services.dag_runtime import DATA_ROOT, CONTAINER_DATA_ROOT
+
+logger = logging.getLogger(__name__)
+
+STEP_HISTORY_ENABLED = os.getenv("VERIFLOW_STEP_HISTORY", "true").lower() in ("1", "true", "yes")
+
+# Weight of a new run time once a history entry has 1 / HISTORY_ALPHA samples
+HISTORY_ALPHA = float(os.getenv("VERIFLOW_STEP_HISTORY_ALPHA", "0.2"))
+
+# Share of its estimate a running step counts for until it finishes
+RUNNING_PROGRESS_CAP = 0.95
+
+SIZE_CLASS_BASE = 1024 * 1024
+
+
+def size_class(num_bytes: int) -> int:
+    """Input size bucket: 0 below 1 MiB, then one class per factor of 4."""
+    if num_bytes < SIZE_CLASS_BASE:
+        return 0
+    return int(math.log(num_bytes / SIZE_CLASS_BASE, 4)) + 1
+
+
+def _path_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _data_paths(value: Any) -> List[str]:
+    """Host paths of the /data files a workflow input value refers to."""
+    if isinstance(value, dict):
+        location = value.get("path") or value.get("location")
+        if value.get("class") in ("File", "Directory") and isinstance(location, str):
+            return _data_paths(location)
+        return [path for item in value.values() for path in _data_paths(item)]
+    if isinstance(value, list):
+        return [path for item in value for path in _data_paths(item)]
+    if isinstance(value, str):
+        path = value.replace("file://", "", 1)
+        if path == CONTAINER_DATA_ROOT or path.startswith(CONTAINER_DATA_ROOT + "/"):
+            return [DATA_ROOT + path[len(CONTAINER_DATA_ROOT):]]
+    return []
+
+
+def input_size(execution_id: str, config: Optional[Dict[str, Any]] = None) -> int:
+    """Total bytes of an execution's input folder and of the data files its inputs name."""
+    paths = [os.path.join(DATA_ROOT, "input", execution_id)]
+    paths += _data_paths((config or {}).get("inputs", {}))
+    return sum(_path_size(path) for path in set(paths) if os.path.exists(path))
+
+
+def tool_key(step: PlannedStep) -> str:
+    """Identifies what a step runs, independent of the workflow it is part of."""
+    return hashlib.sha256(
+        json.dumps({"run": step.run, "tool": step.tool_document}, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds of an Airflow ISO timestamp."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def task_run_times(task_instances: List[Dict[str, Any]], now: float) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Run times of the tasks of a DAG run, from their task instances.
+
+    Mapped tasks count from their first start to their last end.
+
+    Args:
+        task_instances: Task instances of the run (Airflow API records)
+        now: Current epoch seconds
+
+    Returns:
+        (task_id -> seconds of tasks whose instances all succeeded,
+         task_id -> seconds running tasks have been running)
+    """
+    spans: Dict[str, List[Optional[float]]] = {}
+    states: Dict[str, set] = {}
+    for task in task_instances:
+        task_id = task.get("task_id")
+        start, end = _timestamp(task.get("start_date")), _timestamp(task.get("end_date"))
+        span = spans.setdefault(task_id, [None, None])
+        if start is not None:
+            span[0] = start if span[0] is None else min(span[0], start)
+        if end is not None:
+            span[1] = end if span[1] is None else max(span[1], end)
+        states.setdefault(task_id, set()).add(task.get("state"))
+
+    finished: Dict[str, float] = {}
+    running: Dict[str, float] = {}
+    for task_id, (start, end) in spans.items():
+        if start is None:
+            continue
+        if states[task_id] == {"success"} and end is not None:
+            finished[task_id] = max(end - start, 0.0)
+        elif "running" in states[task_id]:
+            running[task_id] = max(now - start, 0.0)
+    return finished, running
+
+
+def estimate_progress(
+    plan: ExecutionPlan,
+    states: Dict[str, str],
+    elapsed: Dict[str, float],
+) -> Tuple[int, float]:
+    """
+    Duration-weighted progress and remaining time of a plan.
+
+    Each step counts for its estimated duration; running steps count for
+    the share of their estimate they have run (capped until they finish).
+    The remaining time is the longest path of remaining step times through
+    the dependency graph.
+
+    Args:
+        plan: Execution plan (expected seconds in the steps' estimated_duration)
+        states: step_id -> "completed", "running" or anything else (not started)
+        elapsed: step_id -> seconds a running step has been running
+
+    Returns:
+        (progress percentage, seconds until the last step should finish)
+    """
+    if not plan.steps:
+        return 0, 0.0
+
+    total = done = 0.0
+    completed = 0
+    finish: Dict[str, float] = {}
+    for step_id, step in plan.steps.items():
+        expected = max(step.estimated_duration, 0.0)
+        state = states.get(step_id)
+        if state == "completed":
+            share, remaining = 1.0, 0.0
+            completed += 1
+        elif state == "running":
+            ran = elapsed.get(step_id, 0.0)
+            share = min(ran / expected, RUNNING_PROGRESS_CAP) if expected else 0.0
+            remaining = max(expected - ran, expected * (1 - RUNNING_PROGRESS_CAP))
+        else:
+            share, remaining = 0.0, expected
+        total += expected
+        done += share * expected
+        # steps are in topological order
+        finish[step_id] = remaining + max(
+            (finish[dep] for dep in step.dependencies if dep in finish), default=0.0
+        )
+
+    if total:
+        progress = int(done / total * 100)
+    else:
+        progress = int(completed / len(plan.steps) * 100)
+    return progress, max(finish.values())
+
+
+class StepHistory:
+    """
+    Moving average of step run times per tool, image and input size class.
+
+    Entries live in the step_durations table (SQLite). Steps without an
+    entry for their size class use the entry of the nearest size class.
+    """
+
+    def __init__(self, db=None, alpha: float = HISTORY_ALPHA):
+        """
+        Initialize step history.
+
+        Args:
+            db: Database with the step_durations table (default: SQLite service)
+            alpha: Weight of a new run time in the moving average
+        """
+        if db is None:
+            from app.services.database_sqlite import database_service
+            db = database_service
+        self.db = db
+        self.alpha = alpha
+
+    def estimates(self, plan: ExecutionPlan, input_bytes: int) -> Dict[str, float]:
+        """
+        Expected seconds of the steps of a plan that ran before.
+
+        Args:
+            plan: Compiled execution plan
+            input_bytes: Total size of the execution's inputs
+
+        Returns:
+            step_id -> expected seconds (steps without history are left out)
+        """
+        keys = {step_id: (tool_key(step), step.image or "") for step_id, step in plan.steps.items()}
+        rows = self.db.get_step_durations(sorted(set(keys.values())))
+        if not rows:
+            return {}
+
+        by_tool: Dict[Tuple[str, str], Dict[int, float]] = {}
+        for row in rows:
+            by_tool.setdefault((row["tool_key"], row["image"]), {})[row["size_class"]] = row["mean_seconds"]
+
+        target = size_class(input_bytes)
+        estimates: Dict[str, float] = {}
+        for step_id, key in keys.items():
+            classes = by_tool.get(key)
+            if not classes:
+                continue
+            # Nearest size class; the larger one on ties
+            nearest = min(classes, key=lambda cls: (abs(cls - target), -cls))
+            estimates[step_id] = classes[nearest]
+        return estimates
+
+    def record(self, plan: ExecutionPlan, input_bytes: int, durations: Dict[str, float]) -> int:
+        """
+        Add the run times of steps of an execution to the history.
+
+        Args:
+            plan: Execution plan the steps ran from
+            input_bytes: Total size of the execution's inputs
+            durations: step_id -> seconds of steps that ran successfully
+
+        Returns:
+            Number of samples recorded
+        """
+        cls = size_class(input_bytes)
+        rows = [
+            (tool_key(plan.steps[step_id]), plan.steps[step_id].image or "", cls, float(seconds))
+            for step_id, seconds in durations.items()
+            if step_id in plan.steps
+        ]
+        if rows:
+            self.db.add_step_durations(rows, self.alpha)
+        return len(rows)
+
+
+# Singleton instance (None when the duration history is disabled)
+step_history = StepHistory() if STEP_HISTORY_ENABLED else None
@@ -0,0 +1,379 @@
+"""
+VeriFlow - CWL Tool Resolver Service
+Resolves the `run:` references of workflow steps into tool documents.
+Per SPEC.md Section 7.2 and 8.1
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Optional, Dict, List, Any, Tuple, NamedTuple
+
+from app.models.cwl import (
+    CWLWorkflow,
+    CWLCommandLineTool,
+    ParsedWorkflow,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ToolReference(NamedTuple):
+    """Canonical location of a tool document."""
+    kind: str  # "root", "local", "minio" or "inline"
+    location: str  # Absolute path, object name or inline id
+    bucket: Optional[str] = None
+
+
+class ToolResolution(NamedTuple):
+    """Result of resolving all tool references of a workflow."""
+    tools: Dict[str, CWLCommandLineTool]
+    subworkflows: Dict[str, ParsedWorkflow]
+    errors: List[str]
+    versions: Dict[ToolReference, Optional[str]]  # ETag of each fetched document (None if missing)
+
+
+class ToolResolver:
+    """
+    Resolves CWL step `run:` references to CommandLineTool documents.
+
+    Supports:
+    - Inline tool definitions and `#id` references into a packed `$graph`
+    - Local paths relative to the referencing document
+    - Objects in the MinIO workflow-tool bucket (or `minio://bucket/key`)
+    - Nested sub-workflows, resolved recursively with de-duplication
+
+    Independent references are fetched concurrently on a thread pool, since
+    the MinIO SDK is blocking. Fetched documents are cached by object ETag
+    (file mtime/size for local paths) so unchanged tools are not re-parsed;
+    the same versions let callers check a cached resolution is still current.
+    """
+
+    MAX_WORKERS = int(os.getenv("CWL_RESOLVER_WORKERS", "16"))
+    CACHE_SIZE = int(os.getenv("CWL_RESOLVER_CACHE_SIZE", "256"))
+    MAX_DEPTH = 8
+
+    def __init__(
+        self,
+        parser,
+        storage=None,
+        bucket: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ):
+        """
+        Initialize tool resolver.
+
+        Args:
+            parser: CWLParser used to parse fetched documents
+            storage: MinIO service (defaults to the global minio_service)
+            bucket: Bucket holding tool CWL files (defaults to workflow-tool)
+            max_workers: Maximum number of concurrent fetches
+        """
+        self.parser = parser
+        self._storage = storage
+        self._bucket = bucket
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cache: "OrderedDict[ToolReference, Tuple[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @property
+    def storage(self):
+        """MinIO service used for bucket references (loaded lazily)."""
+        if self._storage is None:
+            from app.services.minio_client import minio_service
+            self._storage = minio_service
+        return self._storage
+
+    @property
+    def bucket(self) -> str:
+        """Bucket holding tool CWL documents."""
+        return self._bucket or self.storage.WORKFLOW_TOOL_BUCKET
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="cwl-resolver",
+            )
+        return self._executor
+
+    def resolve(
+        self,
+        workflow: CWLWorkflow,
+        base_path: Optional[Path] = None,
+        inline_documents: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> ToolResolution:
+        """
+        Resolve tool documents for every step of a workflow.
+
+        Args:
+            workflow: Parsed top-level workflow
+            base_path: Directory for resolving relative local references
+            inline_documents: Packed `$graph` entries keyed by id
+
+        Returns:
+            ToolResolution with tools and sub-workflows keyed by step_id
+        """
+        inline_documents = inline_documents or {}
+        root_dir = Path(base_path or self.parser.base_path).resolve()
+        root = ToolReference("root", "")
+
+        documents: Dict[ToolReference, Any] = {}
+        errors: Dict[ToolReference, str] = {}
+        versions: Dict[ToolReference, Optional[str]] = {}
+        step_refs: Dict[ToolReference, Dict[str, ToolReference]] = {}
+        parsed_workflows: Dict[ToolReference, CWLWorkflow] = {root: workflow}
+
+        # Breadth-first: every level of references is fetched in one batch
+        pending = [root]
+        depth = 0
+        while pending and depth <= self.MAX_DEPTH:
+            to_fetch: Dict[ToolReference, None] = {}
+            for parent in pending:
+                refs = {}
+                for step_id, step in parsed_workflows[parent].steps.items():
+                    if isinstance(step.run, dict):
+                        # Embedded document: children resolve relative to the parent
+                        ref = ToolReference(parent.kind, f"{parent.location}#{step_id}", parent.bucket)
+                        documents[ref] = self._build_document(step.run, errors, ref)
+                    else:
+                        ref = self._make_reference(step.run, parent, root_dir)
+                        if ref.kind == "inline":
+                            if ref not in documents and ref not in errors:
+                                entry = inline_documents.get(ref.location)
+                                if entry is None:
+                                    errors[ref] = f"inline reference '#{ref.location}' not found"
+                                else:
+                                    documents[ref] = self._build_document(entry, errors, ref)
+                        elif ref not in documents and ref not in errors:
+                            to_fetch[ref] = None
+                    refs[step_id] = ref
+                step_refs[parent] = refs
+
+            for ref, result in zip(to_fetch, self._fetch_all(list(to_fetch))):
+                if isinstance(result, Exception):
+                    errors[ref] = str(result)
+                    versions[ref] = None
+                else:
+                    versions[ref], documents[ref] = result
+
+            # Queue newly discovered sub-workflows for the next level
+            next_pending = []
+            for parent in pending:
+                for ref in step_refs[parent].values():
+                    doc = documents.get(ref)
+                    if isinstance(doc, CWLWorkflow) and ref not in parsed_workflows:
+                        parsed_workflows[ref] = doc
+                        next_pending.append(ref)
+            pending = next_pending
+            depth += 1
+
+        built: Dict[ToolReference, ParsedWorkflow] = {}
+        error_messages: List[str] = []
+        resolution = self._assemble(root, step_refs, documents, errors, built, error_messages, set())
+        return ToolResolution(
+            tools=resolution[0],
+            subworkflows=resolution[1],
+            errors=error_messages,
+            versions=versions,
+        )
+
+    def is_current(self, versions: Dict[ToolReference, Optional[str]]) -> bool:
+        """
+        Check that fetched tool documents are unchanged since a resolution.
+
+        Only ETags (file mtime/size) are read, concurrently; documents are
+        not downloaded. A reference that could not be checked counts as changed.
+
+        Args:
+            versions: ToolResolution.versions of the earlier resolution
+
+        Returns:
+            True if every document still has the recorded version
+        """
+        if not versions:
+            return True
+        refs = list(versions)
+        if len(refs) == 1:
+            current = [self._version_safe(refs[0])]
+        else:
+            current = list(self._get_executor().map(self._version_safe, refs))
+        return all(
+            not isinstance(version, Exception) and version == versions[ref]
+            for ref, version in zip(refs, current)
+        )
+
+    def _assemble(
+        self,
+        parent: ToolReference,
+        step_refs: Dict[ToolReference, Dict[str, ToolReference]],
+        documents: Dict[ToolReference, Any],
+        errors: Dict[ToolReference, str],
+        built: Dict[ToolReference, ParsedWorkflow],
+        error_messages: List[str],
+        ancestors: set,
+        prefix: str = "",
+    ) -> Tuple[Dict[str, CWLCommandLineTool], Dict[str, ParsedWorkflow]]:
+        """Attach resolved documents to their steps, building sub-workflows bottom-up."""
+        tools: Dict[str, CWLCommandLineTool] = {}
+        subworkflows: Dict[str, ParsedWorkflow] = {}
+
+        for step_id, ref in step_refs.get(parent, {}).items():
+            doc = documents.get(ref)
+            if isinstance(doc, CWLCommandLineTool):
+                tools[step_id] = doc
+            elif isinstance(doc, CWLWorkflow):
+                if ref in ancestors:
+                    error_messages.append(f"Step '{prefix}{step_id}' creates a cyclic sub-workflow reference")
+                    continue
+                if ref not in built:
+                    sub_tools, sub_workflows = self._assemble(
+                        ref, step_refs, documents, errors, built,
+                        error_messages, ancestors | {ref}, f"{prefix}{step_id}/",
+                    )
+                    built[ref] = self.parser.build_parsed_workflow(doc, sub_tools, sub_workflows)
+                subworkflows[step_id] = built[ref]
+            else:
+                reason = errors.get(ref, "unsupported document class")
+                error_messages.append(f"Step '{prefix}{step_id}' tool could not be resolved: {reason}")
+
+        return tools, subworkflows
+
+    def _make_reference(
+        self,
+        run: str,
+        parent: ToolReference,
+        root_dir: Path,
+    ) -> ToolReference:
+        """Turn a `run:` string into a canonical reference relative to its parent."""
+        if run.startswith("#"):
+            return ToolReference("inline", run[1:])
+
+        if run.startswith("minio://"):
+            bucket, _, key = run[len("minio://"):].partition("/")
+            return ToolReference("minio", _normalize_key(key), bucket)
+
+        if run.startswith("file://"):
+            run = run[len("file://"):]
+
+        if parent.kind == "minio":
+            key = PurePosixPath(parent.location.split("#")[0]).parent / run
+            return ToolReference("minio", _normalize_key(str(key)), parent.bucket)
+
+        if parent.kind == "local":
+            base_dir = Path(parent.location.split("#")[0]).parent
+        else:
+            base_dir = root_dir
+        local_path = (base_dir / run).resolve()
+
+        # Documents loaded from disk only reference other files on disk;
+        # the top-level workflow falls back to the workflow-tool bucket
+        if parent.kind == "local" or local_path.exists():
+            return ToolReference("local", str(local_path))
+        return ToolReference("minio", _normalize_key(run), self.bucket)
+
+    def _fetch_all(self, refs: List[ToolReference]) -> List[Any]:
+        """Fetch and parse independent references concurrently."""
+        if not refs:
+            return []
+        if len(refs) == 1:
+            return [self._fetch_safe(refs[0])]
+        return list(self._get_executor().map(self._fetch_safe, refs))
+
+    def _fetch_safe(self, ref: ToolReference) -> Any:
+        try:
+            return self._fetch(ref)
+        except Exception as e:
+            logger.warning(f"Failed to resolve tool {ref.location}: {e}")
+            return e
+
+    def _version(self, ref: ToolReference) -> str:
+        """ETag of a document (mtime/size for local files)."""
+        if ref.kind == "local":
+            stat = Path(ref.location).stat()
+            return f"{stat.st_mtime_ns}-{stat.st_size}"
+        etag = self.storage.get_object_etag(ref.bucket, ref.location)
+        if etag is None:
+            raise FileNotFoundError(f"{ref.bucket}/{ref.location} not found")
+        return etag
+
+    def _version_safe(self, ref: ToolReference) -> Any:
+        try:
+            return self._version(ref)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            return e
+
+    def _fetch(self, ref: ToolReference) -> Tuple[str, Any]:
+        """Fetch one document, reusing the cached parse when its ETag is unchanged."""
+        etag = self._version(ref)
+
+        with self._cache_lock:
+            cached = self._cache.get(ref)
+            if cached and cached[0] == etag:
+                self._cache.move_to_end(ref)
+                return cached
+
+        if ref.kind == "local":
+            content = Path(ref.location).read_text(encoding="utf-8")
+        else:
+            content = self.storage.download_file(ref.bucket, ref.location).decode("utf-8")
+
+        errors: Dict[ToolReference, str] = {}
+        document = self._build_document(self.parser.parse_yaml(content), errors, ref)
+        if document is None:
+            raise ValueError(errors.get(ref, "unsupported document"))
+
+        with self._cache_lock:
+            self._cache[ref] = (etag, document)
+            self._cache.move_to_end(ref)
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+        return etag, document
+
+    def _build_document(
+        self,
+        data: Any,
+        errors: Dict[ToolReference, str],
+        ref: ToolReference,
+    ) -> Optional[Any]:
+        """Build a CommandLineTool or Workflow model from a loaded document."""
+        doc_class = data.get("class") if isinstance(data, dict) else None
+        if doc_class == "CommandLineTool":
+            tool = self.parser.build_tool(data)
+            if tool is None:
+                errors[ref] = "invalid CommandLineTool document"
+            return tool
+        if doc_class == "Workflow":
+            try:
+                return self.parser.build_workflow(data)
+            except Exception as e:
+                errors[ref] = f"invalid Workflow document: {e}"
+                return None
+        errors[ref] = f"unsupported document class: {doc_class}"
+        return None
+
+    def clear_cache(self) -> None:
+        """Drop all cached tool documents."""
+        with self._cache_lock:
+            self._cache.clear()
+
+
+def _normalize_key(key: str) -> str:
+    """Normalize an object name (strip ./ and resolve ..)."""
+    parts: List[str] = []
+    for part in key.split("/"):
+        if part in ("", "."):
+            continue
+        if part == "..":
+            if parts:
+                parts.pop()
+            continue
+        parts.append(part)
+    return "/".join(parts)
@@ -1,22 +1,32 @@
 import logging
 import json
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from fastapi import WebSocket
 
+from app.services.shared_state import shared_state
+
 logger = logging.getLogger(__name__)
 
+# Shared state channel of agent/chat WebSocket messages
+AGENT_CHANNEL = "agents"
+
 class WebSocketManager:
     """
     Manages WebSocket connections and broadcasts messages to clients.
     Maps client_id/run_id to active WebSocket connections.
+    Messages go through the shared state channel, so a client connected
+    to one API worker receives messages sent from any other.
     """
-    def __init__(self):
+    def __init__(self, state=None):
         # Map client_id -> WebSocket
         self.active_connections: Dict[str, WebSocket] = {}
+        self.state = state or shared_state
+        self.state.subscribe(AGENT_CHANNEL, self._deliver)
 
     async def connect(self, websocket: WebSocket, client_id: str):
         await websocket.accept()
         self.active_connections[client_id] = websocket
+        self.state.start()
         logger.info(f"WebSocket connected: {client_id}")
 
     def disconnect(self, client_id: str):
@@ -26,17 +36,23 @@ class WebSocketManager:
 
     async def send_message(self, client_id: str, message: Dict[str, Any]):
         """Sends a JSON message to a specific client."""
-        if client_id in self.active_connections:
-            try:
-                await self.active_connections[client_id].send_json(message)
-            except Exception as e:
-                logger.error(f"Failed to send message to {client_id}: {e}")
-                self.disconnect(client_id)
+        await self.state.publish(AGENT_CHANNEL, {"client_id": client_id, "message": message})
 
     async def broadcast(self, message: Dict[str, Any]):
         """Broadcasts a message to all connected clients."""
-        for client_id in list(self.active_connections.keys()):
-            await self.send_message(client_id, message)
+        await self.state.publish(AGENT_CHANNEL, {"client_id": None, "message": message})
+
+    async def _deliver(self, event: Dict[str, Any]):
+        """Send a published message to the matching clients of this worker."""
+        client_id: Optional[str] = event["client_id"]
+        targets: List[str] = [client_id] if client_id else list(self.active_connections.keys())
+        for target in targets:
+            if target in self.active_connections:
+                try:
+                    await self.active_connections[target].send_json(event["message"])
+                except Exception as e:
+                    logger.error(f"Failed to send message to {target}: {e}")
+                    self.disconnect(target)
 
 # Global instance
 manager = WebSocketManager()
@@ -42,19 +42,32 @@ CREATE TABLE IF NOT EXISTS conversation_history (
 );
 
 -- Executions table
--- Tracks workflow execution status
+-- Tracks workflow execution status (durable tier of the backend's execution store)
 CREATE TABLE IF NOT EXISTS executions (
-    execution_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    execution_id VARCHAR(64) PRIMARY KEY,
     workflow_id VARCHAR(255) NOT NULL,
     dag_id VARCHAR(255),
-    status VARCHAR(50) DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'success', 'partial_failure', 'failed')),
+    status VARCHAR(50) DEFAULT 'queued' CHECK (status IN ('queued', 'waiting_for_scheduler', 'running', 'success', 'partial_failure', 'failed')),
     overall_progress INTEGER DEFAULT 0,
     config JSONB DEFAULT '{}'::jsonb,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     completed_at TIMESTAMP WITH TIME ZONE,
     node_statuses JSONB DEFAULT '{}'::jsonb,
-    logs JSONB DEFAULT '[]'::jsonb
+    logs JSONB DEFAULT '[]'::jsonb,
+    record JSONB
+);
+
+-- Execution logs table
+-- Append-only log lines, one row per line, ordered by seq within an execution
+CREATE TABLE IF NOT EXISTS execution_logs (
+    execution_id VARCHAR(64) NOT NULL,
+    seq BIGINT NOT NULL,
+    ts TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    level VARCHAR(20) NOT NULL DEFAULT 'INFO',
+    node_id VARCHAR(255),
+    message TEXT NOT NULL,
+    PRIMARY KEY (execution_id, seq)
 );
 
 -- Indexes for common queries
@@ -62,6 +75,8 @@ CREATE INDEX IF NOT EXISTS idx_agent_sessions_upload_id ON agent_sessions(upload
 CREATE INDEX IF NOT EXISTS idx_conversation_history_session_id ON conversation_history(session_id);
 CREATE INDEX IF NOT EXISTS idx_executions_workflow_id ON executions(workflow_id);
 CREATE INDEX IF NOT EXISTS idx_executions_status ON executions(status);
+CREATE INDEX IF NOT EXISTS idx_execution_logs_node ON execution_logs(execution_id, node_id, seq);
+CREATE INDEX IF NOT EXISTS idx_execution_logs_level ON execution_logs(execution_id, level) WHERE level IN ('WARNING', 'ERROR');
 
 -- Updated at trigger function
 CREATE OR REPLACE FUNCTION update_updated_at_column()
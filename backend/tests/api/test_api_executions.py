@@ -114,3 +114,58 @@ class TestExecutionsAPI:
             assert "entities" in data
         finally:
             _executions.pop("exec_prov", None)
+
+
+class TestBroadcastStatusUpdate:
+
+    @pytest.mark.asyncio
+    async def test_task_log_lines_are_broadcast(self):
+        """Tailed task output reaches the WebSocket as log messages."""
+        from app.api.executions import _broadcast_status_update
+        exec_data = {
+            "execution_id": "exec_tail",
+            "status": ExecutionStatus.RUNNING,
+            "task_log_lines": [{
+                "timestamp": "2026-01-01T00:00:00",
+                "level": "INFO",
+                "message": "epoch 1/10",
+                "node_id": "train",
+            }],
+        }
+
+        with patch("app.api.executions.manager.broadcast", new_callable=AsyncMock) as broadcast:
+            await _broadcast_status_update(exec_data)
+
+        messages = [call.args[0] for call in broadcast.await_args_list]
+        assert {
+            "type": "log",
+            "timestamp": "2026-01-01T00:00:00",
+            "level": "INFO",
+            "message": "epoch 1/10",
+            "node_id": "train",
+        } in messages
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status", list(ExecutionStatus))
+    async def test_every_status_is_broadcast(self, status):
+        """Updates in any status broadcast without errors; terminal ones complete."""
+        from app.api.executions import _broadcast_status_update
+        exec_data = {
+            "execution_id": "exec_status",
+            "status": status,
+            "overall_progress": 50,
+            "queue_position": 2,
+            "node_statuses": {"train": {"status": "running", "progress": 50}},
+            "logs": [{"timestamp": "2026-01-01T00:00:00", "level": "INFO", "message": "update"}],
+        }
+
+        with patch("app.api.executions.manager.broadcast", new_callable=AsyncMock) as broadcast:
+            await _broadcast_status_update(exec_data)
+
+        types = [call.args[0]["type"] for call in broadcast.await_args_list]
+        assert "progress" in types and "log" in types
+        terminal = status in (ExecutionStatus.SUCCESS, ExecutionStatus.PARTIAL_FAILURE, ExecutionStatus.FAILED)
+        assert ("execution_complete" in types) == terminal
+        if terminal:
+            assert types[-1] == "execution_complete"
+            assert broadcast.await_args_list[-1].args[0]["status"] == status.value
@@ -0,0 +1,127 @@
+"""
+Benchmark: CWL YAML loading with the libyaml C loader vs the pure-Python loader.
+
+Runs CWLParser.parse_yaml over the prompt_engineering/Step2 samples and over
+synthetic workflows with large InitialWorkDirRequirement listings, checks that
+both loaders produce identical documents, and prints the timings.
+
+Usage:
+    cd backend && python tests/benchmark_cwl_yaml.py [--repeat N]
+"""
+
+import sys
+import os
+import time
+import argparse
+import textwrap
+from pathlib import Path
+
+import yaml
+
+# Helper to set up environment
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(current_dir, '..'))
+
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app.services.cwl_parser import CWLParser
+
+SAMPLES_DIR = Path(backend_dir) / "prompt_engineering" / "Step2"
+
+
+def make_synthetic_workflow(num_steps: int, script_lines: int) -> str:
+    """Build a Workflow document with inline tools embedding Dockerfiles and scripts."""
+    script = "\n".join(
+        f"print('processing line {i}', {i} * 2)" for i in range(script_lines)
+    )
+    dockerfile = "\n".join(
+        ["FROM python:3.11-slim"] + [f"RUN pip install package-{i}" for i in range(script_lines // 10)]
+    )
+    lines = [
+        "cwlVersion: v1.2",
+        "class: Workflow",
+        f"id: synthetic-{num_steps}",
+        "inputs:",
+        "  input_data: Directory",
+        "outputs:",
+        "  result:",
+        "    type: Directory",
+        f"    outputSource: step_{num_steps - 1}/out_dir",
+        "steps:",
+    ]
+    for i in range(num_steps):
+        source = "input_data" if i == 0 else f"step_{i - 1}/out_dir"
+        lines.extend([
+            f"  step_{i}:",
+            "    in:",
+            f"      in_dir: {source}",
+            "    out: [out_dir]",
+            "    run:",
+            "      class: CommandLineTool",
+            "      baseCommand: [python, run.py]",
+            "      requirements:",
+            "        DockerRequirement:",
+            f"          dockerImageId: synthetic-tool-{i}",
+            "          dockerFile: |",
+            textwrap.indent(dockerfile, " " * 12),
+            "        InitialWorkDirRequirement:",
+            "          listing:",
+            "            - entryname: run.py",
+            "              entry: |",
+            textwrap.indent(script, " " * 16),
+            "      inputs:",
+            "        in_dir:",
+            "          type: Directory",
+            "          inputBinding: {prefix: --input}",
+            "      outputs:",
+            "        out_dir:",
+            "          type: Directory",
+            "          outputBinding: {glob: output}",
+        ])
+    return "\n".join(lines) + "\n"
+
+
+def time_loader(parser: CWLParser, documents, repeat: int) -> float:
+    """Return the best-of-N wall time (seconds) to load all documents once."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in documents:
+            parser.parse_yaml(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(repeat: int):
+    fast_parser = CWLParser()
+    pure_parser = CWLParser(yaml_loader=yaml.SafeLoader)
+
+    if fast_parser.yaml_loader is yaml.SafeLoader:
+        print("WARNING: libyaml is not available, both runs use the pure-Python loader")
+
+    cases = {
+        "Step2 samples": [p.read_text() for p in sorted(SAMPLES_DIR.glob("*.cwl"))],
+        "synthetic 20 steps": [make_synthetic_workflow(20, 100)],
+        "synthetic 100 steps": [make_synthetic_workflow(100, 200)],
+    }
+
+    print(f"\n=== CWL YAML loading ({fast_parser.yaml_loader.__name__} vs SafeLoader, best of {repeat}) ===")
+    print(f"{'case':<22}{'size (KB)':>12}{'C (ms)':>12}{'Python (ms)':>14}{'speedup':>10}")
+
+    for name, documents in cases.items():
+        # Semantics must be identical before timings mean anything
+        for doc in documents:
+            assert fast_parser.parse_yaml(doc) == pure_parser.parse_yaml(doc), f"Mismatch in {name}"
+
+        size_kb = sum(len(doc) for doc in documents) / 1024
+        fast = time_loader(fast_parser, documents, repeat)
+        pure = time_loader(pure_parser, documents, repeat)
+        print(f"{name:<22}{size_kb:>12.1f}{fast * 1000:>12.2f}{pure * 1000:>14.2f}{pure / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark CWL YAML loaders")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Repetitions per case")
+    args = arg_parser.parse_args()
+    run_benchmark(args.repeat)
@@ -1,7 +1,10 @@
+import json
+import time
+import base64
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 import httpx
-from app.services.airflow_client import AirflowClient, TaskInstanceState
+from app.services.airflow_client import AirflowClient, AirflowTokenAuth, TaskInstanceState
 
 
 class TestAirflowClient:
@@ -18,28 +21,94 @@ class TestAirflowClient:
         mock_response = MagicMock()
         mock_response.status_code = 200
 
-        with patch("httpx.AsyncClient") as mock_cls:
-            mock_instance = AsyncMock()
-            mock_cls.return_value = mock_instance
-            mock_instance.__aenter__ = AsyncMock(return_value=mock_instance)
-            mock_instance.__aexit__ = AsyncMock(return_value=None)
-            mock_instance.get = AsyncMock(return_value=mock_response)
+        mock_http = AsyncMock()
+        mock_http.get = AsyncMock(return_value=mock_response)
+        mock_http.is_closed = False
+        client._client = mock_http
 
-            result = await client.health_check()
-            assert result is True
+        result = await client.health_check()
+        assert result is True
+        # Health checks are unauthenticated
+        assert mock_http.get.call_args.kwargs["auth"] is None
 
     @pytest.mark.asyncio
     async def test_health_check_failure(self, client):
         """Test health check returns False on connection error."""
-        with patch("httpx.AsyncClient") as mock_cls:
-            mock_instance = AsyncMock()
-            mock_cls.return_value = mock_instance
-            mock_instance.__aenter__ = AsyncMock(return_value=mock_instance)
-            mock_instance.__aexit__ = AsyncMock(return_value=None)
-            mock_instance.get = AsyncMock(side_effect=httpx.ConnectError("Connection refused"))
+        mock_http = AsyncMock()
+        mock_http.get = AsyncMock(side_effect=httpx.ConnectError("Connection refused"))
+        mock_http.is_closed = False
+        client._client = mock_http
 
-            result = await client.health_check()
-            assert result is False
+        result = await client.health_check()
+        assert result is False
+
+    # --- shared client and token refresh ---
+
+    def _jwt(self, exp: float) -> str:
+        """Build an unsigned JWT with an exp claim."""
+        payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+        return f"header.{payload}.signature"
+
+    def _transport_client(self, client, handler):
+        """Install a pooled client whose requests go to a mock transport."""
+        client._client = httpx.AsyncClient(
+            base_url=client.api_base,
+            auth=AirflowTokenAuth(client),
+            transport=httpx.MockTransport(handler),
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_client_is_reused(self, client):
+        """Test all requests share one pooled client until close()."""
+        first = await client._get_client()
+        assert await client._get_client() is first
+
+        await client.close()
+        assert first.is_closed
+        assert await client._get_client() is not first
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_token_refreshed_before_expiry(self, client):
+        """Test a token about to expire is replaced before the request is sent."""
+        tokens = [self._jwt(time.time() + 30), self._jwt(time.time() + 3600)]
+        seen = []
+
+        def handler(request):
+            if request.url.path == "/auth/token":
+                return httpx.Response(200, json={"access_token": tokens.pop(0)})
+            seen.append(request.headers["Authorization"])
+            return httpx.Response(200, json={"dags": []})
+
+        self._transport_client(client, handler)
+        for _ in range(3):
+            await client.get_dags()
+
+        # The first token expires within the refresh margin, the second does not
+        assert seen[0] != seen[1] and seen[1] == seen[2]
+        assert tokens == []
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_unauthorized_request_retried_once_with_new_token(self, client):
+        """Test a 401 fetches a new token and retries the request once."""
+        tokens = [self._jwt(time.time() + 3600), self._jwt(time.time() + 3600) + "2"]
+        requests = []
+
+        def handler(request):
+            if request.url.path == "/auth/token":
+                return httpx.Response(200, json={"access_token": tokens.pop(0)})
+            requests.append(request.headers["Authorization"])
+            if len(requests) == 1:
+                return httpx.Response(401)
+            return httpx.Response(200, json={"dag_run_id": "run_1", "state": "running"})
+
+        self._transport_client(client, handler)
+        result = await client.get_dag_run("test_dag", "run_1")
+
+        assert result["state"] == "running"
+        assert len(requests) == 2 and requests[0] != requests[1]
+        await client.close()
 
     # --- trigger_dag ---
 
@@ -109,6 +178,42 @@ class TestAirflowClient:
         result = await client.get_dag_run("test_dag", "nonexistent")
         assert result is None
 
+    @pytest.mark.asyncio
+    async def test_wait_for_dag_backs_off_until_registered(self, client):
+        """Test DAG registration is polled with growing intervals."""
+        client.get_dag = AsyncMock(side_effect=[None, None, None, {"dag_id": "test_dag"}])
+
+        with patch("app.services.airflow_client.asyncio.sleep", new=AsyncMock()) as sleep:
+            result = await client.wait_for_dag("test_dag", timeout=60)
+
+        assert result == {"dag_id": "test_dag"}
+        assert [call.args[0] for call in sleep.await_args_list] == [0.25, 0.5, 1.0]
+
+    @pytest.mark.asyncio
+    async def test_wait_for_dag_gives_up_at_deadline(self, client):
+        """Test waiting returns None once the deadline passed."""
+        client.get_dag = AsyncMock(return_value=None)
+
+        result = await client.wait_for_dag("test_dag", timeout=0)
+
+        assert result is None
+        client.get_dag.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_set_dag_run_state_patches_run(self, client):
+        """Test a DAG run is stopped by patching its state."""
+        mock_response = MagicMock()
+        mock_response.raise_for_status = MagicMock()
+
+        mock_http = AsyncMock()
+        mock_http.patch = AsyncMock(return_value=mock_response)
+        mock_http.is_closed = False
+        client._client = mock_http
+        client._token = "fake-token"
+
+        assert await client.set_dag_run_state("test_dag", "run_123", "failed") is True
+        mock_http.patch.assert_awaited_once_with("/dags/test_dag/dagRuns/run_123", json={"state": "failed"})
+
     # --- calculate_progress ---
 
     def test_calculate_progress_all_complete(self, client):
@@ -145,3 +250,50 @@ class TestAirflowClient:
     def test_map_task_state_failed(self, client):
         """Test mapping failed state."""
         assert client.map_task_state("failed") == "error"
+
+    # --- batch queries ---
+
+    @pytest.mark.asyncio
+    async def test_list_task_instances_follows_pages(self, client):
+        """Test batch task instance queries read every page."""
+        client.PAGE_LIMIT = 2
+        bodies = []
+
+        def handler(request):
+            if request.url.path == "/auth/token":
+                return httpx.Response(200, json={"access_token": self._jwt(time.time() + 3600)})
+            body = json.loads(request.content)
+            bodies.append(body)
+            tis = [{"task_id": f"t{i}"} for i in range(5)]
+            page = tis[body["page_offset"]:body["page_offset"] + body["page_limit"]]
+            return httpx.Response(200, json={"task_instances": page, "total_entries": 5})
+
+        self._transport_client(client, handler)
+        result = await client.list_task_instances(["dag"], ["run_1", "run_2"])
+
+        assert [t["task_id"] for t in result] == ["t0", "t1", "t2", "t3", "t4"]
+        assert [b["page_offset"] for b in bodies] == [0, 2, 4]
+        assert bodies[0]["dag_run_ids"] == ["run_1", "run_2"]
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_get_task_log_chunk_sends_token(self, client):
+        """Test log chunks are requested from the continuation token on."""
+        params = []
+
+        def handler(request):
+            if request.url.path == "/auth/token":
+                return httpx.Response(200, json={"access_token": self._jwt(time.time() + 3600)})
+            params.append(dict(request.url.params))
+            return httpx.Response(200, json={
+                "content": [{"event": "epoch 3"}, {"event": "epoch 4\nepoch 5"}],
+                "continuation_token": "token_2",
+            })
+
+        self._transport_client(client, handler)
+        lines, token = await client.get_task_log_chunk("dag", "run_1", "infer", 1, "token_1", map_index=2)
+
+        assert lines == ["epoch 3", "epoch 4", "epoch 5"]
+        assert token == "token_2"
+        assert params == [{"full_content": "false", "token": "token_1", "map_index": "2"}]
+        await client.close()
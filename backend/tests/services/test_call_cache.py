@@ -0,0 +1,133 @@
+import os
+import pytest
+from app.models.plan import ExecutionPlan, PlannedStep
+from app.services import call_cache as call_cache_module
+from app.services.call_cache import CallCache, path_fingerprint
+from app.services.database_sqlite import SQLiteDB
+
+
+def make_plan(execution_id, tool="seg.cwl", config=None):
+    steps = {
+        "convert": PlannedStep(
+            step_id="convert", task_id="convert", run="convert.cwl",
+            tool_document={"class": "CommandLineTool", "baseCommand": ["convert"]},
+        ),
+        "segment": PlannedStep(
+            step_id="segment", task_id="segment", run=tool, dependencies=("convert",),
+            tool_document={"class": "CommandLineTool", "baseCommand": [tool]},
+        ),
+    }
+    return ExecutionPlan(
+        workflow_id="wf",
+        execution_id=execution_id,
+        config=config or {},
+        steps=steps,
+        step_order=tuple(steps),
+    )
+
+
+class TestCallCache:
+
+    @pytest.fixture
+    def data_root(self, tmp_path, monkeypatch):
+        root = tmp_path / "data"
+        monkeypatch.setattr(call_cache_module, "DATA_ROOT", str(root))
+        return root
+
+    @pytest.fixture
+    def cache(self, tmp_path, data_root):
+        cache = CallCache(db=SQLiteDB(db_path=str(tmp_path / "cache.db")))
+        cache.image_digest = lambda image: image
+        return cache
+
+    def upload(self, data_root, execution_id, content):
+        folder = data_root / "input" / execution_id
+        folder.mkdir(parents=True)
+        (folder / "scan.nii").write_text(content)
+
+    def run(self, cache, data_root, plan):
+        keys = cache.step_keys(plan, lambda step: True)
+        for step in plan.steps.values():
+            (data_root / "output" / plan.execution_id / step.task_id).mkdir(parents=True)
+        cache.record(plan, keys, list(plan.steps))
+        return keys
+
+    def test_identical_inputs_hit(self, cache, data_root):
+        """Test a rerun with the same input content reuses every step."""
+        self.upload(data_root, "exec_1", "scan")
+        self.run(cache, data_root, make_plan("exec_1"))
+        self.upload(data_root, "exec_2", "scan")
+
+        keys = cache.step_keys(make_plan("exec_2"), lambda step: True)
+
+        assert cache.lookup(keys) == {"convert": "exec_1/convert", "segment": "exec_1/segment"}
+
+    def test_changes_invalidate_downstream(self, cache, data_root):
+        """Test changed inputs miss everywhere and a changed tool misses from that step on."""
+        self.upload(data_root, "exec_1", "scan")
+        self.run(cache, data_root, make_plan("exec_1"))
+        self.upload(data_root, "exec_2", "other scan")
+        self.upload(data_root, "exec_3", "scan")
+
+        changed_input = cache.step_keys(make_plan("exec_2"), lambda step: True)
+        changed_tool = cache.step_keys(make_plan("exec_3", tool="seg2.cwl"), lambda step: True)
+
+        assert cache.lookup(changed_input) == {}
+        assert cache.lookup(changed_tool) == {"convert": "exec_1/convert"}
+
+    def test_ignored_config_and_uncacheable_upstream(self, cache, data_root):
+        """Test force_rerun does not change keys and steps below uncacheable ones are not keyed."""
+        plan = make_plan("exec_1")
+
+        assert cache.step_keys(plan, lambda step: True) == cache.step_keys(
+            make_plan("exec_1", config={"force_rerun": True}), lambda step: True
+        )
+        assert cache.step_keys(plan, lambda step: step.step_id != "convert") == {}
+
+    def test_missing_outputs_are_invalidated(self, cache, data_root):
+        """Test entries whose output directory is gone are dropped on lookup."""
+        keys = self.run(cache, data_root, make_plan("exec_1"))
+        (data_root / "output" / "exec_1" / "segment").rmdir()
+
+        assert cache.lookup(keys) == {"convert": "exec_1/convert"}
+        assert cache.db.get_call_cache_entries([keys["segment"]]) == {}
+        assert cache.invalidate(workflow_id="wf") == 1
+
+    def test_path_fingerprint_ignores_location(self, tmp_path):
+        """Test identical trees in different folders share a fingerprint."""
+        for name in ("a", "b"):
+            (tmp_path / name / "sub").mkdir(parents=True)
+            (tmp_path / name / "sub" / "x.txt").write_text("x")
+
+        assert path_fingerprint(str(tmp_path / "a")) == path_fingerprint(str(tmp_path / "b"))
+        assert path_fingerprint(str(tmp_path / "missing")) is None
+
+    def test_path_fingerprint_covers_whole_file(self, tmp_path):
+        """Test a same-size edit in the middle of a large file changes its fingerprint."""
+        volume = tmp_path / "volume.raw"
+        data = bytearray(5 * 1024 * 1024)
+        volume.write_bytes(bytes(data))
+        before = path_fingerprint(str(volume))
+
+        data[len(data) // 2] = 1
+        volume.write_bytes(bytes(data))
+
+        assert path_fingerprint(str(volume)) != before
+
+    def test_file_digests_are_cached_by_mtime_and_size(self, tmp_path, monkeypatch):
+        """Test unchanged files are not read again and modified files are."""
+        path = tmp_path / "scan.nii"
+        path.write_bytes(b"a" * 1024)
+        first = path_fingerprint(str(path))
+
+        opened = []
+        real_open = open
+        monkeypatch.setattr("builtins.open", lambda *args, **kwargs: opened.append(args[0]) or real_open(*args, **kwargs))
+        assert path_fingerprint(str(path)) == first
+        assert opened == []
+
+        path.write_bytes(b"b" * 1024)
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert path_fingerprint(str(path)) != first
+        assert opened == [str(path)]
@@ -0,0 +1,139 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock, patch
+from app.services.compile_cache import CompileCache, diff_graphs
+from app.services.cwl_parser import CWLParser
+from app.services.dag_generator import DAGGenerator
+from app.services.docker_builder import DockerBuilder
+from app.services.execution_engine import ExecutionEngine
+from app.services.plan_compiler import PlanCompiler
+
+
+def make_graph(label="Segment", x=100, target_handle="in-0"):
+    return {
+        "nodes": [
+            {"id": "input-1", "type": "measurement", "position": {"x": 0, "y": 0},
+             "data": {"label": "Input", "status": "completed"}},
+            {"id": "segment", "type": "tool", "position": {"x": x, "y": 0},
+             "data": {"label": label, "status": "pending"}},
+        ],
+        "edges": [
+            {"id": "e1", "source": "input-1", "target": "segment",
+             "source_handle": "out-0", "target_handle": target_handle},
+        ],
+    }
+
+
+WORKFLOW_CWL = """
+cwlVersion: v1.2
+class: Workflow
+id: cached-workflow
+inputs:
+  data: File
+outputs: {{}}
+steps:
+  segment:
+    run:
+      class: CommandLineTool
+      baseCommand: segment
+      requirements:
+        DockerRequirement: {{dockerPull: "veriflow/segment:{version}"}}
+      inputs: {{data: File}}
+      outputs: {{out: File}}
+    in: {{data: data}}
+    out: [out]
+  report:
+    run:
+      class: CommandLineTool
+      baseCommand: report
+      requirements:
+        DockerRequirement: {{dockerPull: "veriflow/report:1.0"}}
+      inputs: {{data: File}}
+      outputs: {{out: File}}
+    in: {{data: segment/out}}
+    out: [out]
+"""
+
+
+class TestCompileCache:
+
+    def test_diff_ignores_layout_and_status(self):
+        """Test moving nodes or status updates are not semantic changes."""
+        old = make_graph(x=100)
+        new = make_graph(x=400)
+        new["nodes"][1]["data"]["status"] = "running"
+
+        assert diff_graphs(old, new).has_changes is False
+
+    def test_diff_detects_changed_nodes_and_edges(self):
+        """Test edited nodes and rewired ports are reported."""
+        diff = diff_graphs(make_graph(), make_graph(label="Segment v2"))
+        assert diff.changed == ["segment"]
+        assert diff.edges_changed is False
+
+        diff = diff_graphs(make_graph(), make_graph(target_handle="in-1"))
+        assert diff.changed == ["segment"]
+        assert diff.edges_changed is True
+
+        new = make_graph()
+        new["nodes"].append({"id": "report", "type": "tool", "position": {"x": 0, "y": 0}, "data": {}})
+        assert diff_graphs(make_graph(), new).added == ["report"]
+
+    def test_parse_cache_keyed_by_cwl(self):
+        """Test parse results are reused only for identical CWL text."""
+        cache = CompileCache()
+        cwl = WORKFLOW_CWL.format(version="1.0")
+        result = CWLParser().parse_workflow(cwl)
+
+        fingerprints = cache.store_parse("wf", cwl, result)
+
+        assert set(fingerprints) == {"segment", "report"}
+        assert cache.get_parse("wf", cwl) is result
+        assert cache.get_parse("wf", WORKFLOW_CWL.format(version="2.0")) is None
+
+    def test_graph_update_invalidates_only_changed_steps(self):
+        """Test a node edit evicts its step artifacts and keeps the others."""
+        cache = CompileCache()
+        cache.store_step("wf", "segment", "fp-1", dockerfile="FROM a")
+        cache.store_step("wf", "report", "fp-2", dockerfile="FROM b")
+
+        cache.apply_graph_update("wf", make_graph(), make_graph(x=999))
+        assert set(cache.get_steps("wf", {"segment": "fp-1", "report": "fp-2"})) == {"segment", "report"}
+
+        diff = cache.apply_graph_update("wf", make_graph(), make_graph(label="Segment v2"))
+        assert diff.changed == ["segment"]
+        assert set(cache.get_steps("wf", {"segment": "fp-1", "report": "fp-2"})) == {"report"}
+
+    @pytest.mark.asyncio
+    async def test_engine_recompiles_only_changed_steps(self, tmp_path):
+        """Test re-running skips parsing and re-resolves only edited steps."""
+        parser = CWLParser()
+        compiler = PlanCompiler(parser)
+        engine = ExecutionEngine(
+            cwl_parser=parser,
+            dag_generator=DAGGenerator(dags_path=tmp_path),
+            airflow_client=MagicMock(),
+            docker_builder=DockerBuilder(),
+            plan_compiler=compiler,
+            compile_cache=CompileCache(),
+        )
+
+        with patch.object(parser, "parse_workflow", wraps=parser.parse_workflow) as parse, \
+                patch.object(compiler, "resolve_requirements", wraps=compiler.resolve_requirements) as resolve:
+            first = await engine.prepare_execution(WORKFLOW_CWL.format(version="1.0"), "wf")
+            assert first["success"] is True
+            assert parse.call_count == 1
+            assert resolve.call_count == 2
+
+            # Unchanged CWL: no parse, no requirement resolution
+            await engine.prepare_execution(WORKFLOW_CWL.format(version="1.0"), "wf")
+            assert parse.call_count == 1
+            assert resolve.call_count == 2
+
+            # One step edited: only that step is resolved again
+            result = await engine.prepare_execution(WORKFLOW_CWL.format(version="2.0"), "wf")
+            assert parse.call_count == 2
+            assert [c.args[1] for c in resolve.call_args_list[2:]] == ["segment"]
+
+        plan = engine.active_executions[result["execution_id"]]["plan"]
+        assert plan.steps["segment"].image == "veriflow/segment:2.0"
+        assert plan.steps["report"].image == "veriflow/report:1.0"
@@ -1,4 +1,6 @@
 import pytest
+import yaml
+from pathlib import Path
 from app.services.cwl_parser import CWLParser
 from app.models.cwl import CWLCommandLineTool, CWLInput, CWLOutput, DockerRequirement
 
@@ -21,6 +23,23 @@ class TestCWLParser:
         with pytest.raises(ValueError, match="Invalid YAML"):
             parser.parse_yaml("{{invalid yaml::")
 
+    def test_parse_yaml_prefers_c_loader(self, parser):
+        """Test the libyaml loader is used when PyYAML was built with it."""
+        if yaml.__with_libyaml__:
+            assert parser.yaml_loader is yaml.CSafeLoader
+        else:
+            assert parser.yaml_loader is yaml.SafeLoader
+
+    def test_parse_yaml_loaders_equivalent(self):
+        """Test the C and pure-Python loaders produce identical CWL documents."""
+        samples = Path(__file__).parents[2] / "prompt_engineering" / "Step2"
+        pure_parser = CWLParser(yaml_loader=yaml.SafeLoader)
+        fast_parser = CWLParser()
+
+        for cwl_file in samples.glob("*.cwl"):
+            content = cwl_file.read_text()
+            assert fast_parser.parse_yaml(content) == pure_parser.parse_yaml(content)
+
     # --- parse_workflow ---
 
     def test_parse_workflow_success(self, parser, sample_cwl_workflow):
@@ -2,6 +2,9 @@ import pytest
 from pathlib import Path
 from app.services.dag_generator import DAGGenerator
 from app.services.cwl_parser import CWLParser
+from app.services.plan_compiler import plan_compiler
+from app.models.cwl import ResourceRequirement
+from app.models.plan import PlannedStep
 
 
 class TestDAGGenerator:
@@ -66,7 +69,7 @@ class TestDAGGenerator:
         )
 
         assert 'dag_id="veriflow_test"' in code
-        assert "schedule_interval=None" in code
+        assert "schedule=None" in code
 
     def test_generate_dag_code_contains_tasks(self, generator, parsed_workflow):
         """Test generated code contains task definitions for steps."""
@@ -84,12 +87,55 @@ class TestDAGGenerator:
 
     def test_generate_bash_task(self, generator, parsed_workflow):
         """Test BashOperator task generation when no Docker image."""
-        step = parsed_workflow.workflow.steps["step1"]
-        code = generator._generate_bash_task("step1", step, "exec_abc", {})
+        plan = plan_compiler.compile(parsed_workflow, "exec_abc")
+        code = generator._generate_bash_task(plan.steps["step1"])
 
         assert "BashOperator" in code
         assert 'task_id="step1"' in code
 
+    def test_generate_docker_task_resource_limits(self, generator):
+        """Test container limits, pool slots and priority come from the plan."""
+        step = PlannedStep(
+            step_id="infer",
+            task_id="infer",
+            run="infer.cwl",
+            image="veriflow/infer:1.0",
+            resources=ResourceRequirement(coresMin=2, coresMax=4, ramMin=8192),
+            priority_weight=3,
+        )
+        code = generator._generate_docker_task(step)
+
+        assert f'pool="{generator.WORKER_POOL}"' in code
+        assert f"pool_slots={min(2, generator.WORKER_POOL_SLOTS)}" in code
+        assert "priority_weight=3" in code
+        assert 'weight_rule="absolute"' in code
+        assert '"cpus": 4.0' in code
+        assert '"mem_limit": \'8192m\'' in code
+        assert f'"shm_size": {int(8192 * generator.SHM_FRACTION) * 1024 * 1024}' in code
+
+    def test_generated_dag_defers_docker_imports(self, tmp_path, chain_workflow):
+        """Test generated DAGs run containers via the runtime, importing no Docker modules."""
+        plan = plan_compiler.compile(chain_workflow, "exec_abc")
+        code = DAGGenerator(dags_path=tmp_path)._generate_dag_code(
+            chain_workflow, "veriflow_test", "exec_abc", {}, plan=plan,
+        )
+
+        assert "from veriflow_runtime import run_container" in code
+        assert "python_callable=run_container" in code
+        assert "docker" not in "".join(line for line in code.splitlines() if "import" in line)
+        assert "BashOperator" not in code
+        assert "CONFIG =" not in code
+
+    def test_generated_dag_pushes_status_events(self, generator, parsed_workflow):
+        """Test task and DAG run state callbacks are wired to the runtime notifiers."""
+        code = generator._generate_dag_code(parsed_workflow, "veriflow_test", "exec_abc", {})
+
+        assert "'on_execute_callback': notify_task_running," in code
+        assert "'on_failure_callback': notify_task_failed," in code
+        assert "on_success_callback=notify_run_success," in code
+        assert "from veriflow_runtime import notify_task_running, notify_task_success" in code
+        compile(code, "<dag>", "exec")
+
     def test_generate_dependencies_linear(self, generator):
         """Test dependency generation for a linear chain."""
         deps = {"step2": ["step1"]}
@@ -99,6 +145,98 @@ class TestDAGGenerator:
         assert "step1 >> step2" in code
         assert "step2 >> end" in code
 
+    @pytest.fixture
+    def chain_workflow(self):
+        """Parse a workflow with a same-image chain feeding a different image."""
+        def tool(image):
+            return f"""
+      class: CommandLineTool
+      requirements:
+        DockerRequirement: {{dockerPull: "{image}"}}
+      inputs: {{data: File}}
+      outputs: {{out: File}}"""
+
+        cwl = f"""
+cwlVersion: v1.2
+class: Workflow
+id: chain-workflow
+inputs:
+  data: File
+outputs: {{}}
+steps:
+  dicom:
+    run:{tool("veriflow/mri:1.0")}
+    in: {{data: data}}
+    out: [out]
+  nifti:
+    run:{tool("veriflow/mri:1.0")}
+    in: {{data: dicom/out}}
+    out: [out]
+  normalize:
+    run:{tool("veriflow/mri:1.0")}
+    in: {{data: nifti/out}}
+    out: [out]
+  segment:
+    run:{tool("veriflow/segment:1.0")}
+    in: {{data: normalize/out}}
+    out: [out]
+"""
+        result = CWLParser().parse_workflow(cwl)
+        assert result.success
+        return result.workflow
+
+    def test_generate_cwl_task_runs_tool_with_cache(self, tmp_path, chain_workflow):
+        """Test steps with a resolved tool run through the cwltool runner image."""
+        generator = DAGGenerator(dags_path=tmp_path, task_runner="cwltool")
+        plan = plan_compiler.compile(chain_workflow, "exec_abc")
+        code = generator._generate_task(plan.steps["nifti"], plan.config)
+
+        assert f'"image": \'{generator.CWL_RUNNER_IMAGE}\'' in code
+        assert generator.CWL_STEP_SCRIPT in code
+        assert '"source": "dicom/out"' in code
+        assert f"'source': '{generator.CWL_CACHE_PATH}'" in code
+        assert "/var/run/docker.sock" in code
+
+        placeholder = DAGGenerator(dags_path=tmp_path, task_runner="placeholder")
+        assert '"image": \'veriflow/mri:1.0\'' in placeholder._generate_task(plan.steps["nifti"], plan.config)
+
+    def test_fusion_groups_same_image_chain(self, tmp_path, chain_workflow):
+        """Test linear same-image chains are fused and others are not."""
+        plan = plan_compiler.compile(chain_workflow, "exec_abc")
+
+        assert DAGGenerator(dags_path=tmp_path).fusion_groups(plan) == []
+        generator = DAGGenerator(dags_path=tmp_path, fuse_steps=True)
+        assert generator.fusion_groups(plan) == [("dicom", "nifti", "normalize")]
+
+    def test_fusion_groups_do_not_mix_tools_and_placeholders(self, tmp_path, chain_workflow):
+        """Test a step with a resolved tool is never fused with placeholder steps."""
+        plan = plan_compiler.compile(chain_workflow, "exec_abc")
+        plan = plan.model_copy(update={"steps": {
+            step_id: step.model_copy(update={"tool_document": None}) if step_id in ("nifti", "normalize") else step
+            for step_id, step in plan.steps.items()
+        }})
+        generator = DAGGenerator(dags_path=tmp_path, fuse_steps=True, task_runner="cwltool")
+
+        assert generator.fusion_groups(plan) == [("nifti", "normalize")]
+        code = generator._generate_tasks(plan, groups=generator.fusion_groups(plan))
+        assert generator.CWL_STEP_SCRIPT in code.split("# Task: dicom")[1].split("# Task:")[0]
+
+    def test_generate_fused_dag(self, tmp_path, chain_workflow):
+        """Test a fused chain becomes one task with per-step log markers."""
+        generator = DAGGenerator(dags_path=tmp_path, fuse_steps=True)
+        plan = plan_compiler.compile(chain_workflow, "exec_abc")
+        code = generator._generate_dag_code(
+            chain_workflow, "veriflow_test", "exec_abc", {}, plan=plan, parameterized=True,
+        )
+
+        assert 'task_id="dicom__normalize"' in code
+        assert 'task_id="nifti"' not in code
+        assert "VERIFLOW_STEP step=nifti event=start" in code
+        assert "start >> dicom__normalize" in code
+        assert "dicom__normalize >> segment" in code
+        assert generator._generate_shape_dag_id(chain_workflow, plan).endswith("_fused")
+        compile(code, "<dag>", "exec")
+
     def test_delete_dag_exists(self, generator, parsed_workflow, tmp_path):
         """Test deleting an existing DAG file."""
         dag_path = generator.generate_dag(parsed_workflow, "exec_del")
@@ -114,3 +252,143 @@ class TestDAGGenerator:
     def test_list_generated_dags_empty(self, generator):
         """Test listing DAGs in empty directory."""
         assert generator.list_generated_dags() == []
+
+    @pytest.fixture
+    def scatter_workflow(self):
+        """Parse a workflow whose first step scatters over subjects."""
+        cwl = """
+cwlVersion: v1.2
+class: Workflow
+id: scatter-workflow
+requirements:
+  ScatterFeatureRequirement: {}
+inputs:
+  subjects: File[]
+outputs: {}
+steps:
+  segment:
+    run: tools/step1.cwl
+    scatter: input_file
+    in:
+      input_file: subjects
+    out: [output_file]
+  report:
+    run: tools/step2.cwl
+    in:
+      input_file: segment/output_file
+    out: [output_file]
+"""
+        result = CWLParser().parse_workflow(cwl)
+        assert result.success
+        return result.workflow
+
+    def test_generate_scatter_task_maps_over_split(self, tmp_path, scatter_workflow):
+        """Test scatter steps expand as split -> mapped task -> gather."""
+        generator = DAGGenerator(dags_path=tmp_path, task_runner="placeholder")
+        code = generator._generate_dag_code(
+            workflow=scatter_workflow,
+            dag_id="veriflow_test",
+            execution_id="exec_abc",
+            config={"scatter_batch_size": 4},
+        )
+
+        assert "from veriflow_runtime import scatter_split, scatter_gather" in code
+        assert 'task_id="segment_split"' in code
+        assert ".expand(env=segment_split.output)" in code
+        assert '"batch_size": 4' in code
+        assert "segment_split >> segment >> segment_gather" in code
+        assert "start >> segment_split" in code
+        assert "segment_gather >> report" in code
+        compile(code, "<dag>", "exec")
+
+    def test_generate_scatter_task_runs_tool_per_batch(self, tmp_path):
+        """Test scatter batches of a resolved tool run through the CWL runner."""
+        cwl = """
+cwlVersion: v1.2
+class: Workflow
+id: scatter-tool-workflow
+requirements:
+  ScatterFeatureRequirement: {}
+inputs:
+  subjects: File[]
+outputs: {}
+steps:
+  segment:
+    run:
+      class: CommandLineTool
+      baseCommand: segment
+      requirements:
+        DockerRequirement: {dockerPull: "veriflow/segment:1.0"}
+      inputs: {data: File}
+      outputs: {out: File}
+    scatter: data
+    in: {data: subjects}
+    out: [out]
+"""
+        result = CWLParser().parse_workflow(cwl)
+        assert result.success
+        generator = DAGGenerator(dags_path=tmp_path, task_runner="cwltool")
+        plan = plan_compiler.compile(result.workflow, "exec_abc")
+        code = generator._generate_task(plan.steps["segment"], plan.config)
+
+        assert f'"image": \'{generator.CWL_RUNNER_IMAGE}\'' in code
+        assert generator.CWL_STEP_SCRIPT in code
+        assert '"baseCommand": "segment"' in code
+        assert "Executing segment" not in code
+        assert ".expand(op_args=segment_split.output.map(container_args))" in code
+
+    def test_generate_scatter_task_quotes_config_values(self, tmp_path, scatter_workflow):
+        """Test a user-supplied scatter glob is emitted as a literal, not as code."""
+        generator = DAGGenerator(dags_path=tmp_path, task_runner="placeholder")
+        glob = 'sub-*", "x": __import__("os").system("id"), "y": "'
+        code = generator._generate_dag_code(
+            workflow=scatter_workflow,
+            dag_id="veriflow_test",
+            execution_id="exec_abc",
+            config={"scatter_glob": glob},
+        )
+
+        assert f'"pattern": {glob!r},' in code
+        assert '"method": \'dotproduct\',' in code
+        compile(code, "<dag>", "exec")
+
+    def test_generate_scatter_without_tool_fails(self, tmp_path, scatter_workflow):
+        """Test the cwltool runner refuses scatter steps it cannot run per batch."""
+        generator = DAGGenerator(dags_path=tmp_path, task_runner="cwltool")
+
+        with pytest.raises(ValueError, match="segment"):
+            generator.generate_dag(workflow=scatter_workflow, execution_id="exec_abc")
+        assert generator.list_generated_dags() == []
+
+    def test_generate_dag_installs_runtime(self, generator, tmp_path):
+        """Test the runtime helpers are copied next to the DAGs but not listed."""
+        assert (tmp_path / "veriflow_runtime.py").exists()
+        assert generator.list_generated_dags() == []
+
+    def test_generate_shape_dag_reused_across_executions(self, generator, parsed_workflow, tmp_path):
+        """Test executions of the same workflow shape share one DAG file."""
+        first = plan_compiler.compile(parsed_workflow, "exec_1", {"subjects": [1]})
+        second = plan_compiler.compile(parsed_workflow, "exec_2", {"subjects": [2]})
+
+        dag_id, dag_path = generator.generate_shape_dag(parsed_workflow, first)
+        mtime = Path(dag_path).stat().st_mtime_ns
+        assert generator.generate_shape_dag(parsed_workflow, second) == (dag_id, dag_path)
+
+        # The file is not rewritten, so the scheduler does not re-parse it
+        assert Path(dag_path).stat().st_mtime_ns == mtime
+        assert len(generator.list_generated_dags()) == 1
+
+        code = Path(dag_path).read_text()
+        assert "exec_1" not in code
+        assert "dag_run.conf['steps']['step1']['env']" in code
+        assert "render_template_as_native_obj=True" in code
+        compile(code, "<dag>", "exec")
+
+    def test_shape_conf_carries_execution_values(self, parsed_workflow):
+        """Test the run conf holds what the parameterized DAG templates read."""
+        plan = plan_compiler.compile(parsed_workflow, "exec_1", {"subjects": [1]})
+        conf = plan.to_conf()
+
+        assert conf["execution_id"] == "exec_1"
+        assert conf["steps"]["step2"]["env"]["OUTPUT_PATH"] == "/data/output/exec_1/step2"
+        assert plan.shape_key == plan_compiler.compile(parsed_workflow, "exec_2").shape_key
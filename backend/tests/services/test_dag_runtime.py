@@ -0,0 +1,173 @@
+import json
+import pytest
+from types import SimpleNamespace
+from app.services import dag_runtime
+from app.services.dag_runtime import scatter_split, scatter_gather
+
+
+class FakeTaskInstance:
+    """Minimal task instance returning canned XCom values."""
+
+    def __init__(self, xcoms):
+        self.xcoms = xcoms
+
+    def xcom_pull(self, task_ids):
+        return self.xcoms.get(task_ids)
+
+
+def jobs(batches):
+    return [job for env in batches for job in json.loads(env["SCATTER_ITEMS"])]
+
+
+class TestDAGRuntime:
+
+    @pytest.fixture
+    def context(self):
+        conf = {"inputs": {"subjects": ["s1", "s2", "s3"], "models": ["a", "b"]}}
+        return {"dag_run": SimpleNamespace(conf=conf)}
+
+    def test_scatter_split_dotproduct_one_per_task(self, context):
+        """Test default batching creates one mapped task per subject."""
+        batches = scatter_split(
+            "seg", {"input_file": "subjects"}, "dotproduct", 1,
+            {"OUTPUT_PATH": "/data/output/exec/seg"}, "exec", **context,
+        )
+
+        assert len(batches) == 3
+        assert batches[1]["SCATTER_INDEX"] == "1"
+        assert jobs(batches)[2] == {
+            "index": 2,
+            "inputs": {"input_file": "s3"},
+            "output_path": "/data/output/exec/seg/2",
+        }
+
+    def test_scatter_split_batches(self, context):
+        """Test jobs are chunked by batch size while keeping their global index."""
+        batches = scatter_split("seg", {"x": "subjects"}, "dotproduct", 2, {}, "exec", **context)
+
+        assert len(batches) == 2
+        assert [job["index"] for job in jobs(batches)] == [0, 1, 2]
+
+    def test_scatter_split_crossproduct(self, context):
+        """Test flat_crossproduct combines every pair of inputs."""
+        batches = scatter_split(
+            "seg", {"x": "subjects", "m": "models"}, "flat_crossproduct", 10, {}, "exec", **context,
+        )
+
+        assert len(jobs(batches)) == 6
+        assert jobs(batches)[1]["inputs"] == {"x": "s1", "m": "b"}
+
+    def test_scatter_split_dotproduct_length_mismatch(self, context):
+        """Test dotproduct rejects inputs of different lengths."""
+        with pytest.raises(ValueError):
+            scatter_split("seg", {"x": "subjects", "m": "models"}, "dotproduct", 1, {}, "exec", **context)
+
+    def test_scatter_split_from_upstream_gather(self):
+        """Test a scatter source produced by an upstream scatter step."""
+        ti = FakeTaskInstance({"seg_gather": {"output_file": ["/data/a", "/data/b"]}})
+        batches = scatter_split("report", {"x": "seg/output_file"}, "dotproduct", 1, {}, "exec", ti=ti)
+
+        assert [job["inputs"]["x"] for job in jobs(batches)] == ["/data/a", "/data/b"]
+
+    def test_scatter_split_from_data_folder(self, tmp_path, monkeypatch):
+        """Test items default to the matching entries of the input folder."""
+        monkeypatch.setattr(dag_runtime, "DATA_ROOT", str(tmp_path))
+        for subject in ["sub-02", "sub-01", "other"]:
+            (tmp_path / "input" / "exec" / subject).mkdir(parents=True)
+
+        batches = scatter_split("seg", {"x": "subjects"}, "dotproduct", 1, {}, "exec", pattern="sub-*")
+
+        assert [job["inputs"]["x"] for job in jobs(batches)] == [
+            "/data/input/exec/sub-01",
+            "/data/input/exec/sub-02",
+        ]
+
+    def test_scatter_gather_orders_outputs(self, context):
+        """Test gathered outputs follow the scatter input order."""
+        batches = scatter_split("seg", {"x": "subjects"}, "dotproduct", 2, {"OUTPUT_PATH": "/out"}, "exec", **context)
+        ti = FakeTaskInstance({"seg_split": list(reversed(batches))})
+
+        result = scatter_gather("seg", ["output_file"], ti=ti)
+
+        assert result == {"output_file": ["/out/0/output_file", "/out/1/output_file", "/out/2/output_file"]}
+
+    def test_scatter_gather_reads_cwl_outputs(self, context, tmp_path, monkeypatch):
+        """Test jobs run through cwltool contribute their cwl_output.json values."""
+        monkeypatch.setattr(dag_runtime, "DATA_ROOT", str(tmp_path))
+        batches = scatter_split(
+            "seg", {"x": "subjects"}, "dotproduct", 2, {"OUTPUT_PATH": "/data/output/exec/seg"}, "exec", **context
+        )
+        for index in range(3):
+            job_dir = tmp_path / "output" / "exec" / "seg" / str(index)
+            job_dir.mkdir(parents=True)
+            (job_dir / "cwl_output.json").write_text(json.dumps({"out": {"class": "File", "basename": f"{index}.nii"}}))
+        ti = FakeTaskInstance({"seg_split": batches})
+
+        result = scatter_gather("seg", ["out"], ti=ti)
+
+        assert [value["basename"] for value in result["out"]] == ["0.nii", "1.nii", "2.nii"]
+
+    def test_parse_step_markers(self):
+        """Test per-step states are read from fused task log markers."""
+        log = "\n".join([
+            "[2026-01-01] INFO - " + dag_runtime.step_marker("convert", "start"),
+            "converting...",
+            "[2026-01-01] INFO - " + dag_runtime.step_marker("convert", "end"),
+            "[2026-01-01] INFO - " + dag_runtime.step_marker("normalize", "start"),
+        ])
+
+        assert dag_runtime.parse_step_markers(log) == {
+            "convert": "completed",
+            "normalize": "running",
+        }
+
+    def test_run_container_links_cached_outputs(self, tmp_path, monkeypatch):
+        """Test a call cache hit links the earlier outputs instead of running."""
+        monkeypatch.setattr(dag_runtime, "DATA_ROOT", str(tmp_path))
+        (tmp_path / "output" / "exec_old" / "seg").mkdir(parents=True)
+        (tmp_path / "output" / "exec_old" / "seg" / "mask.nii").write_text("mask")
+        env = {"EXECUTION_ID": "exec_new", "STEP_ID": "seg", dag_runtime.CACHE_HIT_ENV: "exec_old/seg"}
+
+        assert dag_runtime.run_container(env, image="unused") == 0
+
+        target = tmp_path / "output" / "exec_new" / "seg"
+        assert target.is_symlink()
+        assert (target / "mask.nii").read_text() == "mask"
+
+    def test_notify_backend_posts_task_event(self, monkeypatch):
+        """Test task callbacks POST the state change to the webhook."""
+        posted = []
+
+        class FakeResponse:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        def urlopen(request, timeout):
+            posted.append((request.full_url, json.loads(request.data), request.headers))
+            return FakeResponse()
+
+        monkeypatch.setattr(dag_runtime.urllib.request, "urlopen", urlopen)
+        context = {
+            "dag_run": SimpleNamespace(dag_id="dag", run_id="run_1"),
+            "ti": SimpleNamespace(task_id="step1", map_index=-1, try_number=1),
+        }
+
+        monkeypatch.delenv("VERIFLOW_WEBHOOK_URL", raising=False)
+        assert dag_runtime.notify_backend(context, "running") is False
+
+        monkeypatch.setenv("VERIFLOW_WEBHOOK_URL", "http://backend/api/v1/executions/events")
+        monkeypatch.setenv("VERIFLOW_WEBHOOK_TOKEN", "secret")
+        dag_runtime.notify_task_success(context)
+        dag_runtime.notify_run_failed(context)
+
+        (url, task_event, headers), (_, run_event, _) = posted
+        assert url == "http://backend/api/v1/executions/events"
+        assert task_event == {
+            "dag_id": "dag", "dag_run_id": "run_1", "task_id": "step1",
+            "map_index": -1, "try_number": 1, "state": "success",
+        }
+        assert headers["X-veriflow-token"] == "secret"
+        assert run_event["task_id"] is None and run_event["state"] == "failed"
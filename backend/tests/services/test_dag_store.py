@@ -0,0 +1,95 @@
+import time
+import pytest
+from app.services.dag_store import DAGStore
+
+
+DAG_CODE = '''"""
+VeriFlow Generated DAG
+Generated: {timestamp}
+"""
+dag_id = "veriflow_test"
+'''
+
+
+class TestDAGStore:
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        """Create a DAGStore with a one hour retention window."""
+        return DAGStore(tmp_path, retention_hours=1)
+
+    def test_write_is_atomic_and_leaves_no_temp_files(self, store, tmp_path):
+        """Test writes go through a temp file that is renamed away."""
+        path = store.write("veriflow_test", DAG_CODE.format(timestamp="t1"), "exec_1")
+
+        assert path.read_text() == DAG_CODE.format(timestamp="t1")
+        assert not list(tmp_path.glob("*.tmp"))
+
+    def test_identical_content_is_not_rewritten(self, store):
+        """Test regenerating the same DAG (new timestamp only) keeps the file."""
+        path = store.write("veriflow_test", DAG_CODE.format(timestamp="t1"), "exec_1")
+        mtime = path.stat().st_mtime_ns
+
+        store.write("veriflow_test", DAG_CODE.format(timestamp="t2"), "exec_2")
+
+        assert path.stat().st_mtime_ns == mtime
+        assert store.list_dags()[0]["executions"] == 2
+
+    def test_changed_content_is_rewritten(self, store):
+        """Test a DAG with different code replaces the stored file."""
+        store.write("veriflow_test", DAG_CODE.format(timestamp="t1"))
+        path = store.write("veriflow_test", DAG_CODE.format(timestamp="t1") + "x = 1\n")
+
+        assert path.read_text().endswith("x = 1\n")
+
+    def test_gc_waits_for_all_executions_and_retention(self, store):
+        """Test DAGs are collected only after every execution finished long enough ago."""
+        store.write("veriflow_test", DAG_CODE.format(timestamp="t1"), "exec_1")
+        store.add_reference("veriflow_test", "exec_2")
+        now = time.time()
+
+        store.mark_finished("exec_1", finished_at=now - 7200)
+        assert store.collect_garbage(now=now) == []
+
+        store.mark_finished("exec_2", finished_at=now - 60)
+        assert store.collect_garbage(now=now) == []
+        assert store.collect_garbage(now=now + 3600) == ["veriflow_test"]
+        assert store.list_dags() == []
+
+    def test_gc_keeps_dags_without_executions(self, store, tmp_path):
+        """Test DAGs never used by an execution are not collected."""
+        store.write("veriflow_test", DAG_CODE.format(timestamp="t1"))
+
+        assert store.collect_garbage(now=time.time() + 10 ** 6) == []
+        assert (tmp_path / "veriflow_test.py").exists()
+
+    def test_index_survives_restart(self, store, tmp_path):
+        """Test a new store picks up references recorded by a previous one."""
+        store.write("veriflow_test", DAG_CODE.format(timestamp="t1"), "exec_1")
+        store.mark_finished("exec_1", finished_at=time.time() - 7200)
+
+        assert DAGStore(tmp_path, retention_hours=1).collect_garbage() == ["veriflow_test"]
+
+    def test_workers_share_references(self, store, tmp_path):
+        """Test a worker's GC keeps a shared DAG another worker still runs on."""
+        other = DAGStore(tmp_path, retention_hours=1)
+        store.write("veriflow_shape", DAG_CODE.format(timestamp="t1"), "exec_1")
+        assert other.add_reference("veriflow_shape", "exec_2") is True
+        store.mark_finished("exec_1", finished_at=time.time() - 7200)
+
+        assert store.collect_garbage() == []
+        assert other.list_dags()[0]["active_executions"] == 1
+
+        other.mark_finished("exec_2", finished_at=time.time() - 7200)
+        assert store.collect_garbage() == ["veriflow_shape"]
+        assert other.add_reference("veriflow_shape", "exec_3") is False
+
+    def test_list_dags_reports_size_and_age(self, store):
+        """Test listing includes file size and age."""
+        path = store.write("veriflow_test", DAG_CODE.format(timestamp="t1"), "exec_1")
+
+        [entry] = store.list_dags()
+        assert entry["dag_id"] == "veriflow_test"
+        assert entry["size_bytes"] == path.stat().st_size
+        assert entry["age_seconds"] >= 0
+        assert entry["active_executions"] == 1
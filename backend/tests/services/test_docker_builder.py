@@ -110,3 +110,23 @@ class TestDockerBuilder:
         assert "docker build" in script
         assert "veriflow/my_tool:latest" in script
         assert "/path/to/Dockerfile" in script
+
+    def test_prepare_images_from_plan(self, builder, docker_tool):
+        """Test Dockerfiles and image names are generated from a compiled plan."""
+        from app.models.cwl import CWLWorkflow, CWLStep, ParsedWorkflow
+        from app.services.plan_compiler import PlanCompiler
+
+        workflow = ParsedWorkflow(
+            workflow=CWLWorkflow(
+                cwlVersion="v1.3",
+                **{"class": "Workflow"},
+                steps={"docker-step": CWLStep(run="docker.cwl")},
+            ),
+            tools={"docker-step": docker_tool},
+            step_order=["docker-step"],
+        )
+        plan = PlanCompiler().compile(workflow, "exec_1")
+
+        assert builder.prepare_images(plan) == {"docker-step": builder.PLACEHOLDER_IMAGE}
+        assert builder.prepare_images(plan, use_placeholder=False) == {"docker-step": "myimage:1.0"}
+        assert "FROM myimage:1.0" in builder.generated_dockerfiles["docker-step"]
@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
 from app.services.execution_engine import ExecutionEngine
@@ -14,17 +15,19 @@ class TestExecutionEngine:
         mock_dag_gen = MagicMock()
         mock_airflow = MagicMock()
         mock_docker = MagicMock()
-        return mock_parser, mock_dag_gen, mock_airflow, mock_docker
+        mock_compiler = MagicMock()
+        return mock_parser, mock_dag_gen, mock_airflow, mock_docker, mock_compiler
 
     @pytest.fixture
     def engine(self, mock_services):
         """Create ExecutionEngine with mocked dependencies."""
-        mock_parser, mock_dag_gen, mock_airflow, mock_docker = mock_services
+        mock_parser, mock_dag_gen, mock_airflow, mock_docker, mock_compiler = mock_services
         return ExecutionEngine(
             cwl_parser=mock_parser,
             dag_generator=mock_dag_gen,
             airflow_client=mock_airflow,
             docker_builder=mock_docker,
+            plan_compiler=mock_compiler,
         )
 
     @pytest.mark.asyncio
@@ -49,14 +52,42 @@ class TestExecutionEngine:
         mock_dag_gen.generate_dag.return_value = "/path/to/dag.py"
         mock_dag_gen._generate_dag_id.return_value = "veriflow_test_exec"
 
-        mock_docker.generate_dockerfile.return_value = "FROM python:3.11"
-        mock_docker.get_image_name.return_value = "python:3.11-slim"
+        mock_docker.prepare_images.return_value = {"step1": "python:3.11-slim"}
+
+        mock_compiler = mock_services[4]
+        mock_plan = MagicMock(step_order=("step1",))
+        mock_compiler.compile.return_value = mock_plan
 
         result = await engine.prepare_execution("cwl content", "wf_123")
 
         assert result["success"] is True
         assert "execution_id" in result
         assert result["dag_id"] == "veriflow_test_exec"
+        assert result["steps"] == ["step1"]
+        # The compiled plan is shared by DAG generation and Docker builds
+        assert mock_dag_gen.generate_dag.call_args.kwargs["plan"] is mock_plan
+        assert mock_docker.prepare_images.call_args.args[0] is mock_plan
+
+    @pytest.mark.asyncio
+    async def test_prepare_execution_revalidates_cached_parse(self, engine, mock_services):
+        """Test a cached parse is reused only while its tool documents are unchanged."""
+        mock_parser, mock_dag_gen, _, mock_docker, mock_compiler = mock_services
+        mock_parse_result = MagicMock(success=True, validation=MagicMock(valid=True))
+        mock_parse_result.tool_versions = {"tool0": "etag-1"}
+        mock_parser.parse_workflow.return_value = mock_parse_result
+        mock_parser.tool_resolver.is_current.return_value = True
+        mock_dag_gen._generate_dag_id.return_value = "veriflow_test_exec"
+        mock_docker.prepare_images.return_value = {}
+        mock_compiler.compile.return_value = MagicMock(step_order=("step1",))
+
+        await engine.prepare_execution("cwl content", "wf_123")
+        await engine.prepare_execution("cwl content", "wf_123")
+        assert mock_parser.parse_workflow.call_count == 1
+        mock_parser.tool_resolver.is_current.assert_called_with({"tool0": "etag-1"})
+
+        mock_parser.tool_resolver.is_current.return_value = False
+        await engine.prepare_execution("cwl content", "wf_123")
+        assert mock_parser.parse_workflow.call_count == 2
 
     @pytest.mark.asyncio
     async def test_prepare_execution_parse_failure(self, engine, mock_services):
@@ -118,6 +149,61 @@ class TestExecutionEngine:
         assert result is True
         assert engine.active_executions["exec_123"]["status"] == ExecutionStatus.FAILED
 
+    @pytest.mark.asyncio
+    async def test_cancel_execution_stops_dag_run_and_containers(self, engine, mock_services):
+        """Test cancelling a started execution fails its DAG run and frees its slot."""
+        mock_airflow = mock_services[2]
+        mock_airflow.set_dag_run_state = AsyncMock(return_value=True)
+        engine.run_monitor = MagicMock()
+        engine.scheduler = MagicMock()
+        engine.active_executions["exec_123"] = {
+            "status": ExecutionStatus.RUNNING,
+            "dag_id": "veriflow_wf",
+            "dag_run_id": "run_1",
+            "started_at": "2026-01-01T00:00:00",
+            "logs": [],
+        }
+
+        with patch("app.services.execution_engine.stop_containers", return_value=2) as stop:
+            result = await engine.cancel_execution("exec_123")
+
+        assert result is True
+        mock_airflow.set_dag_run_state.assert_awaited_once_with("veriflow_wf", "run_1", "failed")
+        engine.run_monitor.unwatch.assert_called_once_with("run_1")
+        assert stop.call_args.args[0] == "exec_123"
+        engine.scheduler.release.assert_called_once_with("exec_123")
+        assert await engine.cancel_execution("exec_123") is False
+
+    @pytest.mark.asyncio
+    async def test_request_cancel_forwards_to_owning_worker(self, engine):
+        """Test executions of another worker are cancelled through the shared state."""
+        engine.shared_state = MagicMock()
+        engine.shared_state.publish = AsyncMock()
+        engine.active_executions.owns = MagicMock(return_value=False)
+        engine.active_executions.load = AsyncMock(return_value={"status": "running"})
+        engine.cancel_execution = AsyncMock()
+
+        assert await engine.request_cancel("exec_123") is True
+
+        engine.cancel_execution.assert_not_awaited()
+        engine.shared_state.publish.assert_awaited_once_with("execution_cancel", {"execution_id": "exec_123"})
+
+    @pytest.mark.asyncio
+    async def test_task_event_forwarded_to_monitoring_worker(self, engine):
+        """Test pushed events for runs monitored elsewhere go through the shared state."""
+        engine.shared_state = MagicMock()
+        engine.shared_state.publish = AsyncMock()
+        engine.run_monitor.notify = MagicMock(side_effect=lambda run_id: run_id == "run_local")
+
+        assert await engine.handle_task_event("run_local") is True
+        engine.shared_state.publish.assert_not_awaited()
+
+        assert await engine.handle_task_event("run_remote") is True
+        engine.shared_state.publish.assert_awaited_once_with("task_events", {"dag_run_id": "run_remote"})
+
+        await engine._task_event_received({"dag_run_id": "run_remote"})
+        engine.run_monitor.notify.assert_called_with("run_remote")
+
     @pytest.mark.asyncio
     async def test_cancel_execution_not_exists(self, engine):
         """Test cancelling a non-existent execution returns False."""
@@ -146,3 +232,333 @@ class TestExecutionEngine:
         assert len(logs) == 1
         assert logs[0]["message"] == "Test message"
         assert logs[0]["node_id"] == "step1"
+
+    def test_add_log_appends_to_execution_log(self, engine):
+        """Test log entries get consecutive sequence numbers in the execution log."""
+        engine.log_writer = MagicMock()
+        engine.active_executions["exec_123"] = {"logs": []}
+
+        engine._add_log("exec_123", LogLevel.INFO, "first")
+        engine._add_log("exec_123", LogLevel.ERROR, "second", node_id="step1")
+
+        calls = engine.log_writer.append.call_args_list
+        assert [c.args[:3] for c in calls] == [("exec_123", 1, "first"), ("exec_123", 2, "second")]
+        assert calls[1].kwargs["level"] == "ERROR"
+        assert engine.active_executions["exec_123"]["log_seq"] == 2
+
+    @pytest.mark.asyncio
+    async def test_run_simulation_follows_plan_levels(self, engine, sample_cwl_workflow):
+        """Test simulation runs each dependency level of the plan and succeeds."""
+        from app.services.cwl_parser import CWLParser
+        from app.services.plan_compiler import PlanCompiler
+
+        workflow = CWLParser().parse_workflow(sample_cwl_workflow).workflow
+        plan = PlanCompiler().compile(workflow, "exec_123")
+        engine.active_executions["exec_123"] = {
+            "workflow_id": "wf_456",
+            "plan": plan,
+            "step_order": list(plan.step_order),
+            "logs": [],
+            "node_statuses": {},
+        }
+
+        with patch("app.services.execution_engine.asyncio.sleep", new=AsyncMock()):
+            await engine._run_simulation("exec_123")
+
+        exec_data = engine.active_executions["exec_123"]
+        assert exec_data["status"] == ExecutionStatus.SUCCESS
+        assert exec_data["overall_progress"] == 100
+        assert set(exec_data["node_statuses"]) == {"step1", "step2"}
+        activities = exec_data["provenance"]["activities"]
+        assert [a["step_id"] for a in activities] == ["step1", "step2"]
+        assert activities[1]["depends_on"] == ["step1"]
+        entities = exec_data["provenance"]["entities"]
+        assert entities["output"]["path"] == "process/exec_123/"
+        assert activities[1]["generated"] == ["output/step2"]
+        assert entities["output/step2"]["path"] == f"process/exec_123/{plan.steps['step2'].task_id}/"
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_airflow_runs_plan_locally(self, engine, mock_services, sample_cwl_workflow):
+        """Test the local executor runs the plan and reports like a DAG run."""
+        from app.services.cwl_parser import CWLParser
+        from app.services.plan_compiler import PlanCompiler
+
+        mock_airflow = mock_services[2]
+        mock_airflow.health_check = AsyncMock(return_value=False)
+        mock_airflow.map_task_state.side_effect = {"running": "running", "success": "completed"}.get
+        mock_airflow.calculate_progress.return_value = 100
+
+        async def run(plan, on_update):
+            await on_update({"step1": "running"}, {"step1": ["hello"]})
+            await on_update({"step1": "success", "step2": "success"}, {})
+            return {"step1": "success", "step2": "success"}
+        engine.local_executor = MagicMock()
+        engine.local_executor.run = run
+
+        workflow = CWLParser().parse_workflow(sample_cwl_workflow).workflow
+        plan = PlanCompiler().compile(workflow, "exec_123")
+        engine.active_executions["exec_123"] = {
+            "execution_id": "exec_123",
+            "dag_id": "dag_1",
+            "plan": plan,
+            "step_order": list(plan.step_order),
+            "logs": [],
+            "node_statuses": {},
+        }
+        seen = []
+
+        async def callback(exec_data):
+            seen.append(list(exec_data.get("task_log_lines", [])))
+
+        result = await engine.start_execution("exec_123", status_callback=callback)
+        await engine._local_runs["exec_123"]
+
+        exec_data = engine.active_executions["exec_123"]
+        assert result["local"] is True
+        assert exec_data["status"] == ExecutionStatus.SUCCESS
+        assert exec_data["node_statuses"]["step2"]["status"] == "completed"
+        assert seen[0][0]["message"] == "hello" and seen[0][0]["node_id"] == "step1"
+        assert "plan" not in exec_data
+
+    @pytest.mark.asyncio
+    async def test_prepare_execution_reuses_cached_steps(self, engine, mock_services, sample_cwl_workflow):
+        """Test call cache hits are marked in the plan and successful runs are recorded."""
+        from app.services.cwl_parser import CWLParser
+        from app.services.plan_compiler import PlanCompiler
+        from app.services.dag_runtime import CACHE_HIT_ENV
+
+        mock_parser, mock_dag_gen, _, _, mock_compiler = mock_services
+        parse_result = CWLParser().parse_workflow(sample_cwl_workflow)
+        mock_parser.parse_workflow.return_value = parse_result
+        mock_compiler.compile.side_effect = lambda workflow, execution_id, *args, **kwargs: (
+            PlanCompiler().compile(workflow, execution_id)
+        )
+        mock_dag_gen.fusion_groups.return_value = []
+        engine.call_cache = MagicMock()
+        engine.call_cache.step_keys.return_value = {"step1": "k1", "step2": "k2"}
+        engine.call_cache.lookup.return_value = {"step1": "exec_old/step1"}
+
+        result = await engine.prepare_execution("cwl content", "wf_123")
+
+        plan = mock_dag_gen.generate_dag.call_args.kwargs["plan"]
+        assert result["cached_steps"] == ["step1"]
+        assert plan.steps["step1"].env[CACHE_HIT_ENV] == "exec_old/step1"
+        assert CACHE_HIT_ENV not in plan.steps["step2"].env
+
+        exec_data = engine.active_executions[result["execution_id"]]
+        exec_data["node_statuses"] = {
+            "step1": {"airflow_state": "success"},
+            "step2": {"airflow_state": "success"},
+        }
+        await engine._record_call_cache(result["execution_id"])
+
+        args = engine.call_cache.record.call_args.args
+        assert args[1] == {"step1": "k1", "step2": "k2"}
+        assert args[2] == ["step2"]
+
+    @pytest.mark.asyncio
+    async def test_submit_execution_waits_for_run_slot(self, engine):
+        """Test executions beyond the running cap are queued and started on release."""
+        from app.services.execution_scheduler import ExecutionScheduler
+
+        engine.scheduler = ExecutionScheduler(max_running=1, max_per_user=0, max_per_workflow=0, aging_seconds=0)
+        engine.scheduler.on_queue_change = engine._queue_changed
+        engine.start_execution = AsyncMock(return_value={"success": True})
+        for execution_id in ("exec_1", "exec_2"):
+            engine.active_executions[execution_id] = {
+                "execution_id": execution_id,
+                "workflow_id": "wf",
+                "status": ExecutionStatus.QUEUED,
+                "logs": [],
+                "node_statuses": {},
+            }
+
+        first = await engine.submit_execution("exec_1")
+        second = await engine.submit_execution("exec_2", user_id="alice")
+        await asyncio.sleep(0)
+
+        assert first["queue_position"] == 0
+        assert second["queue_position"] == 1
+        assert engine.active_executions["exec_2"]["queue_position"] == 1
+        assert engine.start_execution.await_count == 1
+
+        engine.active_executions["exec_1"]["status"] = ExecutionStatus.SUCCESS
+        engine._finish("exec_1")
+        await asyncio.sleep(0)
+
+        assert engine.start_execution.await_args_list[1].args[0] == "exec_2"
+        assert "queue_position" not in engine.active_executions["exec_2"]
+
+    @pytest.mark.asyncio
+    async def test_start_execution_registered_dag_triggers_immediately(self, engine, mock_services):
+        """Test an already registered DAG is triggered without waiting, with the plan conf."""
+        mock_airflow = mock_services[2]
+        mock_airflow.health_check = AsyncMock(return_value=True)
+        mock_airflow.get_dag = AsyncMock(return_value={"dag_id": "veriflow_wf_shape_abc"})
+        mock_airflow.trigger_dag = AsyncMock(return_value="run_1")
+        engine.active_executions["exec_123"] = {
+            "dag_id": "veriflow_wf_shape_abc",
+            "config": {},
+            "trigger_conf": {"execution_id": "exec_123", "steps": {}},
+            "logs": [],
+        }
+
+        with patch("app.services.execution_engine.asyncio.sleep", new=AsyncMock()) as sleep:
+            result = await engine.start_execution("exec_123")
+
+        assert result["success"] is True
+        sleep.assert_not_called()
+        mock_airflow.trigger_dag.assert_awaited_once_with(
+            dag_id="veriflow_wf_shape_abc",
+            conf={"execution_id": "exec_123", "steps": {}},
+        )
+
+    @pytest.mark.asyncio
+    async def test_failing_status_callback_does_not_fail_execution(self, engine, mock_services):
+        """Test a status callback error while waiting for the DAG is only logged."""
+        mock_airflow = mock_services[2]
+        mock_airflow.health_check = AsyncMock(return_value=True)
+        mock_airflow.get_dag = AsyncMock(return_value=None)
+        mock_airflow.wait_for_dag = AsyncMock(return_value={"dag_id": "veriflow_new"})
+        mock_airflow.trigger_dag = AsyncMock(return_value="run_1")
+        engine.active_executions["exec_123"] = {
+            "dag_id": "veriflow_new",
+            "config": {},
+            "logs": [],
+        }
+        callback = AsyncMock(side_effect=AttributeError("broken broadcast"))
+
+        with patch.object(engine, "_monitor_execution"), \
+             patch.object(engine, "_ensure_worker_pool", new=AsyncMock()):
+            result = await engine.start_execution("exec_123", status_callback=callback)
+
+        assert result["success"] is True
+        callback.assert_awaited_once()
+        mock_airflow.wait_for_dag.assert_awaited_once_with("veriflow_new")
+        assert engine.active_executions["exec_123"]["status"] == ExecutionStatus.RUNNING
+
+    @pytest.mark.asyncio
+    async def test_start_execution_unregistered_dag_fails_without_simulation(self, engine, mock_services):
+        """Test a DAG that never registers fails the start instead of faking a run."""
+        mock_airflow = mock_services[2]
+        mock_airflow.health_check = AsyncMock(return_value=True)
+        mock_airflow.get_dag = AsyncMock(return_value=None)
+        mock_airflow.wait_for_dag = AsyncMock(return_value=None)
+        mock_airflow.DAG_REGISTRATION_TIMEOUT = 120
+        engine.active_executions["exec_123"] = {
+            "dag_id": "veriflow_new",
+            "config": {},
+            "logs": [],
+        }
+        statuses = []
+
+        async def callback(exec_data):
+            statuses.append(exec_data["status"])
+
+        result = await engine.start_execution("exec_123", status_callback=callback)
+
+        assert result["success"] is False
+        assert "not registered" in result["error"]
+        assert statuses == [ExecutionStatus.WAITING_FOR_SCHEDULER]
+        mock_airflow.trigger_dag.assert_not_called()
+
+        engine.active_executions["exec_123"]["config"] = {"simulate": True}
+        with patch.object(engine, "_simulate_execution", new=AsyncMock(return_value={"success": True})) as simulate:
+            result = await engine.start_execution("exec_123")
+        assert result["success"] is True
+        simulate.assert_awaited_once()
+
+    def test_fused_task_statuses_from_log_markers(self, engine, mock_services):
+        """Test steps of a fused task get their own status from its log markers."""
+        from app.services.airflow_client import AirflowClient
+        from app.services.dag_runtime import step_marker
+
+        mock_airflow = mock_services[2]
+        mock_airflow.map_task_state = AirflowClient().map_task_state
+        exec_data = {"dag_id": "dag", "dag_run_id": "run_1", "node_statuses": {}}
+        task = {"task_id": "dicom__normalize", "state": "running", "try_number": 2}
+        members = ["dicom", "nifti", "normalize"]
+
+        engine._update_fused_statuses(exec_data, task, members, [
+            step_marker("dicom", "start"),
+        ])
+        # Markers accumulate across incremental log reads
+        engine._update_fused_statuses(exec_data, {**task, "state": "failed"}, members, [
+            step_marker("dicom", "end"),
+            step_marker("nifti", "start"),
+        ])
+
+        statuses = {k: v["status"] for k, v in exec_data["node_statuses"].items()}
+        assert statuses == {"dicom": "completed", "nifti": "error", "normalize": "pending"}
+
+    @pytest.mark.asyncio
+    async def test_run_update_tails_running_task_logs(self, engine, mock_services):
+        """Test only new lines of running task logs are fetched and streamed."""
+        from app.services.airflow_client import AirflowClient
+
+        mock_airflow = mock_services[2]
+        mock_airflow.map_task_state = AirflowClient().map_task_state
+        mock_airflow.calculate_progress = AirflowClient().calculate_progress
+        mock_airflow.get_task_log_chunk = AsyncMock(side_effect=[
+            (["epoch 1", "epoch 2"], "token_1"),
+            (["epoch 3"], "token_2"),
+        ])
+        engine.active_executions["exec_123"] = {
+            "dag_id": "dag", "dag_run_id": "run_1", "node_statuses": {}, "logs": [],
+        }
+        callback = AsyncMock()
+        task = {"task_id": "infer", "state": "running", "try_number": 1, "map_index": -1}
+
+        await engine._handle_run_update("exec_123", callback, {"state": "running"}, [task], [task])
+        await engine._handle_run_update("exec_123", callback, {"state": "running"}, [task], [])
+
+        exec_data = engine.active_executions["exec_123"]
+        assert [e["message"] for e in exec_data["task_log_lines"]] == ["epoch 3"]
+        assert mock_airflow.get_task_log_chunk.await_args_list[1].args == (
+            "dag", "run_1", "infer", 1, "token_1", -1,
+        )
+        assert engine.get_task_logs("exec_123", "infer") == ["epoch 1", "epoch 2", "epoch 3"]
+
+    @pytest.mark.asyncio
+    async def test_run_update_estimates_eta_and_records_step_durations(self, engine, mock_services):
+        """Test progress is weighted by step history and run times are recorded on completion."""
+        from app.models.plan import ExecutionPlan, PlannedStep
+        from app.services.airflow_client import AirflowClient
+
+        mock_airflow = mock_services[2]
+        mock_airflow.map_task_state = AirflowClient().map_task_state
+        engine.log_tailer = MagicMock()
+        engine.log_tailer.tail = AsyncMock(return_value=[])
+        engine.step_history = MagicMock()
+        plan = ExecutionPlan(
+            workflow_id="wf",
+            execution_id="exec_123",
+            steps={
+                "copy": PlannedStep(step_id="copy", task_id="copy", run="copy.cwl", estimated_duration=10),
+                "infer": PlannedStep(
+                    step_id="infer", task_id="infer", run="infer.cwl",
+                    dependencies=("copy",), estimated_duration=90,
+                ),
+            },
+        )
+        engine.active_executions["exec_123"] = {
+            "execution_id": "exec_123", "dag_id": "dag", "dag_run_id": "run_1", "plan": plan,
+            "status": ExecutionStatus.RUNNING, "node_statuses": {}, "logs": [], "input_bytes": 2048,
+        }
+        copy = {"task_id": "copy", "state": "success",
+                "start_date": "2026-01-01T00:00:00Z", "end_date": "2026-01-01T00:00:12Z"}
+        infer = {"task_id": "infer", "state": "running", "start_date": "2026-01-01T00:00:12Z"}
+
+        with patch("app.services.execution_engine.time.time", return_value=1767225657.0):
+            await engine._handle_run_update("exec_123", AsyncMock(), {"state": "running"}, [copy, infer], [copy, infer])
+        exec_data = engine.active_executions["exec_123"]
+        # copy done (10 of 100 expected seconds), infer 45 of 90 seconds in
+        assert exec_data["overall_progress"] == 55
+        assert exec_data["eta_seconds"] == 45
+
+        infer = {**infer, "state": "success", "end_date": "2026-01-01T00:01:42Z"}
+        await engine._handle_run_update("exec_123", AsyncMock(), {"state": "success"}, [copy, infer], [infer])
+
+        engine.step_history.record.assert_called_once_with(plan, 2048, {"copy": 12.0, "infer": 90.0})
+        assert exec_data["overall_progress"] == 100
+        assert exec_data["eta_seconds"] == 0
@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.services.database_sqlite import SQLiteDB
+from app.services.execution_store import SQLiteExecutionBackend
+from app.services.execution_log_writer import ExecutionLogWriter
+
+
+class TestExecutionLogWriter:
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        return SQLiteDB(db_path=tmp_path / "veriflow.db")
+
+    @pytest.fixture
+    def writer(self, db):
+        return ExecutionLogWriter(SQLiteExecutionBackend(db), batch_size=3, flush_interval_ms=50)
+
+    @pytest.mark.asyncio
+    async def test_lines_are_written_in_batches(self, writer, db):
+        """Test a full batch is flushed right away and the rest after the interval."""
+        backend = writer.backend
+        backend.save_logs = AsyncMock(wraps=backend.save_logs)
+        for seq in range(1, 5):
+            writer.append("exec_1", seq, f"line {seq}")
+
+        await asyncio.sleep(0.01)
+        assert backend.save_logs.await_count == 1
+        assert len(backend.save_logs.await_args.args[0]) == 4
+        
+        writer.append("exec_1", 5, "line 5")
+        await asyncio.sleep(0.1)
+        assert writer.buffered == 0
+        assert [e["seq"] for e in db.get_execution_logs("exec_1")] == [1, 2, 3, 4, 5]
+
+    @pytest.mark.asyncio
+    async def test_read_pages_by_seq_including_buffered_lines(self, writer):
+        """Test pages continue from after_seq across flushed and buffered lines."""
+        writer.batch_size = 100
+        for seq in range(1, 4):
+            writer.append("exec_1", seq, f"line {seq}", node_id="step1")
+        await writer.flush()
+        writer.append("exec_1", 4, "line 4")
+        writer.append("exec_2", 1, "other")
+
+        first = await writer.read("exec_1", limit=2)
+        second = await writer.read("exec_1", after_seq=first[-1]["seq"], limit=2)
+
+        assert [e["message"] for e in first] == ["line 1", "line 2"]
+        assert [e["seq"] for e in second] == [3, 4]
+        assert first[0]["node_id"] == "step1"
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_lines(self):
+        """Test lines survive a failed batch write."""
+        backend = MagicMock()
+        backend.save_logs = AsyncMock(side_effect=[Exception("db down"), None])
+        writer = ExecutionLogWriter(backend, batch_size=100)
+        writer.append("exec_1", 1, "line")
+
+        assert await writer.flush() == 0
+        assert writer.buffered == 1
+        assert await writer.flush() == 1
+        await writer.close()
+
+    def test_buffer_keeps_newest_lines_up_to_max_buffered(self):
+        """Test appends while flushes fail do not grow the buffer without bound."""
+        writer = ExecutionLogWriter(MagicMock(), batch_size=100, max_buffered=3)
+        for seq in range(1, 6):
+            writer.append("exec_1", seq, f"line {seq}")
+
+        assert writer.buffered == 3
+        assert [row[1] for row in writer._buffer] == [3, 4, 5]
+
+    def test_without_backend_lines_are_discarded(self):
+        """Test the in-memory configuration does not accumulate lines."""
+        writer = ExecutionLogWriter()
+        writer.append("exec_1", 1, "line")
+        assert writer.buffered == 0
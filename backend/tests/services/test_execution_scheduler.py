@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+from app.services.execution_scheduler import ExecutionScheduler, QueueFullError
+from app.services.shared_state import SharedState, SQLiteStateBackend
+
+
+class TestExecutionScheduler:
+
+    def starter(self, started, result=True):
+        def start(execution_id):
+            async def run():
+                started.append(execution_id)
+                return result
+            return run
+        return start
+
+    @pytest.mark.asyncio
+    async def test_global_cap_queues_and_release_starts_next(self):
+        """Test executions beyond the cap wait and start when a slot frees up."""
+        scheduler = ExecutionScheduler(max_running=1, max_per_user=0, max_per_workflow=0, aging_seconds=0)
+        started = []
+        start = self.starter(started)
+
+        assert scheduler.submit("a", start("a")) == 0
+        assert scheduler.submit("b", start("b")) == 1
+        await asyncio.sleep(0)
+        assert started == ["a"]
+
+        scheduler.release("a")
+        await asyncio.sleep(0)
+        assert started == ["a", "b"]
+        assert scheduler.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_fair_share_and_priority_order(self):
+        """Test priority comes first, then users with fewer running executions."""
+        scheduler = ExecutionScheduler(max_running=2, max_per_user=0, max_per_workflow=0, aging_seconds=0)
+        start = self.starter([])
+        positions = {}
+        scheduler.on_queue_change = positions.update
+
+        scheduler.submit("alice_1", start("alice_1"), user_id="alice")
+        scheduler.submit("alice_2", start("alice_2"), user_id="alice")
+        scheduler.submit("alice_3", start("alice_3"), user_id="alice")
+        scheduler.submit("bob_1", start("bob_1"), user_id="bob")
+        scheduler.submit("urgent", start("urgent"), user_id="alice", priority=5)
+
+        assert scheduler.position("urgent") == 1
+        assert scheduler.position("bob_1") == 2
+        assert scheduler.position("alice_3") == 3
+        assert positions["alice_3"] == 3
+
+    @pytest.mark.asyncio
+    async def test_per_user_cap_lets_other_users_run(self):
+        """Test a user at their cap does not block other users."""
+        scheduler = ExecutionScheduler(max_running=0, max_per_user=1, max_per_workflow=0, aging_seconds=0)
+        started = []
+        start = self.starter(started)
+
+        scheduler.submit("alice_1", start("alice_1"), user_id="alice")
+        scheduler.submit("alice_2", start("alice_2"), user_id="alice")
+        scheduler.submit("bob_1", start("bob_1"), user_id="bob")
+        await asyncio.sleep(0)
+
+        assert sorted(started) == ["alice_1", "bob_1"]
+        assert scheduler.is_queued("alice_2")
+
+    @pytest.mark.asyncio
+    async def test_full_queue_preempts_lower_priority(self):
+        """Test a full queue drops its lowest-priority entry for higher-priority work."""
+        scheduler = ExecutionScheduler(max_running=1, max_per_user=0, max_per_workflow=0, max_queued=1, aging_seconds=0)
+        start = self.starter([])
+        preempted = []
+        scheduler.on_preempted = preempted.append
+
+        scheduler.submit("running", start("running"))
+        scheduler.submit("low", start("low"), priority=0)
+        with pytest.raises(QueueFullError):
+            scheduler.submit("same", start("same"), priority=0)
+        scheduler.submit("high", start("high"), priority=1)
+
+        assert preempted == ["low"]
+        assert scheduler.position("high") == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_start_releases_slot(self):
+        """Test an execution that fails to start does not hold its slot."""
+        scheduler = ExecutionScheduler(max_running=1, max_per_user=0, max_per_workflow=0, aging_seconds=0)
+        started = []
+
+        scheduler.submit("broken", self.starter(started, result=False)("broken"))
+        scheduler.submit("next", self.starter(started)("next"))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        assert started == ["broken", "next"]
+
+    @pytest.mark.asyncio
+    async def test_caps_hold_across_workers(self, tmp_path):
+        """Test two workers sharing a slot ledger never run more than the global cap."""
+        workers = []
+        for worker_id in ("w1", "w2"):
+            state = SharedState(SQLiteStateBackend(tmp_path / "state.db", poll_interval=0.01))
+            state.worker_id = worker_id
+            workers.append(ExecutionScheduler(
+                max_running=1, max_per_user=0, max_per_workflow=0, aging_seconds=0,
+                slots=state.dict("execution_slots"),
+            ))
+        first, second = workers
+        started = []
+        start = self.starter(started)
+
+        first.submit("a", start("a"))
+        await asyncio.sleep(0.05)
+        second.submit("b", start("b"))
+        await asyncio.sleep(0.05)
+        assert started == ["a"]
+        assert second.position("b") == 1
+
+        first.release("a")
+        for _ in range(50):
+            if "b" in started:
+                break
+            await asyncio.sleep(0.01)
+        assert started == ["a", "b"]
+        for scheduler in workers:
+            scheduler._heartbeat.cancel()
+            await scheduler.slots.state.close()
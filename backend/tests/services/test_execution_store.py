@@ -0,0 +1,135 @@
+import pytest
+from app.models.execution import ExecutionStatus
+from app.services.database_sqlite import SQLiteDB
+from app.services.execution_store import ExecutionStore, SQLiteExecutionBackend, MAX_RECORD_LOGS
+
+
+def make_record(execution_id, status=ExecutionStatus.RUNNING):
+    return {
+        "execution_id": execution_id,
+        "workflow_id": "wf",
+        "dag_id": f"dag_{execution_id}",
+        "status": status,
+        "overall_progress": 0,
+        "workflow": object(),
+        "plan": object(),
+        "node_statuses": {},
+        "logs": [],
+    }
+
+
+class TestExecutionStore:
+
+    @pytest.fixture
+    def db(self, tmp_path):
+        return SQLiteDB(db_path=tmp_path / "veriflow.db")
+
+    @pytest.fixture
+    def store(self, db):
+        return ExecutionStore(backend=SQLiteExecutionBackend(db), max_hot=2)
+
+    def test_active_executions_are_never_evicted(self):
+        """Test the LRU bound only evicts finished executions."""
+        store = ExecutionStore(max_hot=2)
+        for execution_id in ("a", "b", "c"):
+            store[execution_id] = make_record(execution_id)
+        assert list(store) == ["a", "b", "c"]
+
+        store["a"]["status"] = ExecutionStatus.SUCCESS
+        store["d"] = make_record("d")
+        assert list(store) == ["b", "c", "d"]
+
+    def test_finish_keeps_compact_status_in_place(self):
+        """Test finishing drops the workflow and plan but keeps the same dict."""
+        store = ExecutionStore()
+        store["a"] = record = make_record("a", ExecutionStatus.SUCCESS)
+
+        store.finish("a")
+
+        assert store["a"] is record
+        assert "plan" not in record and "workflow" not in record
+        assert record["status"] == "success"
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_only_changed_records(self, store, db):
+        """Test write-behind flushes persist each status change once."""
+        store["a"] = make_record("a")
+        store["b"] = make_record("b")
+        assert await store.flush() == 2
+        assert await store.flush() == 0
+
+        store["a"]["overall_progress"] = 50
+        assert await store.flush() == 1
+        assert db.get_execution("a")["overall_progress"] == 50
+        assert "plan" not in db.get_execution("a")
+
+    @pytest.mark.asyncio
+    async def test_finished_records_are_not_serialized_again(self, db, monkeypatch):
+        """Test flushes only serialize records that may still change."""
+        store = ExecutionStore(backend=SQLiteExecutionBackend(db), max_hot=10)
+        store["a"] = make_record("a", ExecutionStatus.SUCCESS)
+        store["b"] = make_record("b")
+        store.finish("a")
+        assert await store.flush() == 2
+
+        serialized = []
+        serialize = store._serialize
+        monkeypatch.setattr(store, "_serialize", lambda record: serialized.append(record["execution_id"]) or serialize(record))
+        assert await store.flush() == 0
+        assert serialized == ["b"]
+        assert store._unsettled()
+
+        store["b"]["status"] = ExecutionStatus.FAILED
+        store.finish("b")
+        assert await store.flush() == 1
+        assert not store._unsettled()
+        assert db.get_execution("b")["status"] == "failed"
+
+    @pytest.mark.asyncio
+    async def test_evicted_record_is_persisted_and_reloaded(self, store, db):
+        """Test a finished execution survives eviction and a restart."""
+        store["a"] = make_record("a", ExecutionStatus.SUCCESS)
+        store["b"] = make_record("b")
+        store["c"] = make_record("c")
+
+        # Evicted before its first flush: still readable until persisted
+        assert "a" not in list(store)
+        assert store["a"]["status"] == ExecutionStatus.SUCCESS
+        await store.flush()
+        assert "a" not in store
+
+        restarted = ExecutionStore(backend=SQLiteExecutionBackend(db))
+        record = await restarted.load("a")
+        assert record["status"] == "success"
+        assert await restarted.load("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_persisted_logs_are_bounded(self, store, db):
+        """Test only the most recent log entries are persisted."""
+        store["a"] = make_record("a")
+        store["a"]["logs"] = [{"message": str(i)} for i in range(MAX_RECORD_LOGS + 10)]
+
+        await store.flush()
+
+        logs = db.get_execution("a")["logs"]
+        assert len(logs) == MAX_RECORD_LOGS
+        assert logs[-1]["message"] == str(MAX_RECORD_LOGS + 9)
+
+    @pytest.mark.asyncio
+    async def test_records_of_other_workers_are_refreshed_not_written(self, store, db):
+        """Test a worker re-reads executions run by another worker and never flushes them."""
+        store["a"] = make_record("a")
+        await store.flush()
+
+        other_worker = ExecutionStore(backend=SQLiteExecutionBackend(db), flush_interval=0)
+        record = await other_worker.load("a")
+        assert not other_worker.owns("a") and store.owns("a")
+
+        store["a"]["overall_progress"] = 75
+        await store.flush()
+        assert (await other_worker.load("a")) is record
+        assert record["overall_progress"] == 75
+
+        record["overall_progress"] = 10
+        assert await other_worker.flush() == 0
+        assert db.get_execution("a")["overall_progress"] == 75
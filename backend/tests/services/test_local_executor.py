@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from app.models.cwl import ResourceRequirement
+from app.models.plan import ExecutionPlan, PlannedStep
+from app.services.local_executor import LocalExecutor
+
+
+def make_plan(steps):
+    """Plan from (step_id, dependencies, cores, priority) tuples."""
+    planned = {
+        step_id: PlannedStep(
+            step_id=step_id,
+            task_id=step_id,
+            run="tool.cwl",
+            env={"EXECUTION_ID": "exec_1", "STEP_ID": step_id},
+            dependencies=tuple(deps),
+            resources=ResourceRequirement(coresMin=cores),
+            priority_weight=priority,
+        )
+        for step_id, deps, cores, priority in steps
+    }
+    return ExecutionPlan(
+        workflow_id="wf",
+        execution_id="exec_1",
+        steps=planned,
+        step_order=tuple(planned),
+    )
+
+
+class TestLocalExecutor:
+
+    @pytest.fixture
+    def generator(self):
+        generator = MagicMock()
+        generator.step_container.return_value = None
+        generator.CWL_STEP_SCRIPT = "/opt/veriflow/veriflow_step.py"
+        return generator
+
+    @pytest.fixture
+    def updates(self):
+        calls = []
+
+        async def on_update(changed, lines):
+            calls.append((dict(changed), dict(lines)))
+        on_update.calls = calls
+        return on_update
+
+    @pytest.mark.asyncio
+    async def test_independent_steps_run_within_cpu_budget(self, generator, updates):
+        """Test concurrency is bounded by cores and critical-path steps start first."""
+        executor = LocalExecutor(generator, cpus=2, runtime="process")
+        active, peak, started = set(), [0], []
+
+        async def fake_step(plan, step, use_docker, emit):
+            started.append(step.step_id)
+            active.add(step.step_id)
+            peak[0] = max(peak[0], len(active))
+            await asyncio.sleep(0.05)
+            active.discard(step.step_id)
+            return True
+        executor._run_step = fake_step
+
+        plan = make_plan([("a", [], 1, 1), ("b", [], 1, 3), ("c", [], 1, 2), ("d", ["a"], 2, 1)])
+        states = await executor.run(plan, updates)
+
+        assert states == {"a": "success", "b": "success", "c": "success", "d": "success"}
+        assert peak[0] == 2
+        assert started[:2] == ["b", "c"]
+        assert started[-1] == "d"
+
+    @pytest.mark.asyncio
+    async def test_failure_skips_downstream_only(self, generator, updates):
+        """Test a failed step fails its dependents while other branches finish."""
+        generator.step_container.side_effect = lambda step: (
+            {"command": ["sh", "-c", "echo broken; exit 3"]} if step.step_id == "bad" else None
+        )
+        executor = LocalExecutor(generator, cpus=4, runtime="process")
+        plan = make_plan([("bad", [], 1, 2), ("after", ["bad"], 1, 1), ("other", [], 1, 1)])
+
+        states = await executor.run(plan, updates)
+
+        assert states == {"bad": "failed", "after": "upstream_failed", "other": "success"}
+        lines = [line for _, out in updates.calls for line in out.get("bad", [])]
+        assert "broken" in lines
+        assert any("exited with status 3" in line for line in lines)
+        assert any(changed.get("after") == "upstream_failed" for changed, _ in updates.calls)
+
+    @pytest.mark.asyncio
+    async def test_step_timeout_kills_process(self, generator, updates):
+        """Test a step running past the timeout is killed and fails."""
+        generator.step_container.return_value = {"command": ["sh", "-c", "sleep 30"]}
+        executor = LocalExecutor(generator, cpus=1, step_timeout=0.2, runtime="process")
+
+        states = await asyncio.wait_for(executor.run(make_plan([("slow", [], 1, 1)]), updates), 5)
+
+        assert states == {"slow": "failed"}
+        lines = [line for _, out in updates.calls for line in out.get("slow", [])]
+        assert any("timed out" in line for line in lines)
+
+    @pytest.mark.asyncio
+    async def test_scatter_without_tool_fails(self, generator, updates):
+        """Test a scatter step that cannot run its tool per batch is not reported as succeeded."""
+        generator.scatter_runnable.return_value = False
+        plan = make_plan([("seg", [], 1, 1)])
+        plan = plan.model_copy(update={"steps": {
+            "seg": plan.steps["seg"].model_copy(update={"scatter": ("x",)}),
+        }})
+        executor = LocalExecutor(generator, cpus=1, runtime="process")
+
+        states = await executor.run(plan, updates)
+
+        assert states == {"seg": "failed"}
+        lines = [line for _, out in updates.calls for line in out.get("seg", [])]
+        assert any("no resolved CWL tool" in line for line in lines)
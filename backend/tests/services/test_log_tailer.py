@@ -0,0 +1,50 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.services.log_tailer import TaskLogTailer
+
+
+class TestTaskLogTailer:
+
+    @pytest.fixture
+    def airflow(self):
+        client = MagicMock()
+        client.get_task_log_chunk = AsyncMock()
+        return client
+
+    @pytest.mark.asyncio
+    async def test_new_try_starts_from_beginning(self, airflow):
+        """Test a retry reads its own log from the start."""
+        tailer = TaskLogTailer(airflow)
+        airflow.get_task_log_chunk.return_value = (["line"], "token_1")
+
+        await tailer.tail("dag", "run_1", {"task_id": "t", "try_number": 1})
+        await tailer.tail("dag", "run_1", {"task_id": "t", "try_number": 2})
+
+        tokens = [call.args[4] for call in airflow.get_task_log_chunk.await_args_list]
+        assert tokens == [None, None]
+
+    @pytest.mark.asyncio
+    async def test_buffer_is_bounded(self, airflow):
+        """Test only the most recent lines are kept per task."""
+        tailer = TaskLogTailer(airflow, max_lines=3)
+        airflow.get_task_log_chunk.return_value = ([f"line {i}" for i in range(10)], "token")
+
+        new = await tailer.tail("dag", "run_1", {"task_id": "t", "try_number": 1})
+
+        assert len(new) == 10
+        assert tailer.lines("run_1", "t") == ["line 7", "line 8", "line 9"]
+        tailer.forget("run_1")
+        assert tailer.lines("run_1", "t") == []
+
+    @pytest.mark.asyncio
+    async def test_full_log_without_token_skips_read_lines(self, airflow):
+        """Test servers without continuation tokens still yield only new lines."""
+        tailer = TaskLogTailer(airflow, max_lines=2)
+        airflow.get_task_log_chunk.side_effect = [
+            (["a", "b", "c"], None),
+            (["a", "b", "c", "d"], None),
+        ]
+        task = {"task_id": "t", "try_number": 1}
+
+        assert await tailer.tail("dag", "run_1", task) == ["a", "b", "c"]
+        assert await tailer.tail("dag", "run_1", task) == ["d"]
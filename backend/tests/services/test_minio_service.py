@@ -120,3 +120,10 @@ class TestMinIOService:
         service.client.stat_object.side_effect = _S3Error("not found")
 
         assert service.object_exists("measurements", "nonexistent") is False
+
+    def test_get_object_etag_unreachable(self, service):
+        """Test network failures surface as ConnectionError, not as a missing object."""
+        service.client.stat_object.side_effect = OSError("connection refused")
+
+        with pytest.raises(ConnectionError, match="unreachable"):
+            service.get_object_etag("workflow-tool", "tools/tool.cwl")
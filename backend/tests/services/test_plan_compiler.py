@@ -0,0 +1,171 @@
+import pytest
+from pydantic import ValidationError
+from app.services.cwl_parser import CWLParser
+from app.services.plan_compiler import PlanCompiler
+
+
+DIAMOND_CWL = """
+cwlVersion: v1.2
+class: Workflow
+id: diamond-workflow
+inputs:
+  data: File
+outputs: {}
+steps:
+  fetch:
+    run:
+      class: CommandLineTool
+      baseCommand: [python, fetch.py]
+      requirements:
+        DockerRequirement: {dockerPull: "python:3.11"}
+        ResourceRequirement: {coresMin: 2, ramMin: 4096}
+      inputs: {data: File}
+      outputs: {out: File}
+    in: {data: data}
+    out: [out]
+  segment:
+    run:
+      class: CommandLineTool
+      baseCommand: segment
+      hints:
+        - class: DockerRequirement
+          dockerPull: "veriflow/segment:1.0"
+      inputs: {data: File}
+      outputs: {out: File}
+    in: {data: fetch/out}
+    out: [out]
+  measure:
+    run:
+      class: CommandLineTool
+      baseCommand: measure
+      inputs: {data: File}
+      outputs: {out: File}
+    in: {data: fetch/out}
+    out: [out]
+  report:
+    run:
+      class: CommandLineTool
+      baseCommand: report
+      inputs: {a: File, b: File}
+      outputs: {out: File}
+    in: {a: segment/out, b: measure/out}
+    out: [out]
+"""
+
+
+class TestPlanCompiler:
+
+    @pytest.fixture
+    def workflow(self):
+        result = CWLParser().parse_workflow(DIAMOND_CWL)
+        assert result.success
+        return result.workflow
+
+    @pytest.fixture
+    def compiler(self):
+        return PlanCompiler()
+
+    def test_compile_resolves_images_and_resources(self, compiler, workflow):
+        """Test images and resource requirements are resolved once per step."""
+        plan = compiler.compile(workflow, "exec_1")
+
+        assert plan.images == {"fetch": "python:3.11", "segment": "veriflow/segment:1.0"}
+        assert plan.steps["fetch"].resources.cores_min == 2
+        assert plan.steps["fetch"].resources.ram_min == 4096
+        assert plan.steps["measure"].resources is None
+        assert plan.steps["fetch"].base_command == ["python", "fetch.py"]
+        assert plan.steps["segment"].base_command == ["segment"]
+
+    def test_compile_env_and_mounts(self, compiler, workflow):
+        """Test per-step environment and data mounts."""
+        plan = compiler.compile(workflow, "exec_1", config={"subjects": [1]})
+        step = plan.steps["segment"]
+
+        assert step.env["OUTPUT_PATH"] == "/data/output/exec_1/segment"
+        assert step.env["CONFIG_SUBJECTS"] == "[1]"
+        assert step.mounts[0].target == "/data"
+
+    def test_compile_levels(self, compiler, workflow):
+        """Test dependency levels group steps that can run in parallel."""
+        plan = compiler.compile(workflow, "exec_1")
+
+        assert plan.levels[0] == ("fetch",)
+        assert set(plan.levels[1]) == {"segment", "measure"}
+        assert plan.levels[2] == ("report",)
+        assert plan.steps["report"].level == 2
+        assert set(plan.dependencies["report"]) == {"segment", "measure"}
+
+    def test_compile_critical_path(self, compiler, workflow):
+        """Test the critical path follows the slowest branch."""
+        plan = compiler.compile(
+            workflow, "exec_1",
+            duration_estimates={"fetch": 10, "segment": 300, "measure": 20, "report": 5},
+        )
+
+        assert plan.critical_path == ("fetch", "segment", "report")
+        assert plan.estimated_duration == 315
+
+    def test_compile_tool_documents_for_runner(self, compiler, workflow):
+        """Test steps carry a self-contained tool document and input bindings."""
+        plan = compiler.compile(workflow, "exec_1", config={"inputs": {"data": "scan.nii"}})
+        fetch = plan.steps["fetch"]
+
+        assert fetch.tool_document["class"] == "CommandLineTool"
+        assert fetch.tool_document["cwlVersion"] == "v1.2"
+        assert fetch.tool_document["baseCommand"] == ["python", "fetch.py"]
+        assert fetch.tool_document["inputs"] == {"data": {"type": "File"}}
+        assert fetch.step_inputs == {"data": {"source": "data"}}
+        assert plan.steps["report"].step_inputs == {
+            "a": {"source": "segment/out"},
+            "b": {"source": "measure/out"},
+        }
+        assert fetch.env["CWL_INPUTS"] == '{"data": "scan.nii"}'
+
+    def test_priority_weights_favor_critical_path(self, compiler, workflow):
+        """Test steps with the longest remaining path get the highest weight."""
+        plan = compiler.compile(
+            workflow, "exec_1",
+            duration_estimates={"fetch": 10, "segment": 300, "measure": 20, "report": 5},
+        )
+        weights = {step_id: step.priority_weight for step_id, step in plan.steps.items()}
+
+        assert weights["fetch"] > weights["segment"] > weights["measure"] > weights["report"]
+        assert weights["report"] == 1
+
+    def test_apply_durations_reranks_compiled_plan(self, compiler, workflow):
+        """Test new duration estimates move the critical path and priority weights."""
+        plan = compiler.compile(
+            workflow, "exec_1",
+            duration_estimates={"fetch": 10, "segment": 300, "measure": 20, "report": 5},
+        )
+
+        updated = compiler.apply_durations(plan, {"segment": 30, "measure": 600})
+
+        assert updated.critical_path == ("fetch", "measure", "report")
+        assert updated.estimated_duration == 615
+        assert updated.steps["measure"].priority_weight > updated.steps["segment"].priority_weight
+        assert updated.shape_key == plan.shape_key
+        assert updated.steps["fetch"].estimated_duration == 10
+        assert updated.workflow is plan.workflow
+
+    def test_plan_is_immutable(self, compiler, workflow):
+        """Test compiled plans cannot be modified by consumers."""
+        plan = compiler.compile(workflow, "exec_1")
+
+        with pytest.raises(ValidationError):
+            plan.execution_id = "other"
+        with pytest.raises(ValidationError):
+            plan.steps["fetch"].image = "other"
+
+    def test_compile_rejects_unknown_scatter_method(self, compiler):
+        """Test scatterMethod is one of the CWL methods before it reaches a DAG."""
+        cwl = DIAMOND_CWL.replace(
+            "    in: {data: fetch/out}\n    out: [out]\n  measure:",
+            "    in: {data: fetch/out}\n    scatter: data\n    scatterMethod: 'dotproduct\"\nimport os'\n"
+            "    out: [out]\n  measure:",
+        )
+        result = CWLParser().parse_workflow(cwl)
+        assert result.success
+
+        with pytest.raises(ValueError, match="scatterMethod"):
+            compiler.compile(result.workflow, "exec_1")
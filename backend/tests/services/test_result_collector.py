@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+import json
+import pytest
+from unittest.mock import MagicMock
+from app.models.plan import ExecutionPlan, PlannedStep
+from app.services.local_executor import LocalExecutor
+from app.services.plan_compiler import PlanCompiler
+from app.services.result_collector import ResultCollector, detect_mime_type, INDEX_OBJECT
+
+NIFTI_HEADER = b"\x5c\x01\x00\x00" + b"\x00" * 340 + b"n+1\x00" + b"\x00" * 4
+
+
+class FakeStorage:
+    """In-memory stand-in for the MinIO service."""
+    PROCESS_BUCKET = "process"
+
+    def __init__(self, objects):
+        self.objects = dict(objects)
+        self.listed = []
+        self.reads = []
+
+    def list_objects(self, bucket, prefix="", recursive=True):
+        self.listed.append(prefix)
+        return [{"name": name, "size": len(data)} for name, data in self.objects.items() if name.startswith(prefix)]
+
+    def iter_object(self, bucket, object_name, chunk_size=1024):
+        self.reads.append(object_name)
+        data = self.objects[object_name]
+        for start in range(0, len(data), 4):
+            yield data[start:start + 4]
+
+    def download_file(self, bucket, object_name):
+        return self.objects[object_name]
+
+    def upload_file(self, bucket, object_name, file_data, content_type="", length=-1):
+        # Read in parts like the MinIO client does
+        self.objects[object_name] = b"".join(iter(lambda: file_data.read(5), b""))
+
+
+class TestResultCollector:
+
+    def test_detect_mime_type_from_magic_bytes(self):
+        """Test MIME types come from content, including gzipped NIfTI."""
+        assert detect_mime_type(NIFTI_HEADER, "mask.bin") == "application/x-nifti"
+        assert detect_mime_type(gzip.compress(NIFTI_HEADER), "mask.nii.gz") == "application/x-nifti"
+        assert detect_mime_type(b"\x89PNG\r\n\x1a\n....", "overlay") == "image/png"
+        assert detect_mime_type(b'{"dice": 0.9}', "metrics.json") == "application/json"
+        assert detect_mime_type(b"\x00\x01\x02", "blob") == "application/octet-stream"
+
+    @pytest.mark.asyncio
+    async def test_collect_indexes_per_step_once(self):
+        """Test outputs are hashed per step, the index is stored and reused."""
+        storage = FakeStorage({
+            "exec_1/seg/sub-001/mask.nii.gz": gzip.compress(NIFTI_HEADER),
+            "exec_1/seg2/metrics.json": b'{"dice": 0.9}',
+            "exec_2/seg/other.txt": b"other execution",
+        })
+        collector = ResultCollector(storage=storage, max_workers=4)
+
+        results = await collector.collect("exec_1", {"seg": "exec_1/seg/", "seg2": "exec_1/seg2/"})
+
+        assert [(r["path"], r["node_id"], r["mime_type"]) for r in results] == [
+            ("seg/sub-001/mask.nii.gz", "seg", "application/x-nifti"),
+            ("seg2/metrics.json", "seg2", "application/json"),
+        ]
+        assert results[1]["size"] == 13
+        assert results[1]["sha256"] == hashlib.sha256(b'{"dice": 0.9}').hexdigest()
+        assert json.loads(storage.objects[f"exec_1/{INDEX_OBJECT}"]) == results
+
+        reads = len(storage.reads)
+        assert await collector.collect("exec_1", {"seg": "exec_1/seg/"}) == results
+        assert len(storage.reads) == reads
+
+    @pytest.mark.asyncio
+    async def test_collect_publishes_local_step_outputs(self, tmp_path, monkeypatch):
+        """Test outputs a step wrote to its OUTPUT_PATH are uploaded and indexed."""
+        monkeypatch.setattr(PlanCompiler, "MINIO_DATA_PATH", str(tmp_path))
+        step = PlannedStep(
+            step_id="segment",
+            task_id="segment",
+            run="tool.cwl",
+            env={"EXECUTION_ID": "exec_1", "OUTPUT_PATH": "/data/output/exec_1/segment"},
+        )
+        plan = ExecutionPlan(workflow_id="wf", execution_id="exec_1", steps={"segment": step}, step_order=("segment",))
+        generator = MagicMock()
+        generator.step_container.return_value = {
+            "command": ["sh", "-c", 'mkdir -p "$OUTPUT_PATH/sub-001" && printf \'{"dice": 0.9}\' > "$OUTPUT_PATH/sub-001/metrics.json"'],
+        }
+
+        async def on_update(changed, lines):
+            pass
+        states = await LocalExecutor(generator, cpus=1, runtime="process").run(plan, on_update)
+        assert states == {"segment": "success"}
+
+        storage = FakeStorage({"exec_1/segment/log.txt": b"stored by the step"})
+        collector = ResultCollector(storage=storage, max_workers=2, data_root=str(tmp_path))
+        results = await collector.collect("exec_1", {"segment": "exec_1/segment/"})
+
+        assert [(r["path"], r["node_id"], r["mime_type"]) for r in results] == [
+            ("segment/log.txt", "segment", "text/plain"),
+            ("segment/sub-001/metrics.json", "segment", "application/json"),
+        ]
+        assert results[1]["sha256"] == hashlib.sha256(b'{"dice": 0.9}').hexdigest()
+        assert storage.objects["exec_1/segment/sub-001/metrics.json"] == b'{"dice": 0.9}'
+        assert json.loads(storage.objects[f"exec_1/{INDEX_OBJECT}"]) == results
+
+    @pytest.mark.asyncio
+    async def test_collect_hashes_local_outputs_while_uploading(self, tmp_path, monkeypatch):
+        """Test each local output file is opened once, to upload and hash it."""
+        output = tmp_path / "output" / "exec_1" / "segment"
+        output.mkdir(parents=True)
+        (output / "mask.nii.gz").write_bytes(gzip.compress(NIFTI_HEADER))
+        opened = []
+        real_open = open
+
+        def tracking_open(path, *args, **kwargs):
+            opened.append(str(path))
+            return real_open(path, *args, **kwargs)
+        monkeypatch.setattr("builtins.open", tracking_open)
+
+        storage = FakeStorage({})
+        collector = ResultCollector(storage=storage, max_workers=2, data_root=str(tmp_path))
+        results = await collector.collect("exec_1", {"segment": "exec_1/segment/"})
+
+        data = gzip.compress(NIFTI_HEADER)
+        assert opened.count(str(output / "mask.nii.gz")) == 1
+        assert results[0]["mime_type"] == "application/x-nifti"
+        assert results[0]["size"] == len(data)
+        assert results[0]["sha256"] == hashlib.sha256(data).hexdigest()
+        assert storage.objects["exec_1/segment/mask.nii.gz"] == data
@@ -0,0 +1,148 @@
+import time
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.services.run_monitor import RunMonitor, RunWatch, ACTIVE_RUN_STATES
+
+
+class TestRunMonitor:
+
+    @pytest.fixture
+    def airflow(self):
+        """Mock Airflow client with two running DAG runs."""
+        client = MagicMock()
+        client.list_dag_runs = AsyncMock(return_value=[
+            {"dag_id": "dag_a", "dag_run_id": "run_a", "state": "running"},
+            {"dag_id": "dag_b", "dag_run_id": "run_b", "state": "running"},
+            {"dag_id": "dag_b", "dag_run_id": "other", "state": "running"},
+        ])
+        client.list_task_instances = AsyncMock(return_value=[
+            {"dag_run_id": "run_a", "task_id": "step1", "state": "running", "try_number": 1},
+            {"dag_run_id": "run_b", "task_id": "step1", "state": "queued", "try_number": 1},
+        ])
+        client.get_dag_run = AsyncMock()
+        return client
+
+    @pytest.fixture
+    def monitor(self, airflow):
+        """Create a RunMonitor watching run_a and run_b without starting its loop."""
+        monitor = RunMonitor(airflow)
+        self.calls = []
+
+        def handler(run_id):
+            async def handle(dag_run, task_instances, changed):
+                self.calls.append((run_id, dag_run["state"], [t["task_id"] for t in changed]))
+                return False
+            return handle
+
+        for dag_id, run_id in (("dag_a", "run_a"), ("dag_b", "run_b")):
+            monitor._watches[run_id] = RunWatch(dag_id, run_id, handler(run_id))
+        return monitor
+
+    @pytest.mark.asyncio
+    async def test_poll_batches_all_runs(self, monitor, airflow):
+        """Test one poll issues one run query and one task query for all executions."""
+        await monitor.poll()
+
+        airflow.list_dag_runs.assert_awaited_once_with(["dag_a", "dag_b"], states=ACTIVE_RUN_STATES)
+        airflow.list_task_instances.assert_awaited_once_with(["dag_a", "dag_b"], ["run_a", "run_b"])
+        airflow.get_dag_run.assert_not_awaited()
+        assert sorted(self.calls) == [("run_a", "running", ["step1"]), ("run_b", "running", ["step1"])]
+
+    @pytest.mark.asyncio
+    async def test_poll_dispatches_only_changes(self, monitor, airflow):
+        """Test handlers are not called again when nothing changed."""
+        await monitor.poll()
+        self.calls.clear()
+        airflow.list_task_instances.return_value = [
+            {"dag_run_id": "run_a", "task_id": "step1", "state": "running", "try_number": 1},
+            {"dag_run_id": "run_b", "task_id": "step1", "state": "running", "try_number": 1},
+        ]
+
+        await monitor.poll()
+
+        assert self.calls == [("run_b", "running", ["step1"])]
+
+    @pytest.mark.asyncio
+    async def test_finished_run_fetched_once_and_unwatched(self, monitor, airflow):
+        """Test a run that left the active states is looked up and stops being watched."""
+        airflow.list_dag_runs.return_value = [
+            {"dag_id": "dag_b", "dag_run_id": "run_b", "state": "running"},
+        ]
+        airflow.get_dag_run.return_value = {"dag_id": "dag_a", "dag_run_id": "run_a", "state": "success"}
+
+        await monitor.poll()
+
+        airflow.get_dag_run.assert_awaited_once_with("dag_a", "run_a")
+        assert ("run_a", "success", ["step1"]) in self.calls
+        assert monitor.watched == ["run_b"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("failing", ["list_dag_runs", "list_task_instances"])
+    async def test_failed_query_backs_off(self, monitor, airflow, failing):
+        """Test runs are not polled again right away when an Airflow query fails."""
+        getattr(airflow, failing).return_value = None
+
+        await monitor.poll()
+
+        now = time.time()
+        assert all(w.next_poll_at > now for w in monitor._watches.values())
+        assert self.calls == []
+
+    @pytest.mark.asyncio
+    async def test_failed_query_does_not_spin_run_loop(self, monitor, airflow):
+        """Test the polling loop waits between polls while Airflow is unavailable."""
+        airflow.list_dag_runs.return_value = None
+        monitor._wakeup = asyncio.Event()
+        task = asyncio.create_task(monitor._run())
+
+        await asyncio.sleep(0.3)
+        task.cancel()
+
+        assert airflow.list_dag_runs.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_handler_failure_keeps_watching(self, monitor, airflow):
+        """Test a failing handler gets the same changes again instead of dropping the run."""
+        handler = AsyncMock(side_effect=[Exception("db down"), True])
+        monitor._watches = {"run_a": RunWatch("dag_a", "run_a", handler)}
+        airflow.list_dag_runs.return_value = []
+        airflow.get_dag_run.return_value = {"dag_id": "dag_a", "dag_run_id": "run_a", "state": "success"}
+
+        await monitor.poll()
+        assert monitor.watched == ["run_a"]
+        assert monitor._watches["run_a"].next_poll_at > time.time()
+
+        await monitor.poll()
+        assert handler.await_count == 2
+        assert handler.await_args_list[0] == handler.await_args_list[1]
+        assert monitor.watched == []
+
+    def test_schedule_backs_off_then_speeds_up_near_completion(self, monitor):
+        """Test unchanged runs back off and tasks near their expected end are polled sooner."""
+        from datetime import datetime, timezone, timedelta
+        from app.services import run_monitor as rm
+
+        watch = monitor._watches["run_a"]
+        intervals = []
+        for _ in range(3):
+            before = time.time()
+            monitor._schedule(watch, [], changed=False)
+            intervals.append(watch.next_poll_at - before)
+        assert intervals[0] < intervals[2] <= rm.MAX_INTERVAL * (1 + rm.JITTER)
+
+        # A 100 s task started 90 s ago is polled again within ~5 s
+        watch.expected_durations = {"step1": 100}
+        started = (datetime.now(timezone.utc) - timedelta(seconds=90)).isoformat()
+        monitor._schedule(watch, [{"task_id": "step1", "state": "running", "start_date": started}], changed=False)
+        assert watch.next_poll_at - time.time() <= 5 * (1 + rm.JITTER) + 0.1
+
+    def test_notify_makes_run_due(self, monitor):
+        """Test a pushed event schedules an immediate poll of its run only."""
+        for watch in monitor._watches.values():
+            watch.next_poll_at = time.time() + 60
+
+        assert monitor.notify("run_b") is True
+        assert monitor.notify("unknown") is False
+        assert monitor._watches["run_b"].next_poll_at == 0.0
+        assert monitor._watches["run_a"].next_poll_at > time.time()
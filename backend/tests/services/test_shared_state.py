@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.shared_state import SharedState, MemoryStateBackend, SQLiteStateBackend
+
+
+class TestSharedDict:
+
+    def test_values_are_copies_written_back_by_patch(self):
+        """Test nested changes only persist when written back."""
+        uploads = SharedState(MemoryStateBackend()).dict("uploads")
+        uploads["u1"] = {"status": "processing", "result": None}
+
+        uploads["u1"]["status"] = "lost"
+        assert uploads["u1"]["status"] == "processing"
+
+        uploads.patch("u1", {"status": "completed", "result": {"tools": 2}})
+        assert uploads["u1"] == {"status": "completed", "result": {"tools": 2}}
+        assert "u1" in uploads and list(uploads) == ["u1"]
+        assert uploads.pop("u1")["status"] == "completed"
+        assert uploads.get("u1") is None
+
+    def test_namespaces_are_separate(self, tmp_path):
+        """Test the same key in two namespaces of a SQLite backend."""
+        state = SharedState(SQLiteStateBackend(tmp_path / "state.db"))
+        state.dict("uploads")["x"] = 1
+        state.dict("workflows")["x"] = 2
+
+        other_worker = SharedState(SQLiteStateBackend(tmp_path / "state.db"))
+        assert other_worker.dict("uploads")["x"] == 1
+        assert other_worker.dict("workflows")["x"] == 2
+        del other_worker.dict("uploads")["x"]
+        assert "x" not in state.dict("uploads")
+
+
+    @pytest.mark.asyncio
+    async def test_async_access_runs_blocking_backends_in_a_thread(self, tmp_path):
+        """Test coroutines keep SQLite I/O off the event loop."""
+        workflows = SharedState(SQLiteStateBackend(tmp_path / "state.db")).dict("workflows")
+
+        with patch("app.services.shared_state.asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+            await workflows.aset("wf1", {"status": "draft"})
+            await workflows.apatch("wf1", {"status": "saved"})
+            assert await workflows.acontains("wf1")
+            assert await workflows.aget("wf1") == {"status": "saved"}
+            assert await workflows.apop("wf1") == {"status": "saved"}
+            assert await workflows.aget("wf1", {}) == {}
+
+        assert to_thread.call_count == 6
+
+
+class TestSharedStatePubSub:
+
+    @pytest.mark.asyncio
+    async def test_memory_publish_reaches_local_handlers(self):
+        """Test a single worker delivers its own messages directly."""
+        state = SharedState(MemoryStateBackend())
+        handler = AsyncMock()
+        state.subscribe("executions", handler)
+
+        await state.publish("executions", {"execution_id": "e1"})
+
+        handler.assert_awaited_once_with({"execution_id": "e1"})
+
+    @pytest.mark.asyncio
+    async def test_sqlite_publish_reaches_other_workers_once(self, tmp_path):
+        """Test messages fan out to other workers and are not echoed back."""
+        publisher = SharedState(SQLiteStateBackend(tmp_path / "state.db", poll_interval=0.01))
+        subscriber = SharedState(SQLiteStateBackend(tmp_path / "state.db", poll_interval=0.01))
+        # Both "workers" run in this process: give them distinct identities
+        local, remote = AsyncMock(), AsyncMock()
+        publisher.subscribe("agents", local)
+        subscriber.subscribe("agents", remote)
+        subscriber.worker_id = "worker-2"
+        await asyncio.sleep(0.05)
+
+        await publisher.publish("agents", {"client_id": "c1", "message": {"type": "log"}})
+        for _ in range(50):
+            if remote.await_count:
+                break
+            await asyncio.sleep(0.01)
+
+        local.assert_awaited_once_with({"client_id": "c1", "message": {"type": "log"}})
+        remote.assert_awaited_once_with({"client_id": "c1", "message": {"type": "log"}})
+        await publisher.close()
+        await subscriber.close()
+
@@ -0,0 +1,102 @@
+import pytest
+from app.models.plan import ExecutionPlan, PlannedStep
+from app.services.database_sqlite import SQLiteDB
+from app.services.step_history import (
+    StepHistory,
+    size_class,
+    estimate_progress,
+    task_run_times,
+)
+
+
+def make_plan(durations, dependencies=None, image="veriflow/tool:1.0"):
+    dependencies = dependencies or {}
+    steps = {
+        step_id: PlannedStep(
+            step_id=step_id,
+            task_id=step_id,
+            run=f"{step_id}.cwl",
+            image=image,
+            dependencies=tuple(dependencies.get(step_id, ())),
+            estimated_duration=duration,
+        )
+        for step_id, duration in durations.items()
+    }
+    return ExecutionPlan(workflow_id="wf", execution_id="exec_1", steps=steps, step_order=tuple(steps))
+
+
+class TestStepHistory:
+
+    @pytest.fixture
+    def history(self, tmp_path):
+        return StepHistory(SQLiteDB(db_path=tmp_path / "veriflow.db"), alpha=0.5)
+
+    def test_size_classes_grow_by_factor_four(self):
+        """Test inputs are bucketed by size."""
+        mib = 1024 * 1024
+        assert size_class(0) == size_class(mib - 1) == 0
+        assert size_class(mib) == size_class(4 * mib - 1) == 1
+        assert size_class(4 * mib) == 2
+
+    def test_estimates_average_recorded_run_times(self, history):
+        """Test run times are averaged per tool and only known steps are estimated."""
+        plan = make_plan({"fetch": 60.0, "segment": 60.0})
+
+        assert history.estimates(plan, 0) == {}
+        history.record(plan, 0, {"fetch": 10.0})
+        history.record(plan, 0, {"fetch": 20.0})
+        # Moving average once the history has 1 / alpha samples
+        history.record(plan, 0, {"fetch": 35.0})
+
+        assert history.estimates(plan, 0) == {"fetch": 25.0}
+
+    def test_estimates_fall_back_to_nearest_size_class(self, history):
+        """Test a size class without history uses the closest one."""
+        plan = make_plan({"fetch": 60.0})
+        history.record(plan, 0, {"fetch": 5.0})
+        history.record(plan, 64 * 1024 * 1024, {"fetch": 500.0})
+
+        assert history.estimates(plan, 200 * 1024 * 1024) == {"fetch": 500.0}
+        assert history.estimates(plan, 1024) == {"fetch": 5.0}
+        # Another image is another history
+        assert history.estimates(make_plan({"fetch": 60.0}, image="other:2"), 0) == {}
+
+
+class TestProgressEstimate:
+
+    def test_progress_weighted_by_expected_durations(self):
+        """Test a long step weighs more than a short one and the ETA follows the critical path."""
+        plan = make_plan(
+            {"copy": 10.0, "infer": 30.0, "report": 100.0},
+            dependencies={"infer": ["copy"]},
+        )
+
+        progress, remaining = estimate_progress(
+            plan, {"copy": "completed", "infer": "running"}, {"infer": 15.0}
+        )
+
+        assert progress == int((10 + 15) / 140 * 100)
+        assert remaining == 100.0
+
+    def test_overrunning_step_is_never_complete(self):
+        """Test a step running longer than expected keeps some remaining time."""
+        plan = make_plan({"infer": 10.0})
+
+        progress, remaining = estimate_progress(plan, {"infer": "running"}, {"infer": 60.0})
+
+        assert progress == 95
+        assert remaining > 0
+
+    def test_task_run_times_span_mapped_instances(self):
+        """Test mapped tasks count from their first start to their last end."""
+        finished, running = task_run_times([
+            {"task_id": "align", "map_index": 0, "state": "success",
+             "start_date": "2026-01-01T00:00:00Z", "end_date": "2026-01-01T00:01:00Z"},
+            {"task_id": "align", "map_index": 1, "state": "success",
+             "start_date": "2026-01-01T00:00:30Z", "end_date": "2026-01-01T00:02:00Z"},
+            {"task_id": "infer", "map_index": -1, "state": "running",
+             "start_date": "2026-01-01T00:02:00+00:00", "end_date": None},
+        ], now=1767225780.0)
+
+        assert finished == {"align": 120.0}
+        assert running == {"infer": 60.0}
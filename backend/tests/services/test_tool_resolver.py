@@ -0,0 +1,228 @@
+import time
+import threading
+import pytest
+from pathlib import Path
+from app.services.cwl_parser import CWLParser
+from app.services.tool_resolver import ToolResolver
+
+
+TOOL_CWL = """
+cwlVersion: v1.2
+class: CommandLineTool
+id: {name}
+baseCommand: [python, {name}.py]
+requirements:
+  DockerRequirement:
+    dockerPull: veriflow/{name}:latest
+inputs:
+  input_file: File
+outputs:
+  output_file:
+    type: File
+    outputBinding:
+      glob: "*.out"
+"""
+
+
+def make_workflow(refs):
+    """Build a linear workflow whose steps run the given references."""
+    lines = [
+        "cwlVersion: v1.2",
+        "class: Workflow",
+        "id: resolver-test",
+        "inputs:",
+        "  data: File",
+        "outputs: {}",
+        "steps:",
+    ]
+    for i, ref in enumerate(refs):
+        source = "data" if i == 0 else f"step{i - 1}/output_file"
+        lines.extend([
+            f"  step{i}:",
+            f"    run: {ref}",
+            "    in:",
+            f"      input_file: {source}",
+            "    out: [output_file]",
+        ])
+    return "\n".join(lines) + "\n"
+
+
+class FakeStorage:
+    """In-memory stand-in for MinIOService with per-request latency."""
+
+    WORKFLOW_TOOL_BUCKET = "workflow-tool"
+
+    def __init__(self, objects, latency=0.0):
+        self.objects = objects
+        self.etags = {key: "etag-1" for key in objects}
+        self.latency = latency
+        self.downloads = []
+        self.lock = threading.Lock()
+
+    def get_object_etag(self, bucket, object_name):
+        time.sleep(self.latency)
+        return self.etags.get(object_name)
+
+    def download_file(self, bucket, object_name):
+        time.sleep(self.latency)
+        with self.lock:
+            self.downloads.append(object_name)
+        return self.objects[object_name].encode()
+
+
+class TestToolResolver:
+
+    @pytest.fixture
+    def storage(self):
+        objects = {f"tools/tool{i}.cwl": TOOL_CWL.format(name=f"tool{i}") for i in range(25)}
+        return FakeStorage(objects)
+
+    @pytest.fixture
+    def parser(self, storage, tmp_path):
+        parser = CWLParser(base_path=tmp_path)
+        parser.tool_resolver = ToolResolver(parser, storage=storage)
+        return parser
+
+    def test_resolve_local_step2_samples(self):
+        """Test tools are loaded from disk relative to the workflow."""
+        samples = Path(__file__).parents[2] / "prompt_engineering" / "Step2"
+        parser = CWLParser()
+        result = parser.parse_workflow((samples / "workflow.cwl").read_text(), base_path=samples)
+
+        assert result.success is True
+        tools = result.workflow.tools
+        assert set(tools) == {"create_nifti", "run_inference"}
+        assert tools["create_nifti"].base_command == ["python", "create_nifti.py"]
+        docker_req = parser.get_docker_requirement(tools["create_nifti"])
+        assert docker_req.docker_pull == "python:3.9"
+        assert result.validation.warnings == []
+
+    def test_resolve_from_minio(self, parser, storage):
+        """Test references missing on disk are fetched from the workflow-tool bucket."""
+        result = parser.parse_workflow(make_workflow(["tools/tool0.cwl", "./tools/tool1.cwl"]))
+
+        assert result.success is True
+        assert result.workflow.tools["step0"].id == "tool0"
+        assert result.workflow.tools["step1"].id == "tool1"
+        assert sorted(storage.downloads) == ["tools/tool0.cwl", "tools/tool1.cwl"]
+
+    def test_resolve_deduplicates_references(self, parser, storage):
+        """Test steps sharing a tool trigger a single fetch."""
+        result = parser.parse_workflow(make_workflow(["tools/tool0.cwl"] * 3))
+
+        assert len(result.workflow.tools) == 3
+        assert storage.downloads == ["tools/tool0.cwl"]
+
+    def test_resolve_cache_by_etag(self, parser, storage):
+        """Test unchanged ETags reuse the cached parse and changed ones refetch."""
+        cwl = make_workflow(["tools/tool0.cwl"])
+        parser.parse_workflow(cwl)
+        parser.parse_workflow(cwl)
+        assert storage.downloads == ["tools/tool0.cwl"]
+
+        storage.etags["tools/tool0.cwl"] = "etag-2"
+        parser.parse_workflow(cwl)
+        assert storage.downloads == ["tools/tool0.cwl", "tools/tool0.cwl"]
+
+    def test_is_current_checks_tool_versions(self, parser, storage, tmp_path):
+        """Test a resolution is current until a MinIO or local tool changes."""
+        (tmp_path / "local.cwl").write_text(TOOL_CWL.format(name="local"))
+        result = parser.parse_workflow(make_workflow(["tools/tool0.cwl", "local.cwl", "tools/missing.cwl"]))
+        resolver = parser.tool_resolver
+        assert len(result.tool_versions) == 3
+        assert resolver.is_current(result.tool_versions)
+
+        storage.etags["tools/tool0.cwl"] = "etag-2"
+        assert not resolver.is_current(result.tool_versions)
+        storage.etags["tools/tool0.cwl"] = "etag-1"
+
+        (tmp_path / "local.cwl").write_text(TOOL_CWL.format(name="local") + "doc: changed\n")
+        assert not resolver.is_current(result.tool_versions)
+        result = parser.parse_workflow(make_workflow(["tools/tool0.cwl", "local.cwl", "tools/missing.cwl"]))
+        assert resolver.is_current(result.tool_versions)
+
+        storage.etags["tools/missing.cwl"] = "etag-1"
+        assert not resolver.is_current(result.tool_versions)
+
+    def test_resolve_fetches_concurrently(self, parser, storage):
+        """Test 20+ independent tools resolve in about one round trip."""
+        storage.latency = 0.1
+        refs = [f"tools/tool{i}.cwl" for i in range(25)]
+
+        start = time.perf_counter()
+        result = parser.parse_workflow(make_workflow(refs))
+        elapsed = time.perf_counter() - start
+
+        assert len(result.workflow.tools) == 25
+        # Sequential fetching would take 25 * 2 * 0.1s = 5s
+        assert elapsed < 1.0
+
+    def test_resolve_inline_and_graph_references(self, parser):
+        """Test embedded tools and `#id` references into a packed $graph."""
+        packed = """
+cwlVersion: v1.2
+$graph:
+  - id: "#main"
+    class: Workflow
+    inputs:
+      data: File
+    outputs: {}
+    steps:
+      packed:
+        run: "#packed_tool"
+        in: {input_file: data}
+        out: [output_file]
+      embedded:
+        run:
+          class: CommandLineTool
+          baseCommand: echo
+          inputs: {input_file: File}
+          outputs: {}
+        in: {input_file: packed/output_file}
+        out: []
+  - id: "#packed_tool"
+    class: CommandLineTool
+    baseCommand: [cat]
+    inputs: {input_file: File}
+    outputs: {output_file: stdout}
+"""
+        result = parser.parse_workflow(packed)
+
+        assert result.success is True
+        assert result.workflow.tools["packed"].base_command == ["cat"]
+        assert result.workflow.tools["embedded"].base_command == "echo"
+        assert result.workflow.step_dependencies == {"embedded": ["packed"]}
+
+    def test_resolve_nested_subworkflows(self, parser, storage):
+        """Test sub-workflows resolve recursively and shared ones are fetched once."""
+        storage.objects["sub/inner.cwl"] = make_workflow(["../tools/tool3.cwl", "../tools/tool4.cwl"])
+        storage.etags["sub/inner.cwl"] = "etag-1"
+
+        result = parser.parse_workflow(make_workflow(["sub/inner.cwl", "sub/inner.cwl"]))
+
+        assert result.success is True
+        subworkflows = result.workflow.subworkflows
+        assert set(subworkflows) == {"step0", "step1"}
+        assert subworkflows["step0"].tools["step0"].id == "tool3"
+        assert subworkflows["step0"].tools["step1"].id == "tool4"
+        assert sorted(storage.downloads) == ["sub/inner.cwl", "tools/tool3.cwl", "tools/tool4.cwl"]
+
+    def test_resolve_missing_reference_warns(self, parser):
+        """Test unresolved references are reported as validation warnings."""
+        result = parser.parse_workflow(make_workflow(["tools/missing.cwl"]))
+
+        assert result.success is True
+        assert result.workflow.tools == {}
+        assert any("could not be resolved" in w for w in result.validation.warnings)
+
+    def test_resolve_unreachable_storage_warns(self, parser, storage):
+        """Test storage connection errors are reported as validation warnings."""
+        def unreachable(bucket, object_name):
+            raise ConnectionError("MinIO unreachable at localhost:9000")
+        storage.get_object_etag = unreachable
+
+        result = parser.parse_workflow(make_workflow(["tools/tool0.cwl"]))
+
+        assert result.success is True
+        assert result.workflow.tools == {}
+        assert any("unreachable" in w for w in result.validation.warnings)
@@ -0,0 +1,153 @@
+"""
+VeriFlow - CWL Step Runner
+Runs one workflow step with cwltool inside the runner image.
+
+Invoked by generated Airflow tasks as
+
+    python /opt/veriflow/veriflow_step.py '<step spec JSON>'
+
+where the spec holds the step's tool document (CommandLineTool or an
+inlined sub-workflow) and how each tool input is bound:
+{"source": "input"} / {"source": "step/output"} / {"value": literal}.
+
+Workflow inputs come from the CWL_INPUTS environment variable, upstream
+outputs from the cwl_output.json files written by earlier steps. Results are
+cached in a shared --cachedir keyed by tool and input hashes, so re-running
+a workflow only recomputes steps whose tool or inputs changed.
+
+Mapped tasks of a scatter step get their batch in SCATTER_ITEMS (see
+veriflow_runtime.scatter_split) and run the tool once per job, each into
+the job's own output directory.
+"""
+
+import os
+import sys
+import json
+import subprocess
+import tempfile
+
+DATA_ROOT = "/data"
+CACHE_DIR = os.getenv("CWL_CACHE_DIR", "/data/veriflow-cwl-cache")
+OUTPUT_FILE = "cwl_output.json"
+
+
+def upstream_output(execution_id: str, source: str):
+    """
+    Read `output` of an upstream step (`step/output`) from its cwl_output.json.
+
+    Scatter steps write one cwl_output.json per job (in numbered
+    subdirectories); their output is the array of the job outputs.
+    """
+    step, output = source.split("/", 1)
+    step_dir = os.path.join(DATA_ROOT, "output", execution_id, step)
+    path = os.path.join(step_dir, OUTPUT_FILE)
+    if not os.path.exists(path) and os.path.isdir(step_dir):
+        jobs = sorted((int(name) for name in os.listdir(step_dir) if name.isdigit()))
+        return [upstream_output(execution_id, f"{step}/{index}/{output}") for index in jobs]
+    with open(path) as f:
+        return json.load(f).get(output)
+
+
+def _input_type(tool: dict, name: str):
+    inputs = tool.get("inputs", {})
+    if isinstance(inputs, list):
+        inputs = {i.get("id", "").lstrip("#"): i for i in inputs}
+    definition = inputs.get(name)
+    return definition.get("type") if isinstance(definition, dict) else definition
+
+
+def scatter_value(tool: dict, name: str, value):
+    """CWL value of one scatter item (folder entries arrive as plain paths)."""
+    kind = _input_type(tool, name)
+    kind = kind.rstrip("?") if isinstance(kind, str) else kind
+    if isinstance(value, str) and kind in ("File", "Directory"):
+        return {"class": kind, "path": value}
+    return value
+
+
+def build_job(spec: dict, execution_id: str, workflow_inputs: dict) -> dict:
+    """Build the cwltool job object of a step from its input bindings."""
+    def resolve(source):
+        if isinstance(source, list):
+            return [resolve(s) for s in source]
+        source = source.lstrip("#")
+        if "/" in source:
+            return upstream_output(execution_id, source)
+        return workflow_inputs.get(source)
+
+    job = {}
+    for name, binding in spec.get("inputs", {}).items():
+        value = resolve(binding["source"]) if "source" in binding else binding.get("value")
+        if value is not None:
+            job[name] = value
+    return job
+
+
+def run_tool(spec: dict, job: dict, output_path: str) -> int:
+    """Run the step's tool on one job with cwltool, writing cwl_output.json."""
+    os.makedirs(output_path, exist_ok=True)
+
+    # Step containers are started on the host Docker daemon, so every path
+    # they bind-mount must exist at the same location on the host
+    tmp_root = os.path.join(CACHE_DIR, "tmp")
+    os.makedirs(tmp_root, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=tmp_root) as work_dir:
+        tool_file = os.path.join(work_dir, "tool.cwl")
+        job_file = os.path.join(work_dir, "job.json")
+        with open(tool_file, "w") as f:
+            json.dump(spec["tool"], f)
+        with open(job_file, "w") as f:
+            json.dump(job, f)
+
+        command = [
+            "cwltool",
+            "--cachedir", CACHE_DIR,
+            "--tmpdir-prefix", os.path.join(tmp_root, "job-"),
+            "--tmp-outdir-prefix", os.path.join(tmp_root, "out-"),
+            "--outdir", output_path,
+            "--strict-memory-limit",
+            "--strict-cpu-limit",
+        ]
+        if spec["tool"].get("class") == "Workflow":
+            # Independent branches of a sub-workflow run side by side
+            command.append("--parallel")
+        command.extend([tool_file, job_file])
+
+        print(f"Running step {spec['step']}: {' '.join(command)}", flush=True)
+        result = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            return result.returncode
+
+    with open(os.path.join(output_path, OUTPUT_FILE), "w") as f:
+        f.write(result.stdout)
+    print(result.stdout, flush=True)
+    return 0
+
+
+def main(argv) -> int:
+    spec = json.loads(argv[1])
+    execution_id = os.environ["EXECUTION_ID"]
+    output_path = os.environ.get("OUTPUT_PATH") or os.path.join(
+        DATA_ROOT, "output", execution_id, spec["step"]
+    )
+    workflow_inputs = json.loads(os.environ.get("CWL_INPUTS") or "{}")
+    job = build_job(spec, execution_id, workflow_inputs)
+
+    if "SCATTER_ITEMS" not in os.environ:
+        return run_tool(spec, job, output_path)
+
+    # Scatter batch: the scattered inputs take the job's item values
+    for item in json.loads(os.environ["SCATTER_ITEMS"]):
+        print(f"Scatter job {item['index']} of step {spec['step']}", flush=True)
+        item_job = dict(job)
+        for name, value in item["inputs"].items():
+            item_job[name] = scatter_value(spec["tool"], name, value)
+        returncode = run_tool(spec, item_job, item["output_path"])
+        if returncode != 0:
+            return returncode
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))